@@ -29,7 +29,9 @@ LAL-derived code (eg. LALApps programs)
 """
 
 
+import bisect
 import fnmatch
+import itertools
 import math
 import os
 import re
@@ -374,6 +376,19 @@ class LIGOTimeGPS(object):
 		return -self
 
 
+#
+# Use the C implementation if it's available.  It has the same interface,
+# pickles identically, and the C segment code has a fast path for
+# comparing them.
+#
+
+
+try:
+	from glue.__segments import LIGOTimeGPS
+except ImportError:
+	pass
+
+
 #
 # =============================================================================
 #
@@ -691,16 +706,15 @@ class Cache(list):
 		"""
 		Remove elements from self that are in other.
 		"""
-		end = len(self) - 1
-		for i, elem in enumerate(self[::-1]):
-			if elem in other:
-				del self[end - i]
+		other = set(other)
+		self[:] = [elem for elem in self if elem not in other]
 		return self
 
 	def __sub__(self, other):
 		"""
 		Return a Cache containing the entries of self that are not in other.
 		"""
+		other = set(other)
 		return self.__class__([elem for elem in self if elem not in other])
 
 	def __ior__(self, other):
@@ -720,26 +734,27 @@ class Cache(list):
 		"""
 		Remove elements in self that are not in other.
 		"""
-		end = len(self) - 1
-		for i, elem in enumerate(self[::-1]):
-			if elem not in other:
-				del self[end - i]
+		other = set(other)
+		self[:] = [elem for elem in self if elem in other]
 		return self
 	
 	def __and__(self, other):
 		"""
 		Return a Cache containing the entries of self that are also in other.
 		"""
+		other = set(other)
 		return self.__class__([elem for elem in self if elem in other])
 
 	def unique(self):
 		"""
 		Return a Cache which has every element of self, but without
-		duplication.  Preserve order.  Does not hash, so a bit slow.
+		duplication.  Preserve order.
 		"""
+		seen = set()
 		new = self.__class__([])
 		for elem in self:
-			if elem not in new:
+			if elem not in seen:
+				seen.add(elem)
 				new.append(elem)
 		return new
 
@@ -748,16 +763,14 @@ class Cache(list):
 		"""
 		write a cache object to the fileobj as a lal cache file
 		"""
-		for entry in self:
-			print >>fileobj, str(entry)
+		fileobj.writelines("%s\n" % entry for entry in self)
 		fileobj.close()
 
 	def topfnfile(self, fileobj):
 		"""
 		write a cache object to filename as a plain text pfn file
 		"""
-		for entry in self:
-			print >>fileobj, entry.path
+		fileobj.writelines("%s\n" % entry.path for entry in self)
 		fileobj.close()
 
 	def to_segmentlistdict(self):
@@ -862,3 +875,448 @@ class Cache(list):
 
 	def __getslice__(self, i, j):
 		return self.__class__(super(Cache, self).__getslice__(i, j))
+
+
+#
+# A Cache with an index of its entries
+#
+
+
+class _CacheIndexGroup(object):
+	"""
+	The entries of an IndexedCache that share an observatory and a
+	description:  the start times of the entries' segments in order,
+	and for each the entry's segment and position in the Cache.
+	Entries without segments are listed separately.  For internal
+	use only.
+	"""
+	__slots__ = ("starts", "segments", "positions", "maxdur", "unsegmented")
+
+	def __init__(self):
+		self.starts = []
+		self.segments = []
+		self.positions = []
+		self.maxdur = None
+		self.unsegmented = []
+
+	def add(self, position, seg):
+		if seg is None:
+			self.unsegmented.append(position)
+			return
+		# usually entries are added in time order, so this is
+		# usually an append
+		i = bisect.bisect_right(self.starts, seg[0])
+		self.starts.insert(i, seg[0])
+		self.segments.insert(i, seg)
+		self.positions.insert(i, position)
+		if self.maxdur is None or abs(seg) > self.maxdur:
+			self.maxdur = abs(seg)
+
+	def intersecting(self, seg):
+		"""
+		Return the positions of the entries whose segments
+		intersect seg.  No entry is longer than .maxdur so only
+		those starting after seg[0] - .maxdur need be checked.
+		"""
+		if not self.starts:
+			return []
+		i = bisect.bisect_right(self.starts, seg[0] - self.maxdur)
+		j = bisect.bisect_left(self.starts, seg[1])
+		return [position for position, s in itertools.izip(self.positions[i:j], self.segments[i:j]) if s[1] > seg[0]]
+
+	def contained(self, seg):
+		"""
+		Return the positions of the entries whose segments are
+		contained in seg.
+		"""
+		i = bisect.bisect_left(self.starts, seg[0])
+		j = bisect.bisect_right(self.starts, seg[1])
+		return [position for position, s in itertools.izip(self.positions[i:j], self.segments[i:j]) if s[1] <= seg[1]]
+
+	def equal(self, seg):
+		"""
+		Return the positions of the entries whose segments equal
+		seg.
+		"""
+		i = bisect.bisect_left(self.starts, seg[0])
+		j = bisect.bisect_right(self.starts, seg[0])
+		return [position for position, s in itertools.izip(self.positions[i:j], self.segments[i:j]) if s == seg]
+
+
+class IndexedCache(Cache):
+	"""
+	A Cache that maintains an index of its entries, grouped by
+	observatory and description and, within each group, sorted by
+	start time.  With the index, .sieve() matches the ifos and
+	description patterns against each distinct (observatory,
+	description) pair instead of against each entry, and finds the
+	entries intersecting a segment or segmentlist by bisection, so a
+	sieve of n entries by a segment costs O(log n + k) to find k
+	entries instead of O(n).
+
+	The index is built when first needed.  Appending entries to the
+	cache, with .append(), .extend() or +=, updates the index;  all
+	other modifications discard it, and it is rebuilt when next
+	needed.  The entries returned by .sieve() are in the order they
+	appear in the cache, as with Cache.sieve().
+
+	Example:
+
+	>>> c = IndexedCache.from_urls(["H-H1_RDS-%d-64.gwf" % t for t in range(815901568, 815904000, 64)] + ["L-L1_RDS-%d-64.gwf" % t for t in range(815901568, 815904000, 64)])
+	>>> for entry in c.sieve(ifos = "H", segment = segments.segment(815902000, 815902100)):
+	...	print entry.observatory, entry.segment
+	...
+	H [815901952 ... 815902016)
+	H [815902016 ... 815902080)
+	H [815902080 ... 815902144)
+	>>> c.append(CacheEntry.from_T050017("H-H1_RDS-815904000-64.gwf"))
+	>>> len(c.sieve(ifos = "H", segment = segments.segment(815904010, 815904020)))
+	1
+	"""
+	def __init__(self, *args):
+		super(IndexedCache, self).__init__(*args)
+		self._index = None
+
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state["_index"] = None
+		return state
+
+	def _get_index(self):
+		"""
+		Return the index, building it if needed.
+		"""
+		if self._index is None:
+			self._index = {}
+			self._add_to_index(0, self)
+		return self._index
+
+	def _add_to_index(self, position, entries):
+		index = self._index
+		for position, entry in enumerate(entries, position):
+			key = entry.observatory, entry.description
+			try:
+				group = index[key]
+			except KeyError:
+				group = index[key] = _CacheIndexGroup()
+			group.add(position, entry.segment)
+
+	def _invalidate_index(self):
+		self._index = None
+
+	# methods that update the index
+
+	def append(self, entry):
+		super(IndexedCache, self).append(entry)
+		if self._index is not None:
+			self._add_to_index(len(self) - 1, (entry,))
+
+	def extend(self, entries):
+		n = len(self)
+		super(IndexedCache, self).extend(entries)
+		if self._index is not None:
+			self._add_to_index(n, self[n:])
+
+	def __iadd__(self, entries):
+		self.extend(entries)
+		return self
+
+	# methods that discard the index
+
+	def __setitem__(self, *args):
+		super(IndexedCache, self).__setitem__(*args)
+		self._invalidate_index()
+
+	def __delitem__(self, *args):
+		super(IndexedCache, self).__delitem__(*args)
+		self._invalidate_index()
+
+	def __setslice__(self, *args):
+		super(IndexedCache, self).__setslice__(*args)
+		self._invalidate_index()
+
+	def __delslice__(self, *args):
+		super(IndexedCache, self).__delslice__(*args)
+		self._invalidate_index()
+
+	def __imul__(self, *args):
+		result = super(IndexedCache, self).__imul__(*args)
+		self._invalidate_index()
+		return result
+
+	def insert(self, *args):
+		super(IndexedCache, self).insert(*args)
+		self._invalidate_index()
+
+	def pop(self, *args):
+		result = super(IndexedCache, self).pop(*args)
+		self._invalidate_index()
+		return result
+
+	def remove(self, *args):
+		super(IndexedCache, self).remove(*args)
+		self._invalidate_index()
+
+	def reverse(self):
+		super(IndexedCache, self).reverse()
+		self._invalidate_index()
+
+	def sort(self, *args, **kwargs):
+		super(IndexedCache, self).sort(*args, **kwargs)
+		self._invalidate_index()
+
+	# queries
+
+	def sieve(self, ifos=None, description=None, segment=None,
+		segmentlist=None, exact_match=False):
+		"""
+		Same as Cache.sieve(), but uses the index.  Entries whose
+		observatory or description is None do not match ifos or
+		description patterns, and entries without segments do not
+		match segment or segmentlist constraints.
+		"""
+		index = self._get_index()
+
+		if not exact_match:
+			if ifos is not None: ifos = "*" + ifos + "*"
+			if description is not None: description = "*" + description + "*"
+		keys = index.keys()
+		if ifos is not None:
+			ifos_regexp = re.compile(fnmatch.translate(ifos))
+			keys = [key for key in keys if key[0] is not None and ifos_regexp.match(key[0]) is not None]
+		if description is not None:
+			descr_regexp = re.compile(fnmatch.translate(description))
+			keys = [key for key in keys if key[1] is not None and descr_regexp.match(key[1]) is not None]
+
+		if segmentlist is not None:
+			# must coalesce for intersects_segment() to work
+			segmentlist.coalesce()
+
+		positions = set()
+		for key in keys:
+			group = index[key]
+			if segment is None and segmentlist is None:
+				positions.update(group.positions)
+				positions.update(group.unsegmented)
+				continue
+			found = None
+			if segment is not None:
+				if exact_match:
+					found = set(group.equal(segment))
+				else:
+					found = set(group.intersecting(segment))
+			if segmentlist is not None:
+				if exact_match:
+					query = group.contained
+				else:
+					query = group.intersecting
+				in_list = set(position for seg in segmentlist for position in query(seg))
+				found = in_list if found is None else found & in_list
+			positions |= found
+
+		return self.__class__([self[position] for position in sorted(positions)])
+
+
+#
+# A LAL cache file stored as columns
+#
+
+
+def _parse_cache(text):
+	"""
+	Parse the text of a LAL cache file into a tuple of five lists of
+	strings, the observatory, description, start, duration and URL
+	columns.  An observatory or description of "-" is translated to
+	None.  ValueError is raised if a line does not have exactly five
+	white-space delimited columns.  This is the pure-Python version,
+	it is replaced by a C implementation if one is available.
+	"""
+	columns = [], [], [], [], []
+	for line in text.splitlines(True):
+		fields = line.split()
+		if len(fields) != 5:
+			raise ValueError("could not convert %s to CacheEntry" % repr(line))
+		for column, field in zip(columns, fields):
+			column.append(field)
+	for column in columns[:2]:
+		column[:] = [None if field == "-" else field for field in column]
+	return columns
+
+
+try:
+	from glue.__segments import _parse_cache
+except ImportError:
+	pass
+
+
+class ColumnarCache(object):
+	"""
+	The contents of a LAL cache file stored as five lists, the
+	.observatory, .description, .start, .duration and .url columns.
+	An observatory or description of "-" is stored as None, the start
+	and duration columns store the strings from the file, and
+	CacheEntry objects are only constructed for those rows that are
+	retrieved by indexing or iteration.  Constructing a CacheEntry
+	object for each line of a cache file takes far longer than reading
+	the file, so for large caches of which only some entries are
+	needed, or that are only needed to be copied or converted to
+	segment lists, this is much faster than Cache.fromfile().  The
+	file is parsed in C if the C extension module is available.
+
+	The columns should be treated as read-only.  Retrieving an entry
+	twice returns the same CacheEntry object, and the .tofile() method
+	writes entries that have been retrieved (and possibly modified) as
+	they are now, the rest directly from the columns.
+
+	Example:
+
+	>>> import StringIO
+	>>> f = StringIO.StringIO("H1 S5 815901601 576.5 file://localhost/home/kipp/tmp/1/H1-815901601-576.xml\\n- - - - file://localhost/home/kipp/tmp/1/misc.xml\\n")
+	>>> c = ColumnarCache.fromfile(f)
+	>>> len(c)
+	2
+	>>> c.observatory
+	['H1', None]
+	>>> print c[0].segment
+	[815901601 ... 815902177.5)
+	>>> c.pfnlist()
+	['/home/kipp/tmp/1/H1-815901601-576.xml', '/home/kipp/tmp/1/misc.xml']
+	>>> print Cache(c)[1]
+	- - - - file://localhost/home/kipp/tmp/1/misc.xml
+	"""
+	entry_class = CacheEntry
+
+	def __init__(self, observatory = (), description = (), start = (), duration = (), url = (), coltype = LIGOTimeGPS):
+		self.observatory = list(observatory)
+		self.description = list(description)
+		self.start = list(start)
+		self.duration = list(duration)
+		self.url = list(url)
+		if not len(self.observatory) == len(self.description) == len(self.start) == len(self.duration) == len(self.url):
+			raise ValueError("columns must have the same length")
+		self.coltype = coltype
+		# CacheEntry objects retrieved so far, indexed by row
+		self._entries = {}
+
+	@classmethod
+	def fromfile(cls, fileobj, coltype = LIGOTimeGPS):
+		"""
+		Return a ColumnarCache object whose entries are read from
+		an open file.
+		"""
+		return cls(*_parse_cache(fileobj.read()), coltype = coltype)
+
+	@classmethod
+	def fromfilenames(cls, filenames, coltype = LIGOTimeGPS):
+		"""
+		Read the files named and concatenate the results into a
+		single ColumnarCache.
+		"""
+		columns = [], [], [], [], []
+		for filename in filenames:
+			for column, new in zip(columns, _parse_cache(open(filename).read())):
+				column.extend(new)
+		return cls(*columns, coltype = coltype)
+
+	def __len__(self):
+		return len(self.url)
+
+	def __getitem__(self, index):
+		"""
+		Return the CacheEntry object for a row, constructing it if
+		needed, or a Cache of the entries for a slice.
+		"""
+		if isinstance(index, slice):
+			return Cache(self[i] for i in xrange(*index.indices(len(self))))
+		if index < 0:
+			index += len(self)
+		try:
+			return self._entries[index]
+		except KeyError:
+			pass
+		if not 0 <= index < len(self):
+			raise IndexError("ColumnarCache index out of range")
+		start = self.start[index]
+		duration = self.duration[index]
+		if start == "-" and duration == "-":
+			# no segment information
+			segment = None
+		else:
+			start = self.coltype(start)
+			segment = segments.segment(start, start + self.coltype(duration))
+		entry = self._entries[index] = self.entry_class(self.observatory[index], self.description[index], segment, self.url[index])
+		return entry
+
+	def __iter__(self):
+		for i in xrange(len(self)):
+			yield self[i]
+
+	def tofile(self, fileobj):
+		"""
+		Write the cache to fileobj as a LAL cache file.  The start
+		and duration columns are converted to and from the coltype,
+		so the result is the same as that of Cache.tofile().
+		"""
+		coltype = self.coltype
+		entries = self._entries
+		def lines():
+			for i, (observatory, description, start, duration, url) in enumerate(itertools.izip(self.observatory, self.description, self.start, self.duration, self.url)):
+				if i in entries:
+					yield "%s\n" % entries[i]
+					continue
+				if start != "-" or duration != "-":
+					start = coltype(start)
+					duration = (start + coltype(duration)) - start
+				yield "%s %s %s %s %s\n" % (observatory or "-", description or "-", start, duration, url)
+		fileobj.writelines(lines())
+		fileobj.close()
+
+	@staticmethod
+	def _url_path(url):
+		# the usual case is much faster to do ourselves than with
+		# urlparse
+		if url.startswith("file://") and "?" not in url and "#" not in url:
+			i = url.find("/", 7)
+			return url[i:] if i >= 0 else ""
+		return urlparse.urlparse(url)[2]
+
+	def pfnlist(self):
+		"""
+		Return a list of physical file names.
+		"""
+		return map(self._url_path, self.url)
+
+	def topfnfile(self, fileobj):
+		"""
+		write the cache to fileobj as a plain text pfn file
+		"""
+		fileobj.writelines("%s\n" % path for path in self.pfnlist())
+		fileobj.close()
+
+	def to_segmentlistdict(self):
+		"""
+		Return a segmentlistdict object describing the instruments
+		and times spanned by the entries in this cache, without
+		constructing CacheEntry objects.  The return value is
+		coalesced, and is the same as that of
+		Cache.to_segmentlistdict() except that zero-length segments
+		are always discarded.
+		"""
+		# the import has to be done here to break the cyclic
+		# dependancy
+		from glue.ligolw.lsctables import instrument_set_from_ifos
+		coltype = self.coltype
+		seglists = {}
+		for observatory, start, duration in itertools.izip(self.observatory, self.start, self.duration):
+			try:
+				seglist = seglists[observatory]
+			except KeyError:
+				seglist = seglists[observatory] = segments.segmentlist()
+			if start != "-" or duration != "-":
+				start = coltype(start)
+				seglist.append(segments.segment(start, start + coltype(duration)))
+		d = segments.segmentlistdict()
+		for observatory, seglist in seglists.items():
+			seglist.coalesce()
+			d |= segments.segmentlistdict((instrument, segments.segmentlist(seglist)) for instrument in instrument_set_from_ifos(observatory) or (None,))
+		return d
@@ -0,0 +1,431 @@
+# Copyright (C) 2013  Kipp Cannon
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3 of the License, or (at your
+# option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+#
+# =============================================================================
+#
+#                                   Preamble
+#
+# =============================================================================
+#
+
+
+"""
+A binary encoding for the contents of Table elements.  A table whose
+Stream element has the Encoding attribute set to the value of Encoding
+stores each column as a block of binary data, base64 encoded, instead of
+as delimited text.  The rest of the document, including the Column
+elements that describe the table's schema, is unchanged, so the document
+is still LIGO Light Weight XML, it can be loaded with the usual content
+handlers, and writing it with the Encoding attribute removed produces
+exactly the XML that would have been written had the table never been
+encoded.  Decoding a column is little more than a base64 decode and a
+copy, so large tables load much faster than from text, and numeric
+columns are stored in full precision.
+
+The Stream's character data is the number of rows followed by one token
+for each column, in the order of the Column elements, separated by the
+Stream's delimiter.  Each token is a one-character code followed by the
+base64 encoded data.  All numbers are little-endian.
+
+	a	the column's values in an array of the type given by
+		BinaryType()
+	A	an array of bytes, 1 for each row whose value is null, followed
+		by the values in an array of the type given by BinaryType()
+	i	the integer parts of ilwd:char IDs, as 64-bit integers.  The
+		data is preceded by "table_name:column_name:" identifying the
+		class of the IDs
+	s	64-bit lengths of the UTF-8 encoded values, -1 for null
+		values, followed by the encoded values.  Values in columns that
+		are not string columns are stored as text and converted with
+		glue.ligolw.types.ToPyType
+	b	like s, for the raw bytes of blob and ilwd:char_u values
+
+The TableStream elements in glue.ligolw.table and
+glue.ligolw.columnartables read and write this encoding, and
+glue.ligolw.utils.write_filename() uses it for files whose names end in
+one of glue.ligolw.utils.BinaryExtensions.
+
+Example:
+
+>>> import sys
+>>> from glue.ligolw import ligolw, lsctables
+>>> tbl = lsctables.New(lsctables.SnglBurstTable, ["ifo", "snr", "event_id"])
+>>> for snr in (5.5, 6.0):
+...	row = tbl.RowType()
+...	row.ifo, row.snr, row.event_id = u"H1", snr, tbl.get_next_id()
+...	tbl.append(row)
+...
+>>> with encoded(tbl):
+...	tbl.write(sys.stdout)	# doctest: +NORMALIZE_WHITESPACE
+...
+<Table Name="sngl_burst:table">
+	<Column Type="lstring" Name="sngl_burst:ifo"/>
+	<Column Type="real_4" Name="sngl_burst:snr"/>
+	<Column Type="ilwd:char" Name="sngl_burst:event_id"/>
+	<Stream Delimiter="," Type="Local" Name="sngl_burst:table" Encoding="columns,base64,LittleEndian">
+		2,
+		sAgAAAAAAAAACAAAAAAAAAEgxSDE=,
+		aAAAAAAAAFkAAAAAAAAAYQA==,
+		isngl_burst:event_id:AAAAAAAAAAABAAAAAAAAAA==
+	</Stream>
+</Table>
+
+Loading the document decodes the table:
+
+>>> import StringIO
+>>> from glue.ligolw import utils
+>>> xmldoc = ligolw.Document()
+>>> tbl = xmldoc.appendChild(ligolw.LIGO_LW()).appendChild(tbl)
+>>> f = StringIO.StringIO()
+>>> with encoded(xmldoc):
+...	digest = utils.write_fileobj(xmldoc, f)
+...
+>>> f.seek(0)
+>>> class ContentHandler(ligolw.LIGOLWContentHandler):
+...	pass
+...
+>>> ContentHandler = lsctables.use_in(ContentHandler)
+>>> xmldoc, digest = utils.load_fileobj(f, contenthandler = ContentHandler)
+>>> [(row.ifo, row.snr, str(row.event_id)) for row in lsctables.SnglBurstTable.get_table(xmldoc)]
+[(u'H1', 5.5, 'sngl_burst:event_id:0'), (u'H1', 6.0, 'sngl_burst:event_id:1')]
+"""
+
+
+import base64
+import itertools
+import numpy
+import re
+
+
+from glue import git_version
+from . import ilwd
+from . import ligolw
+from . import types as ligolwtypes
+
+
+__author__ = "Kipp Cannon <kipp.cannon@ligo.org>"
+__version__ = "git id %s" % git_version.id
+__date__ = git_version.date
+
+
+#
+# =============================================================================
+#
+#                                   Encoding
+#
+# =============================================================================
+#
+
+
+Encoding = u"columns,base64,LittleEndian"
+"""
+The value of a Stream element's Encoding attribute that selects this
+encoding.
+"""
+
+
+def BinaryType(coltype):
+	"""
+	Return the numpy type, little-endian, in which the values of a
+	numeric column of type coltype are stored.  Floating-point and
+	complex values are stored in double precision so that they are
+	preserved exactly.
+
+	Example:
+
+	>>> BinaryType(u"real_4")
+	dtype('<f8')
+	>>> BinaryType(u"int_4s")
+	dtype('<i4')
+	"""
+	if coltype in ligolwtypes.FloatTypes:
+		dtype = "float64"
+	elif coltype in ligolwtypes.ComplexTypes:
+		dtype = "complex128"
+	else:
+		dtype = ligolwtypes.ToNumPyType[coltype]
+	return numpy.dtype(dtype).newbyteorder("<")
+
+
+def _to_array(coltype, values):
+	"""
+	Convert the list values to an array of the column's binary type.
+	Returns the array and an array of bytes set to 1 for the values
+	that are None, or None if there are none, or (None, None) if the
+	values cannot be stored exactly that way.
+	"""
+	dtype = BinaryType(coltype)
+	if not values:
+		return numpy.empty((0,), dtype = dtype), None
+	nulls = None
+	if coltype in ligolwtypes.IntTypes:
+		# let numpy choose the integer type, then check the values
+		# fit in the column's type
+		a = numpy.array(values)
+		if a.dtype.kind == "O" and None in values:
+			nulls = numpy.array([value is None for value in values], dtype = "uint8")
+			a = numpy.array([0 if value is None else value for value in values])
+		if a.dtype.kind not in "biu":
+			return None, None
+		info = numpy.iinfo(dtype)
+		if not (info.min <= a.min() and a.max() <= info.max):
+			return None, None
+		return a.astype(dtype), nulls
+	try:
+		a = numpy.array(values, dtype = dtype)
+	except (TypeError, ValueError, OverflowError):
+		return None, None
+	# numpy converts None to NaN
+	for i in numpy.flatnonzero(numpy.isnan(a)):
+		if values[i] is None:
+			if nulls is None:
+				nulls = numpy.zeros((len(a),), dtype = "uint8")
+			nulls[i] = 1
+			a[i] = 0
+	return a, nulls
+
+
+def _encode_strings(strings):
+	"""
+	Return the lengths and the concatenation of a list of str objects,
+	None for null values, as described for the s and b codes.
+	"""
+	lengths = numpy.array([-1 if s is None else len(s) for s in strings], dtype = "<i8")
+	return lengths.tostring() + "".join(s for s in strings if s is not None)
+
+
+def _encode_unicode(strings):
+	"""
+	Like _encode_strings() for a list of unicode objects, which are
+	UTF-8 encoded.
+	"""
+	# encode the values all at once.  if they are all ASCII the
+	# lengths of the encoded values are those of the values
+	data = u"".join(s for s in strings if s is not None).encode("utf-8")
+	if len(data) != sum(len(s) for s in strings if s is not None):
+		return _encode_strings([None if s is None else s.encode("utf-8") for s in strings])
+	lengths = numpy.array([-1 if s is None else len(s) for s in strings], dtype = "<i8")
+	return lengths.tostring() + data
+
+
+def _decode_strings(data, n, decode = False):
+	"""
+	Inverse of _encode_strings() and, if decode is True,
+	_encode_unicode().  Returns a list of str objects, or unicode
+	objects if decode is True, and None.
+	"""
+	lengths = numpy.frombuffer(data, dtype = "<i8", count = n)
+	ends = numpy.cumsum(numpy.maximum(lengths, 0))
+	lengths = lengths.tolist()
+	if decode:
+		# decode the values all at once.  if they are all ASCII the
+		# offsets of the characters are those of the bytes
+		strings = unicode(buffer(data, 8 * n), "utf-8")
+		if len(strings) == len(data) - 8 * n:
+			return [None if l < 0 else strings[end - l : end] for l, end in itertools.izip(lengths, ends.tolist())]
+	strings = [None if l < 0 else data[end - l : end] for l, end in itertools.izip(lengths, (ends + 8 * n).tolist())]
+	if decode:
+		return [None if s is None else s.decode("utf-8") for s in strings]
+	return strings
+
+
+def encode_column(coltype, values, idclass = None):
+	"""
+	Return the token encoding the values of a column of type coltype.
+	values is a list of the values, or an array.  If idclass is not
+	None, values is an array of the integer parts of IDs of that class.
+	"""
+	if isinstance(values, numpy.ndarray):
+		if idclass is not None:
+			return u"i%s:%s:%s" % (idclass.table_name, idclass.column_name, base64.standard_b64encode(values.astype("<i8").tostring()))
+		if values.dtype != object and coltype in ligolwtypes.NumericTypes:
+			dtype = BinaryType(coltype)
+			if numpy.can_cast(values.dtype, dtype):
+				return u"a" + base64.standard_b64encode(values.astype(dtype).tostring())
+		values = values.tolist()
+	if coltype in ligolwtypes.NumericTypes:
+		a, nulls = _to_array(coltype, values)
+		if nulls is not None:
+			return u"A" + base64.standard_b64encode(nulls.tostring() + a.tostring())
+		if a is not None:
+			return u"a" + base64.standard_b64encode(a.tostring())
+		formatfunc = ligolwtypes.FormatFunc[coltype]
+		values = [None if value is None else formatfunc(value) for value in values]
+	elif coltype == u"ilwd:char":
+		idclasses = set(map(type, values))
+		idclass = idclasses.pop() if len(idclasses) == 1 else None
+		if idclass is not None and issubclass(idclass, ilwd._ilwd.ilwdchar):
+			return encode_column(coltype, numpy.array(map(int, values), dtype = "int64"), idclass)
+		values = [None if value is None else unicode(value) for value in values]
+	elif coltype in ligolwtypes.BlobTypes:
+		return u"b" + base64.standard_b64encode(_encode_strings([None if value is None else str(value) for value in values]))
+	else:
+		values = [value if value is None or type(value) is unicode else unicode(value) for value in values]
+	return u"s" + base64.standard_b64encode(_encode_unicode(values))
+
+
+# matches the white space preceding a token
+_leading_space = re.compile(r"\s*")
+
+
+def decode_column(coltype, token, n):
+	"""
+	Decode the token for a column of type coltype with n rows.  The
+	token may be surrounded by white space.  The return value is a
+	tuple of the values and the ID class.  If the ID class is not None
+	the values are an array of the integer parts of IDs of that class,
+	otherwise they are an array of the column's binary type (see
+	BinaryType()) or a list.  The arrays are read-only.
+	"""
+	# the tokens can be large, so avoid copying them
+	start = _leading_space.match(token).end()
+	code = token[start : start + 1]
+	if code == "i":
+		end = token.index(":", token.index(":", start) + 1)
+		tbl_name, col_name = token[start + 1 : end].split(":")
+		values = numpy.frombuffer(base64.standard_b64decode(buffer(token, end + 1)), dtype = "<i8", count = n)
+		return values, ilwd.get_ilwdchar_class(tbl_name, col_name)
+	data = base64.standard_b64decode(buffer(token, start + 1))
+	if code == "a":
+		return numpy.frombuffer(data, dtype = BinaryType(coltype), count = n), None
+	if code == "A":
+		values = numpy.frombuffer(data, dtype = BinaryType(coltype), count = n, offset = n).tolist()
+		for i in numpy.flatnonzero(numpy.frombuffer(data, dtype = "uint8", count = n)):
+			values[i] = None
+		return values, None
+	if code == "b":
+		return [None if s is None else buffer(s) for s in _decode_strings(data, n)], None
+	if code == "s":
+		values = _decode_strings(data, n, decode = True)
+		pytype = ligolwtypes.ToPyType[coltype]
+		if pytype is not unicode:
+			values = [None if s is None else pytype(s) for s in values]
+		return values, None
+	raise ValueError("invalid column code '%s'" % code)
+
+
+def column_values(values, idclass):
+	"""
+	Return a list of the Python values of a column decoded by
+	decode_column().
+	"""
+	if isinstance(values, numpy.ndarray):
+		values = values.tolist()
+	if idclass is not None:
+		values = map(idclass, values)
+	return values
+
+
+#
+# =============================================================================
+#
+#                                Stream Content
+#
+# =============================================================================
+#
+
+
+def decode_stream(data, delimiter, columntypes, loadcolumns = None):
+	"""
+	Decode the character data of an encoded Stream element.
+	columntypes is the list of the types of the table's columns, and
+	loadcolumns, if not None, a list of booleans indicating which
+	columns are wanted.  Returns the number of rows and a list
+	containing the (values, ID class) tuple returned by decode_column()
+	for each column, or None for columns that are not wanted.
+	"""
+	if isinstance(data, unicode):
+		try:
+			data = data.encode("ascii")
+		except UnicodeError:
+			raise ligolw.ElementError("encoded Stream contains non-ASCII characters")
+	tokens = data.split(str(delimiter))
+	if not tokens[-1].strip():
+		del tokens[-1]
+	if len(tokens) != len(columntypes) + 1:
+		raise ligolw.ElementError("expected %d columns in encoded Stream, found %d" % (len(columntypes), len(tokens) - 1))
+	try:
+		n = int(tokens[0])
+	except ValueError:
+		raise ligolw.ElementError("invalid row count in encoded Stream: '%s'" % tokens[0].strip())
+	if loadcolumns is None:
+		loadcolumns = itertools.repeat(True)
+	try:
+		return n, [decode_column(coltype, token, n) if load else None for coltype, token, load in itertools.izip(columntypes, tokens[1:], loadcolumns)]
+	except (TypeError, ValueError) as e:
+		raise ligolw.ElementError("invalid encoded Stream: %s" % str(e))
+
+
+def write_stream(stream, fileobj, indent, n, columns):
+	"""
+	Write the Stream element stream with the encoded columns of its
+	table.  n is the number of rows, and columns is a list of (values,
+	ID class) tuples as accepted by encode_column(), one for each of
+	the table's columns.
+	"""
+	w = fileobj.write
+	newline = u"\n" + indent + ligolw.Indent
+	separator = stream.Delimiter + newline
+	w(stream.start_tag(indent))
+	w(newline)
+	w(u"%d" % n)
+	for coltype, (values, idclass) in zip(stream.parentNode.columntypes, columns):
+		w(separator)
+		w(encode_column(coltype, values, idclass))
+	w(u"\n" + stream.end_tag(indent) + u"\n")
+
+
+#
+# =============================================================================
+#
+#                                  Utilities
+#
+# =============================================================================
+#
+
+
+class encoded(object):
+	"""
+	Context manager that sets the Encoding attribute of the Stream
+	element of every table in the document tree rooted at elem, and
+	restores the original values on exit.
+
+	Example:
+
+	>>> from glue.ligolw import utils
+	>>> with encoded(xmldoc):	# doctest: +SKIP
+	...	utils.write_filename(xmldoc, "demo.xml")
+	...
+	"""
+	def __init__(self, elem, encoding = Encoding):
+		self.streams = [stream for stream in elem.getElementsByTagName(ligolw.Stream.tagName) if stream.parentNode.tagName == ligolw.Table.tagName]
+		self.encoding = encoding
+
+	def __enter__(self):
+		self.saved = [stream.getAttribute(u"Encoding") if stream.hasAttribute(u"Encoding") else None for stream in self.streams]
+		for stream in self.streams:
+			stream.Encoding = self.encoding
+		return self
+
+	def __exit__(self, *args):
+		for stream, encoding in zip(self.streams, self.saved):
+			if encoding is None:
+				del stream.Encoding
+			else:
+				stream.Encoding = encoding
+		return False
@@ -0,0 +1,820 @@
+# Copyright (C) 2013  Kipp Cannon
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3 of the License, or (at your
+# option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+#
+# =============================================================================
+#
+#                                   Preamble
+#
+# =============================================================================
+#
+
+
+"""
+This module provides an implementation of the Table element that stores
+the table's contents in numpy arrays, one for each column, instead of in a
+list of row objects.  Loading a large table this way is much faster and
+uses much less memory than constructing a Python object for each row, and
+the arrays can be used directly for vectorized computations.  Row objects
+are constructed only when rows are retrieved.
+
+Integer columns are stored in arrays of the numpy type corresponding to the
+column's type (see glue.ligolw.types.ToNumPyType), floating-point and
+complex columns in double-precision arrays, ilwd:char columns as arrays of
+the integer parts of the IDs, and all other columns (and numeric or ID
+columns containing null values, or ID columns containing IDs of more than
+one class) in object arrays.
+
+Example:
+
+>>> from glue.ligolw import ligolw
+>>> from glue.ligolw import utils
+>>> class ContentHandler(ligolw.LIGOLWContentHandler):
+...	pass
+...
+>>> use_in(ContentHandler)
+<class 'glue.ligolw.columnartables.ContentHandler'>
+>>> xmldoc = utils.load_filename("inspiral_event_id_test_in2.xml", contenthandler = ContentHandler)
+>>> sngl_inspiral_table = lsctables.SnglInspiralTable.get_table(xmldoc)
+>>> end_time = sngl_inspiral_table.getColumnByName("end_time").asarray()
+>>> end_time
+array([600000000, 600000000], dtype=int32)
+>>> sngl_inspiral_table.getColumnByName("event_id").asarray()
+array([822746565000000001, 822746565000000001])
+>>> row = sngl_inspiral_table[1]
+>>> row.ifo, row.end_time
+(u'H2', 600000000)
+>>> print row.event_id
+sngl_inspiral:event_id:822746565000000001
+>>> end_time += 10	# modifies the table
+>>> sngl_inspiral_table[1].end_time
+600000010
+"""
+
+
+import itertools
+import numpy
+
+
+from glue import git_version
+from . import binarytables
+from . import ilwd
+from . import ligolw
+from . import table
+from . import lsctables
+from . import types as ligolwtypes
+
+
+__author__ = "Kipp Cannon <kipp.cannon@ligo.org>"
+__version__ = "git id %s" % git_version.id
+__date__ = git_version.date
+
+
+#
+# =============================================================================
+#
+#                                Column Element
+#
+# =============================================================================
+#
+
+
+class ColumnarColumn(table.Column):
+	"""
+	Column element for use in ColumnarTable elements.  Provides the
+	same list-like access to the values in the column as does the
+	table.Column class, and .asarray() returns the table's storage
+	for the column, not a copy, so modifications made to the array
+	*are* recorded in the document.
+	"""
+	def __getitem__(self, i):
+		if isinstance(i, slice):
+			return self.parentNode._column_values(self.Name, i)
+		if i < 0:
+			i += len(self)
+		if not 0 <= i < len(self):
+			raise IndexError("Column index out of range")
+		return self.parentNode._column_values(self.Name, slice(i, i + 1))[0]
+
+	def __setitem__(self, i, value):
+		"""
+		Set the value in this column in row i.  i may be a slice,
+		in which case the same rules apply as for
+		table.Column.__setitem__().
+		"""
+		if isinstance(i, slice):
+			for i, val in itertools.izip(xrange(*i.indices(len(self))), value):
+				self.parentNode._set_value(self.Name, i, val)
+		else:
+			self.parentNode._set_value(self.Name, i, value)
+
+	def __iter__(self):
+		return iter(self.parentNode._column_values(self.Name, slice(None)))
+
+	def count(self, value):
+		return self.parentNode._column_values(self.Name, slice(None)).count(value)
+
+	def index(self, value):
+		return self.parentNode._column_values(self.Name, slice(None)).index(value)
+
+	def __contains__(self, value):
+		return value in self.parentNode._column_values(self.Name, slice(None))
+
+	def asarray(self):
+		"""
+		Return the numpy array in which the table stores this
+		column.  This is not a copy:  modifications made to the
+		array are recorded in the document.  For ilwd:char columns
+		the array contains the integer parts of the IDs.
+		"""
+		return self.parentNode.get_array(self.Name)
+
+
+#
+# =============================================================================
+#
+#                                Stream Element
+#
+# =============================================================================
+#
+
+
+class ColumnarTableStream(table.TableStream):
+	"""
+	Stream element for use in ColumnarTable elements.  The text is
+	collected in the tokenizer and converted to the parent table's
+	columns a block at a time by the tokenizer's .columns() method,
+	never as row objects.  The integer and float conversions are done
+	without holding the global interpreter lock, and are split across
+	nthreads threads.  To use more than one, set the class attribute,
+	e.g.
+
+	>>> ColumnarTableStream.nthreads = 4	# doctest: +SKIP
+	"""
+	# number of threads to use for the conversion
+	nthreads = 1
+	# number of characters to collect before converting them
+	block_size = 1 << 22
+
+	def config(self, parentNode):
+		super(ColumnarTableStream, self).config(parentNode)
+		self._ncolumns = len(parentNode._loaded_columns())
+		self._buffered = 0
+		# set to a list if the tokenizer's .columns() method can't
+		# be used
+		self._tokens = None
+		return self
+
+	def appendData(self, content):
+		if self._chunks is not None:
+			super(ColumnarTableStream, self).appendData(content)
+			return
+		self._tokenizer.append(content)
+		self._buffered += len(content)
+		if self._buffered >= self.block_size:
+			self._flush()
+
+	def _flush(self):
+		self._buffered = 0
+		if self._tokens is None:
+			try:
+				n, columns = self._tokenizer.columns(nthreads = self.nthreads)
+			except OverflowError:
+				# an integer does not fit in 64 bits.  finish
+				# with the tokenizer's iterator, which
+				# returns a long
+				self._tokens = []
+			else:
+				self.parentNode._append_columns(n, columns)
+				return
+		# pass complete rows to the parent, keep the remainder
+		self._tokens.extend(self._tokenizer)
+		n = len(self._tokens) - len(self._tokens) % self._ncolumns
+		self.parentNode._append_tokens(self._tokens[:n])
+		del self._tokens[:n]
+
+	def _dump(self, rowdumper):
+		# give the RowDumper the columns instead of row objects.
+		# numeric arrays are formatted directly from their buffers,
+		# including those of IDs, the rest from lists
+		tbl = self.parentNode
+		columns = []
+		idclasses = []
+		for name in tbl.columnnames:
+			a = tbl.get_array(name)
+			if a.dtype.kind in "iuf":
+				columns.append(numpy.ascontiguousarray(a))
+			else:
+				columns.append(a.tolist())
+			idclasses.append(tbl._idclasses.get(name))
+		rowdumper.dump_columns(columns, idclasses)
+
+	def _append_binary(self, n, columns):
+		# the decoded columns go straight into the arrays
+		self.parentNode._append_arrays(n, [column for column in columns if column is not None])
+
+	def _binary_columns(self):
+		tbl = self.parentNode
+		return [(tbl.get_array(name), tbl._idclasses.get(name)) for name in tbl.columnnames]
+
+	def unlink(self):
+		self._tokens = None
+		super(ColumnarTableStream, self).unlink()
+
+	def endElement(self):
+		if self._chunks is not None:
+			super(ColumnarTableStream, self).endElement()
+			return
+		# add a delimiter to terminate the last token, but only if
+		# something other than white-space is left after the
+		# complete rows
+		self._flush()
+		if self._tokenizer.data.strip():
+			self._tokenizer.append(self.Delimiter)
+			self._flush()
+		if self._tokens or list(self._tokenizer):
+			raise ligolw.ElementError("incomplete row in Table '%s'" % self.parentNode.getAttribute("Name"))
+		self.parentNode._end_of_rows()
+
+
+#
+# =============================================================================
+#
+#                                Table Element
+#
+# =============================================================================
+#
+
+
+class ColumnarTable(table.Table):
+	"""
+	A version of the Table class that stores the table's contents as
+	one numpy array per column.  The list-like interface to the rows
+	is retained, but the row objects are constructed from the arrays
+	each time they are retrieved, so modifications made to them are
+	*not* recorded in the document.  Modify the table through the
+	Column elements or the arrays instead.  Rows appended to the
+	table, or assigned to its indexes and slices, are copied into the
+	arrays.  Slice assignment cannot change the number of rows.
+
+	If a custom glue.ligolw.Table subclass is defined in
+	glue.ligolw.lsctables whose name matches the name of the
+	ColumnarTable being constructed, the lsctables class is added to
+	the list of parent classes, as is done by the dbtables module.
+	The lsctables class' methods can be used with the ColumnarTable
+	instances, but those that modify rows in place will not work.
+
+	Example:
+
+	>>> from xml.sax.xmlreader import AttributesImpl
+	>>> tbl = ColumnarTable(AttributesImpl({u"Name": u"sngl_inspiral:table"}))
+	>>> for name in ("ifo", "snr", "event_id"):
+	...	col = tbl.appendColumn(name)
+	...
+	>>> tbl.set_next_id(type(tbl.next_id)(0))
+	>>> for snr in (8.0, 10.0, 12.0):
+	...	row = tbl.RowType()
+	...	row.ifo, row.snr, row.event_id = u"H1", snr, tbl.get_next_id()
+	...	tbl.append(row)
+	...
+	>>> len(tbl)
+	3
+	>>> tbl.get_array("snr").tolist()
+	[8.0, 10.0, 12.0]
+	>>> tbl.get_array("event_id")
+	array([0, 1, 2])
+	>>> print tbl[2].event_id
+	sngl_inspiral:event_id:2
+	>>> tbl[:2] = tbl[1:]
+	>>> tbl.get_array("snr").tolist()
+	[10.0, 12.0, 12.0]
+	>>> del tbl[:2]
+	>>> tbl.get_array("snr").tolist()
+	[12.0]
+
+	The rest of the list interface works on the arrays, too.  Rows are
+	compared by the values of their columns, since a new row object is
+	constructed each time a row is retrieved.
+
+	>>> row = tbl.RowType()
+	>>> row.ifo, row.snr, row.event_id = u"L1", 9.0, tbl.get_next_id()
+	>>> tbl.insert(0, row)
+	>>> tbl += [row]
+	>>> tbl.get_array("snr").tolist()
+	[9.0, 12.0, 9.0]
+	>>> row in tbl, tbl.index(row), tbl.count(row)
+	(True, 0, 2)
+	>>> tbl.remove(row)
+	>>> tbl.get_array("snr").tolist()
+	[12.0, 9.0]
+	>>> tbl.sort(key = lambda row: row.snr)
+	>>> tbl.get_array("snr").tolist()
+	[9.0, 12.0]
+	>>> tbl.reverse()
+	>>> [row.snr for row in reversed(tbl)]
+	[9.0, 12.0]
+	>>> tbl.pop().snr
+	9.0
+	>>> len(tbl)
+	1
+	"""
+	def __new__(cls, *args, **kwargs):
+		# does this class already have table-specific metadata?
+		if not hasattr(cls, "tableName"):
+			# no, try to retrieve it from lsctables
+			attrs, = args
+			name = table.StripTableName(attrs[u"Name"])
+			if name in TableByName:
+				cls = TableByName[name]
+			elif name in lsctables.TableByName:
+				# found metadata in lsctables, construct
+				# custom subclass.  see dbtables for more
+				# information.
+				lsccls = lsctables.TableByName[name]
+				class CustomColumnarTable(cls, lsccls):
+					tableName = lsccls.tableName
+					validcolumns = lsccls.validcolumns
+					loadcolumns = lsccls.loadcolumns
+					interncolumns = lsccls.interncolumns
+					constraints = lsccls.constraints
+					next_id = lsccls.next_id
+					RowType = lsccls.RowType
+					how_to_index = lsccls.how_to_index
+
+				# save for re-use
+				TableByName[name] = CustomColumnarTable
+
+				# replace input argument with new class
+				cls = CustomColumnarTable
+		return table.Table.__new__(cls, *args)
+
+	def __init__(self, *args):
+		super(ColumnarTable, self).__init__(*args)
+		# column name --> array
+		self._arrays = {}
+		# column name --> ID class, for columns whose arrays store
+		# the integer parts of IDs
+		self._idclasses = {}
+		# rows appended since the arrays were last updated
+		self._pending = []
+
+	def copy(self):
+		new = super(ColumnarTable, self).copy()
+		new._idclasses = self._idclasses.copy()
+		new._pending = []
+		return new
+
+	#
+	# Storage
+	#
+
+	def _loaded_columns(self):
+		"""
+		Return a list of the (name, type) pairs of the columns that
+		are stored.  For internal use only.
+		"""
+		if self.loadcolumns is None:
+			return zip(self.columnnames, self.columntypes)
+		return [(name, coltype) for name, coltype in zip(self.columnnames, self.columntypes) if name in self.loadcolumns]
+
+	def _update_column_info(self):
+		# the number of rows
+		n = len(self)
+		super(ColumnarTable, self)._update_column_info()
+		# create arrays for new columns, delete arrays for removed
+		# columns.  if the table has rows the values in a new
+		# column are None.
+		arrays = {}
+		for name, coltype in self._loaded_columns():
+			if name in self._arrays:
+				arrays[name] = self._arrays[name]
+			elif n:
+				arrays[name] = numpy.empty((n,), dtype = object)
+				self._idclasses[name] = None
+			else:
+				arrays[name] = numpy.empty((0,), dtype = self._storage_dtype(coltype))
+				self._idclasses.pop(name, None)
+		self._arrays = arrays
+
+	@staticmethod
+	def _storage_dtype(coltype):
+		"""
+		The type of the array used to store a column of the given
+		type when it contains no null values.  Single-precision
+		columns are stored in double precision so that the values
+		are exactly those that would be found in the row objects of
+		a table.Table.  For internal use only.
+		"""
+		if coltype == u"ilwd:char":
+			return "int64"
+		if coltype in ligolwtypes.FloatTypes:
+			return "float64"
+		if coltype in ligolwtypes.ComplexTypes:
+			return "complex128"
+		return ligolwtypes.ToNumPyType.get(coltype, object)
+
+	def appendColumn(self, name):
+		column = super(ColumnarTable, self).appendColumn(name)
+		return self.replaceChild(ColumnarColumn(column.attributes), column)
+
+	def _to_array(self, name, coltype, values):
+		"""
+		Convert a list of values for the column to an array of the
+		type that is or will be used to store the column.  For
+		internal use only.
+		"""
+		if not values:
+			return self._arrays[name][:0]
+		if coltype in ligolwtypes.IDTypes:
+			if self._idclasses.get(name, True) is not None:
+				idclasses = set(map(type, values))
+				idclass = idclasses.pop()
+				if not idclasses and issubclass(idclass, ilwd._ilwd.ilwdchar) and self._idclasses.setdefault(name, idclass) is idclass:
+					return numpy.array(map(int, values), dtype = "int64")
+				# can't store these as integers
+				self._convert_to_objects(name)
+		elif coltype in ligolwtypes.IntTypes and None not in values:
+			# let numpy choose the integer type, then check the
+			# values fit in the column's type.  if they don't,
+			# keep the wider type.
+			a = numpy.array(values)
+			if a.dtype.kind in "iu":
+				dtype = numpy.dtype(self._storage_dtype(coltype))
+				info = numpy.iinfo(dtype)
+				if info.min <= a.min() and a.max() <= info.max:
+					a = a.astype(dtype)
+				return a
+		elif coltype in ligolwtypes.ToNumPyType and None not in values:
+			return numpy.array(values, dtype = self._storage_dtype(coltype))
+		self._convert_to_objects(name)
+		a = numpy.empty((len(values),), dtype = object)
+		a[:] = values
+		return a
+
+	def _convert_to_objects(self, name):
+		"""
+		Replace the array storing the column with an object array.
+		For internal use only.
+		"""
+		if self._arrays[name].dtype != object:
+			a = numpy.empty(self._arrays[name].shape, dtype = object)
+			a[:] = self._column_values(name, slice(None), flush = False)
+			self._arrays[name] = a
+		self._idclasses[name] = None
+
+	def _append_tokens(self, tokens):
+		"""
+		Append a flat list of values, row by row, to the columns.
+		Used by the Stream element during parsing.  For internal use
+		only.
+		"""
+		columns = self._loaded_columns()
+		n = len(columns)
+		for i, (name, coltype) in enumerate(columns):
+			a = self._to_array(name, coltype, tokens[i::n])
+			self._arrays[name] = numpy.concatenate((self._arrays[name], a))
+
+	def _append_columns(self, n, columns):
+		"""
+		Append the n rows returned by the tokenizer's .columns()
+		method to the columns.  Used by the Stream element during
+		parsing.  For internal use only.
+		"""
+		# the tokenizer returns None for columns that aren't loaded
+		columns = [column for column in columns if column is not None]
+		for (name, coltype), column in zip(self._loaded_columns(), columns):
+			if isinstance(column, tuple):
+				values, nulls = column
+				a = numpy.frombuffer(values, dtype = "int64" if coltype in ligolwtypes.IntTypes else "float64")
+				if nulls is not None:
+					# rare.  take the slow path
+					a = a.tolist()
+					for i in numpy.flatnonzero(numpy.frombuffer(nulls, dtype = "uint8")):
+						a[i] = None
+					a = self._to_array(name, coltype, a)
+				elif coltype in ligolwtypes.IntTypes and self._arrays[name].dtype != object:
+					dtype = numpy.dtype(self._storage_dtype(coltype))
+					info = numpy.iinfo(dtype)
+					if not len(a) or (info.min <= a.min() and a.max() <= info.max):
+						a = a.astype(dtype)
+			else:
+				a = self._to_array(name, coltype, column)
+			self._arrays[name] = numpy.concatenate((self._arrays[name], a))
+
+	def _append_arrays(self, n, columns):
+		"""
+		Append the n rows of the columns decoded from a binary
+		encoded Stream by glue.ligolw.binarytables.decode_stream()
+		to the columns.  For internal use only.
+		"""
+		for (name, coltype), (values, idclass) in zip(self._loaded_columns(), columns):
+			if idclass is not None and self._idclasses.get(name, idclass) is idclass:
+				# the integer parts of IDs of the column's
+				# class
+				self._idclasses[name] = idclass
+			elif idclass is not None or not isinstance(values, numpy.ndarray):
+				values = self._to_array(name, coltype, binarytables.column_values(values, idclass))
+			self._arrays[name] = numpy.concatenate((self._arrays[name], values))
+
+	def _flush(self):
+		"""
+		Copy the values from the rows appended with .append() into
+		the arrays.  For internal use only.
+		"""
+		if self._pending:
+			rows, self._pending = self._pending, []
+			tokens = []
+			for row in rows:
+				tokens.extend(getattr(row, name) for name, coltype in self._loaded_columns())
+			self._append_tokens(tokens)
+
+	def get_array(self, name):
+		"""
+		Return the array storing the column named name.  This is
+		not a copy:  modifications made to the array are recorded
+		in the document.
+		"""
+		self._flush()
+		return self._arrays[table.StripColumnName(name)]
+
+	def _column_values(self, name, index, flush = True):
+		"""
+		Return a list of the Python values stored in the given
+		column for the rows selected by the slice index.  For
+		internal use only.
+		"""
+		if flush:
+			self._flush()
+		values = self._arrays[name][index].tolist()
+		idclass = self._idclasses.get(name)
+		if idclass is not None:
+			values = map(idclass, values)
+		return values
+
+	def _set_value(self, name, i, value):
+		"""
+		Set the value of the column in row i.  For internal use
+		only.
+		"""
+		self._flush()
+		array = self._arrays[name]
+		if array.dtype == object:
+			array[i] = value
+			return
+		idclass = self._idclasses.get(name)
+		try:
+			if idclass is not None:
+				if type(value) is not idclass:
+					raise TypeError(value)
+				value = int(value)
+			elif value is None:
+				raise TypeError(value)
+			array[i] = value
+			if array.dtype.kind in "iu" and array[i] != value:
+				# didn't fit
+				raise ValueError(value)
+		except (TypeError, ValueError, OverflowError):
+			self._convert_to_objects(name)
+			self._arrays[name][i] = value
+
+	#
+	# List-like interface
+	#
+
+	def __len__(self):
+		if not self._arrays:
+			return len(self._pending)
+		return len(self._arrays.itervalues().next()) + len(self._pending)
+
+	def __nonzero__(self):
+		return len(self) != 0
+
+	def _rows(self, index):
+		"""
+		Construct and return a list of row objects for the rows
+		selected by the slice index.  For internal use only.
+		"""
+		self._flush()
+		names = self._arrays.keys()
+		rows = [self.RowType() for i in xrange(*index.indices(len(self)))]
+		for name in names:
+			for row, value in itertools.izip(rows, self._column_values(name, index)):
+				setattr(row, name, value)
+		return rows
+
+	def __getitem__(self, i):
+		if isinstance(i, slice):
+			return self._rows(i)
+		if i < 0:
+			i += len(self)
+		if not 0 <= i < len(self):
+			raise IndexError("Table index out of range")
+		return self._rows(slice(i, i + 1))[0]
+
+	def __getslice__(self, i, j):
+		return self[max(0, i):max(0, j):]
+
+	def __setitem__(self, i, row):
+		if isinstance(i, slice):
+			# the arrays can't be resized this way, so the
+			# number of rows must match the size of the slice
+			indexes = range(*i.indices(len(self)))
+			rows = list(row)
+			if len(rows) != len(indexes):
+				raise ValueError("attempt to assign sequence of size %d to slice of size %d" % (len(rows), len(indexes)))
+			for index, row in zip(indexes, rows):
+				self[index] = row
+			return
+		for name in self._arrays:
+			self._set_value(name, i, getattr(row, name))
+
+	def __setslice__(self, i, j, rows):
+		self[max(0, i):max(0, j):] = rows
+
+	def __delitem__(self, i):
+		self._flush()
+		self._arrays = dict((name, numpy.delete(array, i)) for name, array in self._arrays.items())
+
+	def __delslice__(self, i, j):
+		del self[max(0, i):max(0, j):]
+
+	def __iter__(self):
+		n = len(self)
+		for start in xrange(0, n, 16384):
+			for row in self._rows(slice(start, min(start + 16384, n))):
+				yield row
+
+	def __reversed__(self):
+		for stop in xrange(len(self), 0, -16384):
+			for row in reversed(self._rows(slice(max(stop - 16384, 0), stop))):
+				yield row
+
+	def _take(self, indexes):
+		"""
+		Re-order the rows so that they are the rows at the given
+		indexes.  For internal use only.
+		"""
+		self._flush()
+		indexes = numpy.array(indexes, dtype = "intp")
+		self._arrays = dict((name, array[indexes]) for name, array in self._arrays.items())
+
+	def _matches(self, row):
+		"""
+		Generate a sequence of booleans, one for each row in the
+		table, indicating whether or not its values equal those of
+		row.  For internal use only.
+		"""
+		names = self._arrays.keys()
+		values = tuple(getattr(row, name, None) for name in names)
+		return (other == values for other in itertools.izip(*(self._column_values(name, slice(None)) for name in names)))
+
+	def __contains__(self, row):
+		return any(self._matches(row))
+
+	def index(self, row, start = 0, stop = None):
+		start, stop, step = slice(start, stop).indices(len(self))
+		for i, match in itertools.islice(enumerate(self._matches(row)), start, stop):
+			if match:
+				return i
+		raise ValueError("row not in table")
+
+	def count(self, row):
+		return sum(self._matches(row))
+
+	def append(self, row):
+		self._pending.append(row)
+
+	def extend(self, rows):
+		self._pending.extend(rows)
+
+	def __iadd__(self, rows):
+		self.extend(rows)
+		return self
+
+	def insert(self, i, row):
+		n = len(self)
+		i = min(max(i + n if i < 0 else i, 0), n)
+		self.append(row)
+		self._take(range(i) + [n] + range(i, n))
+
+	def pop(self, i = -1):
+		if not self:
+			raise IndexError("pop from empty table")
+		row = self[i]
+		del self[i]
+		return row
+
+	def remove(self, row):
+		del self[self.index(row)]
+
+	def reverse(self):
+		self._take(range(len(self) - 1, -1, -1))
+
+	def sort(self, cmp = None, key = None, reverse = False):
+		rows = list(self)
+		self._take(sorted(range(len(rows)), cmp = cmp, key = (lambda i: key(rows[i])) if key is not None else rows.__getitem__, reverse = reverse))
+
+	def unlink(self):
+		super(ColumnarTable, self).unlink()
+		self._arrays = {}
+		self._idclasses = {}
+
+	#
+	# GPS time access
+	#
+
+	def get_gps_array(self, name, dtype = "int64"):
+		if name.endswith("_ns"):
+			name = name[:-3]
+		seconds = self.get_array(name).astype("int64")
+		nanoseconds = self.get_array("%s_ns" % name).astype("int64")
+		if numpy.dtype(dtype) == numpy.int64:
+			return seconds * 1000000000 + nanoseconds
+		elif numpy.dtype(dtype) == numpy.float64:
+			return seconds + nanoseconds * 1e-9
+		raise ValueError("dtype must be int64 or float64, not %s" % str(dtype))
+	get_gps_array.__doc__ = table.Table.get_gps_array.__doc__
+
+
+#
+# =============================================================================
+#
+#                                Table Metadata
+#
+# =============================================================================
+#
+
+
+#
+# Table name ---> table type mapping.  Populated by ColumnarTable.__new__()
+#
+
+
+TableByName = {}
+
+
+#
+# =============================================================================
+#
+#                               Content Handler
+#
+# =============================================================================
+#
+
+
+#
+# Override portions of a ligolw.LIGOLWContentHandler class
+#
+
+
+def use_in(ContentHandler):
+	"""
+	Modify ContentHandler, a sub-class of
+	glue.ligolw.LIGOLWContentHandler, to cause it to use the
+	ColumnarTable, ColumnarColumn and ColumnarTableStream classes
+	defined in this module when parsing XML documents.
+
+	Example:
+
+	>>> from glue.ligolw import ligolw
+	>>> class MyContentHandler(ligolw.LIGOLWContentHandler):
+	...	pass
+	...
+	>>> use_in(MyContentHandler)
+	<class 'glue.ligolw.columnartables.MyContentHandler'>
+	"""
+	ContentHandler = lsctables.use_in(ContentHandler)
+
+	def startColumn(self, parent, attrs, __orig_startColumn = ContentHandler.startColumn):
+		if isinstance(parent, ColumnarTable):
+			return ColumnarColumn(attrs)
+		return __orig_startColumn(self, parent, attrs)
+
+	def startStream(self, parent, attrs, __orig_startStream = ContentHandler.startStream):
+		if isinstance(parent, ColumnarTable):
+			parent._end_of_columns()
+			return ColumnarTableStream(attrs).config(parent)
+		return __orig_startStream(self, parent, attrs)
+
+	def startTable(self, parent, attrs):
+		return ColumnarTable(attrs)
+
+	ContentHandler.startColumn = startColumn
+	ContentHandler.startStream = startStream
+	ContentHandler.startTable = startTable
+
+	return ContentHandler
@@ -414,6 +414,184 @@ def discard_connection_filename(filename, working_filename, verbose = False):
 			uninstall_signal_trap()
 
 
+#
+# =============================================================================
+#
+#                                 Integer IDs
+#
+# =============================================================================
+#
+
+
+#
+# by default, ilwd:char IDs are stored in the database as text, like
+# "sngl_inspiral:event_id:1054".  databases can instead store them as
+# integers.  the ID "table_name:column_name:n" is then stored as
+#
+#	(code << IntegerIDShift) + n
+#
+# where code identifies the "table_name:column_name" prefix.  the codes
+# are recorded in the _ilwdchar_prefixes_ table.  an ID is stored as the
+# same integer in every column, so joins work as they do with text IDs,
+# including on columns like coinc_event_map.event_id that contain the IDs
+# of more than one table.
+#
+
+
+IntegerIDShift = 40
+"""
+Number of bits of the integer representation of an ID used for the
+ID's index.  The remaining high bits identify the ID's prefix.
+"""
+
+IntegerIDSQLiteType = "ILWD_INTEGER"
+"""
+SQLite column type of ilwd:char columns in databases that store IDs as
+integers.  The column has INTEGER affinity but, unlike "INTEGER", does
+not alias the ROWID.
+"""
+
+
+def uses_integer_ids(connection):
+	"""
+	Return True if the database at connection stores ilwd:char IDs as
+	integers, False if it stores them as text.  See
+	enable_integer_ids().
+	"""
+	if connection_db_type(connection) != "sqlite":
+		return False
+	cursor = connection.cursor()
+	cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type == 'table' AND name == '_ilwdchar_prefixes_'")
+	return bool(cursor.fetchone()[0])
+
+
+def enable_integer_ids(connection):
+	"""
+	Configure the database at connection to store ilwd:char IDs as
+	integers instead of as text.  This must be done before any tables
+	are created in the database, ValueError is raised if the database
+	contains tables whose IDs are stored as text.  Nothing is done if
+	the database already stores IDs as integers.
+
+	The choice is recorded in the database, so it is permanent and
+	connections opened later will also use integer IDs.  The
+	conversion to and from ilwdchar objects is transparent to code
+	using the DBTable class, but SQL queries that compare IDs to
+	literal strings will not work with such databases.  See
+	IntegerIDCodec for how to convert IDs in SQL queries.
+
+	Example:
+
+	>>> import sqlite3
+	>>> connection = sqlite3.connect(":memory:")
+	>>> enable_integer_ids(connection)
+	>>> uses_integer_ids(connection)
+	True
+	"""
+	if uses_integer_ids(connection):
+		return
+	if connection_db_type(connection) != "sqlite":
+		raise ValueError("integer IDs are only supported by SQLite databases")
+	if get_table_names(connection):
+		raise ValueError("database contains tables with text IDs")
+	connection.cursor().execute("CREATE TABLE _ilwdchar_prefixes_ (code INTEGER PRIMARY KEY, table_name TEXT NOT NULL, column_name TEXT NOT NULL, UNIQUE (table_name, column_name))")
+	connection.commit()
+
+
+class IntegerIDCodec(object):
+	"""
+	Converts ilwdchar objects to and from the integers they are stored
+	as in databases that store IDs as integers.  See
+	enable_integer_ids().  New prefix codes are recorded in the
+	database as they are needed.
+
+	Example:
+
+	>>> import sqlite3
+	>>> connection = sqlite3.connect(":memory:")
+	>>> enable_integer_ids(connection)
+	>>> codec = IntegerIDCodec(connection)
+	>>> codec.encode(ilwd.ilwdchar("sngl_burst:event_id:10"))
+	1099511627786
+	>>> print codec.decode(1099511627786)
+	sngl_burst:event_id:10
+	>>> print codec.encode(None)
+	None
+	"""
+	def __init__(self, connection):
+		self.connection = connection
+		self.codes = {}
+		self.classes = {}
+		for code, table_name, column_name in connection.cursor().execute("SELECT code, table_name, column_name FROM _ilwdchar_prefixes_"):
+			cls = ilwd.get_ilwdchar_class(table_name, column_name)
+			self.codes[cls] = code
+			self.classes[code] = cls
+
+	def code(self, cls, create = True):
+		"""
+		Return the code of the prefix of the ilwdchar subclass cls.
+		If the prefix does not yet have a code a new one is
+		recorded, unless create is False in which case None is
+		returned.
+		"""
+		try:
+			return self.codes[cls]
+		except KeyError:
+			pass
+		cursor = self.connection.cursor()
+		cursor.execute("SELECT code FROM _ilwdchar_prefixes_ WHERE table_name == ? AND column_name == ?", (cls.table_name, cls.column_name))
+		code = cursor.fetchone()
+		if code is not None:
+			code, = code
+		elif create:
+			cursor.execute("INSERT INTO _ilwdchar_prefixes_ (table_name, column_name) VALUES (?, ?)", (cls.table_name, cls.column_name))
+			code = cursor.lastrowid
+		else:
+			return None
+		self.codes[cls] = code
+		self.classes[code] = cls
+		return code
+
+	def encode(self, id):
+		"""
+		Return the integer representation of the ID.  id is an
+		ilwdchar object or a string that can be converted to one,
+		or None.
+		"""
+		if id is None:
+			return None
+		try:
+			code = self.codes[type(id)]
+		except KeyError:
+			if not isinstance(id, ilwd._ilwd.ilwdchar):
+				id = ilwd.ilwdchar(id)
+			code = self.code(type(id))
+		n = int(id)
+		if not 0 <= n < 1 << IntegerIDShift:
+			raise ValueError("%s: index out of range for integer IDs" % id)
+		return (code << IntegerIDShift) + n
+
+	def decode(self, i):
+		"""
+		Return the ilwdchar object represented by the integer i, or
+		None if i is None.
+		"""
+		if i is None:
+			return None
+		code = i >> IntegerIDShift
+		try:
+			cls = self.classes[code]
+		except KeyError:
+			cursor = self.connection.cursor()
+			cursor.execute("SELECT table_name, column_name FROM _ilwdchar_prefixes_ WHERE code == ?", (code,))
+			prefix = cursor.fetchone()
+			if prefix is None:
+				raise ValueError("%d: unrecognized ID prefix code %d" % (i, code))
+			cls = self.classes[code] = ilwd.get_ilwdchar_class(*prefix)
+			self.codes[cls] = code
+		return cls(i & ((1 << IntegerIDShift) - 1))
+
+
 #
 # =============================================================================
 #
@@ -423,31 +601,96 @@ def discard_connection_filename(filename, working_filename, verbose = False):
 #
 
 
+#
+# the old --> new ID mapping for the document being inserted is held in a
+# dictionary in RAM, one for each database connection.  the _idmap_ table
+# in the database is only populated on demand, when rows containing
+# references to IDs that had not yet been seen when they were inserted
+# have to be fixed up with SQL UPDATE statements
+#
+
+
+class _IDMap(dict):
+	"""
+	Dictionary mapping old IDs to new IDs.  The unflushed attribute
+	lists the (old, new) pairs that have not yet been written to the
+	_idmap_ table in the database.
+	"""
+	def __init__(self):
+		super(_IDMap, self).__init__()
+		self.unflushed = []
+
+
+_idmaps = {}
+
+
+def idmap_get(connection):
+	"""
+	Return the dictionary mapping old IDs to new IDs for the document
+	currently being inserted into the database at connection.  The
+	dictionary is created if needed.
+
+	This function is for internal use, it forms part of the code used
+	to re-map row IDs when merging multiple documents.
+	"""
+	try:
+		return _idmaps[connection]
+	except KeyError:
+		return _idmaps.setdefault(connection, _IDMap())
+
+
 def idmap_create(connection):
 	"""
 	Create the _idmap_ table.  This table has columns "old" and "new"
 	containing text strings mapping old IDs to new IDs.  The old column
 	is a primary key (is indexed and must contain unique entries).  The
 	table is created as a temporary table, so it will be automatically
-	dropped when the database connection is closed.
+	dropped when the database connection is closed.  Any ID mapping
+	held in RAM for the connection is discarded.  In databases that
+	store IDs as integers the columns contain integers.
 
 	This function is for internal use, it forms part of the code used
 	to re-map row IDs when merging multiple documents.
 	"""
-	connection.cursor().execute("CREATE TEMPORARY TABLE _idmap_ (old TEXT PRIMARY KEY NOT NULL, new TEXT NOT NULL)")
+	_idmaps.pop(connection, None)
+	if uses_integer_ids(connection):
+		connection.cursor().execute("CREATE TEMPORARY TABLE _idmap_ (old INTEGER PRIMARY KEY NOT NULL, new INTEGER NOT NULL)")
+	else:
+		connection.cursor().execute("CREATE TEMPORARY TABLE _idmap_ (old TEXT PRIMARY KEY NOT NULL, new TEXT NOT NULL)")
 
 
 def idmap_reset(connection):
 	"""
-	Erase the contents of the _idmap_ table, but leave the table in
-	place.
+	Erase the contents of the _idmap_ table and of the ID mapping held
+	in RAM for the connection, but leave the table in place.
 
 	This function is for internal use, it forms part of the code used
 	to re-map row IDs when merging multiple documents.
 	"""
+	_idmaps.pop(connection, None)
 	connection.cursor().execute("DELETE FROM _idmap_")
 
 
+def idmap_flush(connection, id_codec = None):
+	"""
+	Write the entries of the ID mapping held in RAM for the connection
+	that are not yet in the _idmap_ table to the _idmap_ table.  This
+	must be done before the _idmap_ table is used in SQL queries.  For
+	databases that store IDs as integers, id_codec must be an
+	IntegerIDCodec instance for the connection.
+
+	This function is for internal use, it forms part of the code used
+	to re-map row IDs when merging multiple documents.
+	"""
+	idmap = idmap_get(connection)
+	if idmap.unflushed:
+		pairs = idmap.unflushed
+		if id_codec is not None:
+			pairs = [(id_codec.encode(old), id_codec.encode(new)) for old, new in pairs]
+		connection.cursor().executemany("INSERT INTO _idmap_ VALUES (?, ?)", pairs)
+		del idmap.unflushed[:]
+
+
 def idmap_sync(connection):
 	"""
 	Iterate over the tables in the database, ensure that there exists a
@@ -463,25 +706,25 @@ def idmap_sync(connection):
 def idmap_get_new(connection, old, tbl):
 	"""
 	From the old ID string, obtain a replacement ID string by either
-	grabbing it from the _idmap_ table if one has already been assigned
-	to the old ID, or by using the current value of the Table
-	instance's next_id class attribute.  In the latter case, the new ID
-	is recorded in the _idmap_ table, and the class attribute
-	incremented by 1.
+	grabbing it from the ID mapping if one has already been assigned to
+	the old ID, or by using the current value of the Table instance's
+	next_id class attribute.  In the latter case, the new ID is
+	recorded in the ID mapping, and the class attribute incremented by
+	1.  See also idmap_flush().
 
 	This function is for internal use, it forms part of the code used
 	to re-map row IDs when merging multiple documents.
 	"""
-	cursor = connection.cursor()
-	cursor.execute("SELECT new FROM _idmap_ WHERE old == ?", (old,))
-	new = cursor.fetchone()
-	if new is not None:
+	idmap = idmap_get(connection)
+	try:
 		# a new ID has already been created for this old ID
-		return ilwd.ilwdchar(new[0])
-	# this ID was not found in _idmap_ table, assign a new ID and
-	# record it
-	new = tbl.get_next_id()
-	cursor.execute("INSERT INTO _idmap_ VALUES (?, ?)", (old, new))
+		return idmap[old]
+	except KeyError:
+		pass
+	# this ID was not found in the mapping, assign a new ID and record
+	# it
+	new = idmap[old] = tbl.get_next_id()
+	idmap.unflushed.append((old, new))
 	return new
 
 
@@ -499,6 +742,15 @@ def idmap_get_max_id(connection, id_class):
 	>>> print max_id
 	sngl_inspiral:event_id:1054
 	"""
+	if uses_integer_ids(connection):
+		# the IDs of the class are the integers in a range
+		id_codec = IntegerIDCodec(connection)
+		code = id_codec.code(id_class, create = False)
+		if code is None:
+			return None
+		cursor = connection.cursor()
+		cursor.execute("SELECT MAX(%s) FROM %s WHERE %s >= ? AND %s < ?" % (id_class.column_name, id_class.table_name, id_class.column_name, id_class.column_name), (code << IntegerIDShift, (code + 1) << IntegerIDShift))
+		return id_codec.decode(cursor.fetchone()[0])
 	cursor = connection.cursor()
 	cursor.execute("SELECT MAX(CAST(SUBSTR(%s, %d, 10) AS INTEGER)) FROM %s" % (id_class.column_name, id_class.index_offset + 1, id_class.table_name))
 	maxid = cursor.fetchone()[0]
@@ -536,7 +788,7 @@ def get_table_names(connection):
 	Return a list of the table names in the database.
 	"""
 	cursor = connection.cursor()
-	cursor.execute("SELECT name FROM sqlite_master WHERE type == 'table'")
+	cursor.execute("SELECT name FROM sqlite_master WHERE type == 'table' AND name != '_ilwdchar_prefixes_'")
 	return [name for (name,) in cursor]
 
 
@@ -582,7 +834,7 @@ def get_xml(connection, table_names = None):
 				column_type = ligolwtypes.FromSQLiteType[column_type]
 			table_elem.appendChild(table.Column(AttributesImpl({u"Name": u"%s:%s" % (table_name, column_name), u"Type": column_type})))
 		table_elem._end_of_columns()
-		table_elem.appendChild(table.TableStream(AttributesImpl({u"Name": u"%s:table" % table_name, u"Delimiter": table.TableStream.Delimiter.default, u"Type": table.TableStream.Type.default})))
+		table_elem.appendChild(DBTableStream(AttributesImpl({u"Name": u"%s:table" % table_name, u"Delimiter": table.TableStream.Delimiter.default, u"Type": table.TableStream.Type.default})))
 		ligo_lw.appendChild(table_elem)
 	return ligo_lw
 
@@ -692,6 +944,18 @@ class DBTable(table.Table):
 		# pre-allocate a cursor for internal queries
 		self.cursor = self.connection.cursor()
 
+		# rows waiting to be inserted with executemany()
+		self.insert_buffer = []
+
+		# converts IDs to and from their representation in the
+		# database
+		if uses_integer_ids(self.connection):
+			self.id_codec = IntegerIDCodec(self.connection)
+			self.decode_id = self.id_codec.decode
+		else:
+			self.id_codec = None
+			self.decode_id = ilwd.ilwdchar
+
 	def copy(self, *args, **kwargs):
 		"""
 		This method is not implemented.  See
@@ -715,6 +979,9 @@ class DBTable(table.Table):
 			"sqlite": ligolwtypes.ToSQLiteType,
 			"mysql": ligolwtypes.ToMySQLType
 		}[connection_db_type(self.connection)]
+		if self.id_codec is not None:
+			ToSQLType = dict(ToSQLType)
+			ToSQLType[u"ilwd:char"] = IntegerIDSQLiteType
 		try:
 			statement = "CREATE TABLE IF NOT EXISTS " + self.Name + " (" + ", ".join(map(lambda n, t: "%s %s" % (n, ToSQLType[t]), self.dbcolumnnames, self.dbcolumntypes))
 		except KeyError as e:
@@ -735,7 +1002,28 @@ class DBTable(table.Table):
 		self.append_statement = "INSERT INTO %s (%s) VALUES (%s)" % (self.Name, ",".join(self.dbcolumnnames), params)
 		self.append_attrgetter = operator.attrgetter(*self.dbcolumnnames)
 
+		# the ID columns holding references to rows in this or
+		# other tables, and their positions in the INSERT
+		# statement.  these are re-written when merging documents
+		self.reference_columns = tuple(colname for coltype, colname in zip(self.dbcolumntypes, self.dbcolumnnames) if coltype in ligolwtypes.IDTypes and (self.next_id is None or colname != self.next_id.column_name))
+		self.reference_indexes = tuple(self.dbcolumnnames.index(colname) for colname in self.reference_columns)
+		if self.next_id is not None and self.next_id.column_name in self.dbcolumnnames:
+			self.next_id_index = self.dbcolumnnames.index(self.next_id.column_name)
+		else:
+			self.next_id_index = None
+
+		# ROWIDs of rows inserted by ._remapping_append() whose
+		# references could not be re-mapped prior to insertion.
+		# None = rows have not been inserted that way
+		self.unmapped_rowids = None
+
+		# the positions of the ID columns to be converted to
+		# integers before insertion
+		if self.id_codec is not None:
+			self.id_indexes = tuple(i for i, coltype in enumerate(self.dbcolumntypes) if coltype == u"ilwd:char")
+
 	def _end_of_rows(self):
+		self._flush_inserts()
 		# FIXME:  is this needed?
 		table.Table._end_of_rows(self)
 		self.connection.commit()
@@ -770,12 +1058,50 @@ class DBTable(table.Table):
 	#	# which is the intended range
 	#	self.cursor.execute("DELETE FROM %s WHERE ROWID BETWEEN %d AND %d" % (self.Name, i + 1, j))
 
+	def _encode_ids(self, values):
+		"""
+		Return a list of the values with the IDs converted to
+		integers.  Used for databases that store IDs as integers.
+		This method is intended for internal use only.
+		"""
+		values = list(values)
+		encode = self.id_codec.encode
+		for i in self.id_indexes:
+			values[i] = encode(values[i])
+		return values
+
+	def _insert(self, values):
+		"""
+		Insert a row given as a sequence of values in the order of
+		the .dbcolumnnames attribute.  This method is intended for
+		internal use only.
+		"""
+		if self.id_codec is not None:
+			values = self._encode_ids(values)
+		self.cursor.execute(self.append_statement, values)
+
 	def _append(self, row):
 		"""
 		Standard .append() method.  This method is for intended for
 		internal use only.
 		"""
-		self.cursor.execute(self.append_statement, self.append_attrgetter(row))
+		self._insert(self.append_attrgetter(row))
+
+	def _remap_references(self, values, idmap):
+		"""
+		Return a list of the values with the references to other
+		rows replaced by their new IDs from idmap, or None if new
+		IDs have not yet been assigned to all of them.  This method
+		is intended for internal use only.
+		"""
+		mapped = list(values)
+		try:
+			for i in self.reference_indexes:
+				if mapped[i] is not None:
+					mapped[i] = idmap[mapped[i]]
+		except KeyError:
+			return None
+		return mapped
 
 	def _remapping_append(self, row):
 		"""
@@ -784,16 +1110,123 @@ class DBTable(table.Table):
 		also performs the function of the updateKeyMapping()
 		method.  SQLite does not permit the PRIMARY KEY of a row to
 		be modified, so it needs to be done prior to insertion.
-		This method is intended for internal use only.
+
+		References to other rows are also re-mapped prior to
+		insertion if new IDs have already been assigned to all of
+		them, otherwise the row is inserted as-is and its
+		references are updated later by .applyKeyMapping().  This
+		method is intended for internal use only.
 		"""
 		if self.next_id is not None:
 			# assign (and record) a new ID before inserting the
 			# row to avoid collisions with existing rows
 			setattr(row, self.next_id.column_name, idmap_get_new(self.connection, getattr(row, self.next_id.column_name), self))
-		self._append(row)
+		if self.unmapped_rowids is None:
+			self.unmapped_rowids = []
+		values = self.append_attrgetter(row)
+		mapped = self._remap_references(values, idmap_get(self.connection))
+		if mapped is None:
+			# a reference to a row that has not been seen yet.
+			# the row's references are updated after the
+			# document has been inserted
+			self._insert(values)
+			self.unmapped_rowids.append(self.cursor.lastrowid)
+		else:
+			self._insert(mapped)
 
 	append = _append
 
+	# while a document is being parsed, its rows are inserted into the
+	# database this many at a time with executemany()
+	rows_per_insert = 1024
+
+	def _flush_inserts(self):
+		"""
+		Insert the rows waiting in the insert buffer into the
+		database.  This method is intended for internal use only.
+		"""
+		if self.insert_buffer:
+			if self.id_codec is not None:
+				self.cursor.executemany(self.append_statement, itertools.imap(self._encode_ids, self.insert_buffer))
+			else:
+				self.cursor.executemany(self.append_statement, self.insert_buffer)
+			del self.insert_buffer[:]
+
+	def _append_values(self, rows):
+		"""
+		Buffered equivalent of ._append().  rows is an iterable of
+		sequences of values in the order of the .dbcolumnnames
+		attribute.  The rows are inserted when the buffer is full
+		and by ._end_of_rows().  This method is intended for
+		internal use only.
+		"""
+		self.insert_buffer.extend(rows)
+		if len(self.insert_buffer) >= self.rows_per_insert:
+			self._flush_inserts()
+
+	def _remapping_append_values(self, rows):
+		"""
+		Buffered equivalent of ._remapping_append().  See
+		._append_values() for more information.  This method is
+		intended for internal use only.
+		"""
+		if self.unmapped_rowids is None:
+			self.unmapped_rowids = []
+		idmap = idmap_get(self.connection)
+		for values in rows:
+			if self.next_id_index is not None:
+				values = list(values)
+				values[self.next_id_index] = idmap_get_new(self.connection, values[self.next_id_index], self)
+			mapped = self._remap_references(values, idmap)
+			if mapped is None:
+				# see ._remapping_append().  the buffer is
+				# flushed first to insert the rows in order
+				self._flush_inserts()
+				self._insert(values)
+				self.unmapped_rowids.append(self.cursor.lastrowid)
+			else:
+				self.insert_buffer.append(mapped)
+		if len(self.insert_buffer) >= self.rows_per_insert:
+			self._flush_inserts()
+
+	def _values_appender(self):
+		"""
+		Return the method to be used to insert rows given as
+		sequences of values, without constructing row objects, or
+		None if .append() has been customized and so row objects
+		must be appended with it.  This method is intended for
+		internal use only.
+		"""
+		append = self.append.__func__
+		if append is DBTable._append.__func__:
+			return self._append_values
+		if append is DBTable._remapping_append.__func__:
+			return self._remapping_append_values
+		return None
+
+	def _select_values(self):
+		"""
+		Return a cursor over the rows of the table as tuples of
+		values in the order of .columnnames, with IDs in their
+		string form, or None if the rows must be retrieved as row
+		objects because not all of the columns are in the database
+		or because iteration over the table has been customized.
+		This method is intended for internal use only.
+		"""
+		if self.dbcolumnnames != self.columnnames or u"ilwd:char_u" in self.dbcolumntypes:
+			return None
+		cls = type(self)
+		if cls.__iter__.__func__ is not DBTable.__iter__.__func__ or cls.row_from_cols.__func__ is not DBTable.row_from_cols.__func__:
+			return None
+		columns = self.dbcolumnnames
+		if self.id_codec is not None:
+			# rebuild the IDs' strings from their prefix codes
+			# in the query itself
+			columns = [("(SELECT table_name || ':' || column_name || ':' FROM _ilwdchar_prefixes_ WHERE code == %s >> %d) || (%s & %d)" % (name, IntegerIDShift, name, (1 << IntegerIDShift) - 1) if coltype == u"ilwd:char" else name) for name, coltype in zip(self.dbcolumnnames, self.dbcolumntypes)]
+		cursor = self.connection.cursor()
+		cursor.execute("SELECT %s FROM %s" % (", ".join(columns), self.Name))
+		return cursor
+
 	def row_from_cols(self, values):
 		"""
 		Given an iterable of values in the order of columns in the
@@ -803,7 +1236,9 @@ class DBTable(table.Table):
 		"""
 		row = self.RowType()
 		for c, t, v in zip(self.dbcolumnnames, self.dbcolumntypes, values):
-			if t in ligolwtypes.IDTypes:
+			if t == u"ilwd:char":
+				v = self.decode_id(v)
+			elif t in ligolwtypes.IDTypes:
 				v = ilwd.ilwdchar(v)
 			setattr(row, c, v)
 		return row
@@ -814,15 +1249,27 @@ class DBTable(table.Table):
 		table.Table.unlink(self)
 		self.connection = None
 		self.cursor = None
+		self.id_codec = None
+		self.decode_id = None
 
 	def applyKeyMapping(self):
 		"""
 		Used as the second half of the key reassignment algorithm.
-		Loops over each row in the table, replacing references to
-		old row keys with the new values from the _idmap_ table.
+		Loops over each newly-inserted row in the table, replacing
+		references to old row keys with the new values from the
+		_idmap_ table.  If the rows were inserted with
+		._remapping_append(), only the rows whose references could
+		not be re-mapped at insertion time are updated.
 		"""
-		assignments = ", ".join("%s = (SELECT new FROM _idmap_ WHERE old == %s)" % (colname, colname) for coltype, colname in zip(self.dbcolumntypes, self.dbcolumnnames) if coltype in ligolwtypes.IDTypes and (self.next_id is None or colname != self.next_id.column_name))
-		if assignments:
+		assignments = ", ".join("%s = (SELECT new FROM _idmap_ WHERE old == %s)" % (colname, colname) for colname in self.reference_columns)
+		if self.unmapped_rowids is not None:
+			if assignments and self.unmapped_rowids:
+				idmap_flush(self.connection, self.id_codec)
+				self.cursor.executemany("UPDATE %s SET %s WHERE ROWID == ?" % (self.Name, assignments), ((rowid,) for rowid in self.unmapped_rowids))
+			self.unmapped_rowids = None
+			self.last_maxrowid = self.maxrowid() or 0
+		elif assignments:
+			idmap_flush(self.connection, self.id_codec)
 			# SQLite documentation says ROWID is monotonically
 			# increasing starting at 1 for the first row unless
 			# it ever wraps around, then it is randomly
@@ -834,6 +1281,57 @@ class DBTable(table.Table):
 			self.last_maxrowid = self.maxrowid() or 0
 
 
+class DBTableStream(table.TableStream):
+	"""
+	Stream element for use inside DBTables.  Unless the parent table's
+	.append() method has been customized, the tokens are grouped into
+	rows and inserted into the database in batches without
+	constructing row objects.  Likewise, when the document is written
+	the rows are formatted directly from the tuples retrieved from the
+	database.
+	"""
+	def config(self, parentNode):
+		super(DBTableStream, self).config(parentNode)
+		self._ncolumns = len(parentNode.dbcolumnnames)
+		self._append_values = parentNode._values_appender() if self._ncolumns else None
+		# tokens of an incomplete row
+		self._tokens = []
+		return self
+
+	def appendData(self, content):
+		if self._chunks is not None or self._append_values is None:
+			super(DBTableStream, self).appendData(content)
+			return
+		tokens = self._tokens
+		tokens.extend(self._tokenizer.append(content))
+		# hold back the tokens of the last row if it's incomplete
+		self._tokens = tokens[len(tokens) - len(tokens) % self._ncolumns:]
+		self._append_values(zip(*[iter(tokens)] * self._ncolumns))
+
+	def unlink(self):
+		self._append_values = None
+		self._tokens = None
+		super(DBTableStream, self).unlink()
+
+	def _dump(self, rowdumper):
+		# give the database's tuples to the RowDumper directly
+		# instead of converting them to row objects
+		cursor = self.parentNode._select_values()
+		if cursor is None:
+			super(DBTableStream, self)._dump(rowdumper)
+		else:
+			rowdumper.dump_sequences(cursor)
+
+	def _append_binary(self, n, columns):
+		if self._append_values is None:
+			super(DBTableStream, self)._append_binary(n, columns)
+			return
+		binarytables = self._binary_encoding()
+		rows = itertools.izip(*(binarytables.column_values(*column) for column in columns if column is not None))
+		for block in iter(lambda: list(itertools.islice(rows, self.parentNode.rows_per_insert)), []):
+			self._append_values(block)
+
+
 #
 # =============================================================================
 #
@@ -870,7 +1368,7 @@ class TimeSlideTable(DBTable):
 		Return a ditionary mapping time slide IDs to offset
 		dictionaries.
 		"""
-		return dict((ilwd.ilwdchar(id), offsetvector.offsetvector((instrument, offset) for id, instrument, offset in values)) for id, values in itertools.groupby(self.cursor.execute("SELECT time_slide_id, instrument, offset FROM time_slide ORDER BY time_slide_id"), lambda (id, instrument, offset): id))
+		return dict((self.decode_id(id), offsetvector.offsetvector((instrument, offset) for id, instrument, offset in values)) for id, values in itertools.groupby(self.cursor.execute("SELECT time_slide_id, instrument, offset FROM time_slide ORDER BY time_slide_id"), lambda (id, instrument, offset): id))
 
 	def get_time_slide_id(self, offsetdict, create_new = None, superset_ok = False, nonunique_ok = False):
 		"""
@@ -1035,12 +1533,19 @@ def use_in(ContentHandler):
 	"""
 	ContentHandler = lsctables.use_in(ContentHandler)
 
+	def startStream(self, parent, attrs, __orig_startStream = ContentHandler.startStream):
+		if isinstance(parent, DBTable):
+			parent._end_of_columns()
+			return DBTableStream(attrs).config(parent)
+		return __orig_startStream(self, parent, attrs)
+
 	def startTable(self, parent, attrs):
 		name = table.StripTableName(attrs[u"Name"])
 		if name in TableByName:
 			return TableByName[name](attrs, connection = self.connection)
 		return DBTable(attrs, connection = self.connection)
 
+	ContentHandler.startStream = startStream
 	ContentHandler.startTable = startTable
 
 	return ContentHandler
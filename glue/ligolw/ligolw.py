@@ -36,6 +36,7 @@ constructing a parser.
 import datetime
 import sys
 from xml import sax
+from xml.sax import expatreader
 from xml.sax.xmlreader import AttributesImpl
 from xml.sax.saxutils import escape as xmlescape
 from xml.sax.saxutils import unescape as xmlunescape
@@ -525,6 +526,13 @@ class Stream(Element):
 		if self.Type not in (u"Remote", u"Local"):
 			raise ElementError("invalid Type for Stream: '%s'" % self.Type)
 
+	def appendData(self, content):
+		# ExpatParser delivers the contents of Stream elements as
+		# UTF-8 encoded str objects
+		if isinstance(content, str):
+			content = content.decode("utf-8")
+		super(Stream, self).appendData(content)
+
 	Content = attributeproxy(u"Content")
 	Delimiter = attributeproxy(u"Delimiter", default = u",")
 	Encoding = attributeproxy(u"Encoding")
@@ -914,6 +922,51 @@ class FilteringLIGOLWContentHandler(LIGOLWContentHandler):
 			super(FilteringLIGOLWContentHandler, self).characters(content)
 
 
+#
+# =============================================================================
+#
+#                                   Parser
+#
+# =============================================================================
+#
+
+
+class ExpatParser(expatreader.ExpatParser):
+	"""
+	Version of the standard library's expat-based SAX parser adapted
+	to LIGO Light Weight documents.  Character data is collected into
+	blocks of up to text_buffer_size bytes before being passed to the
+	content handler, rather than being delivered a line or so at a
+	time, and the contents of Stream elements are delivered as UTF-8
+	encoded str objects instead of unicode objects.  The tokenizers
+	used by the Stream elements parse ASCII str objects without
+	decoding them.
+	"""
+	# size of expat's character data buffer
+	text_buffer_size = 1 << 20
+
+	def reset(self):
+		expatreader.ExpatParser.reset(self)
+		self._parser.buffer_text = True
+		self._parser.buffer_size = self.text_buffer_size
+		# .parse() does this, but documents can also be given to
+		# .feed() directly
+		self._cont_handler.setDocumentLocator(expatreader.ExpatLocator(self))
+
+	def start_element_ns(self, name, attrs):
+		expatreader.ExpatParser.start_element_ns(self, name, attrs)
+		if name == Stream.tagName:
+			self._parser.returns_unicode = False
+
+	def end_element_ns(self, name):
+		# the buffered contents of the Stream have been delivered,
+		# but the name of the element is a str
+		if not self._parser.returns_unicode:
+			self._parser.returns_unicode = True
+			name = name.decode("utf-8")
+		expatreader.ExpatParser.end_element_ns(self, name)
+
+
 #
 # =============================================================================
 #
@@ -930,9 +983,9 @@ def make_parser(handler):
 	feature, but enabling validation can require the LIGO LW DTD to be
 	downloaded from the LDAS document server if the DTD is not included
 	inline in the XML.  This requires a working connection to the
-	internet and the server to be up.
+	internet and the server to be up.  The parser is an ExpatParser.
 	"""
-	parser = sax.make_parser()
+	parser = ExpatParser()
 	parser.setContentHandler(handler)
 	parser.setFeature(sax.handler.feature_namespaces, True)
 	parser.setFeature(sax.handler.feature_validation, False)
@@ -46,6 +46,7 @@ columns of the table.
 
 import copy
 import itertools
+import operator
 import re
 import sys
 import warnings
@@ -603,9 +604,30 @@ class TableStream(ligolw.Stream):
 		# simplify computing the intersection
 		interncolumns = [name for name in (parentNode.interncolumns or set()) if name in columnnames]
 		self._rowbuilder = RowBuilder(parentNode.RowType, columnnames, interncolumns)
+		# the character data of a binary encoded stream is
+		# collected here, and decoded when the element ends
+		self._chunks = [] if self._binary_encoding() is not None else None
 		return self
 
+	def _binary_encoding(self):
+		"""
+		Return the glue.ligolw.binarytables module if the stream's
+		Encoding attribute selects the binary encoding, otherwise
+		None.  For internal use only.
+		"""
+		if not self.hasAttribute(u"Encoding"):
+			return None
+		# binarytables imports numpy, and importing numpy can be
+		# slow, so only do it if there is an Encoding attribute
+		from . import binarytables
+		if self.Encoding == binarytables.Encoding:
+			return binarytables
+		return None
+
 	def appendData(self, content):
+		if self._chunks is not None:
+			self._chunks.append(content)
+			return
 		# tokenize buffer, pack into row objects, and append to
 		# table
 		appendfunc = self.parentNode.append
@@ -619,9 +641,35 @@ class TableStream(ligolw.Stream):
 		"""
 		self._tokenizer = None
 		self._rowbuilder = None
+		self._chunks = None
 		super(TableStream, self).unlink()
 
+	def _append_binary(self, n, columns):
+		"""
+		Append the rows of a binary encoded stream to the parent
+		table.  columns is the list returned by
+		glue.ligolw.binarytables.decode_stream().  For internal use
+		only.
+		"""
+		binarytables = self._binary_encoding()
+		columns = [binarytables.column_values(*column) for column in columns if column is not None]
+		appendfunc = self.parentNode.append
+		for row in self._rowbuilder.append(itertools.chain.from_iterable(itertools.izip(*columns))):
+			appendfunc(row)
+
 	def endElement(self):
+		if self._chunks is not None:
+			# decode the columns of a binary encoded stream
+			binarytables = self._binary_encoding()
+			loadcolumns = self.parentNode.loadcolumns
+			n, columns = binarytables.decode_stream("".join(self._chunks), self.Delimiter, self.parentNode.columntypes, None if loadcolumns is None else [name in loadcolumns for name in self.parentNode.columnnames])
+			self._chunks = []
+			self._append_binary(n, columns)
+			# the rows are now in the table, how they are
+			# encoded is decided when the document is written
+			del self.Encoding
+			self.parentNode._end_of_rows()
+			return
 		# stream tokenizer uses delimiter to identify end of each
 		# token, so add a final delimiter to induce the last token
 		# to get parsed but only if there's something other than
@@ -631,7 +679,40 @@ class TableStream(ligolw.Stream):
 		# call parent's _end_of_rows() hook.
 		self.parentNode._end_of_rows()
 
+	# number of rows formatted at a time by .write()
+	rows_per_block = 1024
+
+	def _dump(self, rowdumper):
+		"""
+		Give the rows of the parent table to the RowDumper.  For
+		internal use only.
+		"""
+		rowdumper.dump(self.parentNode)
+
+	def _binary_columns(self):
+		"""
+		Return the columns of the parent table as a list of (values,
+		ID class) tuples for glue.ligolw.binarytables.write_stream().
+		For internal use only.
+		"""
+		names = self.parentNode.columnnames
+		if len(names) < 2:
+			return [(map(operator.attrgetter(name), self.parentNode), None) for name in names]
+		# retrieving the values a block of rows at a time is much
+		# faster than retrieving each column in turn
+		getter = operator.attrgetter(*names)
+		columns = [[] for name in names]
+		rows = iter(self.parentNode)
+		for block in iter(lambda: map(getter, itertools.islice(rows, self.rows_per_block)), []):
+			for column, values in zip(columns, zip(*block)):
+				column.extend(values)
+		return [(column, None) for column in columns]
+
 	def write(self, fileobj = sys.stdout, indent = u""):
+		binarytables = self._binary_encoding()
+		if binarytables is not None:
+			binarytables.write_stream(self, fileobj, indent, len(self.parentNode), self._binary_columns())
+			return
 		# retrieve the .write() method of the file object to avoid
 		# doing the attribute lookup in loops
 		w = fileobj.write
@@ -640,15 +721,14 @@ class TableStream(ligolw.Stream):
 		# unless it ends with a null token
 		w(self.start_tag(indent))
 		rowdumper = tokenizer.RowDumper(self.parentNode.columnnames, [ligolwtypes.FormatFunc[coltype] for coltype in self.parentNode.columntypes], self.Delimiter)
-		rowdumper.dump(self.parentNode)
-		try:
-			line = rowdumper.next()
-		except StopIteration:
-			# table is empty
-			pass
-		else:
-			# write first row
-			newline = u"\n" + indent + ligolw.Indent
+		self._dump(rowdumper)
+		# the rows are converted a block at a time, with the
+		# delimiter and newline between them
+		newline = u"\n" + indent + ligolw.Indent
+		separator = rowdumper.delimiter + newline
+		block = rowdumper.block(self.rows_per_block, separator)
+		if block is not None:
+			# write first block
 			w(newline)
 			# the xmlescape() call replaces things like "<"
 			# with "&lt;" so that the string will not confuse
@@ -656,12 +736,11 @@ class TableStream(ligolw.Stream):
 			# "&lt;" back into "<" during file reading is
 			# handled by the XML parser, so there is no code
 			# in Glue related to that.
-			w(xmlescape(line))
-			# now add delimiter and write the remaining rows
-			newline = rowdumper.delimiter + newline
-			for line in rowdumper:
-				w(newline)
-				w(xmlescape(line))
+			w(xmlescape(block))
+			# now add delimiter and write the remaining blocks
+			for block in iter(lambda: rowdumper.block(self.rows_per_block, separator), None):
+				w(separator)
+				w(xmlescape(block))
 			if rowdumper.tokens and rowdumper.tokens[-1] == u"":
 				# the last token of the last row was null:
 				# add a final delimiter to indicate that a
@@ -687,6 +766,79 @@ class TableRow(object):
 	pass
 
 
+class SlottedTableRow(TableRow):
+	"""
+	Parent class of the row classes constructed by slotted_row_type().
+	Provides pickling support, which objects with __slots__ otherwise
+	lack.
+	"""
+	__slots__ = ()
+
+	def __reduce__(self):
+		state = dict((name, getattr(self, name)) for name in self.__slots__ if hasattr(self, name))
+		state.update(self.__dict__)
+		return _new_slotted_row, (self.__slots__,), state
+
+	def __setstate__(self, state):
+		for name, value in state.items():
+			setattr(self, name, value)
+
+
+def _new_slotted_row(columnnames):
+	return slotted_row_type(columnnames)()
+
+
+#
+# Cache of row classes constructed by slotted_row_type()
+#
+
+
+_slotted_row_types = {}
+
+
+#
+# Row attribute names must be identifiers to be used as __slots__
+#
+
+
+IdentifierPattern = re.compile(r"\A[A-Za-z_]\w*\Z")
+
+
+def slotted_row_type(columnnames):
+	"""
+	Return a sub-class of TableRow whose instances store the attributes
+	named in the sequence columnnames in __slots__ instead of in an
+	instance dictionary, which takes several times the memory.
+	Other attributes can still be set, an instance dictionary is
+	created for them when the first is.  The classes are cached, so
+	the same class is returned for the same column names.  Table
+	instances whose class uses TableRow as its RowType use these
+	classes for their rows.
+
+	Example:
+
+	>>> RowType = slotted_row_type(("ifo", "snr"))
+	>>> RowType.__slots__
+	('ifo', 'snr')
+	>>> RowType is slotted_row_type(["ifo", "snr"])
+	True
+	>>> row = RowType()
+	>>> row.ifo, row.snr = u"H1", 8.0
+	>>> row.__dict__
+	{}
+	>>> import pickle
+	>>> row = pickle.loads(pickle.dumps(row))
+	>>> row.ifo, row.snr
+	(u'H1', 8.0)
+	"""
+	columnnames = tuple(columnnames)
+	try:
+		return _slotted_row_types[columnnames]
+	except KeyError:
+		cls = _slotted_row_types[columnnames] = type("SlottedTableRow", (SlottedTableRow,), {"__slots__": columnnames})
+		return cls
+
+
 class Table(ligolw.Table, list):
 	"""
 	High-level Table element that knows about its columns and rows.
@@ -871,6 +1023,96 @@ class Table(ligolw.Table, list):
 		return row
 
 
+	#
+	# GPS time access
+	#
+
+	def get_gps_array(self, name, dtype = "int64"):
+		"""
+		Construct a numpy array of the GPS times stored in the
+		pair of integer columns name and name + "_ns", e.g.
+		"end_time" and "end_time_ns".  If dtype is "int64" (the
+		default) the times are returned as integer counts of
+		nanoseconds, equal to LIGOTimeGPS.ns();  if dtype is
+		"float64" they are returned in seconds, equal to
+		float(LIGOTimeGPS).  The array is built directly from the
+		two columns, no LIGOTimeGPS objects are constructed.  Note
+		that this creates a copy of the data, so modifications made
+		to the array will *not* be recorded in the original
+		document.  See also .set_gps_array().
+
+		Example:
+
+		>>> import lsctables
+		>>> tbl = lsctables.New(lsctables.SnglInspiralTable, ["end_time", "end_time_ns"])
+		>>> for s, ns in ((100, 500000000), (-2, 800000000)):
+		...	row = tbl.appendRow()
+		...	row.end_time, row.end_time_ns = s, ns
+		...
+		>>> tbl.get_gps_array("end_time").tolist()
+		[100500000000, -1200000000]
+		>>> tbl.get_gps_array("end_time", dtype = "float64").tolist()
+		[100.5, -1.2]
+		"""
+		# see Column.asarray() for why the import is here
+		import numpy
+		if name.endswith("_ns"):
+			name = name[:-3]
+		n = len(self)
+		seconds = numpy.fromiter(itertools.imap(operator.attrgetter(name), self), dtype = "int64", count = n)
+		nanoseconds = numpy.fromiter(itertools.imap(operator.attrgetter("%s_ns" % name), self), dtype = "int64", count = n)
+		if numpy.dtype(dtype) == numpy.int64:
+			return seconds * 1000000000 + nanoseconds
+		elif numpy.dtype(dtype) == numpy.float64:
+			return seconds + nanoseconds * 1e-9
+		raise ValueError("dtype must be int64 or float64, not %s" % str(dtype))
+
+	def set_gps_array(self, name, times):
+		"""
+		The inverse of .get_gps_array():  store the GPS times in
+		the sequence times into the pair of integer columns name
+		and name + "_ns" of the rows of this table, in order.
+		times must have exactly one entry for each row.  An
+		integer array is interpreted as counts of nanoseconds, a
+		floating-point array as seconds, and anything else (e.g.
+		a list of LIGOTimeGPS objects) is converted to integer
+		nanoseconds one entry at a time.  Float times are split
+		into seconds and nanoseconds the same way the LIGOTimeGPS
+		constructor splits them.
+
+		Example:
+
+		>>> import lsctables
+		>>> tbl = lsctables.New(lsctables.SnglInspiralTable, ["end_time", "end_time_ns"])
+		>>> for i in range(2):
+		...	row = tbl.appendRow()
+		...
+		>>> tbl.set_gps_array("end_time", [100.5, -1.2])
+		>>> [(row.end_time, row.end_time_ns) for row in tbl]
+		[(100, 500000000), (-2, 800000000)]
+		"""
+		# see Column.asarray() for why the import is here
+		import numpy
+		if name.endswith("_ns"):
+			name = name[:-3]
+		times = numpy.asarray(times)
+		if len(times) != len(self):
+			raise ValueError("need %d times, got %d" % (len(self), len(times)))
+		if times.dtype.kind in "iu":
+			seconds, nanoseconds = numpy.divmod(times.astype("int64"), 1000000000)
+		elif times.dtype.kind == "f":
+			# the same arithmetic as LIGOTimeGPS(float)
+			fraction, seconds = numpy.modf(times.astype("float64"))
+			carry, nanoseconds = numpy.divmod(fraction * 1e9, 1e9)
+			seconds = seconds.astype("int64") + carry.astype("int64")
+			nanoseconds = nanoseconds.astype("int64")
+		else:
+			return self.set_gps_array(name, numpy.fromiter((t.ns() for t in times), dtype = "int64", count = len(times)))
+		for row, s, ns in itertools.izip(self, seconds.tolist(), nanoseconds.tolist()):
+			setattr(row, name, s)
+			setattr(row, "%s_ns" % name, ns)
+
+
 	#
 	# Element methods
 	#
@@ -898,6 +1140,13 @@ class Table(ligolw.Table, list):
 				self.columnpytypes.append(ligolwtypes.ToPyType[child.Type])
 			except KeyError:
 				raise ligolw.ElementError("unrecognized Type '%s' for Column '%s' in Table '%s'" % (child.Type, child.getAttribute("Name"), self.getAttribute("Name")))
+		# tables that use the generic row class get one that stores
+		# the columns in __slots__
+		if type(self).RowType is TableRow:
+			if all(IdentifierPattern.match(name) and not name.startswith("__") for name in self.columnnames):
+				self.RowType = slotted_row_type(self.columnnames)
+			else:
+				self.RowType = TableRow
 
 	def _verifyChildren(self, i):
 		"""
@@ -28,7 +28,10 @@
 
 #include <Python.h>
 #include <structmember.h>
+#include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
+#include <ilwd.h>
 #include <tokenizer.h>
 
 /* Gain access to 64-bit addressing where possible
@@ -39,6 +42,435 @@ typedef int Py_ssize_t;
 #define PY_SSIZE_T_MIN INT_MIN
 #endif
 
+/*
+ * ============================================================================
+ *
+ *                             Native Formatting
+ *
+ * ============================================================================
+ */
+
+
+/*
+ * The format functions in glue.ligolw.types.FormatFunc are recognized and
+ * their work done here, without calling them, when the values are of the
+ * types they are normally used with.  Anything else is passed to the
+ * format function.
+ */
+
+
+enum format_kind {
+	/* call the format function */
+	FORMAT_CALL,
+	/* u"%d".__mod__ or u"%u".__mod__ */
+	FORMAT_INT,
+	/* u"%.<precision>g".__mod__ */
+	FORMAT_FLOAT,
+	/* u"\"%s\"".__mod__, used for ilwd:char */
+	FORMAT_ILWD,
+	/* glue.ligolw.types.string_format_func */
+	FORMAT_STRING
+};
+
+
+/*
+ * glue.ligolw._ilwd.ilwdchar and glue.ligolw.types.string_format_func,
+ * imported when the first RowDumper is created.
+ */
+
+
+static PyTypeObject *ilwdchar_type = NULL;
+static PyObject *string_format_func = NULL;
+
+
+static int import_format_types(void)
+{
+	PyObject *module;
+
+	if(ilwdchar_type && string_format_func)
+		return 0;
+
+	module = PyImport_ImportModule("glue.ligolw._ilwd");
+	if(!module)
+		return -1;
+	Py_XDECREF(ilwdchar_type);
+	ilwdchar_type = (PyTypeObject *) PyObject_GetAttrString(module, "ilwdchar");
+	Py_DECREF(module);
+	if(!ilwdchar_type)
+		return -1;
+
+	module = PyImport_ImportModule("glue.ligolw.types");
+	if(!module)
+		return -1;
+	Py_XDECREF(string_format_func);
+	string_format_func = PyObject_GetAttrString(module, "string_format_func");
+	Py_DECREF(module);
+	if(!string_format_func)
+		return -1;
+
+	return 0;
+}
+
+
+/*
+ * Per-column formatting information, and the column's values when the
+ * rows are being taken from columns.
+ */
+
+
+struct column {
+	enum format_kind kind;
+	/* digits of precision for FORMAT_FLOAT */
+	int precision;
+	/* the ilwd:char class last seen in the column, and the
+	 * "table:column:" prefix of its str(), or NULL if its str() is not
+	 * ilwdchar's */
+	PyTypeObject *ilwd_type;
+	PyObject *ilwd_prefix;
+	/* sequence of values, or NULL if they're in view */
+	PyObject *values;
+	/* buffer of numbers, and its kind ('i', 'u' or 'f') */
+	Py_buffer view;
+	char view_kind;
+	/* class of the IDs whose integer parts are in view, or NULL */
+	PyObject *idclass;
+};
+
+
+/*
+ * Identify the format function's kind.
+ */
+
+
+static enum format_kind format_kind(PyObject *func, int *precision)
+{
+	enum format_kind kind = FORMAT_CALL;
+	PyObject *name, *self, *fmt = NULL;
+
+	if(func == string_format_func)
+		return FORMAT_STRING;
+
+	/*
+	 * a format string's .__mod__() method?
+	 */
+
+	name = PyObject_GetAttrString(func, "__name__");
+	self = PyObject_GetAttrString(func, "__self__");
+	if(!name || !self)
+		PyErr_Clear();
+	else if(PyString_Check(name) && !strcmp(PyString_AS_STRING(name), "__mod__")) {
+		if(PyUnicode_Check(self)) {
+			fmt = PyUnicode_AsASCIIString(self);
+			if(!fmt)
+				PyErr_Clear();
+		} else if(PyString_Check(self)) {
+			Py_INCREF(self);
+			fmt = self;
+		}
+	}
+
+	if(fmt) {
+		const char *s = PyString_AS_STRING(fmt);
+		if(!strcmp(s, "%d") || !strcmp(s, "%u"))
+			kind = FORMAT_INT;
+		else if(!strcmp(s, "\"%s\""))
+			kind = FORMAT_ILWD;
+		else if(!strncmp(s, "%.", 2) && '0' <= s[2] && s[2] <= '9') {
+			char *end;
+			long p = strtol(s + 2, &end, 10);
+			if(!strcmp(end, "g") && p <= 99) {
+				kind = FORMAT_FLOAT;
+				*precision = p;
+			}
+		}
+	}
+
+	Py_XDECREF(name);
+	Py_XDECREF(self);
+	Py_XDECREF(fmt);
+	return kind;
+}
+
+
+/*
+ * Growable output buffer.
+ */
+
+
+struct output {
+	Py_UNICODE *buffer;
+	Py_ssize_t length;
+	Py_ssize_t allocation;
+};
+
+
+static int reserve(struct output *output, Py_ssize_t n)
+{
+	if(output->length + n > output->allocation) {
+		Py_ssize_t allocation = output->allocation * 2;
+		Py_UNICODE *buffer;
+
+		if(allocation < output->length + n)
+			allocation = output->length + n;
+		buffer = PyMem_Realloc(output->buffer, allocation * sizeof(*buffer));
+		if(!buffer) {
+			PyErr_NoMemory();
+			return -1;
+		}
+		output->buffer = buffer;
+		output->allocation = allocation;
+	}
+	return 0;
+}
+
+
+static int append_unicode(struct output *output, const Py_UNICODE *s, Py_ssize_t n)
+{
+	if(reserve(output, n) < 0)
+		return -1;
+	memcpy(output->buffer + output->length, s, n * sizeof(*s));
+	output->length += n;
+	return 0;
+}
+
+
+static int append_ascii(struct output *output, const char *s, Py_ssize_t n)
+{
+	Py_UNICODE *dst;
+
+	if(reserve(output, n) < 0)
+		return -1;
+	for(dst = output->buffer + output->length, output->length += n; n--; )
+		*dst++ = (unsigned char) *s++;
+	return 0;
+}
+
+
+static int append_long(struct output *output, PY_LONG_LONG x)
+{
+	char buf[32];
+	return append_ascii(output, buf, sprintf(buf, "%lld", x));
+}
+
+
+static int append_unsigned_long(struct output *output, unsigned PY_LONG_LONG x)
+{
+	char buf[32];
+	return append_ascii(output, buf, sprintf(buf, "%llu", x));
+}
+
+
+/* the same as u"%.<precision>g" % x */
+static int append_double(struct output *output, double x, int precision)
+{
+	char *s = PyOS_double_to_string(x, 'g', precision, 0, NULL);
+	int result;
+
+	if(!s)
+		return -1;
+	result = append_ascii(output, s, strlen(s));
+	PyMem_Free(s);
+	return result;
+}
+
+
+/* the same as u"\"%s\"" % ilwd, where prefix is "table:column:" */
+static int append_ilwd(struct output *output, PyObject *prefix, long i)
+{
+	char buf[32];
+
+	if(append_ascii(output, "\"", 1) < 0 || append_ascii(output, PyString_AS_STRING(prefix), PyString_GET_SIZE(prefix)) < 0 || append_ascii(output, buf, sprintf(buf, "%ld\"", i)) < 0)
+		return -1;
+	return 0;
+}
+
+
+/* the same as string_format_func(s) */
+static int append_string(struct output *output, PyObject *s)
+{
+	const Py_UNICODE *src = PyUnicode_AS_UNICODE(s);
+	const Py_UNICODE *end = src + PyUnicode_GET_SIZE(s);
+	Py_UNICODE *dst;
+
+	/* worst case every character is escaped, plus the quotes */
+	if(reserve(output, 2 * PyUnicode_GET_SIZE(s) + 2) < 0)
+		return -1;
+	dst = output->buffer + output->length;
+	*dst++ = '"';
+	for(; src < end; src++) {
+		if(*src == '\\' || *src == '"')
+			*dst++ = '\\';
+		*dst++ = *src;
+	}
+	*dst++ = '"';
+	output->length = dst - output->buffer;
+	return 0;
+}
+
+
+static int append_call(struct output *output, PyObject *func, PyObject *val)
+{
+	PyObject *token = PyObject_CallFunctionObjArgs(func, val, NULL);
+	PyObject *u;
+	int result;
+
+	if(!token)
+		return -1;
+	u = PyUnicode_FromObject(token);
+	Py_DECREF(token);
+	if(!u)
+		return -1;
+	result = append_unicode(output, PyUnicode_AS_UNICODE(u), PyUnicode_GET_SIZE(u));
+	Py_DECREF(u);
+	return result;
+}
+
+
+/*
+ * Borrowed reference to the "table:column:" prefix of the str() of
+ * instances of the ilwd:char class type, or NULL if their str() is not
+ * ilwdchar's.
+ */
+
+
+static PyObject *ilwd_prefix(struct column *column, PyTypeObject *type)
+{
+	if(type != column->ilwd_type) {
+		PyObject *prefix = NULL;
+
+		if(PyType_IsSubtype(type, ilwdchar_type) && type->tp_str == ilwdchar_type->tp_str && !PyObject_HasAttrString((PyObject *) type, "__unicode__")) {
+			PyObject *tbl = PyObject_GetAttrString((PyObject *) type, "table_name");
+			PyObject *col = PyObject_GetAttrString((PyObject *) type, "column_name");
+			if(tbl && col && PyString_Check(tbl) && PyString_Check(col))
+				prefix = PyString_FromFormat("%s:%s:", PyString_AS_STRING(tbl), PyString_AS_STRING(col));
+			/* leave errors for the format function to report */
+			PyErr_Clear();
+			Py_XDECREF(tbl);
+			Py_XDECREF(col);
+		}
+
+		Py_XDECREF(column->ilwd_type);
+		Py_XDECREF(column->ilwd_prefix);
+		Py_INCREF(type);
+		column->ilwd_type = type;
+		column->ilwd_prefix = prefix;
+	}
+	return column->ilwd_prefix;
+}
+
+
+/*
+ * Append the token for the Python object val.
+ */
+
+
+static int format_value(struct output *output, struct column *column, PyObject *func, PyObject *val)
+{
+	if(val == Py_None)
+		/* u"" */
+		return 0;
+
+	switch(column->kind) {
+	case FORMAT_INT:
+		if(PyInt_CheckExact(val))
+			return append_long(output, PyInt_AS_LONG(val));
+		break;
+
+	case FORMAT_FLOAT:
+		if(PyFloat_CheckExact(val))
+			return append_double(output, PyFloat_AS_DOUBLE(val), column->precision);
+		break;
+
+	case FORMAT_ILWD:
+		if(PyObject_TypeCheck(val, ilwdchar_type)) {
+			PyObject *prefix = ilwd_prefix(column, val->ob_type);
+			if(prefix)
+				return append_ilwd(output, prefix, ((ligolw_ilwdchar *) val)->i);
+		} else if(PyUnicode_CheckExact(val)) {
+			/* an ID already in its string form, as retrieved
+			 * from a database */
+			if(append_ascii(output, "\"", 1) < 0 || append_unicode(output, PyUnicode_AS_UNICODE(val), PyUnicode_GET_SIZE(val)) < 0 || append_ascii(output, "\"", 1) < 0)
+				return -1;
+			return 0;
+		}
+		break;
+
+	case FORMAT_STRING:
+		if(PyUnicode_CheckExact(val))
+			return append_string(output, val);
+		break;
+
+	default:
+		break;
+	}
+
+	return append_call(output, func, val);
+}
+
+
+/*
+ * Append the token for element i of the column's buffer.
+ */
+
+
+static int format_element(struct output *output, struct column *column, PyObject *func, Py_ssize_t i)
+{
+	const char *p = (const char *) column->view.buf + i * column->view.itemsize;
+	PY_LONG_LONG x = 0;
+	unsigned PY_LONG_LONG ux = 0;
+	double dx = 0;
+	PyObject *val;
+	int result;
+
+	switch(column->view_kind) {
+	case 'i':
+		switch(column->view.itemsize) {
+		case 1: x = *(const signed char *) p; break;
+		case 2: x = *(const short *) p; break;
+		case 4: x = *(const int *) p; break;
+		default: x = *(const PY_LONG_LONG *) p; break;
+		}
+		if(column->idclass) {
+			if(column->kind == FORMAT_ILWD) {
+				PyObject *prefix = ilwd_prefix(column, (PyTypeObject *) column->idclass);
+				if(prefix)
+					return append_ilwd(output, prefix, x);
+			}
+			val = PyObject_CallFunction(column->idclass, "L", x);
+		} else if(column->kind == FORMAT_INT)
+			return append_long(output, x);
+		else
+			val = PyLong_FromLongLong(x);
+		break;
+
+	case 'u':
+		switch(column->view.itemsize) {
+		case 1: ux = *(const unsigned char *) p; break;
+		case 2: ux = *(const unsigned short *) p; break;
+		case 4: ux = *(const unsigned int *) p; break;
+		default: ux = *(const unsigned PY_LONG_LONG *) p; break;
+		}
+		if(column->kind == FORMAT_INT)
+			return append_unsigned_long(output, ux);
+		val = PyLong_FromUnsignedLongLong(ux);
+		break;
+
+	default:
+		dx = column->view.itemsize == 4 ? *(const float *) p : *(const double *) p;
+		if(column->kind == FORMAT_FLOAT)
+			return append_double(output, dx, column->precision);
+		val = PyFloat_FromDouble(dx);
+		break;
+	}
+
+	if(!val)
+		return -1;
+	result = format_value(output, column, func, val);
+	Py_DECREF(val);
+	return result;
+}
+
+
 /*
  * ============================================================================
  *
@@ -63,13 +495,168 @@ typedef struct {
 	PyObject *formats;
 	/* the source of row objects to be turned to unicode strings */
 	PyObject *iter;
+	/* non-zero if the rows from iter are sequences of values in
+	 * attribute order instead of objects with attributes */
+	int sequences;
 	/* number of rows converted so far */
 	Py_ssize_t rows_converted;
 	/* tuple of unicode tokens from most recently converted row */
 	PyObject *tokens;
+	/* formatting information and values of the columns */
+	struct column *columns;
+	/* number of rows in the columns, or -1 if the rows are being
+	 * taken from iter */
+	Py_ssize_t nrows;
+	/* index of the next row to take from the columns */
+	Py_ssize_t row;
+	/* the text of the rows being converted */
+	struct output output;
+	/* start and end offsets in output of the tokens of the most
+	 * recently converted row */
+	Py_ssize_t *bounds;
 } ligolw_RowDumper;
 
 
+/*
+ * Release the columns' values.
+ */
+
+
+static void release_columns(ligolw_RowDumper *rowdumper)
+{
+	Py_ssize_t i;
+
+	for(i = 0; i < PyTuple_GET_SIZE(rowdumper->attributes); i++) {
+		struct column *column = &rowdumper->columns[i];
+		Py_CLEAR(column->values);
+		if(column->view_kind) {
+			PyBuffer_Release(&column->view);
+			column->view_kind = 0;
+		}
+		Py_CLEAR(column->idclass);
+	}
+	rowdumper->nrows = -1;
+}
+
+
+/*
+ * Format the next row into the output buffer, recording the bounds of its
+ * tokens.  Returns 1 if a row was formatted, 0 if there are no more rows,
+ * and -1 on error.
+ */
+
+
+static int format_row(ligolw_RowDumper *rowdumper)
+{
+	const Py_ssize_t n = PyTuple_GET_SIZE(rowdumper->attributes);
+	const Py_UNICODE *delimiter = PyUnicode_AS_UNICODE(rowdumper->delimiter);
+	const Py_ssize_t delimiter_length = PyUnicode_GET_SIZE(rowdumper->delimiter);
+	struct output *output = &rowdumper->output;
+	PyObject *row = NULL;
+	Py_ssize_t i;
+
+	if(rowdumper->nrows >= 0) {
+		if(rowdumper->row >= rowdumper->nrows) {
+			release_columns(rowdumper);
+			return 0;
+		}
+	} else {
+		if(rowdumper->iter == Py_None)
+			return 0;
+		if(!PyIter_Check(rowdumper->iter)) {
+			PyErr_SetObject(PyExc_TypeError, rowdumper->iter);
+			return -1;
+		}
+		row = PyIter_Next(rowdumper->iter);
+		if(!row) {
+			if(PyErr_Occurred())
+				return -1;
+			Py_DECREF(rowdumper->iter);
+			rowdumper->iter = Py_None;
+			Py_INCREF(rowdumper->iter);
+			return 0;
+		}
+		if(rowdumper->sequences) {
+			PyObject *seq = PySequence_Fast(row, "rows must be sequences");
+			Py_DECREF(row);
+			row = seq;
+			if(!row)
+				return -1;
+			if(PySequence_Fast_GET_SIZE(row) != n) {
+				PyErr_SetString(PyExc_ValueError, "len(row) != len(attributes)");
+				goto error;
+			}
+		}
+	}
+
+	for(i = 0; i < n; i++) {
+		struct column *column = &rowdumper->columns[i];
+		PyObject *func = PyTuple_GET_ITEM(rowdumper->formats, i);
+		int result;
+
+		if(i && append_unicode(output, delimiter, delimiter_length) < 0)
+			goto error;
+		rowdumper->bounds[2 * i] = output->length;
+
+		if(row && rowdumper->sequences)
+			result = format_value(output, column, func, PySequence_Fast_GET_ITEM(row, i));
+		else if(row) {
+			PyObject *val = PyObject_GetAttr(row, PyTuple_GET_ITEM(rowdumper->attributes, i));
+			if(!val)
+				goto error;
+			result = format_value(output, column, func, val);
+			Py_DECREF(val);
+		} else if(column->values)
+			result = format_value(output, column, func, PySequence_Fast_GET_ITEM(column->values, rowdumper->row));
+		else
+			result = format_element(output, column, func, rowdumper->row);
+		if(result < 0)
+			goto error;
+
+		rowdumper->bounds[2 * i + 1] = output->length;
+	}
+
+	Py_XDECREF(row);
+	rowdumper->row++;
+	rowdumper->rows_converted++;
+	return 1;
+
+error:
+	Py_XDECREF(row);
+	return -1;
+}
+
+
+/*
+ * Replace the tokens tuple with the tokens of the most recently converted
+ * row.
+ */
+
+
+static int set_tokens(ligolw_RowDumper *rowdumper)
+{
+	const Py_ssize_t n = PyTuple_GET_SIZE(rowdumper->attributes);
+	PyObject *tokens = PyTuple_New(n);
+	Py_ssize_t i;
+
+	if(!tokens)
+		return -1;
+	for(i = 0; i < n; i++) {
+		Py_ssize_t start = rowdumper->bounds[2 * i];
+		PyObject *token = PyUnicode_FromUnicode(rowdumper->output.buffer + start, rowdumper->bounds[2 * i + 1] - start);
+		if(!token) {
+			Py_DECREF(tokens);
+			return -1;
+		}
+		PyTuple_SET_ITEM(tokens, i, token);
+	}
+
+	Py_DECREF(rowdumper->tokens);
+	rowdumper->tokens = tokens;
+	return 0;
+}
+
+
 /*
  * __del__() method
  */
@@ -78,6 +665,18 @@ typedef struct {
 static void __del__(PyObject *self)
 {
 	ligolw_RowDumper *rowdumper = (ligolw_RowDumper *) self;
+	Py_ssize_t i;
+
+	if(rowdumper->columns) {
+		release_columns(rowdumper);
+		for(i = 0; i < PyTuple_GET_SIZE(rowdumper->attributes); i++) {
+			Py_XDECREF(rowdumper->columns[i].ilwd_type);
+			Py_XDECREF(rowdumper->columns[i].ilwd_prefix);
+		}
+		PyMem_Free(rowdumper->columns);
+	}
+	PyMem_Free(rowdumper->output.buffer);
+	PyMem_Free(rowdumper->bounds);
 
 	Py_XDECREF(rowdumper->delimiter);
 	Py_XDECREF(rowdumper->attributes);
@@ -98,6 +697,7 @@ static int __init__(PyObject *self, PyObject *args, PyObject *kwds)
 {
 	ligolw_RowDumper *rowdumper = (ligolw_RowDumper *) self;
 	Py_UNICODE default_delimiter = ',';
+	Py_ssize_t i, n;
 
 	rowdumper->delimiter = NULL;
 	if(!PyArg_ParseTuple(args, "OO|U", &rowdumper->attributes, &rowdumper->formats, &rowdumper->delimiter))
@@ -119,6 +719,22 @@ static int __init__(PyObject *self, PyObject *args, PyObject *kwds)
 		return -1;
 	}
 
+	if(import_format_types() < 0)
+		return -1;
+
+	n = PyTuple_GET_SIZE(rowdumper->attributes);
+	rowdumper->nrows = -1;
+	rowdumper->columns = PyMem_Malloc((n ? n : 1) * sizeof(*rowdumper->columns));
+	if(rowdumper->columns)
+		memset(rowdumper->columns, 0, n * sizeof(*rowdumper->columns));
+	rowdumper->bounds = PyMem_Malloc((n ? 2 * n : 1) * sizeof(*rowdumper->bounds));
+	if(!rowdumper->columns || !rowdumper->bounds) {
+		PyErr_NoMemory();
+		return -1;
+	}
+	for(i = 0; i < n; i++)
+		rowdumper->columns[i].kind = format_kind(PyTuple_GET_ITEM(rowdumper->formats, i), &rowdumper->columns[i].precision);
+
 	rowdumper->rows_converted = 0;
 	rowdumper->iter = Py_None;
 	Py_INCREF(rowdumper->iter);
@@ -130,11 +746,11 @@ static int __init__(PyObject *self, PyObject *args, PyObject *kwds)
 
 
 /*
- * dump() method
+ * Set the iterable from which rows are retrieved.
  */
 
 
-static PyObject *dump(PyObject *self, PyObject *iterable)
+static PyObject *set_iter(PyObject *self, PyObject *iterable, int sequences)
 {
 	ligolw_RowDumper *rowdumper = (ligolw_RowDumper *) self;
 	PyObject *iter = PyObject_GetIter(iterable);
@@ -142,8 +758,10 @@ static PyObject *dump(PyObject *self, PyObject *iterable)
 	if(!iter)
 		return NULL;
 
+	release_columns(rowdumper);
 	Py_DECREF(rowdumper->iter);
 	rowdumper->iter = iter;
+	rowdumper->sequences = sequences;
 
 	Py_INCREF(self);
 	return self;
@@ -151,90 +769,206 @@ static PyObject *dump(PyObject *self, PyObject *iterable)
 
 
 /*
- * __iter__() method
+ * dump() method
  */
 
 
-static PyObject *__iter__(PyObject *self)
+static PyObject *dump(PyObject *self, PyObject *iterable)
 {
-	Py_INCREF(self);
-	return self;
+	return set_iter(self, iterable, 0);
 }
 
 
 /*
- * next() method
+ * dump_sequences() method
  */
 
 
-static PyObject *next(PyObject *self)
+static PyObject *dump_sequences(PyObject *self, PyObject *iterable)
+{
+	return set_iter(self, iterable, 1);
+}
+
+
+/*
+ * dump_columns() method
+ */
+
+
+static PyObject *dump_columns(PyObject *self, PyObject *args, PyObject *kwds)
 {
 	ligolw_RowDumper *rowdumper = (ligolw_RowDumper *) self;
+	static char *kwlist[] = {"columns", "idclasses", NULL};
 	const Py_ssize_t n = PyTuple_GET_SIZE(rowdumper->attributes);
-	PyObject *row;
-	PyObject *result;
+	PyObject *columns, *idclasses = Py_None;
+	Py_ssize_t nrows = 0;
 	Py_ssize_t i;
 
-	if(!PyIter_Check(rowdumper->iter)) {
-		PyErr_SetObject(PyExc_TypeError, rowdumper->iter);
+	if(!PyArg_ParseTupleAndKeywords(args, kwds, "O|O:dump_columns", kwlist, &columns, &idclasses))
+		return NULL;
+	columns = PySequence_Tuple(columns);
+	if(!columns)
 		return NULL;
+	if(idclasses != Py_None) {
+		idclasses = PySequence_Tuple(idclasses);
+		if(!idclasses) {
+			Py_DECREF(columns);
+			return NULL;
+		}
+	} else
+		Py_INCREF(idclasses);
+	if(PyTuple_GET_SIZE(columns) != n || (idclasses != Py_None && PyTuple_GET_SIZE(idclasses) != n)) {
+		PyErr_SetString(PyExc_ValueError, "len(columns) != len(attributes)");
+		goto error;
 	}
-	row = PyIter_Next(rowdumper->iter);
-	if(!row) {
-		if(!PyErr_Occurred()) {
-			Py_DECREF(rowdumper->iter);
-			rowdumper->iter = Py_None;
-			Py_INCREF(rowdumper->iter);
-			PyErr_SetNone(PyExc_StopIteration);
+
+	release_columns(rowdumper);
+	Py_DECREF(rowdumper->iter);
+	rowdumper->iter = Py_None;
+	Py_INCREF(rowdumper->iter);
+
+	for(i = 0; i < n; i++) {
+		struct column *column = &rowdumper->columns[i];
+		PyObject *values = PyTuple_GET_ITEM(columns, i);
+		PyObject *idclass = idclasses != Py_None ? PyTuple_GET_ITEM(idclasses, i) : Py_None;
+		Py_ssize_t length = 0;
+
+		/*
+		 * numbers in a buffer, or a sequence of objects?
+		 */
+
+		if(PyObject_CheckBuffer(values) && !PyObject_GetBuffer(values, &column->view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT)) {
+			const char *format = column->view.format;
+			if(*format == '@' || *format == '=')
+				format++;
+			if(column->view.ndim == 1 && format[0] && !format[1]) {
+				if(strchr("bhilq", format[0]))
+					column->view_kind = 'i';
+				else if(strchr("BHILQ", format[0]))
+					column->view_kind = 'u';
+				else if(strchr("fd", format[0]))
+					column->view_kind = 'f';
+			}
+			if(!column->view_kind)
+				PyBuffer_Release(&column->view);
+			else
+				length = column->view.shape[0];
+		} else
+			PyErr_Clear();
+		if(!column->view_kind) {
+			column->values = PySequence_Fast(values, "columns must be sequences");
+			if(!column->values)
+				goto error;
+			length = PySequence_Fast_GET_SIZE(column->values);
 		}
-		return NULL;
+
+		if(idclass != Py_None) {
+			if(column->view_kind != 'i' || !PyType_Check(idclass)) {
+				PyErr_SetString(PyExc_TypeError, "columns of IDs must be buffers of signed integers, and their ID classes must be types");
+				goto error;
+			}
+			Py_INCREF(idclass);
+		} else
+			idclass = NULL;
+		column->idclass = idclass;
+
+		if(i && length != nrows) {
+			PyErr_SetString(PyExc_ValueError, "columns have different lengths");
+			goto error;
+		}
+		nrows = length;
 	}
+	rowdumper->nrows = nrows;
+	rowdumper->row = 0;
 
-	Py_DECREF(rowdumper->tokens);
-	rowdumper->tokens = PyTuple_New(n);
-	if(!rowdumper->tokens) {
-		rowdumper->tokens = Py_None;
-		Py_INCREF(rowdumper->tokens);
-		Py_DECREF(row);
+	Py_DECREF(columns);
+	Py_DECREF(idclasses);
+	Py_INCREF(self);
+	return self;
+
+error:
+	release_columns(rowdumper);
+	Py_DECREF(columns);
+	Py_DECREF(idclasses);
+	return NULL;
+}
+
+
+/*
+ * block() method
+ */
+
+
+static PyObject *block(PyObject *self, PyObject *args)
+{
+	ligolw_RowDumper *rowdumper = (ligolw_RowDumper *) self;
+	PyObject *separator;
+	Py_ssize_t n, i;
+
+	if(!PyArg_ParseTuple(args, "nU:block", &n, &separator))
+		return NULL;
+	if(n < 1) {
+		PyErr_SetString(PyExc_ValueError, "n must be >= 1");
 		return NULL;
 	}
 
+	rowdumper->output.length = 0;
 	for(i = 0; i < n; i++) {
-		PyObject *val = PyObject_GetAttr(row, PyTuple_GET_ITEM(rowdumper->attributes, i));
-		PyObject *token;
+		Py_ssize_t length = rowdumper->output.length;
+		int result;
 
-		if(!val) {
-			Py_DECREF(rowdumper->tokens);
-			rowdumper->tokens = Py_None;
-			Py_INCREF(rowdumper->tokens);
-			Py_DECREF(row);
+		if(i && append_unicode(&rowdumper->output, PyUnicode_AS_UNICODE(separator), PyUnicode_GET_SIZE(separator)) < 0)
+			return NULL;
+		result = format_row(rowdumper);
+		if(result < 0)
 			return NULL;
+		if(!result) {
+			/* remove the separator */
+			rowdumper->output.length = length;
+			break;
 		}
+	}
 
-		if(val == Py_None)
-			token = PyUnicode_FromUnicode(NULL, 0); /* u"" */
-		else
-			token = PyObject_CallFunctionObjArgs(PyTuple_GET_ITEM(rowdumper->formats, i), val, NULL);
-		Py_DECREF(val);
+	if(!i)
+		Py_RETURN_NONE;
+	if(set_tokens(rowdumper) < 0)
+		return NULL;
+	return PyUnicode_FromUnicode(rowdumper->output.buffer, rowdumper->output.length);
+}
 
-		if(!token) {
-			Py_DECREF(rowdumper->tokens);
-			rowdumper->tokens = Py_None;
-			Py_INCREF(rowdumper->tokens);
-			Py_DECREF(row);
-			return NULL;
-		}
 
-		PyTuple_SET_ITEM(rowdumper->tokens, i, token);
-	}
+/*
+ * __iter__() method
+ */
 
-	Py_DECREF(row);
 
-	result = PyUnicode_Join(rowdumper->delimiter, rowdumper->tokens);
+static PyObject *__iter__(PyObject *self)
+{
+	Py_INCREF(self);
+	return self;
+}
 
-	rowdumper->rows_converted += result != NULL;
 
-	return result;
+/*
+ * next() method
+ */
+
+
+static PyObject *next(PyObject *self)
+{
+	ligolw_RowDumper *rowdumper = (ligolw_RowDumper *) self;
+	int result;
+
+	rowdumper->output.length = 0;
+	result = format_row(rowdumper);
+	if(result <= 0) {
+		if(!result)
+			PyErr_SetNone(PyExc_StopIteration);
+		return NULL;
+	}
+	if(set_tokens(rowdumper) < 0)
+		return NULL;
+	return PyUnicode_FromUnicode(rowdumper->output.buffer, rowdumper->output.length);
 }
 
 
@@ -248,7 +982,7 @@ static struct PyMemberDef members[] = {
 	{"attributes", T_OBJECT, offsetof(ligolw_RowDumper, attributes), READONLY, "In-order tuple of attribute names as strings."},
 	{"formats", T_OBJECT, offsetof(ligolw_RowDumper, formats), READONLY, "In-order tuple of row element format functions."},
 	{"iter", T_OBJECT, offsetof(ligolw_RowDumper, iter), 0, "The iterator being used to provide rows for conversion."},
-	{"rows_converted", T_LONG, offsetof(ligolw_RowDumper, rows_converted), 0, "Count of rows converted."},
+	{"rows_converted", T_PYSSIZET, offsetof(ligolw_RowDumper, rows_converted), 0, "Count of rows converted."},
 	{"tokens", T_OBJECT, offsetof(ligolw_RowDumper, tokens), READONLY, "In-order tuple of unicode tokens from most recently converted row."},
 	{NULL,}
 };
@@ -256,6 +990,9 @@ static struct PyMemberDef members[] = {
 
 static struct PyMethodDef methods[] = {
 	{"dump", dump, METH_O, "Set the Python iterable from which row objects will be retrieved for dumping."},
+	{"dump_sequences", dump_sequences, METH_O, "dump_sequences(iterable)\n\nSet the Python iterable from which rows will be retrieved for dumping, in\nplace of row objects.  Each row is a sequence of the values in attribute\norder, like the tuples returned by a database cursor.  Values of ilwd:char\ncolumns can be unicode strings already in ID form."},
+	{"dump_columns", (PyCFunction) dump_columns, METH_VARARGS | METH_KEYWORDS, "dump_columns(columns, idclasses = None)\n\nSet the columns from which rows will be taken for dumping, in place of\nrow objects.  columns is a sequence with one entry for each attribute.\nEach entry is either a sequence of the values in that column, or an\nobject exporting a one-dimensional, C-contiguous buffer of integers or\nfloats, like a numpy array.  If idclasses is not None it is a sequence\nwith one entry for each column, either None or an ilwd:char class, in\nwhich case the column must be a buffer of signed integers and the values\nare the IDs of that class with those integers."},
+	{"block", block, METH_VARARGS, "block(n, separator)\n\nConvert the next n rows, or as many as remain if there are fewer, and\nreturn their strings joined by the unicode string separator.  Returns None\nif there are no rows left.  tokens is set to the tokens of the last row\nconverted."},
 	{NULL,}
 };
 
@@ -299,7 +1036,40 @@ PyTypeObject ligolw_RowDumper_Type = {
 "representations of the values of the attributes of those objects.  The\n" \
 "attribute values are printed in the order specified when the RowDumper was\n" \
 "created, and using the formats specified.  An attribute whose value is None\n" \
-"is printed as an empty string regardless of the requested format.",
+"is printed as an empty string regardless of the requested format.\n" \
+"\n" \
+"The .block() method converts many rows at once, and returns them as a\n" \
+"single string.\n" \
+"\n" \
+">>> print rowdumper.dump(rows).block(100, u\";\\n\")\n" \
+"10.1,\"bad\";\n" \
+"15.2,\"bad\";\n" \
+"20.3,\"good\"\n" \
+">>> print rowdumper.block(100, u\";\\n\")\n" \
+"None\n" \
+"\n" \
+"Instead of row objects, the values can be given as columns with the\n" \
+".dump_columns() method, in which case numeric columns stored in buffers such\n" \
+"as numpy arrays are formatted without creating Python objects for their\n" \
+"values.\n" \
+"\n" \
+">>> import numpy\n" \
+">>> for line in rowdumper.dump_columns((numpy.array([10.1, 15.2]), [\"bad\", \"good\"])):\n" \
+"...     print line\n" \
+"... \n" \
+"10.1,\"bad\"\n" \
+"15.2,\"good\"\n" \
+"\n" \
+"Or the rows can be given as sequences of values with the .dump_sequences()\n" \
+"method, which avoids constructing row objects.\n" \
+"\n" \
+">>> print rowdumper.dump_sequences([(10.1, u\"bad\"), (20.3, u\"good\")]).block(100, u\"\\n\")\n" \
+"10.1,\"bad\"\n" \
+"20.3,\"good\"\n" \
+"\n" \
+"The format functions in glue.ligolw.types.FormatFunc are recognized, and\n" \
+"their effect reproduced without calling them for values of the types they\n" \
+"are normally used with.",
 	.tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE,
 	.tp_init = __init__,
 	.tp_iter = __iter__,
@@ -28,6 +28,8 @@
 
 #include <Python.h>
 #include <ctype.h>
+#include <errno.h>
+#include <pthread.h>
 #include <stddef.h>
 #include <stdlib.h>
 #include <string.h>
@@ -86,53 +88,75 @@ typedef struct {
 	Py_UNICODE *length;
 	/* current offset in buffer */
 	Py_UNICODE *pos;
+	/* set while columns() is working on the buffer without the GIL */
+	int busy;
 } ligolw_Tokenizer;
 
 
 /*
- * Append the contents of a unicode object to a tokenizer's internal
- * buffer, increasing the size of the buffer if needed.
+ * Make room in the tokenizer's internal buffer for n more characters.  The
+ * buffer is grown geometrically so that appending many small pieces of
+ * text costs amortized O(1) per character.
  */
 
 
-static int add_to_data(ligolw_Tokenizer *tokenizer, PyObject *unicode)
+static int make_room(ligolw_Tokenizer *tokenizer, Py_ssize_t n)
 {
-	Py_ssize_t n = PyUnicode_GET_SIZE(unicode);
+	if(tokenizer->length - tokenizer->data + n > tokenizer->allocation) {
+		/*
+		 * convert pointers to integer offsets
+		 */
 
-	if(n) {
-		if(tokenizer->length - tokenizer->data + n > tokenizer->allocation) {
-			/*
-			 * convert pointers to integer offsets
-			 */
+		ptrdiff_t pos = tokenizer->pos - tokenizer->data;
+		ptrdiff_t length = tokenizer->length - tokenizer->data;
+
+		/*
+		 * increase buffer size, adding 1 to leave room for
+		 * the null terminator
+		 */
+
+		Py_UNICODE *old_data = tokenizer->data;
+		Py_ssize_t allocation = tokenizer->allocation * 2;
 
-			ptrdiff_t pos = tokenizer->pos - tokenizer->data;
-			ptrdiff_t length = tokenizer->length - tokenizer->data;
+		if(allocation < length + n)
+			allocation = length + n;
 
+		tokenizer->data = realloc(tokenizer->data, (allocation + 1) * sizeof(*tokenizer->data));
+		if(!tokenizer->data) {
 			/*
-			 * increase buffer size, adding 1 to leave room for
-			 * the null terminator
+			 * memory failure, restore pointer and exit
 			 */
 
-			Py_UNICODE *old_data = tokenizer->data;
+			tokenizer->data = old_data;
+			return -1;
+		}
+		tokenizer->allocation = allocation;
 
-			tokenizer->data = realloc(tokenizer->data, (tokenizer->allocation + n + 1) * sizeof(*tokenizer->data));
-			if(!tokenizer->data) {
-				/*
-				 * memory failure, restore pointer and exit
-				 */
+		/*
+		 * convert integer offsets back to pointers
+		 */
 
-				tokenizer->data = old_data;
-				return -1;
-			}
-			tokenizer->allocation += n;
+		tokenizer->pos = &tokenizer->data[pos];
+		tokenizer->length = &tokenizer->data[length];
+	}
 
-			/*
-			 * convert integer offsets back to pointers
-			 */
+	return 0;
+}
 
-			tokenizer->pos = &tokenizer->data[pos];
-			tokenizer->length = &tokenizer->data[length];
-		}
+
+/*
+ * Append the contents of a unicode object to a tokenizer's internal
+ * buffer, increasing the size of the buffer if needed.
+ */
+
+
+static int add_to_data(ligolw_Tokenizer *tokenizer, PyObject *unicode)
+{
+	Py_ssize_t n = PyUnicode_GET_SIZE(unicode);
+
+	if(n) {
+		if(make_room(tokenizer, n) < 0)
+			return -1;
 
 		/*
 		 * copy data from unicode into buffer, appending null
@@ -152,6 +176,60 @@ static int add_to_data(ligolw_Tokenizer *tokenizer, PyObject *unicode)
 }
 
 
+/*
+ * Append the contents of a str object to a tokenizer's internal buffer,
+ * increasing the size of the buffer if needed.  ASCII text, which is
+ * what LIGO Light Weight streams normally contain, is copied into the
+ * buffer directly, without constructing a unicode object.  Anything else
+ * is decoded as UTF-8.  Returns 0 on success, -1 on memory allocation
+ * failure, -2 if the text could not be decoded (with an exception set).
+ */
+
+
+static int add_bytes_to_data(ligolw_Tokenizer *tokenizer, PyObject *str)
+{
+	const unsigned char *bytes = (const unsigned char *) PyString_AS_STRING(str);
+	Py_ssize_t n = PyString_GET_SIZE(str);
+	Py_ssize_t i;
+
+	if(n) {
+		if(make_room(tokenizer, n) < 0)
+			return -1;
+
+		/*
+		 * widen the bytes into the buffer, stopping if a
+		 * non-ASCII character is found.  the buffer's length is
+		 * not updated until the copy is complete.
+		 */
+
+		for(i = 0; i < n; i++) {
+			if(bytes[i] & 0x80) {
+				/*
+				 * not ASCII, decode it
+				 */
+
+				PyObject *unicode = PyUnicode_DecodeUTF8((const char *) bytes, n, NULL);
+				int result;
+				if(!unicode)
+					return -2;
+				result = add_to_data(tokenizer, unicode);
+				Py_DECREF(unicode);
+				return result;
+			}
+			tokenizer->length[i] = bytes[i];
+		}
+		tokenizer->length += n;
+		*tokenizer->length = 0;
+	}
+
+	/*
+	 * success
+	 */
+
+	return 0;
+}
+
+
 /*
  * Shift the contents of the tokenizer's buffer so that the data starting
  * at pos is moved to the start of the buffer.  When moving data, add 1 to
@@ -200,7 +278,7 @@ static void parse_error(PyObject *exception, const Py_UNICODE *buffer, const ptr
 	pos_str = PyUnicode_Encode(pos, 1, NULL, NULL);
 
 	if(buffer_str && pos_str)
-		PyErr_Format(exception, "parse error in '%s' near '%s' at position %td: %s", PyString_AS_STRING(buffer_str), PyString_AS_STRING(pos_str), pos - buffer + 1, msg);
+		PyErr_Format(exception, "parse error in '%s' near '%s' at position %zd: %s", PyString_AS_STRING(buffer_str), PyString_AS_STRING(pos_str), (Py_ssize_t) (pos - buffer + 1), msg);
 	else
 		PyErr_Format(exception, "parse error (details not available): %s", msg);
 
@@ -449,18 +527,22 @@ static PyObject *append(PyObject *self, PyObject *data)
 {
 	int fail;
 
+	if(((ligolw_Tokenizer *) self)->busy) {
+		PyErr_SetString(PyExc_RuntimeError, "tokenizer is busy");
+		return NULL;
+	}
+
 	if(PyUnicode_Check(data)) {
 		fail = add_to_data((ligolw_Tokenizer *) self, data);
 	} else if(PyString_Check(data)) {
-		if(!(data = PyUnicode_FromObject(data)))
-			return NULL;
-		fail = add_to_data((ligolw_Tokenizer *) self, data);
-		Py_DECREF(data);
+		fail = add_bytes_to_data((ligolw_Tokenizer *) self, data);
 	} else {
 		PyErr_SetObject(PyExc_TypeError, data);
 		return NULL;
 	}
 
+	if(fail == -2)
+		return NULL;
 	if(fail < 0)
 		return PyErr_NoMemory();
 
@@ -519,6 +601,7 @@ static int __init__(PyObject *self, PyObject *args, PyObject *kwds)
 	tokenizer->data = NULL;
 	tokenizer->length = tokenizer->data;
 	tokenizer->pos = tokenizer->data;
+	tokenizer->busy = 0;
 
 	return 0;
 }
@@ -548,6 +631,11 @@ static PyObject *next(PyObject *self)
 	PyObject *token;
 	Py_UNICODE *start, *end;
 
+	if(tokenizer->busy) {
+		PyErr_SetString(PyExc_RuntimeError, "tokenizer is busy");
+		return NULL;
+	}
+
 	/*
 	 * Identify the start and end of the next token.
 	 */
@@ -605,6 +693,662 @@ static PyObject *next(PyObject *self)
 }
 
 
+/*
+ * ============================================================================
+ *
+ *                           Bulk Column Extraction
+ *
+ * ============================================================================
+ */
+
+
+/*
+ * How the tokens of each column are to be converted.  int and long
+ * tokens are parsed into 64-bit integers, float tokens into doubles,
+ * the rest are converted to Python objects after the GIL is re-acquired.
+ */
+
+
+enum column_kind {
+	COLUMN_SKIP,
+	COLUMN_INT,
+	COLUMN_FLOAT,
+	COLUMN_UNICODE,
+	COLUMN_STRING,
+	COLUMN_OBJECT
+};
+
+
+/*
+ * The location of a token in the tokenizer's buffer.  start and end are
+ * NULL for an empty token.  quote_character is 0 for an unquoted token.
+ */
+
+
+struct token {
+	Py_UNICODE *start;
+	Py_UNICODE *end;
+	Py_UNICODE quote_character;
+};
+
+
+/*
+ * State shared by the threads converting a block of rows.
+ */
+
+
+struct columns_context {
+	const ligolw_Tokenizer *tokenizer;
+	Py_ssize_t n_columns;
+	const enum column_kind *kinds;
+	/* row i starts at row_starts[i], row_starts[n_rows] is the end of
+	 * the last row */
+	Py_UNICODE **row_starts;
+	Py_ssize_t n_rows;
+	/* per column:  the int64 or double array, or the array of struct
+	 * token for columns converted to objects */
+	void **values;
+	/* per column:  1 for each empty token, numeric columns only */
+	unsigned char **nulls;
+};
+
+
+/*
+ * One thread's share of the rows, and the first error it encountered.
+ */
+
+
+struct columns_job {
+	const struct columns_context *context;
+	Py_ssize_t first_row;
+	Py_ssize_t last_row;
+	pthread_t thread;
+	int started;
+	/* if error is not NULL, the token that could not be converted */
+	const char *error;
+	struct token error_token;
+};
+
+
+/*
+ * Equivalent of the token scanning in next_token(), but does not require
+ * the GIL, does not modify the buffer, and does not advance the
+ * tokenizer.  Returns the address of the character following the
+ * delimiter that terminates the token.  Returns NULL if the end of the
+ * data is reached first, or if a parse error occurs in which case *error
+ * and *error_pos are set.
+ */
+
+
+static Py_UNICODE *scan_token(const ligolw_Tokenizer *tokenizer, Py_UNICODE *pos, const Py_UNICODE *bailout, struct token *token, const char **error, const Py_UNICODE **error_pos)
+{
+	token->quote_character = 0;
+
+	if(pos >= bailout)
+		return NULL;
+	while(Py_UNICODE_ISSPACE(*pos))
+		if(++pos >= bailout)
+			return NULL;
+	if(pyunicode_strchr(tokenizer->quote_characters, *pos)) {
+		int escaped = 0;
+
+		token->quote_character = *pos;
+		token->start = ++pos;
+		if(pos >= bailout)
+			return NULL;
+		while((*pos != token->quote_character) || escaped) {
+			escaped = (*pos == tokenizer->escape_character) && !escaped;
+			if(++pos >= bailout)
+				return NULL;
+		}
+		token->end = pos;
+		if(++pos >= bailout)
+			return NULL;
+	} else {
+		token->start = pos;
+		while(!Py_UNICODE_ISSPACE(*pos) && (*pos != tokenizer->delimiter))
+			if(++pos >= bailout)
+				return NULL;
+		token->end = pos;
+		if(token->start == token->end)
+			token->start = token->end = NULL;
+	}
+	while(*pos != tokenizer->delimiter) {
+		if(!Py_UNICODE_ISSPACE(*pos)) {
+			*error = "expected whitespace or delimiter";
+			*error_pos = pos;
+			return NULL;
+		}
+		if(++pos >= bailout)
+			return NULL;
+	}
+
+	return pos + 1;
+}
+
+
+/*
+ * Find the start of each complete row in the tokenizer's buffer.  Returns
+ * the number of complete rows, or -1 on failure.  On success, *row_starts
+ * is a malloc()ed array of n_rows + 1 addresses, the last being the
+ * address following the last complete row.  On failure, if *error is not
+ * NULL a parse error occured at *error_pos, otherwise the failure was a
+ * memory allocation failure.  Does not require the GIL.
+ */
+
+
+static Py_ssize_t find_rows(const ligolw_Tokenizer *tokenizer, Py_ssize_t n_columns, Py_UNICODE ***row_starts, const char **error, const Py_UNICODE **error_pos)
+{
+	Py_UNICODE *pos = tokenizer->pos;
+	Py_ssize_t allocation = 1024;
+	Py_ssize_t n_rows = 0;
+
+	*error = NULL;
+	*row_starts = malloc(allocation * sizeof(**row_starts));
+	if(!*row_starts)
+		return -1;
+	(*row_starts)[0] = pos;
+
+	while(1) {
+		struct token token;
+		Py_ssize_t i;
+
+		for(i = 0; i < n_columns; i++) {
+			pos = scan_token(tokenizer, pos, tokenizer->length, &token, error, error_pos);
+			if(!pos)
+				break;
+		}
+		if(i < n_columns)
+			break;
+
+		if(++n_rows >= allocation) {
+			Py_UNICODE **old = *row_starts;
+			allocation *= 2;
+			*row_starts = realloc(*row_starts, allocation * sizeof(**row_starts));
+			if(!*row_starts) {
+				free(old);
+				return -1;
+			}
+		}
+		(*row_starts)[n_rows] = pos;
+	}
+
+	if(*error) {
+		free(*row_starts);
+		*row_starts = NULL;
+		return -1;
+	}
+	return n_rows;
+}
+
+
+/*
+ * Copy a token into buf as an ASCII string.  Returns buf, or a malloc()ed
+ * buffer if the token does not fit in buf, or NULL if the token contains
+ * non-ASCII characters or memory cannot be allocated.  Does not require
+ * the GIL.
+ */
+
+
+static char *token_to_ascii(const struct token *token, char *buf, size_t size)
+{
+	size_t n = token->end - token->start;
+	char *ascii = n < size ? buf : malloc(n + 1);
+	size_t i;
+
+	if(!ascii)
+		return NULL;
+	for(i = 0; i < n; i++) {
+		if(token->start[i] > 127) {
+			if(ascii != buf)
+				free(ascii);
+			return NULL;
+		}
+		ascii[i] = token->start[i];
+	}
+	ascii[n] = 0;
+
+	return ascii;
+}
+
+
+/*
+ * Parse a token as an int or long.  Like int(x, 0), surrounding
+ * white-space is allowed.  Returns 0 on success, otherwise an error
+ * message.  Does not require the GIL.
+ */
+
+
+static const char *parse_int(const struct token *token, long long *value)
+{
+	char buf[64];
+	char *ascii = token_to_ascii(token, buf, sizeof(buf));
+	char *ascii_end;
+	const char *error = NULL;
+
+	if(!ascii)
+		return "invalid literal for int()";
+	errno = 0;
+	*value = strtoll(ascii, &ascii_end, 0);
+	if(ascii_end == ascii)
+		error = "invalid literal for int()";
+	else {
+		while(isspace(*ascii_end))
+			ascii_end++;
+		if(*ascii_end)
+			error = "invalid literal for int()";
+		else if(errno == ERANGE)
+			error = "integer out of range";
+	}
+	if(ascii != buf)
+		free(ascii);
+
+	return error;
+}
+
+
+/*
+ * Parse a token as a float, with the same rules as next().  Returns 0 on
+ * success, otherwise an error message.  Does not require the GIL.
+ */
+
+
+static const char *parse_float(const struct token *token, double *value)
+{
+	char buf[64];
+	char *ascii = token_to_ascii(token, buf, sizeof(buf));
+	char *ascii_end;
+	const char *error = NULL;
+
+	if(!ascii)
+		return "invalid literal for float()";
+	*value = strtod(ascii, &ascii_end);
+	if(ascii_end == ascii || *ascii_end != 0)
+		error = "invalid literal for float()";
+	if(ascii != buf)
+		free(ascii);
+
+	return error;
+}
+
+
+/*
+ * Thread function.  Convert the tokens in the job's rows, stopping at
+ * the first error.  Does not require the GIL.
+ */
+
+
+static void *convert_rows(void *data)
+{
+	struct columns_job *job = data;
+	const struct columns_context *context = job->context;
+	Py_ssize_t row;
+
+	for(row = job->first_row; row < job->last_row; row++) {
+		Py_UNICODE *pos = context->row_starts[row];
+		Py_ssize_t i;
+
+		for(i = 0; i < context->n_columns; i++) {
+			struct token token;
+			const char *error = NULL;
+			const Py_UNICODE *error_pos;
+
+			/* can't fail, find_rows() has scanned the row */
+			pos = scan_token(context->tokenizer, pos, context->row_starts[row + 1], &token, &error, &error_pos);
+
+			switch(context->kinds[i]) {
+			case COLUMN_SKIP:
+				break;
+
+			case COLUMN_INT:
+				if(!token.start) {
+					((long long *) context->values[i])[row] = 0;
+					context->nulls[i][row] = 1;
+				} else
+					error = parse_int(&token, &((long long *) context->values[i])[row]);
+				break;
+
+			case COLUMN_FLOAT:
+				if(!token.start) {
+					((double *) context->values[i])[row] = 0;
+					context->nulls[i][row] = 1;
+				} else
+					error = parse_float(&token, &((double *) context->values[i])[row]);
+				break;
+
+			default:
+				((struct token *) context->values[i])[row] = token;
+				break;
+			}
+
+			if(error) {
+				job->error = error;
+				job->error_token = token;
+				return NULL;
+			}
+		}
+	}
+
+	return NULL;
+}
+
+
+/*
+ * Convert a token to a Python object.  last is the object made from the
+ * previous token in the column, it is re-used if the new object would be
+ * equal to it so that repeated strings share one object.  Returns a new
+ * reference or NULL on error.  Requires the GIL.
+ */
+
+
+static PyObject *token_to_object(const ligolw_Tokenizer *tokenizer, PyObject *type, enum column_kind kind, const struct token *token, PyObject *last)
+{
+	Py_UNICODE *start = token->start;
+	Py_UNICODE *end = token->end;
+	Py_UNICODE *copy = NULL;
+	PyObject *result;
+
+	if(!start) {
+		Py_INCREF(Py_None);
+		return Py_None;
+	}
+
+	/*
+	 * Unescape quoted tokens that contain escape characters.  The
+	 * buffer is not modified, a copy is unescaped instead.
+	 */
+
+	if(token->quote_character) {
+		Py_UNICODE *c;
+		for(c = start; c < end; c++)
+			if(*c == tokenizer->escape_character)
+				break;
+		if(c < end) {
+			Py_UNICODE escapable_characters[] = {token->quote_character, tokenizer->escape_character, tokenizer->delimiter, '\0'};
+			copy = PyMem_Malloc((end - start + 1) * sizeof(*copy));
+			if(!copy)
+				return PyErr_NoMemory();
+			memcpy(copy, start, (end - start) * sizeof(*copy));
+			end = &copy[end - start];
+			start = copy;
+			*end = 0;
+			if(unescape(start, &end, escapable_characters, tokenizer->escape_character)) {
+				PyMem_Free(copy);
+				return NULL;
+			}
+		}
+	}
+
+	switch(kind) {
+	case COLUMN_UNICODE:
+		if(last && PyUnicode_CheckExact(last) && PyUnicode_GET_SIZE(last) == end - start && !memcmp(PyUnicode_AS_UNICODE(last), start, (end - start) * sizeof(*start))) {
+			Py_INCREF(last);
+			result = last;
+		} else
+			result = PyUnicode_FromUnicode(start, end - start);
+		break;
+
+	case COLUMN_STRING:
+		result = PyUnicode_Encode(start, end - start, NULL, NULL);
+		if(result && last && PyString_CheckExact(last) && PyString_GET_SIZE(last) == PyString_GET_SIZE(result) && !memcmp(PyString_AS_STRING(last), PyString_AS_STRING(result), PyString_GET_SIZE(result))) {
+			Py_DECREF(result);
+			Py_INCREF(last);
+			result = last;
+		}
+		break;
+
+	default:
+		result = PyObject_CallFunction(type, "u#", start, end - start);
+		break;
+	}
+
+	PyMem_Free(copy);
+	return result;
+}
+
+
+/*
+ * Raise the exception for a token that could not be converted.
+ */
+
+
+static void conversion_error(const char *error, const struct token *token)
+{
+	PyObject *token_str = NULL;
+
+	if(token->start)
+		token_str = PyUnicode_Encode(token->start, token->end - token->start, "ascii", "backslashreplace");
+	PyErr_Format(strcmp(error, "integer out of range") ? PyExc_ValueError : PyExc_OverflowError, "%s: '%s'", error, token_str ? PyString_AS_STRING(token_str) : "");
+	Py_XDECREF(token_str);
+}
+
+
+/*
+ * columns() method
+ */
+
+
+static PyObject *columns(PyObject *self, PyObject *args, PyObject *kwds)
+{
+	static char *kwlist[] = {"nthreads", NULL};
+	ligolw_Tokenizer *tokenizer = (ligolw_Tokenizer *) self;
+	Py_ssize_t n_columns = tokenizer->types_length - tokenizer->types;
+	int nthreads = 1;
+	enum column_kind *kinds = NULL;
+	struct columns_context context = {tokenizer, n_columns, NULL, NULL, 0, NULL, NULL};
+	struct columns_job *jobs = NULL;
+	PyObject **buffers = NULL;
+	PyObject *result = NULL;
+	const char *error;
+	const Py_UNICODE *error_pos;
+	Py_ssize_t i, row;
+
+	if(!PyArg_ParseTupleAndKeywords(args, kwds, "|i:columns", kwlist, &nthreads))
+		return NULL;
+	if(nthreads < 1) {
+		PyErr_SetString(PyExc_ValueError, "nthreads must be >= 1");
+		return NULL;
+	}
+	if(tokenizer->busy) {
+		PyErr_SetString(PyExc_RuntimeError, "tokenizer is busy");
+		return NULL;
+	}
+	if(tokenizer->type != tokenizer->types) {
+		PyErr_SetString(PyExc_ValueError, "tokenizer is not at the start of a row");
+		return NULL;
+	}
+
+	/*
+	 * Decide how to convert each column.
+	 */
+
+	kinds = malloc(n_columns * sizeof(*kinds));
+	context.values = calloc(n_columns, sizeof(*context.values));
+	context.nulls = calloc(n_columns, sizeof(*context.nulls));
+	buffers = calloc(n_columns, sizeof(*buffers));
+	if(!kinds || !context.values || !context.nulls || !buffers) {
+		PyErr_NoMemory();
+		goto done;
+	}
+	context.kinds = kinds;
+	for(i = 0; i < n_columns; i++) {
+		PyObject *type = tokenizer->types[i];
+		if(type == Py_None)
+			kinds[i] = COLUMN_SKIP;
+		else if(type == (PyObject *) &PyInt_Type || type == (PyObject *) &PyLong_Type)
+			kinds[i] = COLUMN_INT;
+		else if(type == (PyObject *) &PyFloat_Type)
+			kinds[i] = COLUMN_FLOAT;
+		else if(type == (PyObject *) &PyUnicode_Type)
+			kinds[i] = COLUMN_UNICODE;
+		else if(type == (PyObject *) &PyString_Type)
+			kinds[i] = COLUMN_STRING;
+		else
+			kinds[i] = COLUMN_OBJECT;
+	}
+
+	/*
+	 * Find the complete rows.
+	 */
+
+	tokenizer->busy = 1;
+	Py_BEGIN_ALLOW_THREADS
+	context.n_rows = find_rows(tokenizer, n_columns, &context.row_starts, &error, &error_pos);
+	Py_END_ALLOW_THREADS
+	tokenizer->busy = 0;
+	if(context.n_rows < 0) {
+		if(error)
+			parse_error(PyExc_ValueError, tokenizer->pos, tokenizer->length - tokenizer->pos, error_pos, error);
+		else
+			PyErr_NoMemory();
+		goto done;
+	}
+
+	/*
+	 * Allocate the output buffers.
+	 */
+
+	for(i = 0; i < n_columns; i++) {
+		switch(kinds[i]) {
+		case COLUMN_SKIP:
+			break;
+
+		case COLUMN_INT:
+		case COLUMN_FLOAT:
+			buffers[i] = PyByteArray_FromStringAndSize(NULL, context.n_rows * 8);
+			context.nulls[i] = calloc(context.n_rows + 1, 1);
+			if(!buffers[i] || !context.nulls[i]) {
+				PyErr_NoMemory();
+				goto done;
+			}
+			context.values[i] = PyByteArray_AS_STRING(buffers[i]);
+			break;
+
+		default:
+			context.values[i] = malloc((context.n_rows + 1) * sizeof(struct token));
+			if(!context.values[i]) {
+				PyErr_NoMemory();
+				goto done;
+			}
+			break;
+		}
+	}
+
+	/*
+	 * Convert the rows, dividing them among the threads.  Don't
+	 * bother starting threads for fewer than 1024 rows each.
+	 */
+
+	if(nthreads > context.n_rows / 1024)
+		nthreads = context.n_rows / 1024 > 1 ? context.n_rows / 1024 : 1;
+	jobs = calloc(nthreads, sizeof(*jobs));
+	if(!jobs) {
+		PyErr_NoMemory();
+		goto done;
+	}
+	for(i = 0; i < nthreads; i++) {
+		jobs[i].context = &context;
+		jobs[i].first_row = context.n_rows * i / nthreads;
+		jobs[i].last_row = context.n_rows * (i + 1) / nthreads;
+	}
+
+	tokenizer->busy = 1;
+	Py_BEGIN_ALLOW_THREADS
+	for(i = 1; i < nthreads; i++)
+		jobs[i].started = !pthread_create(&jobs[i].thread, NULL, convert_rows, &jobs[i]);
+	convert_rows(&jobs[0]);
+	for(i = 1; i < nthreads; i++) {
+		if(jobs[i].started)
+			pthread_join(jobs[i].thread, NULL);
+		else
+			/* thread couldn't be started, do its work here */
+			convert_rows(&jobs[i]);
+	}
+	Py_END_ALLOW_THREADS
+	tokenizer->busy = 0;
+
+	/* report the first error in the document */
+	for(i = 0; i < nthreads; i++)
+		if(jobs[i].error) {
+			conversion_error(jobs[i].error, &jobs[i].error_token);
+			goto done;
+		}
+
+	/*
+	 * Build the result.  Numeric columns are returned as a tuple of a
+	 * bytearray containing the values and either None or a bytearray
+	 * marking the rows with null values, other columns as lists.
+	 */
+
+	result = PyList_New(n_columns);
+	if(!result)
+		goto done;
+	for(i = 0; i < n_columns; i++) {
+		PyObject *item;
+
+		switch(kinds[i]) {
+		case COLUMN_SKIP:
+			Py_INCREF(Py_None);
+			item = Py_None;
+			break;
+
+		case COLUMN_INT:
+		case COLUMN_FLOAT:
+			if(memchr(context.nulls[i], 1, context.n_rows))
+				item = Py_BuildValue("(ON)", buffers[i], PyByteArray_FromStringAndSize((char *) context.nulls[i], context.n_rows));
+			else
+				item = Py_BuildValue("(OO)", buffers[i], Py_None);
+			break;
+
+		default:
+			item = PyList_New(context.n_rows);
+			if(!item)
+				break;
+			for(row = 0; row < context.n_rows; row++) {
+				PyObject *obj = token_to_object(tokenizer, tokenizer->types[i], kinds[i], &((struct token *) context.values[i])[row], row ? PyList_GET_ITEM(item, row - 1) : NULL);
+				if(!obj) {
+					Py_CLEAR(item);
+					break;
+				}
+				PyList_SET_ITEM(item, row, obj);
+			}
+			break;
+		}
+
+		if(!item) {
+			Py_CLEAR(result);
+			goto done;
+		}
+		PyList_SET_ITEM(result, i, item);
+	}
+
+	/*
+	 * Success.  Consume the rows.
+	 */
+
+	tokenizer->pos = context.row_starts[context.n_rows];
+	advance_to_pos(tokenizer);
+	result = Py_BuildValue("(nN)", context.n_rows, result);
+
+done:
+	for(i = 0; i < n_columns && kinds && context.values; i++) {
+		if(kinds[i] != COLUMN_INT && kinds[i] != COLUMN_FLOAT)
+			free(context.values[i]);
+		if(context.nulls)
+			free(context.nulls[i]);
+		if(buffers)
+			Py_XDECREF(buffers[i]);
+	}
+	free(kinds);
+	free(context.values);
+	free(context.nulls);
+	free(context.row_starts);
+	free(buffers);
+	free(jobs);
+	return result;
+}
+
+
 /*
  * set_types() method
  */
@@ -615,6 +1359,11 @@ static PyObject *set_types(PyObject *self, PyObject *sequence)
 	ligolw_Tokenizer *tokenizer = (ligolw_Tokenizer *) self;
 	Py_ssize_t length, i;
 
+	if(tokenizer->busy) {
+		PyErr_SetString(PyExc_RuntimeError, "tokenizer is busy");
+		return NULL;
+	}
+
 	/*
 	 * Simplify the sequence access.
 	 */
@@ -680,7 +1429,8 @@ static PyObject *attribute_get_data(PyObject *obj, void *data)
 
 
 static struct PyMethodDef methods[] = {
-	{"append", append, METH_O, "Append a unicode object to the tokenizer's internal buffer.  Also accepts str objects as input."},
+	{"append", append, METH_O, "Append a unicode object to the tokenizer's internal buffer.  Also accepts str objects as input, which are decoded as UTF-8.  ASCII str objects are copied into the buffer without being decoded, so they can be faster to append than unicode objects."},
+	{"columns", (PyCFunction) columns, METH_VARARGS | METH_KEYWORDS, "Parse all the complete rows in the tokenizer's internal buffer and remove them from the buffer.  The number of columns in a row is the number of types given to set_types(), and the tokenizer must be at the start of a row.  Returns a tuple containing the number of rows and a list of the columns.  Columns whose type is None are returned as None.  Columns of type int or long are returned as a tuple containing a bytearray of native 64-bit integers and either None or, if there are null values, a bytearray containing a 1 for each row with a null value.  Columns of type float are returned the same way but as native doubles.  Other columns are returned as lists of objects.  The integer and float conversions are done without holding the global interpreter lock, split across up to nthreads threads (default 1).  OverflowError is raised if an integer does not fit in 64 bits.  On error the buffer is not modified."},
 	{"set_types", set_types, METH_O, "Set the types to be used cyclically for token parsing.  This function accepts an iterable of callables.  Each callable will be passed the token to be converted as a unicode string.  Special fast-paths are included to handle the Python builtin types float, int, long, str, and unicode.  The default is to return all tokens as unicode objects."},
 	{NULL,}
 };
@@ -725,7 +1475,29 @@ PyTypeObject ligolw_Tokenizer_Type = {
 "removed before conversion to the target type.  An empty token (two delimiters\n" \
 "with only whitespace between them) is returned as None regardless of the\n" \
 "requested type.  To prevent a zero-length string token from being interpreted\n" \
-"as None, place it in quotes.",
+"as None, place it in quotes.\n" \
+"\n" \
+"The columns() method extracts all the complete rows in the buffer at once,\n" \
+"converting the int and float columns to arrays of native values without\n" \
+"holding the global interpreter lock.  Empty tokens are marked in a separate\n" \
+"array.\n" \
+"\n" \
+"Example:\n" \
+"\n" \
+">>> import numpy\n" \
+">>> t = tokenizer.Tokenizer(u\",\")\n" \
+">>> t.set_types([unicode, int, float])\n" \
+">>> n, (names, (ints, nulls), (floats, no_nulls)) = t.append(u\"a,1,0.5,b,,2,c\").columns()\n" \
+">>> n, names, no_nulls\n" \
+"(2, [u'a', u'b'], None)\n" \
+">>> numpy.frombuffer(ints, dtype = \"int64\")\n" \
+"array([1, 0])\n" \
+">>> numpy.frombuffer(nulls, dtype = \"uint8\")\n" \
+"array([0, 1], dtype=uint8)\n" \
+">>> numpy.frombuffer(floats, dtype = \"float64\")\n" \
+"array([0.5, 2. ])\n" \
+">>> t.data\n" \
+"u'c'",
 	.tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_CHECKTYPES,
 	.tp_init = __init__,
 	.tp_iter = __iter__,
@@ -358,7 +358,8 @@ FromSQLiteType = {
 	"TEXT": u"lstring",
 	"STRING": u"lstring",
 	"INTEGER": u"int_4s",
-	"REAL": u"real_8"
+	"REAL": u"real_8",
+	"ILWD_INTEGER": u"ilwd:char"
 }
 """
 Look-up table used to guess LIGO Light-Weight XML data type strings from
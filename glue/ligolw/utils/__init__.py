@@ -30,15 +30,23 @@ Library of utility code for LIGO Light Weight XML applications.
 
 
 import codecs
+import collections
 import gzip
 from hashlib import md5
+import itertools
+import mmap
 import warnings
 import os
+import Queue
 import urllib2
 import urlparse
 import signal
 import stat
+import struct
 import sys
+import threading
+import time
+import zlib
 
 
 # work-around for Python < 2.7.  remove when we can rely on native GzipFile
@@ -55,8 +63,14 @@ except AttributeError:
 			return False
 
 
+from xml.sax.saxutils import escape as xmlescape
+
+
 from glue import git_version
 from .. import ligolw
+from .. import table
+from .. import tokenizer
+from .. import types as ligolwtypes
 
 
 __author__ = "Kipp Cannon <kipp.cannon@ligo.org>"
@@ -64,7 +78,7 @@ __version__ = "git id %s" % git_version.id
 __date__ = git_version.date
 
 
-__all__ = ["sort_files_by_size", "local_path_from_url", "load_fileobj", "load_filename", "load_url", "write_fileobj", "write_filename", "write_url"]
+__all__ = ["sort_files_by_size", "local_path_from_url", "load_fileobj", "load_filename", "load_url", "iterrows_fileobj", "iterrows_filename", "iterrows_url", "write_fileobj", "write_filename", "write_url", "IncrementalWriter", "BinaryExtensions"]
 
 
 #
@@ -76,6 +90,13 @@ __all__ = ["sort_files_by_size", "local_path_from_url", "load_fileobj", "load_fi
 #
 
 
+BinaryExtensions = (".lwb", ".lwb.gz")
+"""
+File name extensions for which write_filename() writes the contents of
+tables in the binary encoding of glue.ligolw.binarytables.
+"""
+
+
 def sort_files_by_size(filenames, verbose = False, reverse = False):
 	"""
 	Return a list of the filenames sorted in order from smallest file
@@ -145,10 +166,17 @@ class RewindableInputFile(object):
 		self.reuse = 0
 		# the internal buffer
 		self.buf = buffer(" " * buffer_size)
+		# how many octets have been read from fileobj.  this is
+		# used in place of fileobj.tell(), which pipes and urlfile
+		# objects do not provide
+		self.pos = 0
 		# flag indicating a .seek()-based EOF test is in progress
 		self.gzip_hack_pretend_to_be_at_eof = False
 		# avoid attribute look-ups
-		self._next = self.fileobj.next
+		try:
+			self._next = self.fileobj.next
+		except AttributeError:
+			pass
 		self._read = self.fileobj.read
 
 	def __iter__(self):
@@ -162,6 +190,7 @@ class RewindableInputFile(object):
 			self.reuse = 0
 		else:
 			buf = self._next()
+			self.pos += len(buf)
 			self.buf = (self.buf + buf)[-len(self.buf):]
 		return buf
 
@@ -171,6 +200,7 @@ class RewindableInputFile(object):
 		if self.reuse:
 			if self.reuse < 0:
 				buf = self._read(size - self.reuse)
+				self.pos += len(buf)
 				self.buf = (self.buf + buf)[-len(self.buf):]
 				buf = buf[-self.reuse:]
 				self.reuse = 0
@@ -186,15 +216,15 @@ class RewindableInputFile(object):
 					buf += self.read(size - len(buf))
 		else:
 			buf = self._read(size)
+			self.pos += len(buf)
 			self.buf = (self.buf + buf)[-len(self.buf):]
 		return buf
 
 	def seek(self, offset, whence = os.SEEK_SET):
 		self.gzip_hack_pretend_to_be_at_eof = False
 		if whence == os.SEEK_SET:
-			pos = self.fileobj.tell()
-			if offset >= 0 and pos - len(self.buf) <= offset <= pos:
-				self.reuse = pos - offset
+			if offset >= 0 and self.pos - len(self.buf) <= offset <= self.pos:
+				self.reuse = self.pos - offset
 			else:
 				raise IOError("seek out of range")
 		elif whence == os.SEEK_CUR:
@@ -214,14 +244,15 @@ class RewindableInputFile(object):
 			# read 1 character.  save it in the internal buffer
 			# to not loose it.
 			c = self._read(1)
+			self.pos += len(c)
 			self.buf = (self.buf + c)[-len(self.buf):]
 			self.reuse += len(c)
 			if c:
 				# since we have read a character, this will
 				# not return the same answer as when
 				# GzipFile called it
-				return self.fileobj.tell()
-		return self.fileobj.tell() - self.reuse
+				return self.pos
+		return self.pos - self.reuse
 
 	def close(self):
 		return self.fileobj.close()
@@ -309,7 +340,335 @@ class MD5File(object):
 		return False
 
 
-def load_fileobj(fileobj, gz = None, xmldoc = None, contenthandler = None):
+def _deflate_block(data, compresslevel):
+	"""
+	Compress data into a raw deflate stream ending on a byte boundary,
+	to be concatenated with the deflate streams of the blocks before
+	and after it.  For internal use only.
+	"""
+	compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+	return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class ParallelGzipWriter(object):
+	"""
+	Write-only file-like object that gzip compresses the data written
+	to it using a pool of threads, and writes the compressed data to
+	fileobj.  The data is cut into blocks of block_size bytes, and the
+	blocks are compressed independently and in parallel (zlib releases
+	the GIL while it is compressing).  The compressed blocks are
+	written in order as a single gzip member, so the output can be
+	read by anything that reads gzip files.  Because each block is
+	compressed without knowledge of the data before it the output is a
+	little larger than GzipFile's.
+
+	Like GzipFile, .close() does not close fileobj.
+
+	Example:
+
+	>>> import gzip, StringIO
+	>>> f = StringIO.StringIO()
+	>>> with ParallelGzipWriter(f, 2, block_size = 10) as gzfile:
+	...	gzfile.write("the quick brown fox jumps over the lazy dog")
+	...
+	>>> gzip.GzipFile(fileobj = StringIO.StringIO(f.getvalue())).read()
+	'the quick brown fox jumps over the lazy dog'
+	"""
+	def __init__(self, fileobj, nthreads, compresslevel = 9, block_size = 1 << 22):
+		# import here so that the (slow) import of multiprocessing
+		# is only paid for by those who want threads
+		from multiprocessing.pool import ThreadPool
+		self.fileobj = fileobj
+		self.nthreads = nthreads
+		self.compresslevel = compresslevel
+		self.block_size = block_size
+		self._pool = ThreadPool(nthreads)
+		# the data not yet submitted for compression
+		self._buf = []
+		self._buflen = 0
+		# the AsyncResult objects of the blocks being compressed,
+		# in order
+		self._pending = collections.deque()
+		# CRC and size of the uncompressed data, for the trailer
+		self._crc = zlib.crc32("")
+		self._size = 0
+		# the header is the same as GzipFile's
+		self.fileobj.write("\037\213\010\000" + struct.pack("<I", long(time.time()) & 0xffffffffL) + "\002\377")
+
+	def _submit(self):
+		if self._buflen:
+			data = "".join(self._buf)
+			self._buf = []
+			self._buflen = 0
+			self._pending.append(self._pool.apply_async(_deflate_block, (data, self.compresslevel)))
+			self._crc = zlib.crc32(data, self._crc)
+			self._size += len(data)
+		# keep a few blocks queued for each thread, but write out
+		# the ones that are done so that memory use is bounded
+		while len(self._pending) > 2 * self.nthreads:
+			self.fileobj.write(self._pending.popleft().get())
+
+	def write(self, buf):
+		if self._pool is None:
+			raise ValueError("I/O operation on closed file")
+		self._buf.append(buf)
+		self._buflen += len(buf)
+		if self._buflen >= self.block_size:
+			self._submit()
+
+	def flush(self, mode = None):
+		"""
+		Compress the data written so far, and write all of it to
+		fileobj.  The mode argument is accepted for compatibility
+		with GzipFile and is ignored:  the compressed data always
+		ends on a byte boundary as though zlib.Z_SYNC_FLUSH had been
+		used.
+		"""
+		if self._pool is None:
+			raise ValueError("I/O operation on closed file")
+		self._submit()
+		while self._pending:
+			self.fileobj.write(self._pending.popleft().get())
+		self.fileobj.flush()
+
+	def close(self):
+		if self._pool is not None:
+			try:
+				self.flush()
+				# an empty final block ends the deflate
+				# stream, then the trailer
+				self.fileobj.write(zlib.compressobj(self.compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS).flush())
+				self.fileobj.write(struct.pack("<II", self._crc & 0xffffffffL, self._size & 0xffffffffL))
+				self.fileobj.flush()
+			finally:
+				self._pool.close()
+				self._pool.join()
+				self._pool = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+		return False
+
+
+class ThreadedGzipReader(object):
+	"""
+	Read-only file-like object that decompresses the gzip compressed
+	data read from fileobj in a background thread, so that the
+	decompression proceeds in parallel with whatever the caller does
+	with the data it reads.  zlib releases the GIL while it is
+	decompressing.  Multi-member gzip files are supported.  A gzip
+	stream cannot be decompressed in parallel, so there is only the
+	one thread.  At most queue_size blocks of block_size compressed
+	bytes are decompressed ahead of the reader.
+
+	.close() stops the thread, but does not close fileobj.
+
+	Example:
+
+	>>> import StringIO
+	>>> f = StringIO.StringIO()
+	>>> with ParallelGzipWriter(f, 2, block_size = 10) as gzfile:
+	...	gzfile.write("the quick brown fox jumps over the lazy dog")
+	...
+	>>> f.seek(0)
+	>>> with ThreadedGzipReader(f) as gzfile:
+	...	gzfile.read(9), gzfile.read()
+	...
+	('the quick', ' brown fox jumps over the lazy dog')
+	"""
+	def __init__(self, fileobj, block_size = 1 << 20, queue_size = 8):
+		self.fileobj = fileobj
+		self.block_size = block_size
+		self._queue = Queue.Queue(queue_size)
+		self._buf = ""
+		self._eof = False
+		self._closed = False
+		self._thread = threading.Thread(target = self._run)
+		self._thread.daemon = True
+		self._thread.start()
+
+	def _put(self, item):
+		# returns False if the reader has been closed
+		while not self._closed:
+			try:
+				self._queue.put(item, timeout = 0.1)
+				return True
+			except Queue.Full:
+				pass
+		return False
+
+	def _run(self):
+		try:
+			decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+			while True:
+				buf = self.fileobj.read(self.block_size)
+				if not buf:
+					break
+				while buf:
+					if not self._put(decompressor.decompress(buf)):
+						return
+					buf = decompressor.unused_data
+					if buf:
+						# start of next member
+						decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+			# confirm that the last member was complete:  once
+			# the end of a member has been reached anything fed
+			# to the decompressor is left as unused data
+			decompressor.decompress("\0")
+			if decompressor.unused_data != "\0":
+				raise IOError("compressed file ended before the end-of-stream marker was reached")
+		except Exception:
+			self._put(sys.exc_info())
+		else:
+			self._put(None)
+
+	def read(self, size = None):
+		if size is None or size < 0:
+			size = float("inf")
+		bufs = [self._buf]
+		buflen = len(self._buf)
+		while buflen < size and not self._eof:
+			item = self._queue.get()
+			if item is None:
+				self._eof = True
+			elif isinstance(item, tuple):
+				self._eof = True
+				raise item[0], item[1], item[2]
+			else:
+				bufs.append(item)
+				buflen += len(item)
+		buf = "".join(bufs)
+		if buflen > size:
+			buf, self._buf = buf[:size], buf[size:]
+		else:
+			self._buf = ""
+		return buf
+
+	def close(self):
+		self._closed = True
+		self._thread.join()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+		return False
+
+
+def _decompressed(fileobj, gz, gz_threads = 0):
+	"""
+	Wrap fileobj in a gzip decompressor if gz is True, or if gz is None
+	and the data in fileobj is gzip compressed.  The decompressor is a
+	ThreadedGzipReader if gz_threads is not 0.  For internal use only.
+	"""
+	if gz or gz is None:
+		fileobj = RewindableInputFile(fileobj)
+		magic = fileobj.read(2)
+		fileobj.seek(0, os.SEEK_SET)
+		if gz or magic == '\037\213':
+			if gz_threads:
+				fileobj = ThreadedGzipReader(fileobj)
+			else:
+				fileobj = gzip.GzipFile(mode = "rb", fileobj = fileobj)
+	return fileobj
+
+
+def _compressor(fileobj, gz, gz_threads = 0):
+	"""
+	Return a file object that gzip compresses the data written to it
+	and writes it to fileobj, or fileobj itself if gz is False.  A
+	ParallelGzipWriter with gz_threads threads is used if gz_threads is
+	not 0.  For internal use only.
+	"""
+	if not gz:
+		return fileobj
+	if gz_threads:
+		return ParallelGzipWriter(fileobj, gz_threads)
+	return GzipFile(mode = "wb", fileobj = fileobj)
+
+
+def _mapped_blocks(fileobj, gz, block_size):
+	"""
+	If fileobj is a regular file that is not to be gzip decompressed,
+	return an iterator over read-only buffers of its contents from its
+	current position to its end, otherwise return None.  The file is
+	memory-mapped one block of block_size bytes at a time, so the
+	buffers are only valid until the next one is retrieved.
+	block_size must be a multiple of mmap.ALLOCATIONGRANULARITY.  For
+	internal use only.
+	"""
+	if gz:
+		return None
+	try:
+		fd = fileobj.fileno()
+		pos = fileobj.tell()
+	except (AttributeError, IOError, ValueError):
+		return None
+	st = os.fstat(fd)
+	if not stat.S_ISREG(st.st_mode) or pos >= st.st_size:
+		return None
+	# mappings must start on a multiple of the allocation
+	# granularity
+	start = pos - pos % mmap.ALLOCATIONGRANULARITY
+	try:
+		window = mmap.mmap(fd, min(block_size, st.st_size - start), access = mmap.ACCESS_READ, offset = start)
+	except (mmap.error, OverflowError):
+		return None
+	if gz is None and window[pos - start : pos - start + 2] == '\037\213':
+		window.close()
+		return None
+
+	def blocks(window, offset):
+		try:
+			yield buffer(window, pos - start)
+			while offset + block_size < st.st_size:
+				window.close()
+				offset += block_size
+				window = mmap.mmap(fd, min(block_size, st.st_size - offset), access = mmap.ACCESS_READ, offset = offset)
+				yield buffer(window)
+		finally:
+			window.close()
+	return blocks(window, start)
+
+
+def _load_fileobj(fileobj, gz = None, xmldoc = None, contenthandler = None, gz_threads = 0, digest = True, block_size = 1 << 22):
+	"""
+	Implementation of load_fileobj().  If digest is False, the MD5
+	digest is not computed and None is returned in its place.
+	Uncompressed regular files are memory-mapped and given to the
+	parser in blocks of block_size bytes.  For internal use only.
+	"""
+	if xmldoc is None:
+		xmldoc = ligolw.Document()
+	md5obj = md5() if digest else None
+	blocks = _mapped_blocks(fileobj, gz, block_size)
+	if blocks is not None:
+		# parse directly from the memory map without copying,
+		# and leave the file at EOF as reading it would have
+		parser = ligolw.make_parser(contenthandler(xmldoc))
+		for buf in blocks:
+			parser.feed(buf)
+			if md5obj is not None:
+				md5obj.update(buf)
+		parser.close()
+		fileobj.seek(0, os.SEEK_END)
+	else:
+		if md5obj is not None:
+			fileobj = MD5File(fileobj, md5obj = md5obj)
+		fileobj = _decompressed(fileobj, gz, gz_threads)
+		try:
+			ligolw.make_parser(contenthandler(xmldoc)).parse(fileobj)
+		finally:
+			if isinstance(fileobj, ThreadedGzipReader):
+				fileobj.close()
+	return xmldoc, (md5obj.hexdigest() if md5obj is not None else None)
+
+
+def load_fileobj(fileobj, gz = None, xmldoc = None, contenthandler = None, gz_threads = 0):
 	"""
 	Parse the contents of the file object fileobj, and return the
 	contents as a LIGO Light Weight document tree.  The file object
@@ -318,7 +677,11 @@ def load_fileobj(fileobj, gz = None, xmldoc = None, contenthandler = None):
 	If the gz parameter is None (the default) then gzip compressed data
 	will be automatically detected and decompressed, otherwise
 	decompression can be forced on or off by setting gz to True or
-	False respectively.
+	False respectively.  If gz_threads is not 0, compressed data is
+	decompressed in a background thread, in parallel with the parsing
+	(see ThreadedGzipReader).  If fileobj is an uncompressed regular
+	file, it is read from its current position through a memory map
+	and left positioned at its end.
 
 	If the optional xmldoc argument is provided and not None, the
 	parsed XML tree will be appended to that document, otherwise a new
@@ -345,18 +708,7 @@ def load_fileobj(fileobj, gz = None, xmldoc = None, contenthandler = None):
 	custom content handlers used to load subsets of documents into
 	memory.
 	"""
-	fileobj = MD5File(fileobj)
-	md5obj = fileobj.md5obj
-	if gz or gz is None:
-		fileobj = RewindableInputFile(fileobj)
-		magic = fileobj.read(2)
-		fileobj.seek(0, os.SEEK_SET)
-		if gz or magic == '\037\213':
-			fileobj = gzip.GzipFile(mode = "rb", fileobj = fileobj)
-	if xmldoc is None:
-		xmldoc = ligolw.Document()
-	ligolw.make_parser(contenthandler(xmldoc)).parse(fileobj)
-	return xmldoc, md5obj.hexdigest()
+	return _load_fileobj(fileobj, gz = gz, xmldoc = xmldoc, contenthandler = contenthandler, gz_threads = gz_threads)
 
 
 def load_filename(filename, verbose = False, **kwargs):
@@ -366,7 +718,8 @@ def load_filename(filename, verbose = False, **kwargs):
 	if filename is None.  Helpful verbosity messages are printed to
 	stderr if verbose is True.  All other keyword arguments are passed
 	to load_fileobj(), see that function for more information.  In
-	particular note that a content handler must be specified.
+	particular note that a content handler must be specified.  The MD5
+	digest of the file is only computed if verbose is True.
 
 	Example:
 
@@ -379,7 +732,7 @@ def load_filename(filename, verbose = False, **kwargs):
 		fileobj = open(filename, "rb")
 	else:
 		fileobj = sys.stdin
-	xmldoc, hexdigest = load_fileobj(fileobj, **kwargs)
+	xmldoc, hexdigest = _load_fileobj(fileobj, digest = verbose, **kwargs)
 	if verbose:
 		print >>sys.stderr, "md5sum: %s  %s" % (hexdigest, (filename if filename is not None else ""))
 	return xmldoc
@@ -393,7 +746,8 @@ def load_url(url, verbose = False, **kwargs):
 	parsed if url is None.  Helpful verbosity messages are printed to
 	stderr if verbose is True.  All other keyword arguments are passed
 	to load_fileobj(), see that function for more information.  In
-	particular note that a content handler must be specified.
+	particular note that a content handler must be specified.  The MD5
+	digest of the file is only computed if verbose is True.
 
 	Example:
 
@@ -411,21 +765,236 @@ def load_url(url, verbose = False, **kwargs):
 			fileobj = urllib2.urlopen(url)
 	else:
 		fileobj = sys.stdin
-	xmldoc, hexdigest = load_fileobj(fileobj, **kwargs)
+	xmldoc, hexdigest = _load_fileobj(fileobj, digest = verbose, **kwargs)
 	if verbose:
 		print >>sys.stderr, "md5sum: %s  %s" % (hexdigest, (url if url is not None else ""))
 	return xmldoc
 
 
-def write_fileobj(xmldoc, fileobj, gz = False, trap_signals = (signal.SIGTERM, signal.SIGTSTP), **kwargs):
+class _RowQueueStream(table.TableStream):
+	"""
+	Stream element that passes the rows it parses to a queue, a list
+	of (table name, list of rows) tuples, instead of appending them to
+	the parent table.  For internal use only.
+	"""
+	def config(self, parentNode, queue):
+		super(_RowQueueStream, self).config(parentNode)
+		self._name = table.StripTableName(parentNode.Name)
+		self._queue = queue
+		self._rows = None
+		return self
+
+	def _queue_rows(self, rows):
+		if not self._queue or self._queue[-1][1] is not self._rows:
+			# the queue has been emptied since the last call
+			self._rows = []
+			self._queue.append((self._name, self._rows))
+		self._rows.extend(rows)
+
+	def appendData(self, content):
+		if self._chunks is not None:
+			# binary encoded stream.  the parent class collects
+			# the character data, and the rows are decoded in
+			# ._append_binary() when the element ends
+			super(_RowQueueStream, self).appendData(content)
+			return
+		self._queue_rows(self._rowbuilder.append(self._tokenizer.append(content)))
+
+	def _append_binary(self, n, columns):
+		binarytables = self._binary_encoding()
+		columns = [binarytables.column_values(*column) for column in columns if column is not None]
+		self._queue_rows(self._rowbuilder.append(itertools.chain.from_iterable(itertools.izip(*columns))))
+
+	def unlink(self):
+		self._queue = self._rows = None
+		super(_RowQueueStream, self).unlink()
+
+
+class _DiscardedStream(ligolw.Stream):
+	"""
+	Stream element that discards its contents without parsing them.
+	For internal use only.
+	"""
+	def appendData(self, content):
+		pass
+
+
+def iterrows_fileobj(fileobj, contenthandler, tables = None, gz = None, batch_size = None, gz_threads = 0):
+	"""
+	Parse the contents of the file object fileobj and yield the rows
+	of its tables as they are parsed, as (table name, row object)
+	tuples, without building the document tree's rows in memory.  The
+	table names are stripped of their LIGO Light Weight decorations.
+	The memory required is independent of the number of rows in the
+	document.
+
+	If tables is not None it is a collection of the (stripped) names of
+	the tables whose rows are to be returned.  The Streams of the other
+	tables are skipped without being parsed.  If batch_size is not
+	None, lists of up to batch_size consecutive rows from one table are
+	yielded, as (table name, list of rows) tuples, instead of
+	individual rows.  gz and gz_threads have the same meanings as in
+	load_fileobj().
+
+	The contenthandler argument is the SAX content handler to use when
+	parsing the document, and is required.  It must have been prepared
+	with glue.ligolw.table.use_in() or glue.ligolw.lsctables.use_in(),
+	and the row objects are those of the tables it constructs.
+
+	Example:
+
+	>>> from glue.ligolw import ligolw, table
+	>>> import StringIO
+	>>> class ContentHandler(ligolw.LIGOLWContentHandler):
+	...	pass
+	...
+	>>> table.use_in(ContentHandler)
+	<class 'glue.ligolw.utils.ContentHandler'>
+	>>> f = StringIO.StringIO('<?xml version="1.0" encoding="utf-8" ?><LIGO_LW><Table Name="demo:table"><Column Name="name" Type="lstring"/><Column Name="value" Type="real_8"/><Stream Name="demo:table" Type="Local" Delimiter=",">"mass",0.5,"velocity",34</Stream></Table><Table Name="other:table"><Column Name="x" Type="int_4s"/><Stream Name="other:table" Type="Local" Delimiter=",">1,2,3</Stream></Table></LIGO_LW>')
+	>>> for name, row in iterrows_fileobj(f, ContentHandler):
+	...	print name, [getattr(row, attr) for attr in row.__slots__]
+	...
+	demo [u'mass', 0.5]
+	demo [u'velocity', 34.0]
+	other [1]
+	other [2]
+	other [3]
+	>>> f.seek(0)
+	>>> for name, rows in iterrows_fileobj(f, ContentHandler, tables = ["other"], batch_size = 2):
+	...	print name, [row.x for row in rows]
+	...
+	other [1, 2]
+	other [3]
+
+	The file object does not need to be seekable, so rows can be
+	streamed from pipes and URLs, compressed or not.
+
+	>>> import gzip
+	>>> class Pipe(object):
+	...	def __init__(self, data):
+	...		self.read = StringIO.StringIO(data).read
+	...
+	>>> f.seek(0)
+	>>> buf = StringIO.StringIO()
+	>>> gzfile = gzip.GzipFile(mode = "wb", fileobj = buf)
+	>>> gzfile.writelines([f.read()])
+	>>> gzfile.close()
+	>>> for name, row in iterrows_fileobj(Pipe(buf.getvalue()), ContentHandler, tables = ["other"]):
+	...	print name, row.x
+	...
+	other 1
+	other 2
+	other 3
+
+	Documents whose tables are in the binary encoding of
+	glue.ligolw.binarytables, like .lwb files, are read the same way,
+	but the rows of each binary encoded table are only available once
+	all of its Stream has been read.
+
+	>>> from glue.ligolw import binarytables
+	>>> f.seek(0)
+	>>> xmldoc, digest = load_fileobj(f, contenthandler = ContentHandler)
+	>>> f = StringIO.StringIO()
+	>>> with binarytables.encoded(xmldoc):
+	...	digest = write_fileobj(xmldoc, f)
+	...
+	>>> f.seek(0)
+	>>> for name, row in iterrows_fileobj(f, ContentHandler):
+	...	print name, [getattr(row, attr) for attr in row.__slots__]
+	...
+	demo [u'mass', 0.5]
+	demo [u'velocity', 34.0]
+	other [1]
+	other [2]
+	other [3]
+	"""
+	queue = []
+	if tables is not None:
+		tables = frozenset(tables)
+
+	class RowIteratingContentHandler(contenthandler):
+		def startStream(self, parent, attrs):
+			if parent.tagName == ligolw.Table.tagName:
+				parent._end_of_columns()
+				if tables is None or table.StripTableName(parent.Name) in tables:
+					return _RowQueueStream(attrs).config(parent, queue)
+				return _DiscardedStream(attrs)
+			return super(RowIteratingContentHandler, self).startStream(parent, attrs)
+
+	xmldoc = ligolw.Document()
+	parser = ligolw.make_parser(RowIteratingContentHandler(xmldoc))
+	fileobj = _decompressed(fileobj, gz, gz_threads)
+	try:
+		while True:
+			buf = fileobj.read(1 << 16)
+			if buf:
+				parser.feed(buf)
+			else:
+				parser.close()
+			# yield the rows parsed so far
+			batches = queue[:]
+			del queue[:]
+			for name, rows in batches:
+				if batch_size is None:
+					for row in rows:
+						yield name, row
+				else:
+					for i in xrange(0, len(rows), batch_size):
+						yield name, rows[i : i + batch_size]
+			if not buf:
+				break
+	finally:
+		if isinstance(fileobj, ThreadedGzipReader):
+			fileobj.close()
+		xmldoc.unlink()
+
+
+def iterrows_filename(filename, verbose = False, **kwargs):
+	"""
+	Parse the contents of the file identified by filename, and yield
+	the rows of its tables.  stdin is parsed if filename is None.  All
+	other keyword arguments are passed to iterrows_fileobj(), see that
+	function for more information.
+	"""
+	if verbose:
+		print >>sys.stderr, "reading %s ..." % (("'%s'" % filename) if filename is not None else "stdin")
+	if filename is not None:
+		fileobj = open(filename, "rb")
+	else:
+		fileobj = sys.stdin
+	return iterrows_fileobj(fileobj, **kwargs)
+
+
+def iterrows_url(url, verbose = False, **kwargs):
+	"""
+	Parse the contents of the file at the given URL, and yield the
+	rows of its tables.  stdin is parsed if url is None.  All other
+	keyword arguments are passed to iterrows_fileobj(), see that
+	function for more information.
+	"""
+	if verbose:
+		print >>sys.stderr, "reading %s ..." % (("'%s'" % url) if url is not None else "stdin")
+	if url is not None:
+		scheme, host, path = urlparse.urlparse(url)[:3]
+		if scheme.lower() in ("", "file") and host.lower() in ("", "localhost"):
+			fileobj = open(path)
+		else:
+			fileobj = urllib2.urlopen(url)
+	else:
+		fileobj = sys.stdin
+	return iterrows_fileobj(fileobj, **kwargs)
+
+
+def write_fileobj(xmldoc, fileobj, gz = False, trap_signals = (signal.SIGTERM, signal.SIGTSTP), gz_threads = 0, **kwargs):
 	"""
 	Writes the LIGO Light Weight document tree rooted at xmldoc to the
 	given file object.  Internally, the .write() method of the xmldoc
 	object is invoked and any additional keyword arguments are passed
 	to that method.  The file object need not be seekable.  The output
-	data is gzip compressed on the fly if gz is True.  The return value
-	is a string containing the hex digits of the MD5 digest of the
-	output bytestream.
+	data is gzip compressed on the fly if gz is True.  If gz_threads is
+	not 0, the compression is done by that many threads in parallel
+	(see ParallelGzipWriter).  The return value is a string containing
+	the hex digits of the MD5 digest of the output bytestream.
 
 	This function traps the signals in the trap_signals iterable during
 	the write process (the default is signal.SIGTERM and
@@ -472,7 +1041,7 @@ def write_fileobj(xmldoc, fileobj, gz = False, trap_signals = (signal.SIGTERM, s
 	# write the document
 	with MD5File(fileobj, closable = False) as fileobj:
 		md5obj = fileobj.md5obj
-		with fileobj if not gz else GzipFile(mode = "wb", fileobj = fileobj) as fileobj:
+		with _compressor(fileobj, gz, gz_threads) as fileobj:
 			with codecs.getwriter("utf_8")(fileobj) as fileobj:
 				xmldoc.write(fileobj, **kwargs)
 
@@ -492,7 +1061,12 @@ def write_filename(xmldoc, filename, verbose = False, gz = False, **kwargs):
 	Writes the LIGO Light Weight document tree rooted at xmldoc to the
 	file name filename.  Friendly verbosity messages are printed while
 	doing so if verbose is True.  The output data is gzip compressed on
-	the fly if gz is True.
+	the fly if gz is True.  If filename ends in one of BinaryExtensions
+	the tables are written in the binary encoding of
+	glue.ligolw.binarytables.  The document remains LIGO Light Weight
+	XML and is loaded with load_filename() as usual, but much faster,
+	and writing the loaded document to a file with any other name
+	converts it back to plain XML.
 
 	Internally, write_fileobj() is used to perform the write.  All
 	additional keyword arguments are passed to write_fileobj().
@@ -500,7 +1074,9 @@ def write_filename(xmldoc, filename, verbose = False, gz = False, **kwargs):
 	Example:
 
 	>>> write_filename(xmldoc, "demo.xml")	# doctest: +SKIP
+	>>> write_filename(xmldoc, "demo.lwb")	# doctest: +SKIP
 	>>> write_filename(xmldoc, "demo.xml.gz", gz = True)	# doctest: +SKIP
+	>>> write_filename(xmldoc, "demo.xml.gz", gz = True, gz_threads = 4)	# doctest: +SKIP
 	"""
 	if verbose:
 		print >>sys.stderr, "writing %s ..." % (("'%s'" % filename) if filename is not None else "stdout")
@@ -510,7 +1086,12 @@ def write_filename(xmldoc, filename, verbose = False, gz = False, **kwargs):
 		fileobj = open(filename, "w")
 	else:
 		fileobj = sys.stdout
-	hexdigest = write_fileobj(xmldoc, fileobj, gz = gz, **kwargs)
+	if filename is not None and filename.endswith(BinaryExtensions):
+		from .. import binarytables
+		with binarytables.encoded(xmldoc):
+			hexdigest = write_fileobj(xmldoc, fileobj, gz = gz, **kwargs)
+	else:
+		hexdigest = write_fileobj(xmldoc, fileobj, gz = gz, **kwargs)
 	if not fileobj is sys.stdout:
 		fileobj.close()
 	if verbose:
@@ -534,3 +1115,192 @@ def write_url(xmldoc, url, **kwargs):
 	>>> write_url(xmldoc, "file:///data.xml.gz", gz = True)	# doctest: +SKIP
 	"""
 	return write_filename(xmldoc, local_path_from_url(url), **kwargs)
+
+
+class IncrementalWriter(object):
+	"""
+	Write a LIGO Light Weight document to a file object a piece at a
+	time, so that the rows of a table can be written as they are
+	produced instead of being collected in memory first.  The
+	document's head is written when the writer is created.  Elements
+	are then written in document order:  .start_element() writes an
+	element's start tag, .write_element() writes a complete element,
+	.start_table() writes a table's start tag, its columns and the
+	start tag of its stream, after which .append_rows() writes rows to
+	the table until .end_table() closes it, and .end_element() writes
+	the end tag of the most recently started element.  .close()
+	finishes any open table and elements and completes the document,
+	and returns the hex digits of the MD5 digest of the bytes written.
+	The output is gzip compressed on the fly if gz is True, using
+	gz_threads threads if that is not 0 (see write_fileobj()).  The
+	output is identical to what xmldoc.write() would have produced for the
+	same document.
+
+	Unlike write_fileobj(), signals are not trapped:  a writer can be
+	open for hours.  .flush() forces everything written so far to the
+	file object, including through the gzip compressor, so that a
+	reader can see it.
+
+	Example:
+
+	>>> import sys
+	>>> from glue.ligolw import ligolw, lsctables
+	>>> xmldoc = ligolw.Document()
+	>>> root = xmldoc.appendChild(ligolw.LIGO_LW())
+	>>> tbl = root.appendChild(lsctables.New(lsctables.SnglBurstTable, ["ifo", "snr"]))
+	>>> with IncrementalWriter(sys.stdout) as writer:	# doctest: +NORMALIZE_WHITESPACE
+	...	writer.start_element(root)
+	...	writer.start_table(tbl)
+	...	for snr in (5.0, 6.0):
+	...		row = lsctables.SnglBurst()
+	...		row.ifo, row.snr = u"H1", snr
+	...		writer.append_rows([row])
+	...
+	<?xml version='1.0' encoding='utf-8'?>
+	<!DOCTYPE LIGO_LW SYSTEM "http://ldas-sw.ligo.caltech.edu/doc/ligolwAPI/html/ligolw_dtd.txt">
+	<LIGO_LW>
+		<Table Name="sngl_burst:table">
+			<Column Type="lstring" Name="sngl_burst:ifo"/>
+			<Column Type="real_4" Name="sngl_burst:snr"/>
+			<Stream Delimiter="," Type="Local" Name="sngl_burst:table">
+				"H1",5,
+				"H1",6
+			</Stream>
+		</Table>
+	</LIGO_LW>
+	"""
+	def __init__(self, fileobj, gz = False, xsl_file = None, gz_threads = 0):
+		self._md5file = MD5File(fileobj, closable = False)
+		self._gzfile = _compressor(self._md5file, gz, gz_threads) if gz else None
+		self._fileobj = codecs.getwriter("utf_8")(self._gzfile or self._md5file)
+		# the elements whose start tags have been written
+		self._open = []
+		# the stream being written, if any
+		self._stream = None
+		self._fileobj.write(ligolw.Header)
+		self._fileobj.write(u"\n")
+		if xsl_file is not None:
+			self._fileobj.write(u'<?xml-stylesheet type="text/xsl" href="%s" ?>\n' % xsl_file)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+		return False
+
+	@property
+	def _indent(self):
+		return ligolw.Indent * len(self._open)
+
+	def _check_not_in_table(self):
+		if self._stream is not None:
+			raise ValueError("table is open")
+
+	def start_element(self, elem):
+		"""
+		Write the start tag of elem.  Its children are not written.
+		"""
+		self._check_not_in_table()
+		self._fileobj.write(elem.start_tag(self._indent))
+		self._fileobj.write(u"\n")
+		self._open.append(elem)
+
+	def write_element(self, elem):
+		"""
+		Write elem and its children.
+		"""
+		self._check_not_in_table()
+		elem.write(self._fileobj, self._indent)
+
+	def end_element(self):
+		"""
+		Write the end tag of the most recently started element.
+		"""
+		self._check_not_in_table()
+		elem = self._open.pop()
+		self._fileobj.write(elem.end_tag(self._indent))
+		self._fileobj.write(u"\n")
+
+	def start_table(self, tbl):
+		"""
+		Write the start tag of the table tbl, its children other
+		than its Stream, and the start tag of its Stream.  The rows
+		already in tbl are not written.  The table must have a
+		Stream child.
+		"""
+		self._check_not_in_table()
+		streams = tbl.getElementsByTagName(ligolw.Stream.tagName)
+		if not streams:
+			raise ValueError("table has no Stream")
+		stream, = streams
+		self.start_element(tbl)
+		for child in tbl.childNodes:
+			if child is not stream:
+				self.write_element(child)
+		indent = self._indent
+		self._fileobj.write(stream.start_tag(indent))
+		self._stream = stream
+		self._rowdumper = tokenizer.RowDumper(tbl.columnnames, [ligolwtypes.FormatFunc[coltype] for coltype in tbl.columntypes], stream.Delimiter)
+		self._newline = u"\n" + indent + ligolw.Indent
+		self._rows_written = False
+		# the last token of the last row written was null
+		self._last_null = False
+
+	def append_rows(self, rows):
+		"""
+		Write the rows in the iterable rows to the open table.
+		"""
+		if self._stream is None:
+			raise ValueError("no table is open")
+		w = self._fileobj.write
+		rowdumper = self._rowdumper
+		separator = rowdumper.delimiter + self._newline
+		rowdumper.dump(rows)
+		for block in iter(lambda: rowdumper.block(table.TableStream.rows_per_block, separator), None):
+			# the separator includes the delimiter that ends
+			# the previous row
+			w(separator if self._rows_written else self._newline)
+			w(xmlescape(block))
+			self._rows_written = True
+			self._last_null = rowdumper.tokens[-1] == u""
+
+	def end_table(self):
+		"""
+		Write the end tags of the open table's Stream and of the
+		table.
+		"""
+		if self._stream is None:
+			raise ValueError("no table is open")
+		if self._last_null:
+			# the last token of the last row was null:  add a
+			# final delimiter to indicate that a token is
+			# present
+			self._fileobj.write(self._rowdumper.delimiter)
+		self._fileobj.write(u"\n" + self._stream.end_tag(self._indent) + u"\n")
+		self._stream = self._rowdumper = None
+		self.end_element()
+
+	def flush(self):
+		"""
+		Flush everything written so far to the file object.
+		"""
+		if self._gzfile is not None:
+			self._gzfile.flush(zlib.Z_SYNC_FLUSH)
+		self._md5file.flush()
+
+	def close(self):
+		"""
+		Finish the open table and elements, complete the document,
+		and return the hex digits of the MD5 digest of the bytes
+		written.  The file object is not closed.
+		"""
+		if self._fileobj is not None:
+			if self._stream is not None:
+				self.end_table()
+			while self._open:
+				self.end_element()
+			self._fileobj.close()
+			self._fileobj = None
+			self._md5file.flush()
+		return self._md5file.md5obj.hexdigest()
@@ -181,17 +181,18 @@ class DefaultContentHandler(ligolw.LIGOLWContentHandler):
 lsctables.use_in(DefaultContentHandler)
 
 
-def ligolw_add(xmldoc, urls, non_lsc_tables_ok = False, verbose = False, contenthandler = DefaultContentHandler):
+def ligolw_add(xmldoc, urls, non_lsc_tables_ok = False, verbose = False, contenthandler = DefaultContentHandler, gz_threads = 0):
 	"""
 	An implementation of the LIGO LW add algorithm.  urls is a list of
 	URLs (or filenames) to load, xmldoc is the XML document tree to
-	which they should be added.
+	which they should be added.  gz_threads is passed to
+	glue.ligolw.utils.load_url().
 	"""
 	# Input
 	for n, url in enumerate(urls):
 		if verbose:
 			print >>sys.stderr, "%d/%d:" % (n + 1, len(urls)),
-		utils.load_url(url, verbose = verbose, xmldoc = xmldoc, contenthandler = contenthandler)
+		utils.load_url(url, verbose = verbose, xmldoc = xmldoc, contenthandler = contenthandler, gz_threads = gz_threads)
 
 	# ID reassignment
 	if not non_lsc_tables_ok and lsctables.HasNonLSCTables(xmldoc):
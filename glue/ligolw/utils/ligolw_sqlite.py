@@ -43,6 +43,10 @@ try:
 except ImportError:
 	# pre 2.5.x
 	from pysqlite2 import dbapi2 as sqlite3
+import collections
+import cStringIO
+import itertools
+import signal
 import sys
 
 
@@ -71,8 +75,17 @@ __date__ = git_version.date
 #
 
 
-def setup(target, check_same_thread = True):
+def setup(target, check_same_thread = True, integer_ids = False):
+	"""
+	Open the database at target, and prepare it for inserting
+	documents.  If integer_ids is True the database is configured to
+	store ilwd:char IDs as integers, which must be done before any
+	tables are created in it.  See
+	glue.ligolw.dbtables.enable_integer_ids().
+	"""
 	connection = sqlite3.connect(target, check_same_thread = check_same_thread)
+	if integer_ids:
+		dbtables.enable_integer_ids(connection)
 	dbtables.idmap_sync(connection)
 	return connection
 
@@ -106,7 +119,7 @@ def update_ids(connection, xmldoc, verbose = False):
 	dbtables.idmap_reset(connection)
 
 
-def insert_from_url(url, preserve_ids = False, verbose = False, contenthandler = None):
+def insert_from_url(url, preserve_ids = False, verbose = False, contenthandler = None, gz_threads = 0):
 	"""
 	Parse and insert the LIGO Light Weight document at the URL into the
 	database with which the content handler is associated.  If
@@ -117,8 +130,19 @@ def insert_from_url(url, preserve_ids = False, verbose = False, contenthandler =
 	newly-inserted rows collide with row IDs already in the database,
 	and is generally only sensible when inserting a document into an
 	empty database.  If verbose is True then progress reports will be
-	printed to stderr.  See glue.ligolw.dbtables.use_in() for more
-	information about constructing a suitable content handler class.
+	printed to stderr.  gz_threads is passed to
+	glue.ligolw.utils.load_url().  See glue.ligolw.dbtables.use_in()
+	for more information about constructing a suitable content handler
+	class.
+	"""
+	_insert_from_loader(lambda: ligolw_utils.load_url(url, verbose = verbose, contenthandler = contenthandler, gz_threads = gz_threads), contenthandler, preserve_ids = preserve_ids, verbose = verbose)
+
+
+def _insert_from_loader(load, contenthandler, preserve_ids = False, verbose = False):
+	"""
+	For internal use only.  Implements insert_from_url().  load is a
+	function that parses the document using the content handler and
+	returns the document tree.
 	"""
 	#
 	# enable/disable ID remapping
@@ -151,7 +175,7 @@ def insert_from_url(url, preserve_ids = False, verbose = False, contenthandler =
 		# not regular Table instances, but this is not checked.
 		#
 
-		xmldoc = ligolw_utils.load_url(url, verbose = verbose, contenthandler = contenthandler)
+		xmldoc = load()
 
 		#
 		# update references to row IDs and cleanup ID remapping
@@ -268,12 +292,13 @@ def insert_from_xmldoc(connection, source_xmldoc, preserve_ids = False, verbose
 	xmldoc.unlink()
 
 
-def insert_from_urls(urls, contenthandler, **kwargs):
+def insert_from_urls(urls, contenthandler, jobs = 1, **kwargs):
 	"""
 	Iterate over a sequence of URLs, calling insert_from_url() on each,
 	then build the indexes indicated by the metadata in lsctables.py.
-	See insert_from_url() for a description of the additional
-	arguments.
+	If jobs is greater than 1, the documents are parsed by that many
+	worker processes, see insert_from_urls_parallel().  See
+	insert_from_url() for a description of the additional arguments.
 	"""
 	verbose = kwargs.get("verbose", False)
 
@@ -281,10 +306,13 @@ def insert_from_urls(urls, contenthandler, **kwargs):
 	# load documents
 	#
 
-	for n, url in enumerate(urls, 1):
-		if verbose:
-			print >>sys.stderr, "%d/%d:" % (n, len(urls)),
-		insert_from_url(url, contenthandler = contenthandler, **kwargs)
+	if jobs > 1:
+		insert_from_urls_parallel(urls, contenthandler, jobs, **kwargs)
+	else:
+		for n, url in enumerate(urls, 1):
+			if verbose:
+				print >>sys.stderr, "%d/%d:" % (n, len(urls)),
+			insert_from_url(url, contenthandler = contenthandler, **kwargs)
 
 	#
 	# done.  build indexes
@@ -293,23 +321,110 @@ def insert_from_urls(urls, contenthandler, **kwargs):
 	dbtables.build_indexes(contenthandler.connection, verbose)
 
 
+#
+# How to insert in parallel
+#
+
+
+def _init_worker():
+	"""
+	For internal use only.  Initializes the worker processes of
+	insert_from_urls_parallel().
+	"""
+	# the parent process handles keyboard interrupts and terminates
+	# the workers.  the workers must not run the signal handlers
+	# inherited from the parent, they erase the parent's scratch
+	# files (see glue.ligolw.dbtables.install_signal_trap())
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+	for signum in (signal.SIGTERM, signal.SIGTSTP):
+		signal.signal(signum, signal.SIG_DFL)
+
+
+def _encode_url(url, gz_threads = 0):
+	"""
+	For internal use only.  Runs in the worker processes of
+	insert_from_urls_parallel().  Parses the document at the URL, and
+	returns it re-written with the tables' Streams in the binary
+	encoding (see glue.ligolw.binarytables), which is compact and
+	quick to decode.
+	"""
+	# numpy is imported by these modules, and importing numpy can be
+	# slow, so only do it if needed
+	from .. import binarytables
+	from .. import columnartables
+
+	class ContentHandler(ligolw.LIGOLWContentHandler):
+		pass
+	columnartables.use_in(ContentHandler)
+
+	xmldoc = ligolw_utils.load_url(url, contenthandler = ContentHandler, gz_threads = gz_threads)
+	fileobj = cStringIO.StringIO()
+	with binarytables.encoded(xmldoc):
+		ligolw_utils.write_fileobj(xmldoc, fileobj, trap_signals = None)
+	xmldoc.unlink()
+	return fileobj.getvalue()
+
+
+def insert_from_urls_parallel(urls, contenthandler, jobs, preserve_ids = False, verbose = False, gz_threads = 0):
+	"""
+	Insert the documents at the URLs into the database with which the
+	content handler is associated, with the same result as calling
+	insert_from_url() on each in turn.  The documents are parsed by a
+	pool of jobs worker processes while this process, which owns the
+	database connection, inserts the documents in order as they become
+	available.  The workers hand the documents to this process with
+	the tables in the binary encoding of glue.ligolw.binarytables, so
+	that decoding them here is much faster than parsing them.  At most
+	2 * jobs documents are held in memory at a time.  The URLs cannot
+	be None, because the workers cannot read stdin.  See
+	insert_from_url() for a description of the other arguments.
+	"""
+	import multiprocessing
+
+	urls = list(urls)
+	if None in urls:
+		raise ValueError("cannot read stdin in parallel")
+
+	pool = multiprocessing.Pool(jobs, _init_worker)
+	try:
+		# documents being parsed, in order
+		pending = collections.deque()
+		next_urls = iter(urls)
+		for url in itertools.islice(next_urls, 2 * jobs):
+			pending.append(pool.apply_async(_encode_url, (url, gz_threads)))
+		for n, url in enumerate(urls, 1):
+			data = pending.popleft().get()
+			for next_url in itertools.islice(next_urls, 1):
+				pending.append(pool.apply_async(_encode_url, (next_url, gz_threads)))
+			if verbose:
+				print >>sys.stderr, "%d/%d: inserting '%s' ..." % (n, len(urls), url)
+			_insert_from_loader(lambda: ligolw_utils.load_fileobj(cStringIO.StringIO(data), gz = False, contenthandler = contenthandler)[0], contenthandler, preserve_ids = preserve_ids, verbose = verbose)
+		pool.close()
+	except:
+		pool.terminate()
+		raise
+	finally:
+		pool.join()
+
+
 #
 # How to extract
 #
 
 
-def extract(connection, filename, table_names = None, verbose = False, xsl_file = None):
+def extract(connection, filename, table_names = None, verbose = False, xsl_file = None, gz_threads = 0):
 	"""
 	Convert the database at the given connection to a tabular LIGO
 	Light-Weight XML document.  The XML document is written to the file
 	named filename.  If table_names is not None, it should be a
 	sequence of strings and only the tables in that sequence will be
 	converted.  If verbose is True then progress messages will be
-	printed to stderr.
+	printed to stderr.  gz_threads is passed to
+	glue.ligolw.utils.write_filename().
 	"""
 	xmldoc = ligolw.Document()
 	xmldoc.appendChild(dbtables.get_xml(connection, table_names))
-	ligolw_utils.write_filename(xmldoc, filename, gz = (filename or "stdout").endswith(".gz"), verbose = verbose, xsl_file = xsl_file)
+	ligolw_utils.write_filename(xmldoc, filename, gz = (filename or "stdout").endswith(".gz"), verbose = verbose, xsl_file = xsl_file, gz_threads = gz_threads)
 
 	# delete cursors
 	xmldoc.unlink()
@@ -34,6 +34,7 @@ import sys
 import os
 
 import glue.segments
+from glue import segmentsUtils
 
 from glue.ligolw import ligolw
 from glue.ligolw import table
@@ -59,6 +60,23 @@ DIFF      = 'diff'
 
 
 
+def combine_segments(seglists, operation):
+    """
+    Combine a sequence of sorted segment iterables with the operation
+    (INTERSECT, UNION or DIFF, which subtracts the rest from the first)
+    in a single streaming pass.  Returns an iterator over the resulting
+    coalesced segments.
+    """
+    if operation == INTERSECT:
+        return segmentsUtils.iterintersection(*seglists)
+    elif operation == UNION:
+        return segmentsUtils.iterunion(*seglists)
+    elif operation == DIFF:
+        return segmentsUtils.iterdifference(seglists[0], segmentsUtils.iterunion(*seglists[1:]))
+    raise NameError("%s is not a known operation (intersect, union or diff)" % operation)
+
+
+
 def run_file_operation(outdoc, filenames, use_segment_table, operation, preserve = True):
     """
     Performs an operation (intersect or union) across a set of files.
@@ -91,24 +109,8 @@ def run_file_operation(outdoc, filenames, use_segment_table, operation, preserve
 
     # For each unique segment definer, find the intersection
     for ifo, name, version in segment_definers:
-        if operation == INTERSECT:
-            # If I were feeling especially functional-ist I'd write this
-            # with reduce()
-            result = glue.segments.segmentlist([glue.segments.segment(-glue.segments.infinity(), glue.segments.infinity())])
-            for xmldoc in xmldocs:
-                result &= find_segments(xmldoc, '%s:%s:%d' % (ifo, name, version), use_segment_table)
-        elif operation == UNION:
-            result = glue.segments.segmentlist([])
-
-            for xmldoc in xmldocs:
-                result |= find_segments(xmldoc, '%s:%s:%d' % (ifo, name, version), use_segment_table)
-        elif operation == DIFF:
-            result = find_segments(xmldocs[0], '%s:%s:%d' % (ifo, name, version), use_segment_table)
-            
-            for xmldoc in xmldocs[1:]:
-                result -= find_segments(xmldoc, '%s:%s:%d' % (ifo, name, version), use_segment_table)
-        else:
-            raise NameError ("%s is not a known operation (intersect, union or diff)" % operation)
+        seglists = [find_segments(xmldoc, '%s:%s:%d' % (ifo, name, version), use_segment_table) for xmldoc in xmldocs]
+        result = glue.segments.segmentlist(combine_segments(seglists, operation))
 
 
         # Add a segment definer for the result
@@ -153,28 +155,11 @@ def run_segment_operation(outdoc, filenames, segments, use_segment_table, operat
     else:
         indoc = ligolw_add.ligolw_add(ligolw.Document(), filenames)
 
-    # Start with a segment covering all of time, then
-    # intersect with each of the fields of interest
+    # Combine the fields of interest
     keys = segments.split(',')
 
-    if operation == INTERSECT:
-        sgmntlist = glue.segments.segmentlist([glue.segments.segment(-glue.segments.infinity(), glue.segments.infinity())])
-
-        for key in keys:
-            sgmntlist &= find_segments(indoc, key, use_segment_table)
-
-    elif operation == UNION:
-        sgmntlist = glue.segments.segmentlist([])
-
-        for key in keys:
-            sgmntlist |= find_segments(indoc, key, use_segment_table)
-    elif operation == DIFF:
-        sgmntlist = find_segments(indoc, keys[0], use_segment_table)
-
-        for key in keys[1:]:
-            sgmntlist -= find_segments(indoc, key, use_segment_table)
-    else:
-        raise NameError("%s is not a known operation (intersect, union or diff)" % operation)
+    seglists = [find_segments(indoc, key, use_segment_table) for key in keys]
+    sgmntlist = glue.segments.segmentlist(combine_segments(seglists, operation))
 
 
     # Add a segment definer and segments
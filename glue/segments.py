@@ -34,7 +34,9 @@
 
 """
 This module defines the segment and segmentlist objects, as well as the
-infinity object used to define semi-infinite and infinite segments.
+infinity object used to define semi-infinite and infinite segments.  The
+segmentarray object is a compact, array-backed alternative to segmentlist
+for very large lists.
 
 See also:
 
@@ -42,6 +44,7 @@ glue.segmentsUtils
 """
 
 
+from array import array as _array
 from bisect import bisect_left as _bisect_left
 from bisect import bisect_right as _bisect_right
 from copy import copy as _shallowcopy
@@ -548,6 +551,27 @@ class segmentlist(list):
 				return i
 		raise ValueError(item)
 
+	def find_many(self, times):
+		"""
+		Vectorized version of .find().  times is an array (or
+		anything numpy.asarray() accepts) of scalars.  Returns an
+		array of the same shape giving the index of the segment
+		containing each time, or -1 for times not contained in any
+		segment.  Sorted times are located in a single pass over
+		the list, otherwise each is located by bisection.  Requires
+		the segmentlist to be coalesced.  Requires numpy.
+		"""
+		return segmentarray(self).find_many(times)
+
+	def contains_many(self, times):
+		"""
+		Vectorized version of the "in" operator for scalars.
+		Returns a boolean array of the same shape as times that is
+		True where the time is contained in the segmentlist.  See
+		.find_many() for more information.
+		"""
+		return segmentarray(self).find_many(times) >= 0
+
 	# arithmetic operations that are sensible with segment lists
 
 	def __iand__(self, other):
@@ -774,6 +798,629 @@ class segmentlist(list):
 		return self
 
 
+#
+# =============================================================================
+#
+#                                 segmentarray
+#
+# =============================================================================
+#
+
+
+#
+# the extreme values of the 64-bit integer range are reserved to represent
+# -infinity and +infinity in "q" arrays
+#
+
+
+_INT64_MIN = -2**63
+_INT64_MAX = 2**63 - 1
+_FLOAT_INF = float("inf")
+
+
+#
+# truth tables for the boundary sweep.  bit (a << 1 | b) of the table is
+# set if the result is "on" when the first list's state is a and the
+# second list's state is b.
+#
+
+
+_SWEEP_OR = 0xe
+_SWEEP_AND = 0x8
+_SWEEP_SUB = 0x4
+_SWEEP_XOR = 0x6
+
+
+def _segmentarray_typecode(bounds, typecode = "q"):
+	"""
+	Return the narrowest segmentarray typecode, no narrower than
+	typecode, capable of storing the boundaries in the iterable
+	bounds.  "q" is sufficient if all the boundaries are integers in
+	the 64-bit range, "d" if they are integers and floats, otherwise
+	"O" is required.  Infinities can be stored in all three.
+	"""
+	if typecode == "O":
+		return typecode
+	for x in bounds:
+		if x is PosInfinity or x is NegInfinity:
+			continue
+		if isinstance(x, (int, long)):
+			if not _INT64_MIN < x < _INT64_MAX:
+				return "O"
+		elif isinstance(x, float):
+			typecode = "d"
+		else:
+			return "O"
+	return typecode
+
+
+def _segmentarray_store(x, typecode):
+	"""
+	Convert a boundary to its representation in a segmentarray of the
+	given typecode.
+	"""
+	if typecode == "O":
+		return x
+	if x is PosInfinity:
+		return _INT64_MAX if typecode == "q" else _FLOAT_INF
+	if x is NegInfinity:
+		return _INT64_MIN if typecode == "q" else -_FLOAT_INF
+	return int(x) if typecode == "q" else float(x)
+
+
+def _segmentarray_load(x, typecode):
+	"""
+	Inverse of _segmentarray_store().
+	"""
+	if typecode == "q":
+		if x == _INT64_MAX:
+			return PosInfinity
+		if x == _INT64_MIN:
+			return NegInfinity
+	elif typecode == "d":
+		if x == _FLOAT_INF:
+			return PosInfinity
+		if x == -_FLOAT_INF:
+			return NegInfinity
+	return x
+
+
+def _segmentarray_buffer(typecode, values = ()):
+	"""
+	Return a new boundary buffer of the given typecode, initialized
+	from values (which must already be in storage representation).
+	"""
+	if typecode == "d":
+		return _array("d", values)
+	if typecode == "q" and _array("l").itemsize == 8:
+		return _array("l", values)
+	return list(values)
+
+
+class segmentarray(object):
+	"""
+	The segmentarray class is an alternative to the segmentlist class
+	for very large lists of segments.  Instead of storing a segment
+	object for each interval, the lower and upper boundaries of the
+	segments are stored in two contiguous arrays, and segment objects
+	are only created when the caller indexes or iterates over the
+	segmentarray.  All set operations are performed by merging the
+	boundary arrays directly.
+
+	The boundaries are stored in one of three ways, identified by the
+	typecode attribute:  "q" stores 64-bit integers, "d" stores
+	double-precision floats, and "O" stores references to arbitrary
+	Python objects (e.g., LIGOTimeGPS).  If no typecode is given the
+	narrowest one capable of holding all of the boundaries is chosen.
+	Mixing integers and floats stores everything as floats.  In "q"
+	and "d" arrays infinite boundaries are stored as the extremes of
+	the integer range and as IEEE infinities respectively, and are
+	converted back to infinity objects when segments are
+	materialized.
+
+	Unlike segmentlist objects, segmentarray objects are always
+	coalesced:  the constructor coalesces its input, and all
+	operations preserve the coalesced state.  Consequently items
+	cannot be assigned, inserted or appended;  to modify a
+	segmentarray use the arithmetic operators.
+
+	Example:
+
+	>>> x = segmentarray([segment(0, 10), segment(20, 30), segment(5, 15)])
+	>>> x
+	segmentarray([segment(0, 15), segment(20, 30)])
+	>>> x.typecode
+	'q'
+	>>> x |= segmentlist([segment(15, 20)])
+	>>> x
+	segmentarray([segment(0, 30)])
+	>>> x -= segmentarray([segment(2.5, 5)])
+	>>> x
+	segmentarray([segment(0.0, 2.5), segment(5.0, 30.0)])
+	>>> 3 in x
+	False
+	>>> ~x
+	segmentarray([segment(-infinity, 0.0), segment(2.5, 5.0), segment(30.0, infinity)])
+	"""
+	__slots__ = ("_typecode", "_lo", "_hi")
+
+	def __init__(self, segs = (), typecode = None):
+		if isinstance(segs, segmentarray) and typecode in (None, segs._typecode):
+			self._typecode = segs._typecode
+			self._lo = _shallowcopy(segs._lo)
+			self._hi = _shallowcopy(segs._hi)
+			return
+		segs = segmentlist(segment(seg) for seg in segs).coalesce()
+		needed = _segmentarray_typecode(bound for seg in segs for bound in seg)
+		if typecode is None:
+			typecode = needed
+		elif typecode not in ("q", "d", "O"):
+			raise ValueError(typecode)
+		elif "qdO".index(typecode) < "qdO".index(needed):
+			raise TypeError("boundaries cannot be stored with typecode '%s'" % typecode)
+		self._typecode = typecode
+		self._lo = _segmentarray_buffer(typecode, (_segmentarray_store(lo, typecode) for lo, hi in segs))
+		self._hi = _segmentarray_buffer(typecode, (_segmentarray_store(hi, typecode) for lo, hi in segs))
+
+	@classmethod
+	def _new(cls, typecode, lo, hi):
+		"""
+		Construct a segmentarray directly from boundaries in
+		storage representation, which must describe a coalesced
+		list.
+		"""
+		self = object.__new__(cls)
+		self._typecode = typecode
+		self._lo = _segmentarray_buffer(typecode, lo)
+		self._hi = _segmentarray_buffer(typecode, hi)
+		return self
+
+	def _assign(self, other):
+		"""
+		Replace the contents of self with those of other.
+		"""
+		self._typecode = other._typecode
+		self._lo = other._lo
+		self._hi = other._hi
+		return self
+
+	def _bounds(self, typecode):
+		"""
+		Return the boundary arrays converted to the given typecode,
+		which must be at least as wide as self's.
+		"""
+		if typecode == self._typecode:
+			return self._lo, self._hi
+		convert = lambda x: _segmentarray_store(_segmentarray_load(x, self._typecode), typecode)
+		return map(convert, self._lo), map(convert, self._hi)
+
+	@property
+	def typecode(self):
+		"""
+		The typecode of the boundary arrays:  "q", "d" or "O".
+		"""
+		return self._typecode
+
+	# container methods
+
+	def __len__(self):
+		return len(self._lo)
+
+	def __nonzero__(self):
+		return bool(self._lo)
+
+	def __getitem__(self, i):
+		if isinstance(i, slice):
+			if i.step is not None and i.step < 0:
+				raise ValueError("segmentarray slices must have a positive step")
+			return self._new(self._typecode, self._lo[i], self._hi[i])
+		return segment(_segmentarray_load(self._lo[i], self._typecode), _segmentarray_load(self._hi[i], self._typecode))
+
+	def __iter__(self):
+		typecode = self._typecode
+		for lo, hi in zip(self._lo, self._hi):
+			yield segment(_segmentarray_load(lo, typecode), _segmentarray_load(hi, typecode))
+
+	def __repr__(self):
+		return "segmentarray(%s)" % repr(list(self))
+
+	def __eq__(self, other):
+		if not isinstance(other, (segmentarray, list, tuple)):
+			return NotImplemented
+		return list(self) == list(other)
+
+	def __ne__(self, other):
+		if not isinstance(other, (segmentarray, list, tuple)):
+			return NotImplemented
+		return list(self) != list(other)
+
+	__hash__ = None
+
+	def __reduce__(self):
+		return self.__class__, (list(self), self._typecode)
+
+	def __contains__(self, item):
+		"""
+		Returns True if the given object is wholly contained within
+		the segments in self.  item can be a scalar, a segment, or
+		a segmentlist or segmentarray, in which case each of its
+		segments must be contained in self.  For a scalar or a
+		segment this operation is O(log n).
+		"""
+		if isinstance(item, (segmentarray, segmentlist)):
+			return not (_segmentarray_coerce(item) - self)
+		try:
+			self.find(item)
+		except ValueError:
+			return False
+		return True
+
+	# supplementary accessors
+
+	def __abs__(self):
+		"""
+		Return the sum of the durations of all segments in self.
+		"""
+		if not self:
+			return 0
+		if self[0][0] is NegInfinity or self[-1][1] is PosInfinity:
+			return PosInfinity
+		return sum(hi - lo for lo, hi in zip(self._lo, self._hi))
+
+	def extent(self):
+		"""
+		Return the segment whose end-points denote the maximum and
+		minimum extent of the segmentarray.
+		"""
+		if not self:
+			raise ValueError("empty list")
+		return segment(self[0][0], self[-1][1])
+
+	def find(self, item):
+		"""
+		Return the index of the segment that wholly contains item.
+		Raises ValueError if no such segment exists.  This
+		operation is O(log n).
+		"""
+		if isinstance(item, segment):
+			lo, hi = _segmentarray_store_query(item[0], self._typecode), _segmentarray_store_query(item[1], self._typecode)
+			i = _bisect_left(self._hi, lo)
+			if i < len(self) and self._lo[i] <= lo and hi <= self._hi[i]:
+				return i
+		else:
+			x = _segmentarray_store_query(item, self._typecode)
+			i = _bisect_right(self._hi, x)
+			if i < len(self) and self._lo[i] <= x:
+				return i
+		raise ValueError(item)
+
+	def find_many(self, times):
+		"""
+		Vectorized version of .find() for scalars.  times is an
+		array (or anything numpy.asarray() accepts).  Returns an
+		array of the same shape giving the index of the segment
+		containing each time, or -1 for times not contained in any
+		segment.  Sorted times are located in a single pass over
+		the boundaries, otherwise each is located by bisection.
+		Requires numpy.
+		"""
+		return _segmentarray_find_many(self, times)
+
+	def contains_many(self, times):
+		"""
+		Vectorized version of the "in" operator for scalars.
+		Returns a boolean array of the same shape as times that is
+		True where the time is contained in the segmentarray.
+		"""
+		return _segmentarray_find_many(self, times) >= 0
+
+	# arithmetic operations
+
+	def __or__(self, other):
+		"""
+		Return the union of the segmentarray and another.  If the
+		two lists have lengths n and m respectively, this
+		operation is O(n + m).
+		"""
+		return _segmentarray_sweep(self, _segmentarray_coerce(other), _SWEEP_OR)
+
+	def __and__(self, other):
+		"""
+		Return the intersection of the segmentarray and another.
+		This operation is O(n + m).
+		"""
+		return _segmentarray_sweep(self, _segmentarray_coerce(other), _SWEEP_AND)
+
+	def __sub__(self, other):
+		"""
+		Return the difference between the segmentarray and
+		another.  This operation is O(n + m).
+		"""
+		return _segmentarray_sweep(self, _segmentarray_coerce(other), _SWEEP_SUB)
+
+	def __xor__(self, other):
+		"""
+		Return the segmentarray that is the list of all intervals
+		contained in exactly one of this and another list.  This
+		operation is O(n + m).
+		"""
+		return _segmentarray_sweep(self, _segmentarray_coerce(other), _SWEEP_XOR)
+
+	def __ior__(self, other):
+		return self._assign(self | other)
+
+	def __iand__(self, other):
+		return self._assign(self & other)
+
+	def __isub__(self, other):
+		return self._assign(self - other)
+
+	def __ixor__(self, other):
+		return self._assign(self ^ other)
+
+	# addition is union
+	__add__ = __or__
+	__iadd__ = __ior__
+
+	def __invert__(self):
+		"""
+		Return the segmentarray that is the inversion of the given
+		list.  This operation is O(n).
+		"""
+		typecode = self._typecode
+		neg = _segmentarray_store(NegInfinity, typecode)
+		pos = _segmentarray_store(PosInfinity, typecode)
+		lo = [neg] + list(self._hi)
+		hi = list(self._lo) + [pos]
+		if self and _segmentarray_load(self._lo[0], typecode) is NegInfinity:
+			del lo[0], hi[0]
+		if self and _segmentarray_load(self._hi[-1], typecode) is PosInfinity:
+			del lo[-1], hi[-1]
+		return self._new(typecode, lo, hi)
+
+	# other operations
+
+	def intersects_segment(self, other):
+		"""
+		Returns True if the intersection of self and the segment
+		other is not the null set, otherwise returns False.  The
+		algorithm is O(log n).
+		"""
+		lo = _segmentarray_store_query(other[0], self._typecode)
+		hi = _segmentarray_store_query(other[1], self._typecode)
+		i = _bisect_right(self._hi, lo)
+		return i < len(self) and self._lo[i] < hi
+
+	def intersects(self, other):
+		"""
+		Returns True if the intersection of self and the
+		segmentarray other is not the null set, otherwise returns
+		False.  The algorithm is O(n + m), but faster than
+		explicit calculation of the intersection.
+		"""
+		other = _segmentarray_coerce(other)
+		typecode = max(self._typecode, other._typecode, key = "qdO".index)
+		alo, ahi = self._bounds(typecode)
+		blo, bhi = other._bounds(typecode)
+		i = j = 0
+		while i < len(alo) and j < len(blo):
+			if ahi[i] <= blo[j]:
+				i += 1
+			elif bhi[j] <= alo[i]:
+				j += 1
+			else:
+				return True
+		return False
+
+	def coalesce(self):
+		"""
+		Does nothing:  segmentarray objects are always coalesced.
+		Provided for compatibility with segmentlist.
+		"""
+		return self
+
+	def protract(self, x):
+		"""
+		Execute the .protract() method on each segment in the list
+		and coalesce the result.  segmentarray is modified in place.
+		"""
+		return self._assign(_segmentarray_coerce([seg.protract(x) for seg in self], self._typecode))
+
+	def contract(self, x):
+		"""
+		Execute the .contract() method on each segment in the list
+		and coalesce the result.  segmentarray is modified in place.
+		"""
+		return self._assign(_segmentarray_coerce([seg.contract(x) for seg in self], self._typecode))
+
+	def shift(self, x):
+		"""
+		Execute the .shift() method on each segment in the list.
+		The algorithm is O(n).  segmentarray is modified in place.
+		"""
+		return self._assign(_segmentarray_coerce([seg.shift(x) for seg in self], self._typecode))
+
+
+def _segmentarray_coerce(segs, typecode = "q"):
+	"""
+	Return segs if it is a segmentarray, otherwise convert it to one
+	whose typecode is at least as wide as typecode.
+	"""
+	if isinstance(segs, segmentarray):
+		return segs
+	segs = segmentlist(segment(seg) for seg in segs).coalesce()
+	return segmentarray(segs, _segmentarray_typecode((bound for seg in segs for bound in seg), typecode))
+
+
+def _segmentarray_store_query(x, typecode):
+	"""
+	Convert a scalar to the representation against which it can be
+	compared with the boundaries in a segmentarray of the given
+	typecode.  Only infinities need converting.
+	"""
+	if x is PosInfinity or x is NegInfinity:
+		return _segmentarray_store(x, typecode)
+	return x
+
+
+def _segmentarray_sweep(a, b, table):
+	"""
+	Compute the segmentarray that is "on" wherever the bit of table
+	selected by the states of a and b is set, by merging the boundary
+	arrays of a and b in a single pass.
+	"""
+	typecode = max(a._typecode, b._typecode, key = "qdO".index)
+	alo, ahi = a._bounds(typecode)
+	blo, bhi = b._bounds(typecode)
+	na, nb = 2 * len(alo), 2 * len(blo)
+	lo, hi = [], []
+	state = 0
+	i = j = 0
+	while i < na or j < nb:
+		if i < na:
+			x = (alo, ahi)[i & 1][i >> 1]
+		if j < nb:
+			y = (blo, bhi)[j & 1][j >> 1]
+			if i >= na or y < x:
+				x = y
+		if i < na and not x < (alo, ahi)[i & 1][i >> 1]:
+			i += 1
+		if j < nb and not x < (blo, bhi)[j & 1][j >> 1]:
+			j += 1
+		new = (table >> ((i & 1) << 1 | (j & 1))) & 1
+		if new != state:
+			(lo if new else hi).append(x)
+			state = new
+	return a._new(typecode, lo, hi)
+
+
+def _segmentarray_find_many(self, times):
+	"""
+	Implementation of segmentarray.find_many().  If the times and the
+	boundaries are all integers they are compared as 64-bit integers,
+	otherwise numeric times are compared with the boundaries converted
+	to double-precision floats.  Other kinds of times (e.g.,
+	LIGOTimeGPS) are located one at a time.
+	"""
+	import numpy
+	times = numpy.asarray(times)
+	index = numpy.empty(times.shape, dtype = numpy.intp)
+	if times.dtype.kind not in "iubf":
+		for i, t in enumerate(times.flat):
+			try:
+				index.flat[i] = self.find(t)
+			except ValueError:
+				index.flat[i] = -1
+		return index
+	if times.dtype.kind in "iub" and self._typecode == "q":
+		dtype = numpy.int64
+		lo, hi = self._lo, self._hi
+	else:
+		dtype = numpy.float64
+		lo, hi = self._bounds("d")
+	times = times.astype(dtype)
+	lo = numpy.array(lo, dtype = dtype)
+	hi = numpy.array(hi, dtype = dtype)
+	# index of the first segment whose upper bound is > t;  t is in
+	# that segment if the segment exists and its lower bound is <= t
+	index[...] = numpy.searchsorted(hi, times, side = "right")
+	inside = index < len(hi)
+	inside[inside] = lo[index[inside]] <= times[inside]
+	index[~inside] = -1
+	return index
+
+
+#
+# =============================================================================
+#
+#                                 Coincidence
+#
+# =============================================================================
+#
+
+
+def coincidence_sweep(seglists, livetimes = False):
+	"""
+	Sweep once over the boundaries of a sequence of coalesced
+	segmentlists, counting how many of them are "on" at each instant.
+	Returns a tuple (exactly, at_least, livetime).  exactly and at_least
+	are dictionaries mapping each count k from 1 to the number of
+	segmentlists to the coalesced segmentlist of times when exactly k,
+	or at least k, of the segmentlists are on.  If livetimes is True,
+	livetime is a dictionary mapping each tuple of the indexes of the
+	segmentlists that are on together to the total time during which
+	exactly that combination is on, otherwise livetime is None.
+
+	Example:
+
+	>>> w = segmentlist([segment(0, 15)])
+	>>> x = segmentlist([segment(5, 20)])
+	>>> y = segmentlist([segment(10, 25)])
+	>>> exactly, at_least, livetime = coincidence_sweep((w, x, y), livetimes = True)
+	>>> exactly[2]
+	[segment(5, 10), segment(15, 20)]
+	>>> at_least[2]
+	[segment(5, 20)]
+	>>> livetime[(0, 1, 2)]
+	5
+
+	If there are a total of N segments in M segmentlists the algorithm
+	is O(N log N), plus O(M) for each change in the set of segmentlists
+	that are on if livetimes are being computed.
+	"""
+	events = []
+	n = 0
+	for seglist in seglists:
+		for lo, hi in seglist:
+			events.append((lo, 1, n))
+			events.append((hi, -1, n))
+		n += 1
+	events.sort()
+
+	exactly = dict((k, segmentlist()) for k in range(1, n + 1))
+	at_least = dict((k, segmentlist()) for k in range(1, n + 1))
+	livetime = {} if livetimes else None
+
+	depth = [0] * n
+	starts = [None] * (n + 1)
+	count = 0
+	key = ()
+	i = 0
+	while i < len(events):
+		# apply all the transitions at this boundary, remembering
+		# the initial state of each list that's touched
+		bound = events[i][0]
+		touched = {}
+		while i < len(events) and events[i][0] == bound:
+			_, delta, j = events[i]
+			touched.setdefault(j, depth[j] > 0)
+			depth[j] += delta
+			i += 1
+		changed = [j for j, was_on in touched.items() if (depth[j] > 0) != was_on]
+		if not changed:
+			continue
+		old = count
+		count += sum(1 if depth[j] > 0 else -1 for j in changed)
+
+		# record the segments that end here, and note the start
+		# of those that begin here
+		if count != old:
+			if old:
+				exactly[old].append(segment(starts[0], bound))
+			starts[0] = bound
+			for k in range(count + 1, old + 1):
+				at_least[k].append(segment(starts[k], bound))
+			for k in range(old + 1, count + 1):
+				starts[k] = bound
+		if livetime is not None:
+			if key:
+				livetime[key] = livetime[key] + (bound - key_start) if key in livetime else bound - key_start
+			key = tuple(j for j in range(n) if depth[j] > 0)
+			key_start = bound
+
+	return exactly, at_least, livetime
+
+
 #
 # =============================================================================
 #
@@ -811,8 +1458,10 @@ class _offsets(dict):
 			dict.__setitem__(self, key, value)
 			return
 		if delta:
-			self.__parent[key].shift(delta)
+			if not self.__parent.lazy_offsets:
+				dict.__getitem__(self.__parent, key).shift(delta)
 			dict.__setitem__(self, key, self[key] + delta)
+			self.__parent._index = None
 
 	def update(self, d):
 		"""
@@ -847,6 +1496,101 @@ class _offsets(dict):
 		raise NotImplementedError
 
 
+class _segmentlistdict_index(object):
+	"""
+	A static centred interval tree over the segments in a
+	segmentlistdict, used to find the keys whose segmentlists are "on"
+	at an instant or during a segment without visiting every key.  Not
+	intended for use outside of the segmentlistdict class.
+
+	Each node is a tuple (centre, left, right, by_lo, by_hi).  The
+	segments stored at a node are those containing the centre, as
+	(lo, hi, key, index) tuples sorted by increasing lower bound in
+	by_lo and by decreasing upper bound in by_hi.  left and right are
+	the sub-trees of the segments entirely below and above the centre.
+	If the segmentlists are coalesced, a segmentlistdict holding a
+	total of N segments is queried in O(log N + k) time, where k is the
+	number of keys reported.
+	"""
+	__slots__ = ("root",)
+
+	def __init__(self, seglistdict):
+		intervals = [(seg[0], seg[1], key, i) for key, seglist in seglistdict.iteritems() for i, seg in enumerate(seglist) if seg[0] != seg[1]]
+		intervals.sort(key = lambda interval: interval[0])
+		self.root = self._build(intervals)
+
+	@classmethod
+	def _build(cls, intervals):
+		# intervals is sorted by lower bound, and the partitions
+		# preserve the order.  using the median lower bound as the
+		# centre guarantees at least one segment is stored at each
+		# node
+		if not intervals:
+			return None
+		centre = intervals[len(intervals) // 2][0]
+		left, here, right = [], [], []
+		for interval in intervals:
+			if interval[1] <= centre:
+				left.append(interval)
+			elif interval[0] > centre:
+				right.append(interval)
+			else:
+				here.append(interval)
+		by_hi = sorted(here, key = lambda interval: interval[1], reverse = True)
+		return centre, cls._build(left), cls._build(right), here, by_hi
+
+	def stab(self, x):
+		"""
+		Generate the (lo, hi, key, index) tuples of the segments
+		containing x.
+		"""
+		node = self.root
+		while node is not None:
+			centre, left, right, by_lo, by_hi = node
+			if x < centre:
+				for interval in by_lo:
+					if interval[0] > x:
+						break
+					yield interval
+				node = left
+			else:
+				for interval in by_hi:
+					if interval[1] <= x:
+						break
+					yield interval
+				node = right
+
+	def overlap(self, seg):
+		"""
+		Generate the (lo, hi, key, index) tuples of the segments
+		that intersect seg.
+		"""
+		lo, hi = seg
+		nodes = [self.root]
+		while nodes:
+			node = nodes.pop()
+			if node is None:
+				continue
+			centre, left, right, by_lo, by_hi = node
+			if hi <= centre:
+				for interval in by_lo:
+					if interval[0] >= hi:
+						break
+					yield interval
+				nodes.append(left)
+			elif lo >= centre:
+				for interval in by_hi:
+					if interval[1] <= lo:
+						break
+					yield interval
+				nodes.append(right)
+			else:
+				for interval in by_lo:
+					yield interval
+				nodes.append(left)
+				nodes.append(right)
+
+
 class segmentlistdict(dict):
 	"""
 	A dictionary associating a unique label and numeric offset with
@@ -888,10 +1632,32 @@ class segmentlistdict(dict):
 	>>> c.offsets.clear()
 	>>> c
 	{'H2': [segment(6.0, 15)], 'H1': [segment(0.0, 9.0)]}
+
+	Normally assigning an offset shifts the segments in the list
+	immediately.  If the lazy_offsets attribute is set to True the
+	segmentlists are instead stored unshifted, changing an offset costs
+	nothing, and the offsets are applied when the segmentlists are
+	retrieved or queried.  This is much faster when sweeping through
+	many offset vectors, for example in a time-slide analysis.  In this
+	mode retrieving a segmentlist whose offset is not 0 returns a
+	shifted copy, so modifying it in place has no effect on the
+	segmentlistdict unless it is assigned back.
+
+	Example:
+
+	>>> x = segmentlistdict({"H1": segmentlist([segment(0, 10)])})
+	>>> x.lazy_offsets = True
+	>>> x.offsets["H1"] = 6
+	>>> x
+	{'H1': [segment(6.0, 16.0)]}
+	>>> x.keys_at(15)
+	['H1']
 	"""
 	def __new__(cls, *args):
 		self = dict.__new__(cls, *args)
 		self.offsets = _offsets(self)
+		self._index = None
+		self._lazy_offsets = False
 		return self
 
 	def __init__(self, *args):
@@ -901,6 +1667,15 @@ class segmentlistdict(dict):
 			dict.__setitem__(self.offsets, key, 0.0)
 		if args and isinstance(args[0], self.__class__):
 			dict.update(self.offsets, args[0].offsets)
+			# the segmentlists have been copied as stored
+			self._lazy_offsets = args[0].lazy_offsets
+
+	def __reduce__(self):
+		# the segmentlists are pickled as stored, and the offsets
+		# and mode restored afterwards
+		state = self.__dict__.copy()
+		state["_index"] = None
+		return self.__class__, (), state, None, dict.iteritems(self)
 
 	def copy(self, keys = None):
 		"""
@@ -941,24 +1716,130 @@ class segmentlistdict(dict):
 		if keys is None:
 			keys = self
 		new = self.__class__()
+		new._lazy_offsets = self.lazy_offsets
 		for key in keys:
-			new[key] = _shallowcopy(self[key])
+			dict.__setitem__(new, key, _shallowcopy(dict.__getitem__(self, key)))
 			dict.__setitem__(new.offsets, key, self.offsets[key])
 		return new
 
+	@property
+	def lazy_offsets(self):
+		"""
+		If True, offsets are recorded without shifting the stored
+		segmentlists and applied when they are retrieved.  Setting
+		this shifts the stored segmentlists to or from their
+		unshifted positions, so the segmentlists seen through the
+		segmentlistdict are unchanged.
+		"""
+		return getattr(self, "_lazy_offsets", False)
+
+	@lazy_offsets.setter
+	def lazy_offsets(self, value):
+		value = bool(value)
+		if value != self.lazy_offsets:
+			for key, offset in self.offsets.iteritems():
+				if offset:
+					dict.__getitem__(self, key).shift(-offset if value else offset)
+			self._lazy_offsets = value
+			self._index = None
+
+	def _shifted(self, key, value):
+		# value is the stored segmentlist for key;  return it as
+		# seen through the segmentlistdict
+		if self.lazy_offsets:
+			offset = dict.__getitem__(self.offsets, key)
+			if offset:
+				return _shallowcopy(value).shift(offset)
+		return value
+
+	def __getitem__(self, key):
+		return self._shifted(key, dict.__getitem__(self, key))
+
+	def get(self, key, default = None):
+		return self[key] if key in self else default
+
+	def values(self):
+		return list(self.itervalues())
+
+	def itervalues(self):
+		for key, value in dict.iteritems(self):
+			yield self._shifted(key, value)
+
+	def items(self):
+		return list(self.iteritems())
+
+	def iteritems(self):
+		for key, value in dict.iteritems(self):
+			yield key, self._shifted(key, value)
+
+	def __repr__(self):
+		if self.lazy_offsets:
+			return repr(dict(self.iteritems()))
+		return dict.__repr__(self)
+
+	def __eq__(self, other):
+		if not isinstance(other, dict):
+			return NotImplemented
+		return dict(self.iteritems()) == dict(other.iteritems())
+
+	def __ne__(self, other):
+		if not isinstance(other, dict):
+			return NotImplemented
+		return not self.__eq__(other)
+
 	def __setitem__(self, key, value):
 		"""
 		Set the segmentlist associated with a key.  If key is not
 		already in the dictionary, the corresponding offset is
-		initialized to 0.0, otherwise it is left unchanged.
+		initialized to 0.0, otherwise it is left unchanged.  If
+		lazy_offsets is True and the offset is not 0, a copy of the
+		segmentlist shifted to its unshifted position is stored.
 		"""
-		dict.__setitem__(self, key, value)
 		if key not in self.offsets:
 			dict.__setitem__(self.offsets, key, 0.0)
+		elif self.lazy_offsets and self.offsets[key]:
+			value = _shallowcopy(value).shift(-self.offsets[key])
+		dict.__setitem__(self, key, value)
+		self._index = None
 
 	def __delitem__(self, key):
 		dict.__delitem__(self, key)
 		dict.__delitem__(self.offsets, key)
+		self._index = None
+
+	# index
+
+	def build_index(self):
+		"""
+		Build an interval tree over the segments in all the
+		segmentlists, which .keys_at(), .keys_intersecting(),
+		.find() and .intersects_segment() then use to answer
+		queries in O(log N + k) time instead of visiting every key
+		(N is the total number of segments, k the number of keys
+		reported).  The segmentlists must be coalesced.  The index
+		is discarded when the segmentlistdict is modified through
+		its own methods, including changes to the offsets, but
+		changes made directly to the segmentlists it contains are
+		not detected:  call .build_index() again after making them.
+		Returns self.
+
+		Example:
+
+		>>> x = segmentlistdict()
+		>>> x["H1"] = segmentlist([segment(0, 10)])
+		>>> x["H2"] = segmentlist([segment(5, 15)])
+		>>> x.build_index().keys_at(12)
+		['H2']
+		"""
+		self._index = _segmentlistdict_index(self)
+		return self
+
+	@property
+	def indexed(self):
+		"""
+		True if an index built by .build_index() is in use.
+		"""
+		return getattr(self, "_index", None) is not None
 
 	# supplementary accessors
 
@@ -1017,8 +1898,38 @@ class segmentlistdict(dict):
 		NOTE:  all segmentlists must contain the item or KeyError
 		is raised.
 		"""
+		# empty segments at the upper bound of a segment are
+		# contained in it, but not found by stabbing the index
+		if self.indexed and not (isinstance(item, segment) and item[0] == item[1]):
+			if isinstance(item, segment):
+				result = dict((key, i) for lo, hi, key, i in self._index.stab(item[0]) if item[1] <= hi)
+			else:
+				result = dict((key, i) for lo, hi, key, i in self._index.stab(item))
+			if len(result) != len(self):
+				raise ValueError(item)
+			return result
+		if self.lazy_offsets:
+			return dict((key, value.find(item - self.offsets[key] if not isinstance(item, segment) else item.shift(-self.offsets[key]))) for key, value in dict.iteritems(self))
 		return self.map(lambda x: x.find(item))
 
+	def find_many(self, times):
+		"""
+		Return a dictionary of the results of running .find_many()
+		on each of the segmentlists.  The times are converted to an
+		array once and shared by all the lists.  Requires numpy.
+		"""
+		import numpy
+		times = numpy.asarray(times)
+		return self.map(lambda x: segmentarray(x).find_many(times))
+
+	def contains_many(self, times):
+		"""
+		Return a dictionary of the results of running
+		.contains_many() on each of the segmentlists.  Requires
+		numpy.
+		"""
+		return dict((key, index >= 0) for key, index in self.find_many(times).iteritems())
+
 	def keys_at(self, x):
 		"""
 		Return a list of the keys for the segment lists that
@@ -1032,8 +1943,31 @@ class segmentlistdict(dict):
 		>>> x.keys_at(12)
 		['H2']
 		"""
+		if self.indexed:
+			return [key for lo, hi, key, i in self._index.stab(x)]
+		if self.lazy_offsets:
+			return [key for key, segs in dict.iteritems(self) if x - self.offsets[key] in segs]
 		return [key for key, segs in self.items() if x in segs]
 
+	def keys_intersecting(self, seg):
+		"""
+		Return a list of the keys for the segment lists that
+		intersect the segment seg.
+
+		Example:
+
+		>>> x = segmentlistdict()
+		>>> x["H1"] = segmentlist([segment(0, 10)])
+		>>> x["H2"] = segmentlist([segment(5, 15)])
+		>>> x.keys_intersecting(segment(10, 20))
+		['H2']
+		"""
+		if self.indexed:
+			return list(set(key for lo, hi, key, i in self._index.overlap(seg)))
+		if self.lazy_offsets:
+			return [key for key, segs in dict.iteritems(self) if segs.intersects_segment(seg.shift(-self.offsets[key]))]
+		return [key for key, segs in self.items() if segs.intersects_segment(seg)]
+
 	# list-by-list arithmetic
 
 	def __iand__(self, other):
@@ -1089,7 +2023,7 @@ class segmentlistdict(dict):
 
 	def __invert__(self):
 		new = self.copy()
-		for key, value in new.items():
+		for key, value in dict.items(new):
 			dict.__setitem__(new, key, ~value)
 		return new
 
@@ -1100,6 +2034,10 @@ class segmentlistdict(dict):
 		Returns True if any segmentlist in self intersects the
 		segment, otherwise returns False.
 		"""
+		if self.indexed:
+			return any(True for interval in self._index.overlap(seg))
+		if self.lazy_offsets:
+			return any(value.intersects_segment(seg.shift(-self.offsets[key])) for key, value in dict.iteritems(self))
 		return any(value.intersects_segment(seg) for value in self.itervalues())
 
 	def intersects(self, other):
@@ -1161,30 +2099,36 @@ class segmentlistdict(dict):
 			if key not in self:
 				self[key] = _shallowcopy(value)
 			else:
-				self[key].extend(value)
+				seglist = self[key]
+				seglist.extend(value)
+				self[key] = seglist
+		self._index = None
 
 	def coalesce(self):
 		"""
 		Run .coalesce() on all segmentlists.
 		"""
-		for value in self.itervalues():
+		for value in dict.itervalues(self):
 			value.coalesce()
+		self._index = None
 		return self
 
 	def contract(self, x):
 		"""
 		Run .contract(x) on all segmentlists.
 		"""
-		for value in self.itervalues():
+		for value in dict.itervalues(self):
 			value.contract(x)
+		self._index = None
 		return self
 
 	def protract(self, x):
 		"""
 		Run .protract(x) on all segmentlists.
 		"""
-		for value in self.itervalues():
+		for value in dict.itervalues(self):
 			value.protract(x)
+		self._index = None
 		return self
 
 	def extract_common(self, keys):
@@ -1257,6 +2201,37 @@ class segmentlistdict(dict):
 			seglist |= self[key]
 		return seglist
 
+	def coincidences(self, keys = None, livetimes = False):
+		"""
+		Count, in a single pass over the boundaries, how many of the
+		segmentlists are on at each instant.  Returns a tuple
+		(exactly, at_least, livetime).  exactly and at_least are
+		dictionaries mapping each count k to the segmentlist of
+		times when exactly k, or at least k, of the segmentlists are
+		on.  If livetimes is True, livetime is a dictionary mapping
+		each frozenset of keys to the total time during which
+		exactly those segmentlists are on, otherwise it is None.
+		If keys is not None only the segmentlists for those keys are
+		considered.  The segmentlists must be coalesced.  See also
+		coincidence_sweep().
+
+		Example:
+
+		>>> x = segmentlistdict()
+		>>> x["H1"] = segmentlist([segment(0, 10)])
+		>>> x["L1"] = segmentlist([segment(5, 15)])
+		>>> exactly, at_least, livetime = x.coincidences(livetimes = True)
+		>>> at_least[2]
+		[segment(5, 10)]
+		>>> livetime[frozenset(["H1", "L1"])]
+		5
+		"""
+		keys = self.keys() if keys is None else list(keys)
+		exactly, at_least, livetime = coincidence_sweep([self[key] for key in keys], livetimes)
+		if livetime is not None:
+			livetime = dict((frozenset(keys[i] for i in on), value) for on, value in livetime.items())
+		return exactly, at_least, livetime
+
 
 #
 # =============================================================================
@@ -1267,8 +2242,10 @@ class segmentlistdict(dict):
 #
 
 
+# the C extension also provides glue.lal's LIGOTimeGPS, which is not to be
+# exported from here, so import the names explicitly
 try:
-	from __segments import *
+	from __segments import infinity, NegInfinity, PosInfinity, segment, segmentlist, segmentarray, coincidence_sweep
 except ImportError:
 	pass
 
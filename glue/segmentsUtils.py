@@ -116,12 +116,12 @@ def fromlalcache(cachefile, coltype = int):
 #
 
 
-def fromsegwizard(file, coltype = int, strict = True):
+def iterfromsegwizard(file, coltype = int, strict = True):
 	"""
-	Read a segmentlist from the file object file containing a segwizard
-	compatible segment list.  Parsing stops on the first line that
-	cannot be parsed (which is consumed).  The segmentlist will be
-	created with segment whose boundaries are of type coltype, which
+	Generate the segments in the file object file containing a
+	segwizard compatible segment list, as they are read.  Parsing stops
+	on the first line that cannot be parsed (which is consumed).  The
+	segments will be created with boundaries of type coltype, which
 	should raise ValueError if it cannot convert its string argument.
 	Two-column, three-column, and four-column segwizard files are
 	recognized, but the entire file must be in the same format, which
@@ -129,17 +129,16 @@ def fromsegwizard(file, coltype = int, strict = True):
 	file is in three- or four-column format, then each segment's
 	duration is checked against that column in the input file.
 
-	NOTE:  the output is a segmentlist as described by the file;  if
-	the segments in the input file are not coalesced or out of order,
-	then thusly shall be the output of this function.  It is
-	recommended that this function's output be coalesced before use.
+	NOTE:  the segments are generated in the order they appear in the
+	file;  if the file is sorted the output can be passed to the
+	streaming segment algebra functions, for example itercoalesce(),
+	without reading the whole file into memory.
 	"""
 	commentpat = re.compile(r"\s*([#;].*)?\Z", re.DOTALL)
 	twocolsegpat = re.compile(r"\A\s*([\d.+-eE]+)\s+([\d.+-eE]+)\s*\Z")
 	threecolsegpat = re.compile(r"\A\s*([\d.+-eE]+)\s+([\d.+-eE]+)\s+([\d.+-eE]+)\s*\Z")
 	fourcolsegpat = re.compile(r"\A\s*([\d]+)\s+([\d.+-eE]+)\s+([\d.+-eE]+)\s+([\d.+-eE]+)\s*\Z")
 	format = None
-	l = segments.segmentlist()
 	for line in file:
 		line = commentpat.split(line)[0]
 		if not line:
@@ -171,8 +170,29 @@ def fromsegwizard(file, coltype = int, strict = True):
 				format = this_line_format
 			elif format != this_line_format:
 				raise ValueError("segment '%s' format mismatch" % line)
-		l.append(seg)
-	return l
+		yield seg
+
+
+def fromsegwizard(file, coltype = int, strict = True):
+	"""
+	Read a segmentlist from the file object file containing a segwizard
+	compatible segment list.  Parsing stops on the first line that
+	cannot be parsed (which is consumed).  The segmentlist will be
+	created with segment whose boundaries are of type coltype, which
+	should raise ValueError if it cannot convert its string argument.
+	Two-column, three-column, and four-column segwizard files are
+	recognized, but the entire file must be in the same format, which
+	is decided by the first parsed line.  If strict is True and the
+	file is in three- or four-column format, then each segment's
+	duration is checked against that column in the input file.
+
+	NOTE:  the output is a segmentlist as described by the file;  if
+	the segments in the input file are not coalesced or out of order,
+	then thusly shall be the output of this function.  It is
+	recommended that this function's output be coalesced before use.
+	See also iterfromsegwizard().
+	"""
+	return segments.segmentlist(iterfromsegwizard(file, coltype = coltype, strict = strict))
 
 
 def tosegwizard(file, seglist, header = True, coltype = int):
@@ -181,7 +201,9 @@ def tosegwizard(file, seglist, header = True, coltype = int):
 	segwizard compatible format.  If header is True, then the output
 	will begin with a comment line containing column names.  The
 	segment boundaries will be coerced to type coltype and then passed
-	to str() before output.
+	to str() before output.  seglist can be any iterable of segments,
+	for example a generator from one of the streaming segment algebra
+	functions, and is only iterated over once.
 	"""
 	if header:
 		print >>file, "# seg\tstart    \tstop     \tduration"
@@ -496,74 +518,171 @@ def vote(seglists, n):
 	The sequence of segmentlists is only iterated over once, and the
 	segmentlists within it are only iterated over once;  they can all
 	be generators.  If there are a total of N segments in M segment
-	lists and the final result has L segments the algorithm is O(N M) +
-	O(L).
+	lists the algorithm is O(N log N).  See also
+	glue.segments.coincidence_sweep(), which computes the result for
+	all n in a single pass.
 	"""
-	# check for no-op
-
 	if n < 1:
 		return segments.segmentlist()
+	return segments.coincidence_sweep(seglists)[1].get(n, segments.segmentlist())
 
-	# digest the segmentlists into an ordered sequence of off-on and
-	# on-off transitions with the vote count for each transition
-	# FIXME:  this generator is declared locally for now, is it useful
-	# as a stand-alone generator?
-
-	def pop_min(l):
-		# remove and return the smallest value from a list
-		val = min(l)
-		for i in xrange(len(l) - 1, -1, -1):
-			if l[i] is val:
-				return l.pop(i)
-		assert False	# cannot get here
-
-	def vote_generator(seglists):
-		queue = []
-		for seglist in seglists:
-			segiter = iter(seglist)
-			try:
-				seg = segiter.next()
-			except StopIteration:
-				continue
-			# put them in so that the smallest boundary is
-			# closest to the end of the list
-			queue.append((seg[1], -1, segiter))
-			queue.append((seg[0], +1, None))
-		if not queue:
-			return
-		queue.sort(reverse = True)
-		bound = queue[-1][0]
-		votes = 0
-		while queue:
-			this_bound, delta, segiter = pop_min(queue)
-			if this_bound == bound:
-				votes += delta
+
+
+#
+# =============================================================================
+#
+#                           Streaming Segment Algebra
+#
+# =============================================================================
+#
+
+
+#
+# These operate on iterables of segments sorted by lower bound, for
+# example generators reading segments from a file, and yield their results
+# as they are computed.  Regardless of the lengths of the inputs they use a
+# fixed amount of memory, and their outputs are coalesced.  Segments found
+# out of order raise ValueError.
+#
+
+
+def itercoalesce(segs):
+	"""
+	Generate the segments of the coalesced union of the segments in the
+	iterable segs, which must be sorted by lower bound.
+
+	Example:
+
+	>>> from glue.segments import *
+	>>> list(itercoalesce([segment(0, 10), segment(5, 15), segment(15, 20), segment(30, 40)]))
+	[segment(0, 20), segment(30, 40)]
+
+	Zero-length segments are discarded, as by segmentlist.coalesce().
+
+	>>> list(itercoalesce([segment(3, 3)]))
+	[]
+	>>> list(iterunion([], [segment(15, 15)], [segment(41, 50)]))
+	[segment(41, 50)]
+	"""
+	last = lo = hi = None
+	for a, b in segs:
+		if last is not None and a < last:
+			raise ValueError("segment %s out of order" % repr(segments.segment(a, b)))
+		last = a
+		if a == b:
+			continue
+		if lo is None:
+			lo, hi = a, b
+		elif a > hi:
+			yield segments.segment(lo, hi)
+			lo, hi = a, b
+		elif b > hi:
+			hi = b
+		# segments that touch are merged, like segmentlist.coalesce()
+	if lo is not None:
+		yield segments.segment(lo, hi)
+
+
+def iterunion(*iterables):
+	"""
+	Generate the segments of the union of the iterables of segments,
+	each of which must be sorted by lower bound.  The iterables are
+	merged with glue.iterutils.inorder().
+
+	Example:
+
+	>>> from glue.segments import *
+	>>> list(iterunion([segment(0, 10), segment(20, 30)], [segment(5, 25)]))
+	[segment(0, 30)]
+	"""
+	return itercoalesce(iterutils.inorder(*iterables))
+
+
+def _iterintersection(a, b):
+	# the intersection of two coalesced segment iterators
+	for x in a:
+		break
+	else:
+		return
+	for y in b:
+		break
+	else:
+		return
+	while True:
+		lo = max(x[0], y[0])
+		hi = min(x[1], y[1])
+		if lo < hi:
+			yield segments.segment(lo, hi)
+		try:
+			if x[1] <= y[1]:
+				x = a.next()
 			else:
-				yield bound, votes
-				bound = this_bound
-				votes = delta
-			if segiter is not None:
-				try:
-					seg = segiter.next()
-				except StopIteration:
-					continue
-				queue.append((seg[1], -1, segiter))
-				queue.append((seg[0], +1, None))
-		yield bound, votes
-
-	# compute the cumulative sum of votes, and assemble a segmentlist
-	# from the intervals when the vote count is equal to or greater
-	# than n
-
-	result = segments.segmentlist()
-	votes = 0
-	for bound, delta in vote_generator(seglists):
-		if delta > 0 and n - delta <= votes < n:
-			start = bound
-		elif delta < 0 and n <= votes < n - delta:
-			result.append(segments.segment(start, bound))
-			del start	# detect stops that aren't preceded by starts
-		votes += delta
-	assert votes == 0	# detect failed cumulative sum
+				y = b.next()
+		except StopIteration:
+			return
+
+
+def iterintersection(*iterables):
+	"""
+	Generate the segments of the intersection of the iterables of
+	segments, each of which must be sorted by lower bound.  With no
+	iterables the result is empty.
+
+	Example:
 
+	>>> from glue.segments import *
+	>>> list(iterintersection([segment(0, 10), segment(20, 30)], [segment(5, 25)]))
+	[segment(5, 10), segment(20, 25)]
+	"""
+	if not iterables:
+		return iter(())
+	result = itercoalesce(iterables[0])
+	for segs in iterables[1:]:
+		result = _iterintersection(result, itercoalesce(segs))
 	return result
+
+
+def iterdifference(segs1, segs2):
+	"""
+	Generate the segments of the difference segs1 - segs2 of two
+	iterables of segments, each of which must be sorted by lower bound.
+
+	Example:
+
+	>>> from glue.segments import *
+	>>> list(iterdifference([segment(0, 10), segment(20, 30)], [segment(5, 25)]))
+	[segment(0, 5), segment(25, 30)]
+	"""
+	segs2 = itercoalesce(segs2)
+	y = next(segs2, None)
+	for lo, hi in itercoalesce(segs1):
+		# skip segments of segs2 below this one
+		while y is not None and y[1] <= lo:
+			y = next(segs2, None)
+		# cut out the segments of segs2 that overlap this one
+		while y is not None and y[0] < hi:
+			if y[0] > lo:
+				yield segments.segment(lo, y[0])
+			if y[1] >= hi:
+				# y might overlap the next segment too
+				lo = hi
+				break
+			lo = y[1]
+			y = next(segs2, None)
+		if lo < hi:
+			yield segments.segment(lo, hi)
+
+
+def itercomplement(segs, extent = segments.segment(-segments.infinity(), segments.infinity())):
+	"""
+	Generate the segments of the complement of the iterable of
+	segments segs, which must be sorted by lower bound, within the
+	segment extent (the default is all of time).
+
+	Example:
+
+	>>> from glue.segments import *
+	>>> list(itercomplement([segment(0, 10), segment(20, 30)], segment(-5, 25)))
+	[segment(-5, 0), segment(10, 20)]
+	"""
+	return iterdifference([extent], segs)
@@ -147,8 +147,12 @@ setup(
       [
         "src/segments/segments.c",
         "src/segments/infinity.c",
+        "src/segments/LIGOTimeGPS.c",
         "src/segments/segment.c",
-        "src/segments/segmentlist.c"
+        "src/segments/segmentlist.c",
+        "src/segments/segmentarray.c",
+        "src/segments/coincidence.c",
+        "src/segments/cache.c"
       ],
       include_dirs = [ "src/segments" ]
     )
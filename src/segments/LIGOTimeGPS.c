@@ -0,0 +1,1037 @@
+/*
+ * Copyright (C) 2006--2008,2010--2013  Kipp C. Cannon
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms of the GNU General Public License as published by the
+ * Free Software Foundation; either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful, but
+ * WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License along
+ * with this program; if not, write to the Free Software Foundation, Inc.,
+ * 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+ */
+
+
+/*
+ * ============================================================================
+ *
+ *              Segments Module Component --- LIGOTimeGPS Class
+ *
+ * ============================================================================
+ */
+
+
+#include <Python.h>
+#include <ctype.h>
+#include <limits.h>
+#include <math.h>
+#include <stdio.h>
+#include <string.h>
+
+
+#include <segments.h>
+
+
+/*
+ * ============================================================================
+ *
+ *                             LIGOTimeGPS Class
+ *
+ * ============================================================================
+ */
+
+
+#define GIGA 1000000000L
+
+
+/*
+ * Utilities
+ */
+
+
+static int segments_LIGOTimeGPS_Check(PyObject *obj)
+{
+	return obj ? PyObject_TypeCheck(obj, &segments_LIGOTimeGPS_Type) : 0;
+}
+
+
+static PyObject *int_from_long_long(long long x)
+{
+	if(x >= LONG_MIN && x <= LONG_MAX)
+		return PyInt_FromLong(x);
+	return PyLong_FromLongLong(x);
+}
+
+
+static int overflow(void)
+{
+	PyErr_SetString(PyExc_OverflowError, "LIGOTimeGPS overflow");
+	return -1;
+}
+
+
+/* *result = a + b, or OverflowError */
+
+
+static int add_long_long(long long a, long long b, long long *result)
+{
+	if((b > 0 && a > LLONG_MAX - b) || (b < 0 && a < LLONG_MIN - b))
+		return overflow();
+	*result = a + b;
+	return 0;
+}
+
+
+/*
+ * The count of nanoseconds passed to the constructor is carried as an
+ * integer until something forces it to become a float, following the
+ * arithmetic of the pure-Python implementation in glue.lal so that the
+ * two round identically.
+ */
+
+
+struct nanoseconds {
+	int is_float;
+	long long i;
+	double f;
+};
+
+
+static int ns_add_long_long(struct nanoseconds *ns, long long x)
+{
+	if(ns->is_float) {
+		ns->f += x;
+		return 0;
+	}
+	return add_long_long(ns->i, x, &ns->i);
+}
+
+
+static void ns_add_double(struct nanoseconds *ns, double x)
+{
+	if(!ns->is_float) {
+		ns->f = ns->i;
+		ns->is_float = 1;
+	}
+	ns->f += x;
+}
+
+
+/* ns += obj, where obj is an int, a long, or anything float() accepts */
+
+
+static int ns_add_object(struct nanoseconds *ns, PyObject *obj)
+{
+	if(PyInt_CheckExact(obj) || PyLong_CheckExact(obj)) {
+		long long x = PyLong_AsLongLong(obj);
+		if(x == -1 && PyErr_Occurred())
+			return -1;
+		return ns_add_long_long(ns, x);
+	} else if(PyFloat_CheckExact(obj))
+		ns_add_double(ns, PyFloat_AS_DOUBLE(obj));
+	else {
+		obj = PyNumber_Float(obj);
+		if(!obj)
+			return -1;
+		ns_add_double(ns, PyFloat_AS_DOUBLE(obj));
+		Py_DECREF(obj);
+	}
+	return 0;
+}
+
+
+/* int(x) for an integer-valued double */
+
+
+static int double_to_long_long(double x, long long *result)
+{
+	if(isnan(x)) {
+		PyErr_SetString(PyExc_ValueError, "cannot convert float NaN to integer");
+		return -1;
+	}
+	if(!(x >= -9223372036854775808.0 && x < 9223372036854775808.0))
+		return overflow();
+	*result = x;
+	return 0;
+}
+
+
+/*
+ * Set the time to seconds + nanoseconds, normalizing the nanoseconds to
+ * [0, 1000000000) with Python's floor division and modulo.  The float
+ * case reproduces float.__divmod__().
+ */
+
+
+static int set_time(segments_LIGOTimeGPS *gps, long long seconds, const struct nanoseconds *ns)
+{
+	long long quotient, remainder;
+
+	if(ns->is_float) {
+		double mod, div, floordiv;
+		if(isinf(ns->f))
+			return overflow();
+		mod = fmod(ns->f, 1e9);
+		div = (ns->f - mod) / 1e9;
+		if(mod < 0) {
+			mod += 1e9;
+			div -= 1.0;
+		}
+		if(div) {
+			floordiv = floor(div);
+			if(div - floordiv > 0.5)
+				floordiv += 1.0;
+		} else
+			floordiv = 0.0;
+		if(double_to_long_long(floordiv, &quotient) < 0)
+			return -1;
+		remainder = mod;
+	} else {
+		quotient = ns->i / GIGA;
+		remainder = ns->i % GIGA;
+		if(remainder < 0) {
+			remainder += GIGA;
+			quotient--;
+		}
+	}
+	/* a float remainder can round up to 1e9 */
+	if(remainder >= GIGA) {
+		remainder -= GIGA;
+		quotient++;
+	}
+	if(add_long_long(seconds, quotient, &gps->seconds) < 0)
+		return -1;
+	gps->nanoseconds = remainder;
+	return 0;
+}
+
+
+/* new LIGOTimeGPS of seconds + nanoseconds */
+
+
+static PyObject *new_time(long long seconds, long long nanoseconds)
+{
+	struct nanoseconds ns = {0, nanoseconds, 0.0};
+	PyObject *new = segments_LIGOTimeGPS_Type.tp_alloc(&segments_LIGOTimeGPS_Type, 0);
+
+	if(new && set_time((segments_LIGOTimeGPS *) new, seconds, &ns) < 0) {
+		Py_DECREF(new);
+		new = NULL;
+	}
+	return new;
+}
+
+
+/* the time as a Python long count of nanoseconds */
+
+
+static PyObject *as_ns(const segments_LIGOTimeGPS *gps)
+{
+	PyObject *seconds, *giga, *ns, *result;
+
+	if(gps->seconds > -LLONG_MAX / GIGA && gps->seconds < LLONG_MAX / GIGA)
+		return PyLong_FromLongLong(gps->seconds * GIGA + gps->nanoseconds);
+
+	seconds = PyLong_FromLongLong(gps->seconds);
+	giga = PyLong_FromLong(GIGA);
+	ns = PyLong_FromLong(gps->nanoseconds);
+	result = seconds && giga && ns ? PyNumber_Multiply(seconds, giga) : NULL;
+	if(result) {
+		PyObject *sum = PyNumber_Add(result, ns);
+		Py_DECREF(result);
+		result = sum;
+	}
+	Py_XDECREF(seconds);
+	Py_XDECREF(giga);
+	Py_XDECREF(ns);
+	return result;
+}
+
+
+/* obj as a LIGOTimeGPS, converting it if needed */
+
+
+static PyObject *as_time(PyObject *obj)
+{
+	if(segments_LIGOTimeGPS_Check(obj)) {
+		Py_INCREF(obj);
+		return obj;
+	}
+	return PyObject_CallFunctionObjArgs((PyObject *) &segments_LIGOTimeGPS_Type, obj, NULL);
+}
+
+
+/*
+ * int(seconds) and seconds % 1 * 1e9 added to ns, as the constructor
+ * splits float seconds with math.modf()
+ */
+
+
+static int split_seconds(double seconds, long long *s, struct nanoseconds *ns)
+{
+	double ipart, fpart = modf(seconds, &ipart);
+
+	if(isinf(ipart))
+		return overflow();
+	if(double_to_long_long(ipart, s) < 0)
+		return -1;
+	ns_add_double(ns, fpart * 1e9);
+	return 0;
+}
+
+
+/* LIGOTimeGPS(x) for a float x */
+
+
+static int set_time_from_double(segments_LIGOTimeGPS *gps, double x)
+{
+	struct nanoseconds ns = {0, 0, 0.0};
+	long long s;
+
+	if(split_seconds(x, &s, &ns) < 0)
+		return -1;
+	return set_time(gps, s, &ns);
+}
+
+
+static double as_double(const segments_LIGOTimeGPS *gps)
+{
+	return gps->seconds + gps->nanoseconds * 1e-9;
+}
+
+
+/* result = a + sign * b */
+
+
+static int add_times(segments_LIGOTimeGPS *result, const segments_LIGOTimeGPS *a, const segments_LIGOTimeGPS *b, int sign)
+{
+	struct nanoseconds ns = {0, a->nanoseconds + sign * b->nanoseconds, 0.0};
+	long long seconds;
+
+	if(b->seconds == LLONG_MIN && sign < 0)
+		return overflow();
+	if(add_long_long(a->seconds, sign * b->seconds, &seconds) < 0)
+		return -1;
+	return set_time(result, seconds, &ns);
+}
+
+
+/* Python's float % */
+
+
+static double py_fmod(double x, double y)
+{
+	double mod = fmod(x, y);
+
+	if(mod) {
+		if((y < 0) != (mod < 0))
+			mod += y;
+	} else
+		mod = copysign(0.0, y);
+	return mod;
+}
+
+
+/*
+ * result = gps * x.  This is the algorithm of the pure-Python
+ * implementation, and of LAL's XLALGPSMultiply():  the seconds and the
+ * multiplier are each split into high and low parts so that the partial
+ * products can be accumulated without losing the nanoseconds.
+ */
+
+
+static int multiply(segments_LIGOTimeGPS *result, const segments_LIGOTimeGPS *gps, double x)
+{
+	long long seconds = gps->seconds;
+	long long nanoseconds = gps->nanoseconds;
+	long long slo;
+	double shi, xlo, xhi;
+	double addends[4];
+	struct nanoseconds ns = {1, 0, 0.0};
+	double acc = 0.0;
+	int i;
+
+	if(!isfinite(x)) {
+		if(isnan(x))
+			PyErr_SetString(PyExc_ValueError, "math domain error");
+		else
+			overflow();
+		return -1;
+	}
+
+	if(seconds < 0 && nanoseconds > 0) {
+		seconds += 1;
+		nanoseconds -= GIGA;
+	}
+
+	slo = seconds % 131072;
+	if(slo < 0)
+		slo += 131072;
+	shi = seconds - slo;
+	xlo = x ? py_fmod(x, ldexp(1.0, (int) (log(fabs(x)) / log(2.0)) - 26)) : 0.0;
+	xhi = x - xlo;
+
+	ns.f = nanoseconds * x;
+	addends[0] = slo * xlo;
+	addends[1] = shi * xlo;
+	addends[2] = slo * xhi;
+	addends[3] = shi * xhi;
+	for(i = 0; i < 4; i++) {
+		double s, n = modf(addends[i], &s);
+		acc += s;
+		ns.f += n * 1e9;
+	}
+	ns.f = round(ns.f);
+
+	{
+	long long s;
+	if(split_seconds(acc, &s, &ns) < 0)
+		return -1;
+	return set_time(result, s, &ns);
+	}
+}
+
+
+/*
+ * result = gps / x.  Also the pure-Python and LAL algorithm:  the
+ * quotient is refined until the residual is below 0.5 ns.
+ */
+
+
+static int divide(segments_LIGOTimeGPS *result, const segments_LIGOTimeGPS *gps, double x)
+{
+	int i;
+
+	if(x == 0.0) {
+		PyErr_SetString(PyExc_ZeroDivisionError, "float division by zero");
+		return -1;
+	}
+	if(set_time_from_double(result, as_double(gps) / x) < 0)
+		return -1;
+	for(i = 0; i < 100; i++) {
+		segments_LIGOTimeGPS tmp;
+		double residual;
+		if(multiply(&tmp, result, x) < 0 || add_times(&tmp, gps, &tmp, -1) < 0)
+			return -1;
+		residual = as_double(&tmp) / x;
+		if(set_time_from_double(&tmp, residual) < 0 || add_times(result, result, &tmp, +1) < 0)
+			return -1;
+		if(fabs(residual) <= 0.5e-9)
+			break;
+	}
+	return 0;
+}
+
+
+/* parse the string forms of the constructor's seconds argument */
+
+
+static int invalid_literal(PyObject *obj)
+{
+	PyObject *s = PyObject_Str(obj);
+	if(s) {
+		PyErr_Format(PyExc_TypeError, "invalid literal for LIGOTimeGPS(): %s", PyString_AS_STRING(s));
+		Py_DECREF(s);
+	}
+	return -1;
+}
+
+
+static int parse_string(PyObject *str, long long *seconds, struct nanoseconds *ns)
+{
+	PyObject *ascii, *integer = NULL, *fraction = NULL, *bad;
+	const char *s, *dot;
+	Py_ssize_t len;
+	double sign, frac = 0.0;
+	int result = -1;
+
+	if(PyUnicode_Check(str)) {
+		ascii = PyUnicode_AsASCIIString(str);
+		if(!ascii) {
+			PyErr_Clear();
+			return invalid_literal(str);
+		}
+	} else {
+		Py_INCREF(str);
+		ascii = str;
+	}
+	s = PyString_AS_STRING(ascii);
+	len = PyString_GET_SIZE(ascii);
+	bad = str;
+
+	while(len && isspace(*s)) {
+		s++;
+		len--;
+	}
+	sign = len && *s == '-' ? -1.0 : +1.0;
+
+	dot = memchr(s, '.', len);
+	if(dot) {
+		if(memchr(dot + 1, '.', len - (dot + 1 - s)))
+			goto done;
+		integer = PyString_FromStringAndSize(s, dot - s);
+		fraction = PyString_FromStringAndSize(dot, len - (dot - s));
+		if(!integer || !fraction)
+			goto done;
+		bad = integer;
+		/* float("." + fraction) */
+		{
+		PyObject *f = PyFloat_FromString(fraction, NULL);
+		if(!f)
+			goto done;
+		frac = round(sign * PyFloat_AS_DOUBLE(f) * 1e9);
+		Py_DECREF(f);
+		}
+	} else {
+		integer = PyString_FromStringAndSize(s, len);
+		if(!integer)
+			goto done;
+		bad = str;
+	}
+
+	/* int(integer) */
+	{
+	PyObject *i = PyNumber_Int(integer);
+	if(!i)
+		goto done;
+	*seconds = PyLong_AsLongLong(i);
+	Py_DECREF(i);
+	if(*seconds == -1 && PyErr_Occurred())
+		goto done;
+	}
+	if(dot)
+		ns_add_double(ns, frac);
+	result = 0;
+
+done:
+	if(result < 0) {
+		PyErr_Clear();
+		invalid_literal(bad);
+	}
+	Py_XDECREF(integer);
+	Py_XDECREF(fraction);
+	Py_DECREF(ascii);
+	return result;
+}
+
+
+/*
+ * Basic methods
+ */
+
+
+static int __init__(PyObject *self, PyObject *args, PyObject *kwds)
+{
+	static char *kwlist[] = {"seconds", "nanoseconds", NULL};
+	PyObject *seconds, *nanoseconds = NULL;
+	struct nanoseconds ns = {0, 0, 0.0};
+	long long s;
+
+	if(!PyArg_ParseTupleAndKeywords(args, kwds, "O|O:LIGOTimeGPS", kwlist, &seconds, &nanoseconds))
+		return -1;
+
+	if(nanoseconds && ns_add_object(&ns, nanoseconds) < 0) {
+		if(!PyErr_ExceptionMatches(PyExc_OverflowError)) {
+			PyErr_Clear();
+			PyErr_SetObject(PyExc_TypeError, nanoseconds);
+		}
+		return -1;
+	}
+
+	if(PyFloat_CheckExact(seconds)) {
+		if(split_seconds(PyFloat_AS_DOUBLE(seconds), &s, &ns) < 0)
+			return -1;
+	} else if(PyInt_CheckExact(seconds) || PyLong_CheckExact(seconds)) {
+		s = PyLong_AsLongLong(seconds);
+		if(s == -1 && PyErr_Occurred())
+			return -1;
+	} else if(PyString_CheckExact(seconds) || PyUnicode_CheckExact(seconds)) {
+		if(parse_string(seconds, &s, &ns) < 0)
+			return -1;
+	} else if(segments_LIGOTimeGPS_Check(seconds)) {
+		s = ((segments_LIGOTimeGPS *) seconds)->seconds;
+		if(ns_add_long_long(&ns, ((segments_LIGOTimeGPS *) seconds)->nanoseconds) < 0)
+			return -1;
+	} else {
+		/* an object with seconds and nanoseconds attributes */
+		PyObject *n = PyObject_GetAttrString(seconds, "nanoseconds");
+		PyObject *o = n ? PyObject_GetAttrString(seconds, "seconds") : NULL;
+		int err = !o || ns_add_object(&ns, n) < 0;
+		if(!err) {
+			s = PyLong_AsLongLong(o);
+			err = s == -1 && PyErr_Occurred();
+		}
+		Py_XDECREF(n);
+		Py_XDECREF(o);
+		if(err) {
+			PyErr_Clear();
+			PyErr_SetObject(PyExc_TypeError, seconds);
+			return -1;
+		}
+	}
+
+	return set_time((segments_LIGOTimeGPS *) self, s, &ns);
+}
+
+
+static PyObject *__repr__(PyObject *self)
+{
+	const segments_LIGOTimeGPS *gps = (const segments_LIGOTimeGPS *) self;
+	char buf[64];
+
+	snprintf(buf, sizeof(buf), "LIGOTimeGPS(%lld, %ld)", gps->seconds, gps->nanoseconds);
+	return PyString_FromString(buf);
+}
+
+
+static PyObject *__str__(PyObject *self)
+{
+	const segments_LIGOTimeGPS *gps = (const segments_LIGOTimeGPS *) self;
+	char buf[64];
+	char *end;
+
+	if(gps->seconds >= 0 || gps->nanoseconds == 0)
+		snprintf(buf, sizeof(buf), "%lld.%09ld", gps->seconds, gps->nanoseconds);
+	else if(gps->seconds < -1)
+		snprintf(buf, sizeof(buf), "%lld.%09ld", gps->seconds + 1, GIGA - gps->nanoseconds);
+	else
+		snprintf(buf, sizeof(buf), "-0.%09ld", GIGA - gps->nanoseconds);
+	/* strip trailing 0s, then the decimal point if nothing follows */
+	end = buf + strlen(buf);
+	while(end[-1] == '0')
+		*--end = '\0';
+	if(end[-1] == '.')
+		*--end = '\0';
+	return PyString_FromString(buf);
+}
+
+
+/*
+ * Accessors
+ */
+
+
+static PyObject *get_seconds(PyObject *self, void *unused)
+{
+	return int_from_long_long(((segments_LIGOTimeGPS *) self)->seconds);
+}
+
+
+static PyObject *get_nanoseconds(PyObject *self, void *unused)
+{
+	return PyInt_FromLong(((segments_LIGOTimeGPS *) self)->nanoseconds);
+}
+
+
+static PyObject *ns(PyObject *self, PyObject *unused)
+{
+	return as_ns((segments_LIGOTimeGPS *) self);
+}
+
+
+/*
+ * Type conversion
+ */
+
+
+static PyObject *__float__(PyObject *self)
+{
+	const segments_LIGOTimeGPS *gps = (const segments_LIGOTimeGPS *) self;
+
+	return PyFloat_FromDouble(gps->seconds + gps->nanoseconds * 1e-9);
+}
+
+
+static PyObject *__int__(PyObject *self)
+{
+	return int_from_long_long(((segments_LIGOTimeGPS *) self)->seconds);
+}
+
+
+static PyObject *__long__(PyObject *self)
+{
+	return PyLong_FromLongLong(((segments_LIGOTimeGPS *) self)->seconds);
+}
+
+
+/*
+ * Comparisons
+ */
+
+
+static long __hash__(PyObject *self)
+{
+	const segments_LIGOTimeGPS *gps = (const segments_LIGOTimeGPS *) self;
+	long long x = gps->seconds ^ gps->nanoseconds;
+	PyObject *obj;
+	long hash;
+
+	/* hash(seconds ^ nanoseconds), as the pure-Python version */
+	if(x >= LONG_MIN && x <= LONG_MAX)
+		return x == -1 ? -2 : x;
+	obj = PyLong_FromLongLong(x);
+	if(!obj)
+		return -1;
+	hash = PyObject_Hash(obj);
+	Py_DECREF(obj);
+	return hash;
+}
+
+
+static int __cmp__(PyObject *self, PyObject *other)
+{
+	return segments_LIGOTimeGPS_Cmp((segments_LIGOTimeGPS *) self, (segments_LIGOTimeGPS *) other);
+}
+
+
+static PyObject *richcompare(PyObject *self, PyObject *other, int op_id)
+{
+	int d;
+
+	if(!segments_LIGOTimeGPS_Check(other)) {
+		other = as_time(other);
+		if(!other) {
+			if(!PyErr_ExceptionMatches(PyExc_TypeError))
+				return NULL;
+			PyErr_Clear();
+			Py_INCREF(Py_NotImplemented);
+			return Py_NotImplemented;
+		}
+		d = segments_LIGOTimeGPS_Cmp((segments_LIGOTimeGPS *) self, (segments_LIGOTimeGPS *) other);
+		Py_DECREF(other);
+	} else
+		d = segments_LIGOTimeGPS_Cmp((segments_LIGOTimeGPS *) self, (segments_LIGOTimeGPS *) other);
+
+	return PyBool_FromLong(segments_cmp_to_bool(d, op_id));
+}
+
+
+static int __nonzero__(PyObject *self)
+{
+	const segments_LIGOTimeGPS *gps = (const segments_LIGOTimeGPS *) self;
+
+	return gps->seconds || gps->nanoseconds;
+}
+
+
+/*
+ * Arithmetic
+ */
+
+
+/* new LIGOTimeGPS of a + sign * b, either of which might need converting */
+
+
+static PyObject *add_objects(PyObject *a, PyObject *b, int sign)
+{
+	PyObject *result = NULL;
+
+	a = as_time(a);
+	b = a ? as_time(b) : NULL;
+	if(b)
+		result = segments_LIGOTimeGPS_Type.tp_alloc(&segments_LIGOTimeGPS_Type, 0);
+	if(result && add_times((segments_LIGOTimeGPS *) result, (segments_LIGOTimeGPS *) a, (segments_LIGOTimeGPS *) b, sign) < 0) {
+		Py_DECREF(result);
+		result = NULL;
+	}
+	Py_XDECREF(a);
+	Py_XDECREF(b);
+	return result;
+}
+
+
+static PyObject *__add__(PyObject *self, PyObject *other)
+{
+	return add_objects(self, other, +1);
+}
+
+
+static PyObject *__sub__(PyObject *self, PyObject *other)
+{
+	return add_objects(self, other, -1);
+}
+
+
+static PyObject *__mul__(PyObject *self, PyObject *other)
+{
+	PyObject *result;
+	double x;
+
+	if(!segments_LIGOTimeGPS_Check(self)) {
+		/* __rmul__ case.  multiplication is commutative */
+		PyObject *tmp = self;
+		self = other;
+		other = tmp;
+	}
+	if(!PyNumber_Check(other)) {
+		Py_INCREF(Py_NotImplemented);
+		return Py_NotImplemented;
+	}
+	x = PyFloat_AsDouble(other);
+	if(x == -1.0 && PyErr_Occurred())
+		return NULL;
+	result = segments_LIGOTimeGPS_Type.tp_alloc(&segments_LIGOTimeGPS_Type, 0);
+	if(result && multiply((segments_LIGOTimeGPS *) result, (segments_LIGOTimeGPS *) self, x) < 0) {
+		Py_DECREF(result);
+		result = NULL;
+	}
+	return result;
+}
+
+
+static PyObject *__div__(PyObject *self, PyObject *other)
+{
+	PyObject *result;
+	double x;
+
+	if(!segments_LIGOTimeGPS_Check(self) || !PyNumber_Check(other)) {
+		Py_INCREF(Py_NotImplemented);
+		return Py_NotImplemented;
+	}
+	x = PyFloat_AsDouble(other);
+	if(x == -1.0 && PyErr_Occurred())
+		return NULL;
+	result = segments_LIGOTimeGPS_Type.tp_alloc(&segments_LIGOTimeGPS_Type, 0);
+	if(result && divide((segments_LIGOTimeGPS *) result, (segments_LIGOTimeGPS *) self, x) < 0) {
+		Py_DECREF(result);
+		result = NULL;
+	}
+	return result;
+}
+
+
+static PyObject *__mod__(PyObject *self, PyObject *other)
+{
+	PyObject *quotient, *product, *result;
+
+	if(!segments_LIGOTimeGPS_Check(self)) {
+		Py_INCREF(Py_NotImplemented);
+		return Py_NotImplemented;
+	}
+	/* self - int(self / other) * other */
+	quotient = __div__(self, other);
+	if(quotient == Py_NotImplemented)
+		return quotient;
+	if(quotient) {
+		PyObject *tmp = PyNumber_Int(quotient);
+		Py_DECREF(quotient);
+		quotient = tmp;
+	}
+	product = quotient ? PyNumber_Multiply(quotient, other) : NULL;
+	Py_XDECREF(quotient);
+	result = product ? PyNumber_Subtract(self, product) : NULL;
+	Py_XDECREF(product);
+	return result;
+}
+
+
+static PyObject *__pos__(PyObject *self)
+{
+	Py_INCREF(self);
+	return self;
+}
+
+
+static PyObject *__neg__(PyObject *self)
+{
+	const segments_LIGOTimeGPS *gps = (const segments_LIGOTimeGPS *) self;
+
+	if(gps->seconds == LLONG_MIN) {
+		overflow();
+		return NULL;
+	}
+	return new_time(-gps->seconds, -(long long) gps->nanoseconds);
+}
+
+
+static PyObject *__abs__(PyObject *self)
+{
+	if(((segments_LIGOTimeGPS *) self)->seconds >= 0)
+		return __pos__(self);
+	return __neg__(self);
+}
+
+
+/*
+ * Pickle support.  The pickles are the same as those of the pure-Python
+ * implementation in glue.lal, so either can load the other's.
+ */
+
+
+static PyObject *__getstate__(PyObject *self, PyObject *unused)
+{
+	const segments_LIGOTimeGPS *gps = (const segments_LIGOTimeGPS *) self;
+	PyObject *state = PyObject_GetAttrString(self, "__dict__");
+
+	/* instances of subclasses can have additional attributes */
+	if(state) {
+		PyObject *copy = PyDict_Copy(state);
+		Py_DECREF(state);
+		state = copy;
+	} else {
+		PyErr_Clear();
+		state = PyDict_New();
+	}
+	if(state) {
+		PyObject *seconds = int_from_long_long(gps->seconds);
+		PyObject *nanoseconds = PyInt_FromLong(gps->nanoseconds);
+		if(!seconds || !nanoseconds || PyDict_SetItemString(state, "_LIGOTimeGPS__seconds", seconds) || PyDict_SetItemString(state, "_LIGOTimeGPS__nanoseconds", nanoseconds)) {
+			Py_DECREF(state);
+			state = NULL;
+		}
+		Py_XDECREF(seconds);
+		Py_XDECREF(nanoseconds);
+	}
+	return state;
+}
+
+
+static PyObject *__setstate__(PyObject *self, PyObject *state)
+{
+	segments_LIGOTimeGPS *gps = (segments_LIGOTimeGPS *) self;
+	PyObject *key, *value;
+	Py_ssize_t pos = 0;
+	struct nanoseconds ns = {0, 0, 0.0};
+	long long seconds = 0;
+
+	if(!PyDict_Check(state)) {
+		PyErr_SetObject(PyExc_TypeError, state);
+		return NULL;
+	}
+	while(PyDict_Next(state, &pos, &key, &value)) {
+		if(PyString_Check(key) && !strcmp(PyString_AS_STRING(key), "_LIGOTimeGPS__seconds")) {
+			seconds = PyLong_AsLongLong(value);
+			if(seconds == -1 && PyErr_Occurred())
+				return NULL;
+		} else if(PyString_Check(key) && !strcmp(PyString_AS_STRING(key), "_LIGOTimeGPS__nanoseconds")) {
+			if(ns_add_object(&ns, value) < 0)
+				return NULL;
+		} else if(PyObject_SetAttr(self, key, value) < 0)
+			return NULL;
+	}
+	if(set_time(gps, seconds, &ns) < 0)
+		return NULL;
+
+	Py_INCREF(Py_None);
+	return Py_None;
+}
+
+
+static PyObject *__reduce_ex__(PyObject *self, PyObject *args)
+{
+	int protocol = 0;
+	PyObject *copy_reg, *state, *result = NULL;
+
+	if(!PyArg_ParseTuple(args, "|i:__reduce_ex__", &protocol))
+		return NULL;
+
+	copy_reg = PyImport_ImportModule("copy_reg");
+	state = copy_reg ? __getstate__(self, NULL) : NULL;
+	if(state) {
+		/* what object.__reduce_ex__() does for a Python class */
+		if(protocol < 2)
+			result = Py_BuildValue("(N(OOO)O)", PyObject_GetAttrString(copy_reg, "_reconstructor"), Py_TYPE(self), &PyBaseObject_Type, Py_None, state);
+		else
+			result = Py_BuildValue("(N(O)O)", PyObject_GetAttrString(copy_reg, "__newobj__"), Py_TYPE(self), state);
+	}
+	Py_XDECREF(copy_reg);
+	Py_XDECREF(state);
+	return result;
+}
+
+
+/*
+ * Type information
+ */
+
+
+static PyNumberMethods as_number = {
+	.nb_absolute = __abs__,
+	.nb_add = __add__,
+	.nb_divide = __div__,
+	.nb_float = __float__,
+	.nb_int = __int__,
+	.nb_long = __long__,
+	.nb_multiply = __mul__,
+	.nb_negative = __neg__,
+	.nb_nonzero = __nonzero__,
+	.nb_positive = __pos__,
+	.nb_remainder = __mod__,
+	.nb_subtract = __sub__,
+};
+
+
+static struct PyGetSetDef getset[] = {
+	{"seconds", get_seconds, NULL, "Integer seconds.", NULL},
+	{"gpsSeconds", get_seconds, NULL, "Integer seconds.  Synonym for .seconds.", NULL},
+	{"nanoseconds", get_nanoseconds, NULL, "Integer nanoseconds, in [0, 1000000000).", NULL},
+	{"gpsNanoSeconds", get_nanoseconds, NULL, "Integer nanoseconds.  Synonym for .nanoseconds.", NULL},
+	{NULL,}
+};
+
+
+static struct PyMethodDef methods[] = {
+	{"ns", ns, METH_NOARGS, "Convert a LIGOTimeGPS to a count of nanoseconds as a long.\n\nExample:\n\n>>> LIGOTimeGPS(100.5).ns()\n100500000000L"},
+	{"__getstate__", __getstate__, METH_NOARGS, "Pickle support"},
+	{"__setstate__", __setstate__, METH_O, "Pickle support"},
+	{"__reduce_ex__", __reduce_ex__, METH_VARARGS, "Pickle support"},
+	{NULL,}
+};
+
+
+PyTypeObject segments_LIGOTimeGPS_Type = {
+	PyObject_HEAD_INIT(NULL)
+	.tp_as_number = &as_number,
+	.tp_basicsize = sizeof(segments_LIGOTimeGPS),
+	.tp_compare = __cmp__,
+	.tp_doc =
+"An object for storing times with nanosecond resolution.  LAL defines an\n" \
+"equivalent object which is used through-out the search algorithms to\n" \
+"represent times.  Many LALApps routines input and output times in a\n" \
+"manner that meshes well with this object.\n" \
+"\n" \
+"Internally the time is represented as a signed integer \"seconds\" part\n" \
+"and an unsigned integer \"nanoseconds\" part.  The actual time is always\n" \
+"constructed by adding the nanoseconds to the seconds.  So -0.5 s is\n" \
+"represented by setting seconds = -1, and nanoseconds to 500000000.\n" \
+"That's the way LAL does it.\n" \
+"\n" \
+"This is the C implementation of the class.  It has the same interface\n" \
+"and pickles identically to the pure-Python version.\n" \
+"\n" \
+"Example:\n" \
+"\n" \
+">>> LIGOTimeGPS(100.5)\n" \
+"LIGOTimeGPS(100, 500000000)\n" \
+">>> LIGOTimeGPS(\"100.5\")\n" \
+"LIGOTimeGPS(100, 500000000)\n" \
+">>> LIGOTimeGPS(0, 100500000000L)\n" \
+"LIGOTimeGPS(100, 500000000)\n" \
+">>> LIGOTimeGPS(100.2, 300000000)\n" \
+"LIGOTimeGPS(100, 500000000)\n" \
+">>> LIGOTimeGPS(\"0.0000000018\")\n" \
+"LIGOTimeGPS(0, 2)\n" \
+">>> LIGOTimeGPS(\"-1.2\")\n" \
+"LIGOTimeGPS(-2, 800000000)\n" \
+">>> print LIGOTimeGPS(\"-1.2\")\n" \
+"-1.2\n" \
+">>> LIGOTimeGPS(100.5) + \"3\"\n" \
+"LIGOTimeGPS(103, 500000000)\n" \
+">>> LIGOTimeGPS(100.5) % 3\n" \
+"LIGOTimeGPS(1, 500000000)",
+	.tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_CHECKTYPES | Py_TPFLAGS_BASETYPE,
+	.tp_getset = getset,
+	.tp_hash = __hash__,
+	.tp_init = __init__,
+	.tp_methods = methods,
+	/* pickles refer to the class by this name */
+	.tp_name = "glue.lal.LIGOTimeGPS",
+	.tp_repr = __repr__,
+	.tp_richcompare = richcompare,
+	.tp_str = __str__,
+};
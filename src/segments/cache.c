@@ -0,0 +1,180 @@
+/*
+ * Copyright (C) 2013  Kipp C. Cannon
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms of the GNU General Public License as published by the
+ * Free Software Foundation; either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful, but
+ * WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License along
+ * with this program; if not, write to the Free Software Foundation, Inc.,
+ * 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+ */
+
+
+/*
+ * ============================================================================
+ *
+ *                Segments Module Component --- LAL Cache Parser
+ *
+ * ============================================================================
+ */
+
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <string.h>
+
+
+#include <segments.h>
+
+
+/*
+ * ============================================================================
+ *
+ *                                 Utilities
+ *
+ * ============================================================================
+ */
+
+
+#define N_COLUMNS 5
+
+
+/* the characters matched by \s in a non-unicode regular expression,
+ * except \n which ends a line */
+
+
+static int is_space(char c)
+{
+	return c == ' ' || c == '\t' || c == '\r' || c == '\f' || c == '\v';
+}
+
+
+/*
+ * New reference to a string object with the contents of [start, end).  If
+ * the contents are the same as those of *last, a new reference to *last is
+ * returned instead, so that runs of identical values (the observatory and
+ * description columns, usually) share one object.  last can be NULL.  A
+ * "-" is translated to None if dash_is_none is set.
+ */
+
+
+static PyObject *make_string(const char *start, const char *end, PyObject **last, int dash_is_none)
+{
+	Py_ssize_t len = end - start;
+	PyObject *result;
+
+	if(dash_is_none && len == 1 && *start == '-') {
+		Py_INCREF(Py_None);
+		return Py_None;
+	}
+	if(last && *last && PyString_GET_SIZE(*last) == len && !memcmp(PyString_AS_STRING(*last), start, len)) {
+		Py_INCREF(*last);
+		return *last;
+	}
+	result = PyString_FromStringAndSize(start, len);
+	if(result && last) {
+		Py_XDECREF(*last);
+		Py_INCREF(result);
+		*last = result;
+	}
+	return result;
+}
+
+
+/*
+ * ============================================================================
+ *
+ *                              Module Function
+ *
+ * ============================================================================
+ */
+
+
+PyObject *segments_parse_cache(PyObject *self, PyObject *args)
+{
+	const char *text, *end, *line;
+	Py_ssize_t len;
+	PyObject *columns[N_COLUMNS] = {NULL,};
+	PyObject *last[N_COLUMNS] = {NULL,};
+	PyObject *result = NULL;
+	int i;
+
+	if(!PyArg_ParseTuple(args, "s#:_parse_cache", &text, &len))
+		return NULL;
+	end = text + len;
+
+	for(i = 0; i < N_COLUMNS; i++) {
+		columns[i] = PyList_New(0);
+		if(!columns[i])
+			goto done;
+	}
+
+	for(line = text; line < end;) {
+		const char *bounds[N_COLUMNS][2];
+		const char *c = line;
+		const char *eol = memchr(line, '\n', end - line);
+		eol = eol ? eol + 1 : end;
+
+		/*
+		 * Find the start and end of each column.  There must be
+		 * exactly N_COLUMNS white-space delimited columns.
+		 */
+
+		for(i = 0; i < N_COLUMNS; i++) {
+			while(c < eol && (is_space(*c) || *c == '\n'))
+				c++;
+			if(c >= eol)
+				break;
+			bounds[i][0] = c;
+			while(c < eol && !is_space(*c) && *c != '\n')
+				c++;
+			bounds[i][1] = c;
+		}
+		while(c < eol && (is_space(*c) || *c == '\n'))
+			c++;
+		if(i < N_COLUMNS || c < eol) {
+			PyObject *repr = PyString_FromStringAndSize(line, eol - line);
+			PyObject *s = repr ? PyObject_Repr(repr) : NULL;
+			if(s)
+				PyErr_Format(PyExc_ValueError, "could not convert %s to CacheEntry", PyString_AS_STRING(s));
+			Py_XDECREF(repr);
+			Py_XDECREF(s);
+			goto done;
+		}
+
+		/*
+		 * Append the columns to the lists.  The observatory and
+		 * description columns can be "-".
+		 */
+
+		for(i = 0; i < N_COLUMNS; i++) {
+			/* URLs are all different, don't bother checking */
+			PyObject *item = make_string(bounds[i][0], bounds[i][1], i < N_COLUMNS - 1 ? &last[i] : NULL, i < 2);
+			int err;
+			if(!item)
+				goto done;
+			err = PyList_Append(columns[i], item);
+			Py_DECREF(item);
+			if(err)
+				goto done;
+		}
+
+		line = eol;
+	}
+
+	result = Py_BuildValue("(OOOOO)", columns[0], columns[1], columns[2], columns[3], columns[4]);
+
+done:
+	for(i = 0; i < N_COLUMNS; i++) {
+		Py_XDECREF(columns[i]);
+		Py_XDECREF(last[i]);
+	}
+	return result;
+}
@@ -0,0 +1,397 @@
+/*
+ * Copyright (C) 2006--2008,2010--2012  Kipp C. Cannon
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms of the GNU General Public License as published by the
+ * Free Software Foundation; either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful, but
+ * WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License along
+ * with this program; if not, write to the Free Software Foundation, Inc.,
+ * 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+ */
+
+
+/*
+ * ============================================================================
+ *
+ *             Segments Module Component --- Coincidence Sweep
+ *
+ * ============================================================================
+ */
+
+
+#include <Python.h>
+#include <stdlib.h>
+#include <string.h>
+
+
+#include <segments.h>
+
+
+/*
+ * ============================================================================
+ *
+ *                                 Utilities
+ *
+ * ============================================================================
+ */
+
+
+/*
+ * The boundaries of each segmentlist, lo[0], hi[0], lo[1], hi[1], ..., are
+ * merged in order with a binary heap of cursors, one for each list.
+ */
+
+
+struct cursor {
+	/* the list's segments, from PySequence_Fast() */
+	PyObject *segs;
+	/* index of the list */
+	Py_ssize_t list;
+	/* index of the current boundary in the list */
+	Py_ssize_t k;
+};
+
+
+static PyObject *cursor_bound(const struct cursor *cursor)
+{
+	return PyTuple_GET_ITEM(PySequence_Fast_GET_ITEM(cursor->segs, cursor->k >> 1), cursor->k & 1);
+}
+
+
+/* returns 1 if heap[a]'s boundary < heap[b]'s, 0 if not, -1 on error */
+
+
+static int cursor_lt(struct cursor *heap, Py_ssize_t a, Py_ssize_t b)
+{
+	return segments_RichCompareBool(cursor_bound(&heap[a]), cursor_bound(&heap[b]), Py_LT);
+}
+
+
+static int sift_down(struct cursor *heap, Py_ssize_t n, Py_ssize_t i)
+{
+	while(1) {
+		Py_ssize_t child = 2 * i + 1;
+		struct cursor tmp;
+		int result;
+		if(child >= n)
+			return 0;
+		if(child + 1 < n) {
+			result = cursor_lt(heap, child + 1, child);
+			if(result < 0)
+				return -1;
+			child += result;
+		}
+		result = cursor_lt(heap, child, i);
+		if(result <= 0)
+			return result;
+		tmp = heap[i];
+		heap[i] = heap[child];
+		heap[child] = tmp;
+		i = child;
+	}
+}
+
+
+/* new reference to a tuple of the indexes of the lists that are on */
+
+
+static PyObject *on_key(const Py_ssize_t *depth, Py_ssize_t n, Py_ssize_t count)
+{
+	PyObject *key = PyTuple_New(count);
+	Py_ssize_t i, j;
+
+	if(!key)
+		return NULL;
+	for(i = j = 0; i < n; i++)
+		if(depth[i] > 0) {
+			PyObject *index = PyInt_FromSsize_t(i);
+			if(!index) {
+				Py_DECREF(key);
+				return NULL;
+			}
+			PyTuple_SET_ITEM(key, j++, index);
+		}
+	return key;
+}
+
+
+/* append segment(lo, hi) to the segmentlist in dict at key k */
+
+
+static int append_segment(PyObject *dict, Py_ssize_t k, PyObject *lo, PyObject *hi)
+{
+	PyObject *key = PyInt_FromSsize_t(k);
+	PyObject *seglist = key ? PyDict_GetItem(dict, key) : NULL;
+	PyObject *seg;
+	int result;
+
+	Py_XDECREF(key);
+	if(!seglist)
+		return -1;
+	/* segments_Segment_New() steals the references */
+	Py_INCREF(lo);
+	Py_INCREF(hi);
+	seg = segments_Segment_New(&segments_Segment_Type, lo, hi);
+	if(!seg)
+		return -1;
+	result = PyList_Append(seglist, seg);
+	Py_DECREF(seg);
+	return result;
+}
+
+
+/* livetime[key] += hi - lo */
+
+
+static int add_livetime(PyObject *livetime, PyObject *key, PyObject *lo, PyObject *hi)
+{
+	PyObject *duration = PyNumber_Subtract(hi, lo);
+	PyObject *total;
+	int result;
+
+	if(!duration)
+		return -1;
+	total = PyDict_GetItem(livetime, key);
+	if(total) {
+		total = PyNumber_Add(total, duration);
+		Py_DECREF(duration);
+		if(!total)
+			return -1;
+	} else
+		total = duration;
+	result = PyDict_SetItem(livetime, key, total);
+	Py_DECREF(total);
+	return result;
+}
+
+
+/*
+ * ============================================================================
+ *
+ *                              Module Function
+ *
+ * ============================================================================
+ */
+
+
+PyObject *segments_coincidence_sweep(PyObject *self, PyObject *args, PyObject *kwds)
+{
+	static char *kwlist[] = {"seglists", "livetimes", NULL};
+	PyObject *seglists;
+	PyObject *want_livetimes = NULL;
+	PyObject *outer = NULL;
+	PyObject *exactly = NULL, *at_least = NULL, *livetime = NULL;
+	PyObject *key = NULL, *key_start = NULL;
+	PyObject *result = NULL;
+	struct cursor *heap = NULL;
+	Py_ssize_t *depth = NULL, *touched = NULL;
+	char *was_on = NULL;
+	PyObject **starts = NULL;
+	Py_ssize_t n, heap_size = 0, count = 0;
+	Py_ssize_t i, k;
+
+	if(!PyArg_ParseTupleAndKeywords(args, kwds, "O|O:coincidence_sweep", kwlist, &seglists, &want_livetimes))
+		return NULL;
+
+	/*
+	 * Materialize the lists.  The outer sequence and each list are
+	 * iterated over once.
+	 */
+
+	outer = PySequence_List(seglists);
+	if(!outer)
+		return NULL;
+	n = PyList_GET_SIZE(outer);
+	for(i = 0; i < n; i++) {
+		PyObject *segs = PySequence_Fast(PyList_GET_ITEM(outer, i), "segmentlist is not iterable");
+		if(!segs)
+			goto done;
+		Py_DECREF(PyList_GET_ITEM(outer, i));
+		PyList_SET_ITEM(outer, i, segs);
+		for(k = 0; k < PySequence_Fast_GET_SIZE(segs); k++) {
+			PyObject *seg = PySequence_Fast_GET_ITEM(segs, k);
+			if(!PyTuple_Check(seg) || PyTuple_GET_SIZE(seg) != 2) {
+				PyErr_SetObject(PyExc_TypeError, seg);
+				goto done;
+			}
+		}
+	}
+
+	heap = malloc((n ? n : 1) * sizeof(*heap));
+	depth = calloc(n ? n : 1, sizeof(*depth));
+	touched = malloc((n ? n : 1) * sizeof(*touched));
+	was_on = malloc(n ? n : 1);
+	starts = calloc(n + 1, sizeof(*starts));
+	if(!heap || !depth || !touched || !was_on || !starts) {
+		PyErr_NoMemory();
+		goto done;
+	}
+
+	/*
+	 * Create the output dictionaries
+	 */
+
+	exactly = PyDict_New();
+	at_least = PyDict_New();
+	if(!exactly || !at_least)
+		goto done;
+	for(k = 1; k <= n; k++) {
+		PyObject *count_obj = PyInt_FromSsize_t(k);
+		PyObject *a = PyObject_CallObject((PyObject *) &segments_SegmentList_Type, NULL);
+		PyObject *b = PyObject_CallObject((PyObject *) &segments_SegmentList_Type, NULL);
+		int err = !count_obj || !a || !b || PyDict_SetItem(exactly, count_obj, a) || PyDict_SetItem(at_least, count_obj, b);
+		Py_XDECREF(count_obj);
+		Py_XDECREF(a);
+		Py_XDECREF(b);
+		if(err)
+			goto done;
+	}
+	if(want_livetimes && PyObject_IsTrue(want_livetimes)) {
+		livetime = PyDict_New();
+		if(!livetime)
+			goto done;
+	}
+
+	/*
+	 * Initialize the heap
+	 */
+
+	for(i = 0; i < n; i++) {
+		PyObject *segs = PyList_GET_ITEM(outer, i);
+		if(!PySequence_Fast_GET_SIZE(segs))
+			continue;
+		heap[heap_size].segs = segs;
+		heap[heap_size].list = i;
+		heap[heap_size].k = 0;
+		heap_size++;
+	}
+	for(i = heap_size / 2 - 1; i >= 0; i--)
+		if(sift_down(heap, heap_size, i) < 0)
+			goto done;
+
+	/*
+	 * Sweep
+	 */
+
+	while(heap_size) {
+		PyObject *bound = cursor_bound(&heap[0]);
+		Py_ssize_t n_touched = 0, old = count;
+		int changed = 0;
+
+		Py_INCREF(bound);
+
+		/*
+		 * Apply all the transitions at this boundary, remembering
+		 * the initial state of each list that's touched
+		 */
+
+		do {
+			struct cursor *top = &heap[0];
+			Py_ssize_t list = top->list;
+			for(i = 0; i < n_touched && touched[i] != list; i++);
+			if(i == n_touched) {
+				touched[n_touched] = list;
+				was_on[n_touched++] = depth[list] > 0;
+			}
+			depth[list] += top->k & 1 ? -1 : +1;
+			if(++top->k >= 2 * PySequence_Fast_GET_SIZE(top->segs))
+				heap[0] = heap[--heap_size];
+			if(sift_down(heap, heap_size, 0) < 0) {
+				Py_DECREF(bound);
+				goto done;
+			}
+			if(heap_size) {
+				/* the heap's boundaries are >= bound, so
+				 * the top's is equal if it is not greater */
+				int result = segments_RichCompareBool(bound, cursor_bound(&heap[0]), Py_LT);
+				if(result < 0) {
+					Py_DECREF(bound);
+					goto done;
+				}
+				if(result)
+					break;
+			}
+		} while(heap_size);
+
+		for(i = 0; i < n_touched; i++)
+			if((depth[touched[i]] > 0) != was_on[i]) {
+				count += was_on[i] ? -1 : +1;
+				changed = 1;
+			}
+		if(!changed) {
+			Py_DECREF(bound);
+			continue;
+		}
+
+		/*
+		 * Record the segments that end here, and note the start of
+		 * those that begin here.  starts[0] is the start of the
+		 * current exactly-count interval, starts[k] the start of
+		 * the current at-least-k interval.
+		 */
+
+		if(count != old) {
+			if(old && append_segment(exactly, old, starts[0], bound) < 0) {
+				Py_DECREF(bound);
+				goto done;
+			}
+			Py_INCREF(bound);
+			Py_XDECREF(starts[0]);
+			starts[0] = bound;
+			for(k = count + 1; k <= old; k++) {
+				if(append_segment(at_least, k, starts[k], bound) < 0) {
+					Py_DECREF(bound);
+					goto done;
+				}
+				Py_CLEAR(starts[k]);
+			}
+			for(k = old + 1; k <= count; k++) {
+				Py_INCREF(bound);
+				starts[k] = bound;
+			}
+		}
+		if(livetime) {
+			if(key && PyTuple_GET_SIZE(key) && add_livetime(livetime, key, key_start, bound) < 0) {
+				Py_DECREF(bound);
+				goto done;
+			}
+			Py_XDECREF(key);
+			key = on_key(depth, n, count);
+			if(!key) {
+				Py_DECREF(bound);
+				goto done;
+			}
+			Py_XDECREF(key_start);
+			key_start = bound;
+			Py_INCREF(bound);
+		}
+
+		Py_DECREF(bound);
+	}
+
+	result = Py_BuildValue("(OOO)", exactly, at_least, livetime ? livetime : Py_None);
+
+done:
+	if(starts)
+		for(k = 0; k <= n; k++)
+			Py_XDECREF(starts[k]);
+	free(starts);
+	free(was_on);
+	free(touched);
+	free(depth);
+	free(heap);
+	Py_XDECREF(key);
+	Py_XDECREF(key_start);
+	Py_XDECREF(exactly);
+	Py_XDECREF(at_least);
+	Py_XDECREF(livetime);
+	Py_XDECREF(outer);
+	return result;
+}
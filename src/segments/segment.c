@@ -67,7 +67,7 @@ PyObject *segments_Segment_New(PyTypeObject *type, PyObject *a, PyObject *b)
 		return NULL;
 	}
 	new = type->tp_alloc(type, 2);
-	if(new && PyObject_Cmp(a, b, &delta) >= 0) {
+	if(new && segments_Cmp(a, b, &delta) >= 0) {
 		if(delta <= 0) {
 			PyTuple_SET_ITEM(new, 0, a);
 			PyTuple_SET_ITEM(new, 1, b);
@@ -152,7 +152,7 @@ static PyObject *__abs__(PyObject *self)
 
 static int __nonzero__(PyObject *self)
 {
-	return PyObject_Compare(PyTuple_GET_ITEM(self, 0), PyTuple_GET_ITEM(self, 1)) != 0;
+	return segments_Compare(PyTuple_GET_ITEM(self, 0), PyTuple_GET_ITEM(self, 1)) != 0;
 }
 
 
@@ -166,6 +166,25 @@ static PyObject *richcompare(PyObject *self, PyObject *other, int op_id)
 		Py_DECREF(sa);
 		return result;
 	}
+	if(segments_Segment_Check(other)) {
+		/* compare as tuples, but with the fast path for the
+		 * boundaries:  the first boundaries decide unless they're
+		 * equal, in which case the second boundaries do */
+		PyObject *sa = PyTuple_GET_ITEM(self, 0);
+		PyObject *oa = PyTuple_GET_ITEM(other, 0);
+		int result = sa == oa ? 1 : segments_RichCompareBool(sa, oa, Py_EQ);
+		if(result < 0)
+			return NULL;
+		if(result)
+			result = segments_RichCompareBool(PyTuple_GET_ITEM(self, 1), PyTuple_GET_ITEM(other, 1), op_id);
+		else if(op_id == Py_EQ || op_id == Py_NE)
+			result = op_id == Py_NE;
+		else
+			result = segments_RichCompareBool(sa, oa, op_id);
+		if(result < 0)
+			return NULL;
+		return PyBool_FromLong(result);
+	}
 	return PyTuple_Type.tp_richcompare(self, other, op_id);
 }
 
@@ -182,7 +201,7 @@ static PyObject *intersects(PyObject *self, PyObject *other)
 	}
 	oa = PyTuple_GET_ITEM(other, 0);
 	ob = PyTuple_GET_ITEM(other, 1);
-	result = (PyObject_Compare(sb, oa) > 0) && (PyObject_Compare(sa, ob) < 0) ? Py_True : Py_False;
+	result = (segments_Compare(sb, oa) > 0) && (segments_Compare(sa, ob) < 0) ? Py_True : Py_False;
 	Py_INCREF(result);
 	return result;
 }
@@ -195,9 +214,9 @@ static int __contains__(PyObject *self, PyObject *other)
 	if(segments_Segment_Check(other)) {
 		PyObject *oa = PyTuple_GET_ITEM(other, 0);
 		PyObject *ob = PyTuple_GET_ITEM(other, 1);
-		return (PyObject_Compare(sa, oa) <= 0) && (PyObject_Compare(sb, ob) >= 0);
+		return (segments_Compare(sa, oa) <= 0) && (segments_Compare(sb, ob) >= 0);
 	} else
-		return (PyObject_Compare(sa, other) <= 0) && (PyObject_Compare(other, sb) < 0);
+		return (segments_Compare(sa, other) <= 0) && (segments_Compare(other, sb) < 0);
 }
 
 
@@ -212,9 +231,9 @@ static PyObject *disjoint(PyObject *self, PyObject *other)
 	}
 	oa = PyTuple_GET_ITEM(other, 0);
 	ob = PyTuple_GET_ITEM(other, 1);
-	if(PyObject_Compare(sa, ob) > 0)
+	if(segments_Compare(sa, ob) > 0)
 		return PyInt_FromLong(1);
-	if(PyObject_Compare(sb, oa) < 0)
+	if(segments_Compare(sb, oa) < 0)
 		return PyInt_FromLong(-1);
 	return PyInt_FromLong(0);
 }
@@ -242,13 +261,13 @@ static PyObject *__and__(PyObject *self, PyObject *other)
 	sb = PyTuple_GET_ITEM(self, 1);
 	oa = PyTuple_GET_ITEM(other, 0);
 	ob = PyTuple_GET_ITEM(other, 1);
-	if((PyObject_Compare(sb, oa) <= 0) || (PyObject_Compare(sa, ob) >= 0)) {
+	if((segments_Compare(sb, oa) <= 0) || (segments_Compare(sa, ob) >= 0)) {
 		/* self and other don't intersect */
 		PyErr_SetObject(PyExc_ValueError, other);
 		return NULL;
 	}
-	a = (PyObject_Compare(sa, oa) >= 0) ? sa : oa;
-	b = (PyObject_Compare(sb, ob) <= 0) ? sb : ob;
+	a = (segments_Compare(sa, oa) >= 0) ? sa : oa;
+	b = (segments_Compare(sb, ob) <= 0) ? sb : ob;
 	if((a == sa) && (b == sb)) {
 		/* re-use self */
 		Py_INCREF(self);
@@ -282,13 +301,13 @@ static PyObject *__or__(PyObject *self, PyObject *other)
 	sb = PyTuple_GET_ITEM(self, 1);
 	oa = PyTuple_GET_ITEM(other, 0);
 	ob = PyTuple_GET_ITEM(other, 1);
-	if((PyObject_Compare(sb, oa) < 0) || (PyObject_Compare(sa, ob) > 0)) {
+	if((segments_Compare(sb, oa) < 0) || (segments_Compare(sa, ob) > 0)) {
 		/* self and other are disjoint */
 		PyErr_SetObject(PyExc_ValueError, other);
 		return NULL;
 	}
-	a = (PyObject_Compare(sa, oa) <= 0) ? sa : oa;
-	b = (PyObject_Compare(sb, ob) >= 0) ? sb : ob;
+	a = (segments_Compare(sa, oa) <= 0) ? sa : oa;
+	b = (segments_Compare(sb, ob) >= 0) ? sb : ob;
 	if((a == sa) && (b == sb)) {
 		/* re-use self */
 		Py_INCREF(self);
@@ -322,17 +341,17 @@ static PyObject *__sub__(PyObject *self, PyObject *other)
 	sb = PyTuple_GET_ITEM(self, 1);
 	oa = PyTuple_GET_ITEM(other, 0);
 	ob = PyTuple_GET_ITEM(other, 1);
-	if((PyObject_Compare(sb, oa) <= 0) || (PyObject_Compare(sa, ob) >= 0)) {
+	if((segments_Compare(sb, oa) <= 0) || (segments_Compare(sa, ob) >= 0)) {
 		/* self and other do not intersect */
 		Py_INCREF(self);
 		return self;
 	}
-	if(__contains__(other, self) || ((PyObject_Compare(sa, oa) < 0) && (PyObject_Compare(sb, ob) > 0))) {
+	if(__contains__(other, self) || ((segments_Compare(sa, oa) < 0) && (segments_Compare(sb, ob) > 0))) {
 		/* result is not exactly 1 segment */
 		PyErr_SetObject(PyExc_ValueError, other);
 		return NULL;
 	}
-	if(PyObject_Compare(sa, oa) < 0) {
+	if(segments_Compare(sa, oa) < 0) {
 		a = sa;
 		b = oa;
 	} else {
@@ -0,0 +1,1967 @@
+/*
+ * Copyright (C) 2006--2008,2010--2012  Kipp C. Cannon
+ *
+ * This program is free software; you can redistribute it and/or modify it
+ * under the terms of the GNU General Public License as published by the
+ * Free Software Foundation; either version 3 of the License, or (at your
+ * option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful, but
+ * WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License along
+ * with this program; if not, write to the Free Software Foundation, Inc.,
+ * 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+ */
+
+
+/*
+ * ============================================================================
+ *
+ *             Segments Module Component --- segmentarray Class
+ *
+ * ============================================================================
+ */
+
+
+#include <Python.h>
+#include <math.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+
+#include <segments.h>
+
+
+/*
+ * ============================================================================
+ *
+ *                              Boundary Kinds
+ *
+ * ============================================================================
+ */
+
+
+/*
+ * The extreme values of the 64-bit integer range are reserved to
+ * represent -infinity and +infinity in "q" arrays.  In "d" arrays the IEEE
+ * infinities are used.
+ */
+
+
+#define Q_NEG_INFINITY INT64_MIN
+#define Q_POS_INFINITY INT64_MAX
+
+
+static int is_infinity(PyObject *obj)
+{
+	return obj == (PyObject *) segments_PosInfinity || obj == (PyObject *) segments_NegInfinity;
+}
+
+
+/*
+ * The operations needed on each kind of boundary.  ->store() returns 0 on
+ * success, 1 if the object cannot be represented in this kind (no
+ * exception is set), and -1 on error.  ->lt() returns 1 if *a < *b, 0 if
+ * not, and -1 on error.
+ */
+
+
+struct kind {
+	char typecode;
+	int (*store)(void *dst, PyObject *obj);
+	PyObject *(*load)(const void *src);
+	int (*lt)(const void *a, const void *b);
+	void (*copy)(void *dst, const void *src);
+	void (*release)(void *p);
+};
+
+
+static int q_store(void *dst, PyObject *obj)
+{
+	int64_t x;
+	if(obj == (PyObject *) segments_PosInfinity)
+		x = Q_POS_INFINITY;
+	else if(obj == (PyObject *) segments_NegInfinity)
+		x = Q_NEG_INFINITY;
+	else if(PyInt_Check(obj))
+		x = PyInt_AS_LONG(obj);
+	else if(PyLong_Check(obj)) {
+		int overflow;
+		PY_LONG_LONG y = PyLong_AsLongLongAndOverflow(obj, &overflow);
+		if(y == -1 && PyErr_Occurred())
+			return -1;
+		if(overflow)
+			return 1;
+		x = y;
+	} else
+		return 1;
+	if(!is_infinity(obj) && (x == Q_POS_INFINITY || x == Q_NEG_INFINITY))
+		return 1;
+	*(int64_t *) dst = x;
+	return 0;
+}
+
+
+static PyObject *q_load(const void *src)
+{
+	int64_t x = *(const int64_t *) src;
+	PyObject *obj;
+	if(x == Q_POS_INFINITY)
+		obj = (PyObject *) segments_PosInfinity;
+	else if(x == Q_NEG_INFINITY)
+		obj = (PyObject *) segments_NegInfinity;
+	else if(x >= LONG_MIN && x <= LONG_MAX)
+		return PyInt_FromLong(x);
+	else
+		return PyLong_FromLongLong(x);
+	Py_INCREF(obj);
+	return obj;
+}
+
+
+static int q_lt(const void *a, const void *b)
+{
+	return *(const int64_t *) a < *(const int64_t *) b;
+}
+
+
+static void q_copy(void *dst, const void *src)
+{
+	*(int64_t *) dst = *(const int64_t *) src;
+}
+
+
+static int d_store(void *dst, PyObject *obj)
+{
+	double x;
+	if(obj == (PyObject *) segments_PosInfinity)
+		x = HUGE_VAL;
+	else if(obj == (PyObject *) segments_NegInfinity)
+		x = -HUGE_VAL;
+	else if(PyFloat_Check(obj))
+		x = PyFloat_AS_DOUBLE(obj);
+	else if(PyInt_Check(obj))
+		x = PyInt_AS_LONG(obj);
+	else if(PyLong_Check(obj)) {
+		x = PyLong_AsDouble(obj);
+		if(x == -1.0 && PyErr_Occurred()) {
+			if(!PyErr_ExceptionMatches(PyExc_OverflowError))
+				return -1;
+			PyErr_Clear();
+			return 1;
+		}
+	} else
+		return 1;
+	*(double *) dst = x;
+	return 0;
+}
+
+
+static PyObject *d_load(const void *src)
+{
+	double x = *(const double *) src;
+	PyObject *obj;
+	if(x == HUGE_VAL)
+		obj = (PyObject *) segments_PosInfinity;
+	else if(x == -HUGE_VAL)
+		obj = (PyObject *) segments_NegInfinity;
+	else
+		return PyFloat_FromDouble(x);
+	Py_INCREF(obj);
+	return obj;
+}
+
+
+static int d_lt(const void *a, const void *b)
+{
+	return *(const double *) a < *(const double *) b;
+}
+
+
+static void d_copy(void *dst, const void *src)
+{
+	*(double *) dst = *(const double *) src;
+}
+
+
+static int o_store(void *dst, PyObject *obj)
+{
+	Py_INCREF(obj);
+	*(PyObject **) dst = obj;
+	return 0;
+}
+
+
+static PyObject *o_load(const void *src)
+{
+	PyObject *obj = *(PyObject * const *) src;
+	Py_INCREF(obj);
+	return obj;
+}
+
+
+static int o_lt(const void *a, const void *b)
+{
+	return segments_RichCompareBool(*(PyObject * const *) a, *(PyObject * const *) b, Py_LT);
+}
+
+
+static void o_copy(void *dst, const void *src)
+{
+	PyObject *obj = *(PyObject * const *) src;
+	Py_INCREF(obj);
+	*(PyObject **) dst = obj;
+}
+
+
+static void o_release(void *p)
+{
+	Py_XDECREF(*(PyObject **) p);
+}
+
+
+static const struct kind kinds[] = {
+	{'q', q_store, q_load, q_lt, q_copy, NULL},
+	{'d', d_store, d_load, d_lt, d_copy, NULL},
+	{'O', o_store, o_load, o_lt, o_copy, o_release},
+};
+
+
+/* all kinds use 8 byte storage */
+#define ITEMSIZE 8
+
+
+static const struct kind *get_kind(char typecode)
+{
+	switch(typecode) {
+	case 'q':
+		return &kinds[0];
+	case 'd':
+		return &kinds[1];
+	case 'O':
+		return &kinds[2];
+	default:
+		return NULL;
+	}
+}
+
+
+/* the narrowest typecode, no narrower than typecode, that can represent
+ * obj.  see also _segmentarray_typecode() in segments.py */
+
+
+static char widen_typecode(char typecode, PyObject *obj)
+{
+	int64_t q;
+	if(typecode == 'O' || is_infinity(obj))
+		return typecode;
+	if(PyInt_Check(obj) || PyLong_Check(obj)) {
+		int result = q_store(&q, obj);
+		if(result)
+			PyErr_Clear();
+		return result ? 'O' : typecode;
+	}
+	if(PyFloat_Check(obj))
+		return 'd';
+	return 'O';
+}
+
+
+/* the wider of two typecodes */
+
+
+static char common_typecode(char a, char b)
+{
+	if(a == 'O' || b == 'O')
+		return 'O';
+	if(a == 'd' || b == 'd')
+		return 'd';
+	return 'q';
+}
+
+
+/*
+ * ============================================================================
+ *
+ *                            segmentarray Class
+ *
+ * ============================================================================
+ */
+
+
+/*
+ * Utilities
+ */
+
+
+#define LO(self, i) ((char *) (self)->lo + (i) * ITEMSIZE)
+#define HI(self, i) ((char *) (self)->hi + (i) * ITEMSIZE)
+/* the k-th boundary in the sequence lo[0], hi[0], lo[1], hi[1], ... */
+#define BOUND(self, k) ((k) & 1 ? HI(self, (k) >> 1) : LO(self, (k) >> 1))
+
+
+static int segments_SegmentArray_Check(PyObject *obj)
+{
+	return obj ? PyObject_TypeCheck(obj, &segments_SegmentArray_Type) : 0;
+}
+
+
+static const struct kind *kind_of(segments_SegmentArray *self)
+{
+	return get_kind(self->typecode);
+}
+
+
+static segments_SegmentArray *segments_SegmentArray_New(PyTypeObject *type, char typecode, Py_ssize_t allocated)
+{
+	segments_SegmentArray *new;
+	if(!type->tp_alloc) {
+		PyErr_SetObject(PyExc_TypeError, (PyObject *) type);
+		return NULL;
+	}
+	new = (segments_SegmentArray *) type->tp_alloc(type, 0);
+	if(!new)
+		return NULL;
+	new->typecode = typecode;
+	new->length = 0;
+	new->allocated = allocated;
+	/* malloc(0) might return NULL */
+	new->lo = PyMem_Malloc(allocated * ITEMSIZE + 1);
+	new->hi = PyMem_Malloc(allocated * ITEMSIZE + 1);
+	if(!new->lo || !new->hi) {
+		Py_DECREF(new);
+		return (segments_SegmentArray *) PyErr_NoMemory();
+	}
+	return new;
+}
+
+
+static void release_bounds(segments_SegmentArray *self)
+{
+	const struct kind *kind = kind_of(self);
+	Py_ssize_t i;
+	if(kind->release && self->lo && self->hi)
+		for(i = 0; i < self->length; i++) {
+			kind->release(LO(self, i));
+			kind->release(HI(self, i));
+		}
+	PyMem_Free(self->lo);
+	PyMem_Free(self->hi);
+	self->lo = self->hi = NULL;
+	self->length = self->allocated = 0;
+}
+
+
+/* replace the contents of self with those of other, leaving other empty */
+
+
+static void steal(segments_SegmentArray *self, segments_SegmentArray *other)
+{
+	release_bounds(self);
+	self->typecode = other->typecode;
+	self->length = other->length;
+	self->allocated = other->allocated;
+	self->lo = other->lo;
+	self->hi = other->hi;
+	other->length = other->allocated = 0;
+	other->lo = other->hi = NULL;
+}
+
+
+/* return a new segmentarray of the given type containing a copy of self
+ * converted to the (wider) typecode */
+
+
+static segments_SegmentArray *convert(PyTypeObject *type, segments_SegmentArray *self, char typecode)
+{
+	const struct kind *kind = kind_of(self);
+	const struct kind *newkind = get_kind(typecode);
+	segments_SegmentArray *new;
+	Py_ssize_t i;
+
+	new = segments_SegmentArray_New(type, typecode, self->length);
+	if(!new)
+		return NULL;
+
+	if(self->typecode == typecode) {
+		for(i = 0; i < self->length; i++) {
+			kind->copy(LO(new, i), LO(self, i));
+			kind->copy(HI(new, i), HI(self, i));
+		}
+		new->length = self->length;
+		return new;
+	}
+
+	for(i = 0; i < 2 * self->length; i++) {
+		PyObject *obj = kind->load(BOUND(self, i));
+		int result;
+		if(!obj) {
+			result = -1;
+		} else {
+			result = newkind->store(BOUND(new, i), obj);
+			Py_DECREF(obj);
+			if(result > 0)
+				PyErr_SetString(PyExc_TypeError, "cannot convert boundaries to narrower typecode");
+		}
+		if(result) {
+			/* only the first i boundaries are valid */
+			if(newkind->release && (i & 1))
+				newkind->release(LO(new, i / 2));
+			Py_DECREF(new);
+			return NULL;
+		}
+		if(i & 1)
+			new->length++;
+	}
+
+	return new;
+}
+
+
+/* return self, or a copy of self converted to the (wider) typecode */
+
+
+static segments_SegmentArray *as_typecode(segments_SegmentArray *self, char typecode)
+{
+	if(self->typecode == typecode) {
+		Py_INCREF(self);
+		return self;
+	}
+	return convert(self->ob_type, self, typecode);
+}
+
+
+/* qsort() comparison functions for interleaved (lo, hi) pairs */
+
+
+static int q_pair_compare(const void *a, const void *b)
+{
+	const int64_t *x = a, *y = b;
+	if(x[0] != y[0])
+		return x[0] < y[0] ? -1 : +1;
+	return x[1] < y[1] ? -1 : x[1] > y[1] ? +1 : 0;
+}
+
+
+static int d_pair_compare(const void *a, const void *b)
+{
+	const double *x = a, *y = b;
+	if(x[0] != y[0])
+		return x[0] < y[0] ? -1 : +1;
+	return x[1] < y[1] ? -1 : x[1] > y[1] ? +1 : 0;
+}
+
+
+/* append the union of the n interleaved, sorted, (lo, hi) pairs to self,
+ * omitting zero-length segments.  see segmentlist.coalesce() */
+
+
+static int merge_pairs(segments_SegmentArray *self, const char *pairs, Py_ssize_t n)
+{
+	const struct kind *kind = kind_of(self);
+	Py_ssize_t i = 0;
+
+	while(i < n) {
+		const char *lo = pairs + 2 * i * ITEMSIZE;
+		const char *hi = lo + ITEMSIZE;
+		int result;
+		for(i++; i < n; i++) {
+			const char *next = pairs + 2 * i * ITEMSIZE;
+			/* stop if hi < next lo */
+			result = kind->lt(hi, next);
+			if(result < 0)
+				return -1;
+			if(result)
+				break;
+			result = kind->lt(hi, next + ITEMSIZE);
+			if(result < 0)
+				return -1;
+			if(result)
+				hi = next + ITEMSIZE;
+		}
+		/* drop zero-length segments */
+		result = kind->lt(lo, hi);
+		if(result < 0)
+			return -1;
+		if(result) {
+			kind->copy(LO(self, self->length), lo);
+			kind->copy(HI(self, self->length), hi);
+			self->length++;
+		}
+	}
+
+	return 0;
+}
+
+
+/* sort the n interleaved (lo, hi) pairs of the given typecode and
+ * build a new segmentarray from them */
+
+
+static segments_SegmentArray *from_pairs(PyTypeObject *type, char typecode, char *pairs, Py_ssize_t n)
+{
+	segments_SegmentArray *new = segments_SegmentArray_New(type, typecode, n);
+	if(!new)
+		return NULL;
+
+	if(typecode == 'q')
+		qsort(pairs, n, 2 * ITEMSIZE, q_pair_compare);
+	else if(typecode == 'd')
+		qsort(pairs, n, 2 * ITEMSIZE, d_pair_compare);
+	else {
+		/* comparisons can fail, so let Python sort them */
+		PyObject *list = PyList_New(n);
+		Py_ssize_t i;
+		if(!list) {
+			Py_DECREF(new);
+			return NULL;
+		}
+		for(i = 0; i < n; i++) {
+			PyObject *pair = PyTuple_Pack(2, ((PyObject **) pairs)[2 * i], ((PyObject **) pairs)[2 * i + 1]);
+			if(!pair) {
+				Py_DECREF(list);
+				Py_DECREF(new);
+				return NULL;
+			}
+			PyList_SET_ITEM(list, i, pair);
+		}
+		if(PyList_Sort(list) < 0) {
+			Py_DECREF(list);
+			Py_DECREF(new);
+			return NULL;
+		}
+		/* the sorted pairs are a permutation of the original
+		 * pairs, so whatever references the caller holds through
+		 * the pairs buffer remain balanced */
+		for(i = 0; i < n; i++) {
+			PyObject *pair = PyList_GET_ITEM(list, i);
+			((PyObject **) pairs)[2 * i] = PyTuple_GET_ITEM(pair, 0);
+			((PyObject **) pairs)[2 * i + 1] = PyTuple_GET_ITEM(pair, 1);
+		}
+		if(merge_pairs(new, pairs, n) < 0) {
+			Py_DECREF(list);
+			Py_DECREF(new);
+			return NULL;
+		}
+		Py_DECREF(list);
+		return new;
+	}
+
+	if(merge_pairs(new, pairs, n) < 0) {
+		Py_DECREF(new);
+		return NULL;
+	}
+	return new;
+}
+
+
+/* build a new segmentarray from an iterable of segments (or any 2-element
+ * sequences).  the typecode is the narrowest one no narrower than
+ * min_typecode that can represent all the boundaries */
+
+
+static segments_SegmentArray *from_sequence(PyTypeObject *type, PyObject *sequence, char min_typecode)
+{
+	segments_SegmentArray *new = NULL;
+	const struct kind *kind;
+	PyObject *items;
+	char typecode = min_typecode;
+	char *pairs;
+	Py_ssize_t n, i;
+
+	items = PySequence_Fast(sequence, "segmentarray() argument must be iterable");
+	if(!items)
+		return NULL;
+	n = PySequence_Fast_GET_SIZE(items);
+
+	/* first pass:  validate items, choose typecode */
+
+	for(i = 0; i < n; i++) {
+		PyObject *item = PySequence_Fast_GET_ITEM(items, i);
+		if(!PySequence_Check(item) || PySequence_Size(item) != 2) {
+			if(!PyErr_Occurred())
+				PyErr_SetObject(PyExc_TypeError, item);
+			Py_DECREF(items);
+			return NULL;
+		}
+		if(typecode != 'O') {
+			PyObject *lo = PySequence_GetItem(item, 0);
+			PyObject *hi = PySequence_GetItem(item, 1);
+			if(!lo || !hi) {
+				Py_XDECREF(lo);
+				Py_XDECREF(hi);
+				Py_DECREF(items);
+				return NULL;
+			}
+			typecode = widen_typecode(widen_typecode(typecode, lo), hi);
+			Py_DECREF(lo);
+			Py_DECREF(hi);
+		}
+	}
+	kind = get_kind(typecode);
+
+	/* second pass:  store the boundaries, ordering each pair as
+	 * segment() would */
+
+	pairs = PyMem_Malloc(2 * n * ITEMSIZE + 1);
+	if(!pairs) {
+		Py_DECREF(items);
+		return (segments_SegmentArray *) PyErr_NoMemory();
+	}
+	for(i = 0; i < n; i++) {
+		PyObject *item = PySequence_Fast_GET_ITEM(items, i);
+		PyObject *lo = PySequence_GetItem(item, 0);
+		PyObject *hi = PySequence_GetItem(item, 1);
+		int result;
+		if(!lo || !hi) {
+			Py_XDECREF(lo);
+			Py_XDECREF(hi);
+			goto done;
+		}
+		result = segments_RichCompareBool(hi, lo, Py_LT);
+		if(result > 0) {
+			PyObject *tmp = lo;
+			lo = hi;
+			hi = tmp;
+		}
+		if(result >= 0) {
+			result = kind->store(pairs + 2 * i * ITEMSIZE, lo);
+			if(!result) {
+				result = kind->store(pairs + (2 * i + 1) * ITEMSIZE, hi);
+				if(result && kind->release)
+					kind->release(pairs + 2 * i * ITEMSIZE);
+			}
+			if(result > 0)
+				PyErr_Format(PyExc_TypeError, "boundaries cannot be stored with typecode '%c'", typecode);
+		}
+		Py_DECREF(lo);
+		Py_DECREF(hi);
+		if(result)
+			goto done;
+	}
+
+	new = from_pairs(type, typecode, pairs, n);
+
+done:
+	if(kind->release)
+		while(i--) {
+			kind->release(pairs + 2 * i * ITEMSIZE);
+			kind->release(pairs + (2 * i + 1) * ITEMSIZE);
+		}
+	PyMem_Free(pairs);
+	Py_DECREF(items);
+	return new;
+}
+
+
+/* return other as a segmentarray (new reference) */
+
+
+static segments_SegmentArray *coerce(PyTypeObject *type, PyObject *other)
+{
+	if(segments_SegmentArray_Check(other)) {
+		Py_INCREF(other);
+		return (segments_SegmentArray *) other;
+	}
+	return from_sequence(type, other, 'q');
+}
+
+
+/*
+ * A scalar to be compared against the boundaries of a segmentarray.  If it
+ * can be represented in the array's kind it is stored and compared
+ * natively, otherwise boundaries are converted to Python objects for the
+ * comparison.
+ */
+
+
+struct query {
+	const struct kind *kind;
+	int native;
+	char value[ITEMSIZE];
+	PyObject *obj;
+};
+
+
+static int query_init(struct query *query, segments_SegmentArray *self, PyObject *obj)
+{
+	int result;
+	query->kind = kind_of(self);
+	query->obj = obj;
+	result = query->kind->store(query->value, obj);
+	if(result < 0)
+		return -1;
+	query->native = !result;
+	return 0;
+}
+
+
+static void query_clear(struct query *query)
+{
+	if(query->native && query->kind->release)
+		query->kind->release(query->value);
+}
+
+
+/* returns 1 if (bound < query) when reverse is 0 or (query < bound) when
+ * reverse is non-zero, 0 if not, -1 on error */
+
+
+static int query_lt(const struct query *query, const void *bound, int reverse)
+{
+	PyObject *obj;
+	int result;
+	if(query->native)
+		return reverse ? query->kind->lt(query->value, bound) : query->kind->lt(bound, query->value);
+	obj = query->kind->load(bound);
+	if(!obj)
+		return -1;
+	result = reverse ? segments_RichCompareBool(query->obj, obj, Py_LT) : segments_RichCompareBool(obj, query->obj, Py_LT);
+	Py_DECREF(obj);
+	return result;
+}
+
+
+/* the number of upper boundaries < query (right == 0) or <= query (right
+ * != 0).  -1 on error */
+
+
+static Py_ssize_t bisect_hi(segments_SegmentArray *self, const struct query *query, int right)
+{
+	Py_ssize_t lo = 0, hi = self->length;
+
+	while(lo < hi) {
+		Py_ssize_t mid = (lo + hi) / 2;
+		int result = query_lt(query, HI(self, mid), right);
+		if(result < 0)
+			return -1;
+		/* for right, result is query < bound */
+		if(right ? !result : result)
+			lo = mid + 1;
+		else
+			hi = mid;
+	}
+
+	return lo;
+}
+
+
+/* find the index of the segment containing the scalar or segment item.
+ * returns the index, -1 if no segment contains it, -2 on error */
+
+
+static Py_ssize_t find_index(segments_SegmentArray *self, PyObject *item)
+{
+	struct query lo, hi;
+	Py_ssize_t i;
+	int result;
+
+	if(PyObject_TypeCheck(item, &segments_Segment_Type)) {
+		if(query_init(&lo, self, PyTuple_GET_ITEM(item, 0)) < 0)
+			return -2;
+		if(query_init(&hi, self, PyTuple_GET_ITEM(item, 1)) < 0) {
+			query_clear(&lo);
+			return -2;
+		}
+		/* first segment with hi >= item's lo */
+		i = bisect_hi(self, &lo, 0);
+		if(i < 0)
+			result = -1;
+		else if(i >= self->length)
+			result = 0;
+		else {
+			/* contained if lo <= item's lo and item's hi <= hi */
+			result = query_lt(&lo, LO(self, i), 1);
+			if(result > 0)
+				result = 0;
+			else if(!result) {
+				result = query_lt(&hi, HI(self, i), 0);
+				if(result >= 0)
+					result = !result;
+			}
+		}
+		query_clear(&lo);
+		query_clear(&hi);
+	} else {
+		if(query_init(&lo, self, item) < 0)
+			return -2;
+		/* first segment with hi > item */
+		i = bisect_hi(self, &lo, 1);
+		if(i < 0)
+			result = -1;
+		else if(i >= self->length)
+			result = 0;
+		else {
+			/* item < lo? */
+			result = query_lt(&lo, LO(self, i), 1);
+			if(result >= 0)
+				result = !result;
+		}
+		query_clear(&lo);
+	}
+
+	if(result < 0)
+		return -2;
+	return result ? i : -1;
+}
+
+
+/*
+ * Bulk queries.  The locate functions set index[i] to the index of the
+ * segment containing t[i], or -1 if no segment contains it.  If the times
+ * are sorted and there are enough of them they are located by a single
+ * merge-like pass over the upper boundaries, otherwise each is located by
+ * bisection.  NaNs are treated as unsorted and are not contained in any
+ * segment.  These do not touch Python objects and are run with the GIL
+ * released.
+ */
+
+
+#define DEFINE_LOCATE(NAME, TYPE) \
+static void NAME(const TYPE *lo, const TYPE *hi, Py_ssize_t n, const TYPE *t, Py_ssize_t m, Py_ssize_t *index) \
+{ \
+	Py_ssize_t i, j = 0; \
+	int merge = m >= n / 8; \
+ \
+	for(i = 1; merge && i < m; i++) \
+		if(!(t[i] >= t[i - 1])) \
+			merge = 0; \
+ \
+	for(i = 0; i < m; i++) { \
+		if(merge) { \
+			while(j < n && !(t[i] < hi[j])) \
+				j++; \
+		} else { \
+			Py_ssize_t a = 0, b = n; \
+			while(a < b) { \
+				Py_ssize_t mid = (a + b) / 2; \
+				if(t[i] < hi[mid]) \
+					b = mid; \
+				else \
+					a = mid + 1; \
+			} \
+			j = a; \
+		} \
+		index[i] = j < n && lo[j] <= t[i] ? j : -1; \
+	} \
+}
+
+
+DEFINE_LOCATE(locate_q, int64_t)
+DEFINE_LOCATE(locate_d, double)
+
+
+/* the n boundaries starting at base converted to doubles.  for "d" arrays
+ * base is returned, otherwise the result must be released with free() */
+
+
+static double *as_doubles(segments_SegmentArray *self, char *base, Py_ssize_t n)
+{
+	double *result;
+	Py_ssize_t i;
+
+	if(self->typecode == 'd')
+		return (double *) base;
+	result = malloc((n ? n : 1) * sizeof(*result));
+	if(!result) {
+		PyErr_NoMemory();
+		return NULL;
+	}
+	for(i = 0; i < n; i++) {
+		void *bound = base + i * ITEMSIZE;
+		if(self->typecode == 'q') {
+			int64_t x = *(int64_t *) bound;
+			result[i] = x == Q_POS_INFINITY ? HUGE_VAL : x == Q_NEG_INFINITY ? -HUGE_VAL : (double) x;
+		} else {
+			PyObject *obj = *(PyObject **) bound;
+			if(obj == (PyObject *) segments_PosInfinity)
+				result[i] = HUGE_VAL;
+			else if(obj == (PyObject *) segments_NegInfinity)
+				result[i] = -HUGE_VAL;
+			else {
+				result[i] = PyFloat_AsDouble(obj);
+				if(result[i] == -1.0 && PyErr_Occurred()) {
+					free(result);
+					return NULL;
+				}
+			}
+		}
+	}
+	return result;
+}
+
+
+/* locate an array of numeric times, stored as dtype */
+
+
+static int locate_numeric(segments_SegmentArray *self, PyObject *numpy, PyObject *times, const char *dtype, Py_ssize_t *index)
+{
+	PyObject *contiguous = PyObject_CallMethod(numpy, "ascontiguousarray", "Os", times, dtype);
+	Py_buffer buf;
+	double *lo = NULL, *hi = NULL;
+	int result = -1;
+
+	if(!contiguous)
+		return -1;
+	if(PyObject_GetBuffer(contiguous, &buf, PyBUF_C_CONTIGUOUS) < 0) {
+		Py_DECREF(contiguous);
+		return -1;
+	}
+
+	if(!strcmp(dtype, "int64")) {
+		Py_BEGIN_ALLOW_THREADS
+		locate_q((int64_t *) self->lo, (int64_t *) self->hi, self->length, (int64_t *) buf.buf, buf.len / sizeof(int64_t), index);
+		Py_END_ALLOW_THREADS
+		result = 0;
+	} else {
+		lo = as_doubles(self, self->lo, self->length);
+		hi = lo ? as_doubles(self, self->hi, self->length) : NULL;
+		if(hi) {
+			Py_BEGIN_ALLOW_THREADS
+			locate_d(lo, hi, self->length, (double *) buf.buf, buf.len / sizeof(double), index);
+			Py_END_ALLOW_THREADS
+			result = 0;
+		}
+		if(self->typecode != 'd') {
+			free(lo);
+			free(hi);
+		}
+	}
+
+	PyBuffer_Release(&buf);
+	Py_DECREF(contiguous);
+	return result;
+}
+
+
+/* locate an array of arbitrary objects, one at a time */
+
+
+static int locate_objects(segments_SegmentArray *self, PyObject *times, Py_ssize_t *index)
+{
+	PyObject *flat = PyObject_CallMethod(times, "ravel", NULL);
+	PyObject *iter, *item;
+	Py_ssize_t i = 0;
+
+	if(!flat)
+		return -1;
+	iter = PyObject_GetIter(flat);
+	Py_DECREF(flat);
+	if(!iter)
+		return -1;
+	while((item = PyIter_Next(iter))) {
+		index[i] = find_index(self, item);
+		Py_DECREF(item);
+		if(index[i++] == -2) {
+			Py_DECREF(iter);
+			return -1;
+		}
+	}
+	Py_DECREF(iter);
+	return PyErr_Occurred() ? -1 : 0;
+}
+
+
+/*
+ * Implementation of the .find_many() methods of segmentarray and
+ * segmentlist.  obj must be a segmentarray, or a coalesced sequence of
+ * segments.  Returns a numpy array of indexes with the shape of times.
+ */
+
+
+PyObject *segments_SegmentArray_FindMany(PyObject *obj, PyObject *times)
+{
+	segments_SegmentArray *self = coerce(&segments_SegmentArray_Type, obj);
+	PyObject *numpy = NULL, *array = NULL, *dtype = NULL, *kind = NULL, *shape = NULL;
+	PyObject *result = NULL;
+	Py_buffer index;
+	char c;
+
+	if(!self)
+		return NULL;
+	numpy = PyImport_ImportModule("numpy");
+	if(!numpy)
+		goto done;
+	array = PyObject_CallMethod(numpy, "asarray", "O", times);
+	if(!array)
+		goto done;
+	dtype = PyObject_GetAttrString(array, "dtype");
+	kind = dtype ? PyObject_GetAttrString(dtype, "kind") : NULL;
+	shape = PyObject_GetAttrString(array, "shape");
+	if(!kind || !shape)
+		goto done;
+	if(!PyString_Check(kind) || PyString_GET_SIZE(kind) != 1) {
+		PyErr_SetObject(PyExc_TypeError, kind);
+		goto done;
+	}
+	c = PyString_AS_STRING(kind)[0];
+
+	result = PyObject_CallMethod(numpy, "empty", "Os", shape, "intp");
+	if(!result)
+		goto done;
+	if(PyObject_GetBuffer(result, &index, PyBUF_WRITABLE | PyBUF_C_CONTIGUOUS) < 0) {
+		Py_CLEAR(result);
+		goto done;
+	}
+	if(strchr("iub", c) && self->typecode == 'q') {
+		if(locate_numeric(self, numpy, array, "int64", index.buf) < 0)
+			Py_CLEAR(result);
+	} else if(strchr("iubf", c)) {
+		if(locate_numeric(self, numpy, array, "float64", index.buf) < 0)
+			Py_CLEAR(result);
+	} else {
+		if(locate_objects(self, array, index.buf) < 0)
+			Py_CLEAR(result);
+	}
+	PyBuffer_Release(&index);
+
+done:
+	Py_DECREF(self);
+	Py_XDECREF(numpy);
+	Py_XDECREF(array);
+	Py_XDECREF(dtype);
+	Py_XDECREF(kind);
+	Py_XDECREF(shape);
+	return result;
+}
+
+
+/*
+ * The boundary sweep.  Walks the boundaries of a and b in order, and
+ * emits a boundary of the result each time the bit of table selected by
+ * the states of a and b changes.  Bit (x << 1 | y) of table is set if the
+ * result is "on" when a's state is x and b's state is y.
+ */
+
+
+#define SWEEP_OR 0xe
+#define SWEEP_AND 0x8
+#define SWEEP_SUB 0x4
+#define SWEEP_XOR 0x6
+
+
+static PyObject *sweep(PyTypeObject *type, PyObject *a_obj, PyObject *b_obj, int table)
+{
+	segments_SegmentArray *a = coerce(type, a_obj);
+	segments_SegmentArray *b = coerce(type, b_obj);
+	segments_SegmentArray *new = NULL;
+	const struct kind *kind;
+	Py_ssize_t i, j, na, nb;
+	char typecode;
+	int state;
+
+	if(!a || !b)
+		goto done;
+	typecode = common_typecode(a->typecode, b->typecode);
+	kind = get_kind(typecode);
+	if(a->typecode != typecode) {
+		segments_SegmentArray *tmp = as_typecode(a, typecode);
+		Py_DECREF(a);
+		if(!(a = tmp))
+			goto done;
+	}
+	if(b->typecode != typecode) {
+		segments_SegmentArray *tmp = as_typecode(b, typecode);
+		Py_DECREF(b);
+		if(!(b = tmp))
+			goto done;
+	}
+
+	new = segments_SegmentArray_New(type, typecode, a->length + b->length);
+	if(!new)
+		goto done;
+
+	na = 2 * a->length;
+	nb = 2 * b->length;
+	i = j = 0;
+	state = 0;
+	while(i < na || j < nb) {
+		const char *x;
+		int result, newstate;
+
+		/* x = the smaller of the next boundaries */
+		if(j >= nb)
+			x = BOUND(a, i);
+		else if(i >= na)
+			x = BOUND(b, j);
+		else {
+			result = kind->lt(BOUND(b, j), BOUND(a, i));
+			if(result < 0)
+				goto error;
+			x = result ? BOUND(b, j) : BOUND(a, i);
+		}
+
+		/* advance past all boundaries equal to x.  boundaries
+		 * within each list are strictly increasing */
+		if(i < na) {
+			const char *y = BOUND(a, i);
+			result = y == x ? 0 : kind->lt(x, y);
+			if(result < 0)
+				goto error;
+			if(!result)
+				i++;
+		}
+		if(j < nb) {
+			const char *y = BOUND(b, j);
+			result = y == x ? 0 : kind->lt(x, y);
+			if(result < 0)
+				goto error;
+			if(!result)
+				j++;
+		}
+
+		newstate = (table >> (((i & 1) << 1) | (j & 1))) & 1;
+		if(newstate != state) {
+			if(newstate)
+				kind->copy(LO(new, new->length), x);
+			else
+				kind->copy(HI(new, new->length++), x);
+			state = newstate;
+		}
+	}
+	goto done;
+
+error:
+	Py_DECREF(new);
+	new = NULL;
+done:
+	Py_XDECREF(a);
+	Py_XDECREF(b);
+	return (PyObject *) new;
+}
+
+
+/* the type to use for the result of a binary operation */
+
+
+static PyTypeObject *result_type(PyObject *a, PyObject *b)
+{
+	return segments_SegmentArray_Check(a) ? a->ob_type : b->ob_type;
+}
+
+
+/* perform an in-place operation */
+
+
+static PyObject *inplace(PyObject *self, PyObject *result)
+{
+	if(!result)
+		return NULL;
+	steal((segments_SegmentArray *) self, (segments_SegmentArray *) result);
+	Py_DECREF(result);
+	Py_INCREF(self);
+	return self;
+}
+
+
+/*
+ * Basic methods
+ */
+
+
+static PyObject *__new__(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+	static char *kwlist[] = {"segs", "typecode", NULL};
+	PyObject *segs = NULL;
+	PyObject *typecode_obj = Py_None;
+	segments_SegmentArray *tmp, *new;
+	char typecode = 'q';
+	int force = 0;
+
+	if(!PyArg_ParseTupleAndKeywords(args, kwds, "|OO:segmentarray", kwlist, &segs, &typecode_obj))
+		return NULL;
+
+	if(typecode_obj != Py_None) {
+		const char *s = PyString_Check(typecode_obj) ? PyString_AS_STRING(typecode_obj) : NULL;
+		if(!s || strlen(s) != 1 || !get_kind(s[0])) {
+			PyErr_SetObject(PyExc_ValueError, typecode_obj);
+			return NULL;
+		}
+		typecode = s[0];
+		force = 1;
+	}
+
+	if(!segs)
+		return (PyObject *) segments_SegmentArray_New(type, typecode, 0);
+	if(segments_SegmentArray_Check(segs)) {
+		Py_INCREF(segs);
+		tmp = (segments_SegmentArray *) segs;
+	} else {
+		tmp = from_sequence(type, segs, 'q');
+		if(!tmp)
+			return NULL;
+		if(!force || tmp->typecode == typecode)
+			return (PyObject *) tmp;
+	}
+	if(!force)
+		typecode = tmp->typecode;
+	else if(common_typecode(tmp->typecode, typecode) != typecode) {
+		PyErr_Format(PyExc_TypeError, "boundaries cannot be stored with typecode '%c'", typecode);
+		Py_DECREF(tmp);
+		return NULL;
+	}
+	new = convert(type, tmp, typecode);
+	Py_DECREF(tmp);
+	return (PyObject *) new;
+}
+
+
+static void __del__(PyObject *self)
+{
+	release_bounds((segments_SegmentArray *) self);
+	self->ob_type->tp_free(self);
+}
+
+
+static PyObject *__repr__(PyObject *self)
+{
+	PyObject *list = PySequence_List(self);
+	PyObject *repr, *result;
+	if(!list)
+		return NULL;
+	repr = PyObject_Repr(list);
+	Py_DECREF(list);
+	if(!repr)
+		return NULL;
+	result = PyString_FromFormat("segmentarray(%s)", PyString_AsString(repr));
+	Py_DECREF(repr);
+	return result;
+}
+
+
+static PyObject *__reduce__(PyObject *self, PyObject *args)
+{
+	PyObject *list = PySequence_List(self);
+	PyObject *result;
+	if(!list)
+		return NULL;
+	result = Py_BuildValue("(O(Nc))", self->ob_type, list, ((segments_SegmentArray *) self)->typecode);
+	return result;
+}
+
+
+static PyObject *get_typecode(PyObject *self, void *unused)
+{
+	return PyString_FromStringAndSize(&((segments_SegmentArray *) self)->typecode, 1);
+}
+
+
+/*
+ * Container methods
+ */
+
+
+static Py_ssize_t __len__(PyObject *self)
+{
+	return ((segments_SegmentArray *) self)->length;
+}
+
+
+static PyObject *__getitem__(PyObject *obj, Py_ssize_t i)
+{
+	segments_SegmentArray *self = (segments_SegmentArray *) obj;
+	const struct kind *kind = kind_of(self);
+	PyObject *lo, *hi;
+
+	if(i < 0 || i >= self->length) {
+		PyErr_SetString(PyExc_IndexError, "segmentarray index out of range");
+		return NULL;
+	}
+	lo = kind->load(LO(self, i));
+	hi = kind->load(HI(self, i));
+	if(!lo || !hi) {
+		Py_XDECREF(lo);
+		Py_XDECREF(hi);
+		return NULL;
+	}
+	/* consumes references */
+	return segments_Segment_New(&segments_Segment_Type, lo, hi);
+}
+
+
+static PyObject *subscript(PyObject *obj, PyObject *item)
+{
+	segments_SegmentArray *self = (segments_SegmentArray *) obj;
+	const struct kind *kind = kind_of(self);
+	segments_SegmentArray *new;
+	Py_ssize_t start, stop, step, n, i;
+
+	if(PyIndex_Check(item)) {
+		i = PyNumber_AsSsize_t(item, PyExc_IndexError);
+		if(i == -1 && PyErr_Occurred())
+			return NULL;
+		if(i < 0)
+			i += self->length;
+		return __getitem__(obj, i);
+	}
+	if(!PySlice_Check(item)) {
+		PyErr_SetObject(PyExc_TypeError, item);
+		return NULL;
+	}
+	if(PySlice_GetIndicesEx((PySliceObject *) item, self->length, &start, &stop, &step, &n) < 0)
+		return NULL;
+	if(step < 0) {
+		PyErr_SetString(PyExc_ValueError, "segmentarray slices must have a positive step");
+		return NULL;
+	}
+	new = segments_SegmentArray_New(obj->ob_type, self->typecode, n);
+	if(!new)
+		return NULL;
+	for(i = 0; i < n; i++, start += step) {
+		kind->copy(LO(new, i), LO(self, start));
+		kind->copy(HI(new, i), HI(self, start));
+	}
+	new->length = n;
+	return (PyObject *) new;
+}
+
+
+static int __contains__(PyObject *self, PyObject *item)
+{
+	Py_ssize_t i;
+
+	if(segments_SegmentArray_Check(item) || PyObject_TypeCheck(item, &segments_SegmentList_Type)) {
+		/* item is contained if item - self is empty */
+		PyObject *diff = sweep(self->ob_type, item, self, SWEEP_SUB);
+		int result;
+		if(!diff)
+			return -1;
+		result = ((segments_SegmentArray *) diff)->length == 0;
+		Py_DECREF(diff);
+		return result;
+	}
+
+	i = find_index((segments_SegmentArray *) self, item);
+	if(i == -2)
+		return -1;
+	return i >= 0;
+}
+
+
+static PyObject *richcompare(PyObject *self, PyObject *other, int op_id)
+{
+	PyObject *a, *b, *result;
+
+	if((op_id != Py_EQ && op_id != Py_NE) || !(segments_SegmentArray_Check(other) || PyList_Check(other) || PyTuple_Check(other))) {
+		Py_INCREF(Py_NotImplemented);
+		return Py_NotImplemented;
+	}
+
+	a = PySequence_List(self);
+	b = PySequence_List(other);
+	if(!a || !b)
+		result = NULL;
+	else
+		result = PyObject_RichCompare(a, b, op_id);
+	Py_XDECREF(a);
+	Py_XDECREF(b);
+	return result;
+}
+
+
+/*
+ * Accessors
+ */
+
+
+static PyObject *__abs__(PyObject *obj)
+{
+	segments_SegmentArray *self = (segments_SegmentArray *) obj;
+	const struct kind *kind = kind_of(self);
+	PyObject *abs;
+	Py_ssize_t i;
+
+	if(!self->length)
+		return PyInt_FromLong(0);
+
+	if(self->typecode != 'O') {
+		PyObject *lo = kind->load(LO(self, 0));
+		PyObject *hi = kind->load(HI(self, self->length - 1));
+		int infinite = lo == (PyObject *) segments_NegInfinity || hi == (PyObject *) segments_PosInfinity;
+		Py_XDECREF(lo);
+		Py_XDECREF(hi);
+		if(!lo || !hi)
+			return NULL;
+		if(infinite) {
+			Py_INCREF(segments_PosInfinity);
+			return (PyObject *) segments_PosInfinity;
+		}
+	}
+
+	if(self->typecode == 'd') {
+		double sum = 0;
+		for(i = 0; i < self->length; i++)
+			sum += *(double *) HI(self, i) - *(double *) LO(self, i);
+		return PyFloat_FromDouble(sum);
+	}
+
+	if(self->typecode == 'q') {
+		/* durations are < 2^64, so a 64-bit sum only overflows for
+		 * very wide lists.  check, and fall back to Python
+		 * arithmetic if it does */
+		uint64_t sum = 0;
+		for(i = 0; i < self->length; i++) {
+			uint64_t duration = (uint64_t) *(int64_t *) HI(self, i) - (uint64_t) *(int64_t *) LO(self, i);
+			if(duration > INT64_MAX || sum + duration > INT64_MAX)
+				break;
+			sum += duration;
+		}
+		if(i == self->length)
+			return sum <= LONG_MAX ? PyInt_FromLong(sum) : PyLong_FromUnsignedLongLong(sum);
+	}
+
+	abs = PyInt_FromLong(0);
+	for(i = 0; abs && i < self->length; i++) {
+		PyObject *lo = kind->load(LO(self, i));
+		PyObject *hi = kind->load(HI(self, i));
+		PyObject *duration = lo && hi ? PyNumber_Subtract(hi, lo) : NULL;
+		PyObject *newabs = duration ? PyNumber_InPlaceAdd(abs, duration) : NULL;
+		Py_XDECREF(lo);
+		Py_XDECREF(hi);
+		Py_XDECREF(duration);
+		Py_DECREF(abs);
+		abs = newabs;
+	}
+	return abs;
+}
+
+
+static int __nonzero__(PyObject *self)
+{
+	return ((segments_SegmentArray *) self)->length != 0;
+}
+
+
+static PyObject *extent(PyObject *obj, PyObject *nul)
+{
+	segments_SegmentArray *self = (segments_SegmentArray *) obj;
+	const struct kind *kind = kind_of(self);
+	PyObject *lo, *hi;
+
+	if(!self->length) {
+		PyErr_SetString(PyExc_ValueError, "empty list");
+		return NULL;
+	}
+	lo = kind->load(LO(self, 0));
+	hi = kind->load(HI(self, self->length - 1));
+	if(!lo || !hi) {
+		Py_XDECREF(lo);
+		Py_XDECREF(hi);
+		return NULL;
+	}
+	return segments_Segment_New(&segments_Segment_Type, lo, hi);
+}
+
+
+static PyObject *find(PyObject *self, PyObject *item)
+{
+	Py_ssize_t i = find_index((segments_SegmentArray *) self, item);
+	if(i == -2)
+		return NULL;
+	if(i < 0) {
+		PyErr_SetObject(PyExc_ValueError, item);
+		return NULL;
+	}
+	return PyInt_FromSsize_t(i);
+}
+
+
+static PyObject *find_many(PyObject *self, PyObject *times)
+{
+	return segments_SegmentArray_FindMany(self, times);
+}
+
+
+static PyObject *contains_many(PyObject *self, PyObject *times)
+{
+	PyObject *index = segments_SegmentArray_FindMany(self, times);
+	PyObject *zero, *result;
+	if(!index)
+		return NULL;
+	zero = PyInt_FromLong(0);
+	result = zero ? PyObject_RichCompare(index, zero, Py_GE) : NULL;
+	Py_XDECREF(zero);
+	Py_DECREF(index);
+	return result;
+}
+
+
+/*
+ * Arithmetic
+ */
+
+
+static PyObject *__or__(PyObject *self, PyObject *other)
+{
+	return sweep(result_type(self, other), self, other, SWEEP_OR);
+}
+
+
+static PyObject *__and__(PyObject *self, PyObject *other)
+{
+	return sweep(result_type(self, other), self, other, SWEEP_AND);
+}
+
+
+static PyObject *__sub__(PyObject *self, PyObject *other)
+{
+	return sweep(result_type(self, other), self, other, SWEEP_SUB);
+}
+
+
+static PyObject *__xor__(PyObject *self, PyObject *other)
+{
+	return sweep(result_type(self, other), self, other, SWEEP_XOR);
+}
+
+
+static PyObject *__ior__(PyObject *self, PyObject *other)
+{
+	return inplace(self, __or__(self, other));
+}
+
+
+static PyObject *__iand__(PyObject *self, PyObject *other)
+{
+	return inplace(self, __and__(self, other));
+}
+
+
+static PyObject *__isub__(PyObject *self, PyObject *other)
+{
+	return inplace(self, __sub__(self, other));
+}
+
+
+static PyObject *__ixor__(PyObject *self, PyObject *other)
+{
+	return inplace(self, __xor__(self, other));
+}
+
+
+static PyObject *__invert__(PyObject *obj)
+{
+	segments_SegmentArray *self = (segments_SegmentArray *) obj;
+	const struct kind *kind = kind_of(self);
+	segments_SegmentArray *new;
+	char neg[ITEMSIZE], pos[ITEMSIZE];
+	Py_ssize_t i, first, last;
+
+	/* storing infinities cannot fail */
+	kind->store(neg, (PyObject *) segments_NegInfinity);
+	kind->store(pos, (PyObject *) segments_PosInfinity);
+
+	new = segments_SegmentArray_New(obj->ob_type, self->typecode, self->length + 1);
+	if(!new)
+		goto done;
+
+	/* the gaps are (-inf, lo[0]), (hi[0], lo[1]), ..., (hi[n-1], inf)
+	 * omitting the first and/or last if they are empty */
+	first = 0;
+	last = self->length;
+	if(self->length) {
+		int result = kind->lt(neg, LO(self, 0));
+		if(result < 0)
+			goto error;
+		first = !result;
+		result = kind->lt(HI(self, self->length - 1), pos);
+		if(result < 0)
+			goto error;
+		last = self->length - !result;
+	}
+	for(i = first; i <= last; i++) {
+		kind->copy(LO(new, new->length), i ? HI(self, i - 1) : neg);
+		kind->copy(HI(new, new->length), i < self->length ? LO(self, i) : pos);
+		new->length++;
+	}
+	goto done;
+
+error:
+	Py_DECREF(new);
+	new = NULL;
+done:
+	if(kind->release) {
+		kind->release(neg);
+		kind->release(pos);
+	}
+	return (PyObject *) new;
+}
+
+
+/*
+ * Comparisons
+ */
+
+
+static PyObject *intersects(PyObject *self, PyObject *other)
+{
+	segments_SegmentArray *a = coerce(self->ob_type, self);
+	segments_SegmentArray *b = coerce(self->ob_type, other);
+	const struct kind *kind;
+	PyObject *answer = NULL;
+	Py_ssize_t i, j;
+	char typecode;
+
+	if(!a || !b)
+		goto done;
+	typecode = common_typecode(a->typecode, b->typecode);
+	kind = get_kind(typecode);
+	if(a->typecode != typecode) {
+		segments_SegmentArray *tmp = as_typecode(a, typecode);
+		Py_DECREF(a);
+		if(!(a = tmp))
+			goto done;
+	}
+	if(b->typecode != typecode) {
+		segments_SegmentArray *tmp = as_typecode(b, typecode);
+		Py_DECREF(b);
+		if(!(b = tmp))
+			goto done;
+	}
+
+	answer = Py_False;
+	i = j = 0;
+	while(i < a->length && j < b->length) {
+		int result = kind->lt(LO(b, j), HI(a, i));
+		if(result < 0) {
+			answer = NULL;
+			goto done;
+		} else if(!result)
+			/* a's hi <= b's lo */
+			i++;
+		else if((result = kind->lt(LO(a, i), HI(b, j))) < 0) {
+			answer = NULL;
+			goto done;
+		} else if(!result)
+			/* b's hi <= a's lo */
+			j++;
+		else {
+			answer = Py_True;
+			break;
+		}
+	}
+	Py_INCREF(answer);
+
+done:
+	Py_XDECREF(a);
+	Py_XDECREF(b);
+	return answer;
+}
+
+
+static PyObject *intersects_segment(PyObject *obj, PyObject *other)
+{
+	segments_SegmentArray *self = (segments_SegmentArray *) obj;
+	PyObject *lo_obj, *hi_obj;
+	struct query lo, hi;
+	Py_ssize_t i;
+	int result;
+
+	if(!PyTuple_Check(other) || PyTuple_GET_SIZE(other) != 2) {
+		PyErr_SetObject(PyExc_TypeError, other);
+		return NULL;
+	}
+	lo_obj = PyTuple_GET_ITEM(other, 0);
+	hi_obj = PyTuple_GET_ITEM(other, 1);
+
+	if(query_init(&lo, self, lo_obj) < 0)
+		return NULL;
+	/* first segment with hi > other's lo */
+	i = bisect_hi(self, &lo, 1);
+	query_clear(&lo);
+	if(i < 0)
+		return NULL;
+	if(i >= self->length)
+		Py_RETURN_FALSE;
+
+	if(query_init(&hi, self, hi_obj) < 0)
+		return NULL;
+	/* lo < other's hi? */
+	result = query_lt(&hi, LO(self, i), 0);
+	query_clear(&hi);
+	if(result < 0)
+		return NULL;
+	if(result)
+		Py_RETURN_TRUE;
+	Py_RETURN_FALSE;
+}
+
+
+/*
+ * Coalesce
+ */
+
+
+static PyObject *coalesce(PyObject *self, PyObject *nul)
+{
+	/* always coalesced */
+	Py_INCREF(self);
+	return self;
+}
+
+
+/*
+ * Protraction and contraction and shifting
+ */
+
+
+/* add delta to the boundaries in place, natively, if the typecode and
+ * delta allow it.  returns 0 on success, 1 if not possible */
+
+
+static int add_native(segments_SegmentArray *self, PyObject *delta_obj, int lo_sign, int hi_sign)
+{
+	Py_ssize_t i;
+
+	if(self->typecode == 'q') {
+		int64_t delta;
+		if(is_infinity(delta_obj) || q_store(&delta, delta_obj)) {
+			PyErr_Clear();
+			return 1;
+		}
+		/* check for overflow before modifying anything */
+		for(i = 0; i < 2 * self->length; i++) {
+			int64_t x = *(int64_t *) BOUND(self, i);
+			int64_t d = i & 1 ? hi_sign * delta : lo_sign * delta;
+			if(x == Q_NEG_INFINITY || x == Q_POS_INFINITY)
+				continue;
+			if((d > 0 && x >= Q_POS_INFINITY - d) || (d < 0 && x <= Q_NEG_INFINITY - d))
+				return 1;
+		}
+		for(i = 0; i < 2 * self->length; i++) {
+			int64_t *x = (int64_t *) BOUND(self, i);
+			if(*x != Q_NEG_INFINITY && *x != Q_POS_INFINITY)
+				*x += i & 1 ? hi_sign * delta : lo_sign * delta;
+		}
+		return 0;
+	}
+
+	if(self->typecode == 'd') {
+		double delta;
+		if(is_infinity(delta_obj) || d_store(&delta, delta_obj)) {
+			PyErr_Clear();
+			return 1;
+		}
+		for(i = 0; i < 2 * self->length; i++)
+			*(double *) BOUND(self, i) += i & 1 ? hi_sign * delta : lo_sign * delta;
+		return 0;
+	}
+
+	return 1;
+}
+
+
+/* apply segment.<method>(delta) to each segment, and rebuild the array
+ * from the results.  the typecode does not become narrower */
+
+
+static PyObject *apply_method(PyObject *obj, const char *method, PyObject *delta)
+{
+	segments_SegmentArray *self = (segments_SegmentArray *) obj;
+	segments_SegmentArray *new;
+	PyObject *segs;
+	Py_ssize_t i;
+
+	segs = PyList_New(self->length);
+	if(!segs)
+		return NULL;
+	for(i = 0; i < self->length; i++) {
+		PyObject *seg = __getitem__(obj, i);
+		PyObject *newseg = seg ? PyObject_CallMethod(seg, (char *) method, "O", delta) : NULL;
+		Py_XDECREF(seg);
+		if(!newseg) {
+			Py_DECREF(segs);
+			return NULL;
+		}
+		PyList_SET_ITEM(segs, i, newseg);
+	}
+	new = from_sequence(obj->ob_type, segs, self->typecode);
+	Py_DECREF(segs);
+	return inplace(obj, (PyObject *) new);
+}
+
+
+/* re-sort and coalesce the array in place, as required after the
+ * boundaries have been modified by protract() or contract() */
+
+
+static PyObject *recoalesce(PyObject *obj)
+{
+	segments_SegmentArray *self = (segments_SegmentArray *) obj;
+	segments_SegmentArray *new;
+	char *pairs;
+	Py_ssize_t i;
+
+	pairs = PyMem_Malloc(2 * self->length * ITEMSIZE + 1);
+	if(!pairs)
+		return PyErr_NoMemory();
+	for(i = 0; i < self->length; i++) {
+		char *lo = pairs + 2 * i * ITEMSIZE;
+		char *hi = lo + ITEMSIZE;
+		int result;
+		memcpy(lo, LO(self, i), ITEMSIZE);
+		memcpy(hi, HI(self, i), ITEMSIZE);
+		/* reorder reversed segments, as segment() does */
+		result = kind_of(self)->lt(hi, lo);
+		if(result < 0) {
+			PyMem_Free(pairs);
+			return NULL;
+		}
+		if(result) {
+			char tmp[ITEMSIZE];
+			memcpy(tmp, lo, ITEMSIZE);
+			memcpy(lo, hi, ITEMSIZE);
+			memcpy(hi, tmp, ITEMSIZE);
+		}
+	}
+	new = from_pairs(obj->ob_type, self->typecode, pairs, self->length);
+	PyMem_Free(pairs);
+	return inplace(obj, (PyObject *) new);
+}
+
+
+static PyObject *protract(PyObject *self, PyObject *delta)
+{
+	if(add_native((segments_SegmentArray *) self, delta, -1, +1))
+		return apply_method(self, "protract", delta);
+	return recoalesce(self);
+}
+
+
+static PyObject *contract(PyObject *self, PyObject *delta)
+{
+	if(add_native((segments_SegmentArray *) self, delta, +1, -1))
+		return apply_method(self, "contract", delta);
+	return recoalesce(self);
+}
+
+
+static PyObject *shift(PyObject *self, PyObject *delta)
+{
+	if(add_native((segments_SegmentArray *) self, delta, +1, +1))
+		return apply_method(self, "shift", delta);
+	Py_INCREF(self);
+	return self;
+}
+
+
+/*
+ * Type information
+ */
+
+
+static PyNumberMethods as_number = {
+	.nb_inplace_and = __iand__,
+	.nb_and = __and__,
+	.nb_inplace_or = __ior__,
+	.nb_or = __or__,
+	.nb_inplace_xor = __ixor__,
+	.nb_xor = __xor__,
+	.nb_inplace_add = __ior__,
+	.nb_add = __or__,
+	.nb_inplace_subtract = __isub__,
+	.nb_subtract = __sub__,
+	.nb_invert = __invert__,
+	.nb_absolute = __abs__,
+	.nb_nonzero = __nonzero__,
+};
+
+
+static PySequenceMethods as_sequence = {
+	.sq_length = __len__,
+	.sq_item = __getitem__,
+	.sq_contains = __contains__,
+};
+
+
+static PyMappingMethods as_mapping = {
+	.mp_length = __len__,
+	.mp_subscript = subscript,
+};
+
+
+static struct PyMethodDef methods[] = {
+	{"__reduce__", __reduce__, METH_NOARGS, "Pickle support."},
+	{"extent", extent, METH_NOARGS, "Return the segment whose end-points denote the maximum and minimum extent of the segmentarray."},
+	{"find", find, METH_O, "Return the index of the segment that wholly contains item.  Raises ValueError if no such segment exists.  This operation is O(log n)."},
+	{"find_many", find_many, METH_O, "Vectorized version of .find() for scalars.  times is an array (or anything numpy.asarray() accepts).  Returns an array of the same shape giving the index of the segment containing each time, or -1 for times not contained in any segment.  Sorted times are located in a single pass over the boundaries, otherwise each is located by bisection.  Requires numpy."},
+	{"contains_many", contains_many, METH_O, "Vectorized version of the \"in\" operator for scalars.  Returns a boolean array of the same shape as times that is True where the time is contained in the segmentarray."},
+	{"intersects", intersects, METH_O, "Returns True if the intersection of self and the segmentarray other is not the null set, otherwise returns False.  The algorithm is O(n + m), but faster than explicit calculation of the intersection."},
+	{"intersects_segment", intersects_segment, METH_O, "Returns True if the intersection of self and the segment other is not the null set, otherwise returns False.  The algorithm is O(log n)."},
+	{"coalesce", coalesce, METH_NOARGS, "Does nothing:  segmentarray objects are always coalesced.  Provided for compatibility with segmentlist."},
+	{"protract", protract, METH_O, "Execute the .protract() method on each segment in the list and coalesce the result.  segmentarray is modified in place."},
+	{"contract", contract, METH_O, "Execute the .contract() method on each segment in the list and coalesce the result.  segmentarray is modified in place."},
+	{"shift", shift, METH_O, "Execute the .shift() method on each segment in the list.  The algorithm is O(n).  segmentarray is modified in place."},
+	{NULL,}
+};
+
+
+static struct PyGetSetDef getset[] = {
+	{"typecode", get_typecode, NULL, "The typecode of the boundary arrays:  \"q\", \"d\" or \"O\".", NULL},
+	{NULL,}
+};
+
+
+PyTypeObject segments_SegmentArray_Type = {
+	PyObject_HEAD_INIT(NULL)
+	.tp_as_mapping = &as_mapping,
+	.tp_as_number = &as_number,
+	.tp_as_sequence = &as_sequence,
+	.tp_basicsize = sizeof(segments_SegmentArray),
+	.tp_dealloc = __del__,
+	.tp_doc =
+"The segmentarray class is an alternative to the segmentlist class\n" \
+"for very large lists of segments.  Instead of storing a segment\n" \
+"object for each interval, the lower and upper boundaries of the\n" \
+"segments are stored in two contiguous arrays, and segment objects\n" \
+"are only created when the caller indexes or iterates over the\n" \
+"segmentarray.  All set operations are performed by merging the\n" \
+"boundary arrays directly.\n" \
+"\n" \
+"The boundaries are stored in one of three ways, identified by the\n" \
+"typecode attribute:  \"q\" stores 64-bit integers, \"d\" stores\n" \
+"double-precision floats, and \"O\" stores references to arbitrary\n" \
+"Python objects (e.g., LIGOTimeGPS).  If no typecode is given the\n" \
+"narrowest one capable of holding all of the boundaries is chosen.\n" \
+"Mixing integers and floats stores everything as floats.  In \"q\"\n" \
+"and \"d\" arrays infinite boundaries are stored as the extremes of\n" \
+"the integer range and as IEEE infinities respectively, and are\n" \
+"converted back to infinity objects when segments are\n" \
+"materialized.\n" \
+"\n" \
+"Unlike segmentlist objects, segmentarray objects are always\n" \
+"coalesced:  the constructor coalesces its input, and all\n" \
+"operations preserve the coalesced state.  Consequently items\n" \
+"cannot be assigned, inserted or appended;  to modify a\n" \
+"segmentarray use the arithmetic operators.\n" \
+"\n" \
+"Example:\n" \
+"\n" \
+">>> x = segmentarray([segment(0, 10), segment(20, 30), segment(5, 15)])\n" \
+">>> x\n" \
+"segmentarray([segment(0, 15), segment(20, 30)])\n" \
+">>> x.typecode\n" \
+"'q'\n" \
+">>> x |= segmentlist([segment(15, 20)])\n" \
+">>> x\n" \
+"segmentarray([segment(0, 30)])\n" \
+">>> x -= segmentarray([segment(2.5, 5)])\n" \
+">>> x\n" \
+"segmentarray([segment(0.0, 2.5), segment(5.0, 30.0)])\n" \
+">>> 3 in x\n" \
+"False\n" \
+">>> ~x\n" \
+"segmentarray([segment(-infinity, 0.0), segment(2.5, 5.0), segment(30.0, infinity)])",
+	.tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_CHECKTYPES | Py_TPFLAGS_BASETYPE,
+	.tp_getset = getset,
+	.tp_hash = PyObject_HashNotImplemented,
+	.tp_methods = methods,
+	.tp_name = MODULE_NAME ".segmentarray",
+	.tp_new = __new__,
+	.tp_repr = __repr__,
+	.tp_richcompare = richcompare,
+};
@@ -85,7 +85,7 @@ static Py_ssize_t bisect_left(PyObject *seglist, PyObject *seg, Py_ssize_t lo, P
 		if(!item)
 			return -1;
 		Py_INCREF(item);
-		result = PyObject_RichCompareBool(item, seg, Py_LT);
+		result = segments_RichCompareBool(item, seg, Py_LT);
 		Py_DECREF(item);
 		if(result < 0)
 			/* error */
@@ -122,7 +122,7 @@ static Py_ssize_t bisect_right(PyObject *seglist, PyObject *seg, Py_ssize_t lo,
 		if(!item)
 			return -1;
 		Py_INCREF(item);
-		result = PyObject_RichCompareBool(seg, item, Py_LT);
+		result = segments_RichCompareBool(seg, item, Py_LT);
 		Py_DECREF(item);
 		if(result < 0)
 			/* error */
@@ -179,7 +179,7 @@ static PyObject *min(PyObject *a, PyObject *b)
 {
 	int result;
 
-	result = PyObject_RichCompareBool(a, b, Py_LT);
+	result = segments_RichCompareBool(a, b, Py_LT);
 	if(result < 0) {
 		Py_DECREF(a);
 		Py_DECREF(b);
@@ -198,7 +198,7 @@ static PyObject *max(PyObject *a, PyObject *b)
 {
 	int result;
 
-	result = PyObject_RichCompareBool(a, b, Py_GT);
+	result = segments_RichCompareBool(a, b, Py_GT);
 	if(result < 0) {
 		Py_DECREF(a);
 		Py_DECREF(b);
@@ -369,6 +369,26 @@ static PyObject *find(PyObject *self, PyObject *item)
 }
 
 
+static PyObject *find_many(PyObject *self, PyObject *times)
+{
+	return segments_SegmentArray_FindMany(self, times);
+}
+
+
+static PyObject *contains_many(PyObject *self, PyObject *times)
+{
+	PyObject *index = segments_SegmentArray_FindMany(self, times);
+	PyObject *zero, *result;
+	if(!index)
+		return NULL;
+	zero = PyInt_FromLong(0);
+	result = zero ? PyObject_RichCompare(index, zero, Py_GE) : NULL;
+	Py_XDECREF(zero);
+	Py_DECREF(index);
+	return result;
+}
+
+
 /*
  * Comparisons
  */
@@ -407,7 +427,7 @@ static PyObject *intersects(PyObject *self, PyObject *other)
 	Py_DECREF(seg);
 
 	while(1) {
-		if((result = PyObject_RichCompareBool(hi, olo, Py_LE)) < 0) {
+		if((result = segments_RichCompareBool(hi, olo, Py_LE)) < 0) {
 			Py_DECREF(lo);
 			Py_DECREF(hi);
 			Py_DECREF(olo);
@@ -427,7 +447,7 @@ static PyObject *intersects(PyObject *self, PyObject *other)
 				Py_DECREF(ohi);
 				return NULL;
 			}
-		} else if((result = PyObject_RichCompareBool(ohi, lo, Py_LE)) < 0) {
+		} else if((result = segments_RichCompareBool(ohi, lo, Py_LE)) < 0) {
 			Py_DECREF(lo);
 			Py_DECREF(hi);
 			Py_DECREF(olo);
@@ -479,7 +499,7 @@ static PyObject *intersects_segment(PyObject *self, PyObject *other)
 			Py_XDECREF(b);
 			return NULL;
 		}
-		result = PyObject_RichCompareBool(a, b, Py_LT);
+		result = segments_RichCompareBool(a, b, Py_LT);
 		Py_DECREF(a);
 		Py_DECREF(b);
 		if(result < 0)
@@ -496,7 +516,7 @@ static PyObject *intersects_segment(PyObject *self, PyObject *other)
 			Py_XDECREF(b);
 			return NULL;
 		}
-		result = PyObject_RichCompareBool(a, b, Py_GT);
+		result = segments_RichCompareBool(a, b, Py_GT);
 		Py_DECREF(a);
 		Py_DECREF(b);
 		if(result < 0)
@@ -592,7 +612,7 @@ static PyObject *coalesce(PyObject *self, PyObject *nul)
 				Py_DECREF(hi);
 				return NULL;
 			}
-			result = PyObject_RichCompareBool(hi, a, Py_GE);
+			result = segments_RichCompareBool(hi, a, Py_GE);
 			Py_DECREF(a);
 			if(result < 0) {
 				Py_DECREF(lo);
@@ -612,7 +632,7 @@ static PyObject *coalesce(PyObject *self, PyObject *nul)
 			}
 		}
 
-		if((result = PyObject_RichCompareBool(lo, hi, Py_NE)) < 0) {
+		if((result = segments_RichCompareBool(lo, hi, Py_NE)) < 0) {
 			Py_DECREF(lo);
 			Py_DECREF(hi);
 			return NULL;
@@ -729,7 +749,7 @@ static PyObject *__ior__(PyObject *self, PyObject *other)
 				Py_DECREF(other);
 				return NULL;
 			}
-			if((result = PyObject_RichCompareBool(item_hi, lo, Py_GE)) < 0) {
+			if((result = segments_RichCompareBool(item_hi, lo, Py_GE)) < 0) {
 				Py_DECREF(lo);
 				Py_DECREF(hi);
 				Py_DECREF(item_lo);
@@ -755,7 +775,7 @@ static PyObject *__ior__(PyObject *self, PyObject *other)
 				Py_DECREF(seg);
 				Py_DECREF(other);
 				return NULL;
-			} else if((result = PyObject_RichCompareBool(item_lo, hi, Py_LE)) < 0) {
+			} else if((result = segments_RichCompareBool(item_lo, hi, Py_LE)) < 0) {
 				Py_DECREF(lo);
 				Py_DECREF(hi);
 				Py_DECREF(item_lo);
@@ -912,7 +932,7 @@ static PyObject *__isub__(PyObject *self, PyObject *other)
 			return NULL;
 		}
 
-		while((result = PyObject_RichCompareBool(ohi, lo, Py_LE))) {
+		while((result = segments_RichCompareBool(ohi, lo, Py_LE))) {
 			if(result < 0) {
 				Py_DECREF(olo);
 				Py_DECREF(ohi);
@@ -940,7 +960,7 @@ static PyObject *__isub__(PyObject *self, PyObject *other)
 			Py_DECREF(seg);
 		}
 
-		if((result = PyObject_RichCompareBool(hi, olo, Py_LE)) < 0) {
+		if((result = segments_RichCompareBool(hi, olo, Py_LE)) < 0) {
 			Py_DECREF(olo);
 			Py_DECREF(ohi);
 			Py_DECREF(lo);
@@ -949,7 +969,7 @@ static PyObject *__isub__(PyObject *self, PyObject *other)
 		} else if(result > 0) {
 			/* seg[1] <= otherseg[0] */
 			i++;
-		} else if((result = PyObject_RichCompareBool(olo, lo, Py_LE)) < 0) {
+		} else if((result = segments_RichCompareBool(olo, lo, Py_LE)) < 0) {
 			Py_DECREF(olo);
 			Py_DECREF(ohi);
 			Py_DECREF(lo);
@@ -957,7 +977,7 @@ static PyObject *__isub__(PyObject *self, PyObject *other)
 			return NULL;
 		} else if(result > 0) {
 			/* otherseg[0] <= seg[0] */
-			if((result = PyObject_RichCompareBool(ohi, hi, Py_GE)) < 0) {
+			if((result = segments_RichCompareBool(ohi, hi, Py_GE)) < 0) {
 				Py_DECREF(olo);
 				Py_DECREF(ohi);
 				Py_DECREF(lo);
@@ -1011,7 +1031,7 @@ static PyObject *__isub__(PyObject *self, PyObject *other)
 			 * need */
 			Py_INCREF(lo);
 			Py_INCREF(olo);
-			if((result = PyObject_RichCompareBool(ohi, hi, Py_LT)) < 0) {
+			if((result = segments_RichCompareBool(ohi, hi, Py_LT)) < 0) {
 				Py_DECREF(olo);
 				Py_DECREF(ohi);
 				Py_DECREF(lo);
@@ -1102,7 +1122,7 @@ static PyObject *__invert__(PyObject *self)
 		return NULL;
 	}
 	Py_INCREF(segments_NegInfinity);
-	if((result = PyObject_RichCompareBool(a, (PyObject *) segments_NegInfinity, Py_GT)) < 0) {
+	if((result = segments_RichCompareBool(a, (PyObject *) segments_NegInfinity, Py_GT)) < 0) {
 		Py_DECREF(segments_NegInfinity);
 		Py_DECREF(a);
 		Py_DECREF(new);
@@ -1156,7 +1176,7 @@ static PyObject *__invert__(PyObject *self)
 	}
 
 	Py_INCREF(segments_PosInfinity);
-	if((result = PyObject_RichCompareBool(last, (PyObject *) segments_PosInfinity, Py_LT)) < 0) {
+	if((result = segments_RichCompareBool(last, (PyObject *) segments_PosInfinity, Py_LT)) < 0) {
 		Py_DECREF(last);
 		Py_DECREF(segments_PosInfinity);
 		Py_DECREF(new);
@@ -1334,6 +1354,8 @@ static PySequenceMethods as_sequence = {
 static struct PyMethodDef methods[] = {
 	{"extent", extent, METH_NOARGS, "Return the segment whose end-points denote the maximum and minimum extent of the segmentlist.  Does not require the segmentlist to be coalesced."},
 	{"find", find, METH_O, "Return the smallest i such that i is the index of an element that wholly contains item.  Raises ValueError if no such element exists.  Does not require the segmentlist to be coalesced."},
+	{"find_many", find_many, METH_O, "Vectorized version of .find().  times is an array (or anything numpy.asarray() accepts) of scalars.  Returns an array of the same shape giving the index of the segment containing each time, or -1 for times not contained in any segment.  Sorted times are located in a single pass over the list, otherwise each is located by bisection.  Requires the segmentlist to be coalesced.  Requires numpy."},
+	{"contains_many", contains_many, METH_O, "Vectorized version of the \"in\" operator for scalars.  Returns a boolean array of the same shape as times that is True where the time is contained in the segmentlist.  See .find_many() for more information."},
 	{"intersects", intersects, METH_O, "Returns True if the intersection of self and the segmentlist other is not the null set, otherwise returns False.  The algorithm is O(n), but faster than explicit calculation of the intersection, i.e. by testing bool(self & other).  Requires both lists to be coalesced."},
 	{"intersects_segment", intersects_segment, METH_O, "Returns True if the intersection of self and the segment other is not the null set, otherwise returns False.  The algorithm is O(log n).  Requires the list to be coalesced."},
 	{"coalesce", coalesce, METH_NOARGS, "Sort the elements of a list into ascending order, and merge continuous segments into single segments.  This operation is O(n log n)."},
@@ -30,6 +30,22 @@
 #include <segments.h>
 
 
+/*
+ * ============================================================================
+ *
+ *                              Module Functions
+ *
+ * ============================================================================
+ */
+
+
+static struct PyMethodDef functions[] = {
+	{"coincidence_sweep", (PyCFunction) segments_coincidence_sweep, METH_VARARGS | METH_KEYWORDS, "Sweep once over the boundaries of a sequence of coalesced segmentlists, counting how many of them are \"on\" at each instant.  Returns a tuple (exactly, at_least, livetime).  exactly and at_least are dictionaries mapping each count k from 1 to the number of segmentlists to the coalesced segmentlist of times when exactly k, or at least k, of the segmentlists are on.  If livetimes is True, livetime is a dictionary mapping each tuple of the indexes of the segmentlists that are on together to the total time during which exactly that combination is on, otherwise livetime is None.  If there are a total of N segments in M segmentlists the algorithm is O(N log M), plus O(M) for each change in the set of segmentlists that are on if livetimes are being computed."},
+	{"_parse_cache", segments_parse_cache, METH_VARARGS, "Parse the text of a LAL cache file into a tuple of five lists of strings, the observatory, description, start, duration and URL columns.  An observatory or description of \"-\" is translated to None.  ValueError is raised if a line does not have exactly five white-space delimited columns.  For use by glue.lal."},
+	{NULL,}
+};
+
+
 /*
  * ============================================================================
  *
@@ -45,7 +61,7 @@ void init__segments(void)
 	 * Initialize module
 	 */
 
-	PyObject *module = Py_InitModule3(MODULE_NAME, NULL, "C implementations of the infinity, segment, and segmentlist classes from the segments module.");
+	PyObject *module = Py_InitModule3(MODULE_NAME, functions, "C implementations of the infinity, segment, segmentlist, and segmentarray classes and the coincidence_sweep() function from the segments module, and of the LIGOTimeGPS class and the cache file parser from the lal module.");
 
 	/*
 	 * Create infinity class
@@ -67,6 +83,19 @@ void init__segments(void)
 	PyModule_AddObject(module, "PosInfinity", (PyObject *) segments_PosInfinity);
 	PyModule_AddObject(module, "NegInfinity", (PyObject *) segments_NegInfinity);
 
+	/*
+	 * Create LIGOTimeGPS class.  Instances are created by object's
+	 * .tp_new and initialized by .tp_init, like the pure-Python class,
+	 * so that object.__new__() can be used to unpickle them.
+	 */
+
+	if(!segments_LIGOTimeGPS_Type.tp_new)
+		segments_LIGOTimeGPS_Type.tp_new = PyBaseObject_Type.tp_new;
+	if(PyType_Ready(&segments_LIGOTimeGPS_Type) < 0)
+		return;
+	Py_INCREF(&segments_LIGOTimeGPS_Type);
+	PyModule_AddObject(module, "LIGOTimeGPS", (PyObject *) &segments_LIGOTimeGPS_Type);
+
 	/*
 	 * Create segment class.  Ideally the .tp_hash field would be
 	 * initialized along with the other fields in the initializer in
@@ -91,4 +120,13 @@ void init__segments(void)
 		return;
 	Py_INCREF(&segments_SegmentList_Type);
 	PyModule_AddObject(module, "segmentlist", (PyObject *) &segments_SegmentList_Type);
+
+	/*
+	 * Create segmentarray class
+	 */
+
+	if(PyType_Ready(&segments_SegmentArray_Type) < 0)
+		return;
+	Py_INCREF(&segments_SegmentArray_Type);
+	PyModule_AddObject(module, "segmentarray", (PyObject *) &segments_SegmentArray_Type);
 }
@@ -72,6 +72,111 @@ extern segments_Infinity *segments_PosInfinity;
 extern segments_Infinity *segments_NegInfinity;
 
 
+/*
+ * ============================================================================
+ *
+ *                             LIGOTimeGPS Class
+ *
+ * ============================================================================
+ */
+
+
+/*
+ * Structure
+ */
+
+
+typedef struct {
+	PyObject_HEAD
+	/* integer seconds */
+	long long seconds;
+	/* integer nanoseconds in [0, 1000000000) */
+	long nanoseconds;
+} segments_LIGOTimeGPS;
+
+
+/*
+ * Type
+ */
+
+
+extern PyTypeObject segments_LIGOTimeGPS_Type;
+
+
+/*
+ * Comparison
+ */
+
+
+static inline int segments_LIGOTimeGPS_Cmp(const segments_LIGOTimeGPS *a, const segments_LIGOTimeGPS *b)
+{
+	if(a->seconds != b->seconds)
+		return a->seconds < b->seconds ? -1 : +1;
+	if(a->nanoseconds != b->nanoseconds)
+		return a->nanoseconds < b->nanoseconds ? -1 : +1;
+	return 0;
+}
+
+
+static inline int segments_cmp_to_bool(int d, int op_id)
+{
+	switch(op_id) {
+	case Py_LT:
+		return d < 0;
+	case Py_LE:
+		return d <= 0;
+	case Py_EQ:
+		return d == 0;
+	case Py_NE:
+		return d != 0;
+	case Py_GT:
+		return d > 0;
+	case Py_GE:
+		return d >= 0;
+	}
+	return 0;
+}
+
+
+/*
+ * Drop-in replacements for PyObject_RichCompareBool(), PyObject_Compare()
+ * and PyObject_Cmp() with a fast path for comparing two LIGOTimeGPS
+ * objects, the most common type of segment boundary.  Subclasses might
+ * override the comparison operators so only exact instances take the fast
+ * path.
+ */
+
+
+#define segments_LIGOTimeGPS_CheckExact(obj) (Py_TYPE(obj) == &segments_LIGOTimeGPS_Type)
+#define segments_both_LIGOTimeGPS(a, b) (segments_LIGOTimeGPS_CheckExact(a) && segments_LIGOTimeGPS_CheckExact(b))
+
+
+static inline int segments_RichCompareBool(PyObject *a, PyObject *b, int op_id)
+{
+	if(segments_both_LIGOTimeGPS(a, b))
+		return segments_cmp_to_bool(segments_LIGOTimeGPS_Cmp((segments_LIGOTimeGPS *) a, (segments_LIGOTimeGPS *) b), op_id);
+	return PyObject_RichCompareBool(a, b, op_id);
+}
+
+
+static inline int segments_Compare(PyObject *a, PyObject *b)
+{
+	if(segments_both_LIGOTimeGPS(a, b))
+		return segments_LIGOTimeGPS_Cmp((segments_LIGOTimeGPS *) a, (segments_LIGOTimeGPS *) b);
+	return PyObject_Compare(a, b);
+}
+
+
+static inline int segments_Cmp(PyObject *a, PyObject *b, int *result)
+{
+	if(segments_both_LIGOTimeGPS(a, b)) {
+		*result = segments_LIGOTimeGPS_Cmp((segments_LIGOTimeGPS *) a, (segments_LIGOTimeGPS *) b);
+		return 0;
+	}
+	return PyObject_Cmp(a, b, result);
+}
+
+
 /*
  * ============================================================================
  *
@@ -122,4 +227,65 @@ typedef PyListObject segments_SegmentList;
 extern PyTypeObject segments_SegmentList_Type;
 
 
+/*
+ * ============================================================================
+ *
+ *                             segmentarray Class
+ *
+ * ============================================================================
+ */
+
+
+/*
+ * Structure
+ */
+
+
+typedef struct {
+	PyObject_HEAD
+	/* 'q' (int64_t), 'd' (double) or 'O' (PyObject *) boundaries */
+	char typecode;
+	/* number of segments */
+	Py_ssize_t length;
+	/* number of segments for which space is allocated */
+	Py_ssize_t allocated;
+	/* lower and upper boundaries */
+	void *lo;
+	void *hi;
+} segments_SegmentArray;
+
+
+/*
+ * Type
+ */
+
+
+extern PyTypeObject segments_SegmentArray_Type;
+PyObject *segments_SegmentArray_FindMany(PyObject *, PyObject *);
+
+
+/*
+ * ============================================================================
+ *
+ *                                Coincidence
+ *
+ * ============================================================================
+ */
+
+
+PyObject *segments_coincidence_sweep(PyObject *, PyObject *, PyObject *);
+
+
+/*
+ * ============================================================================
+ *
+ *                                 LAL Cache
+ *
+ * ============================================================================
+ */
+
+
+PyObject *segments_parse_cache(PyObject *, PyObject *);
+
+
 #endif /* __SEGMENTS_H__ */
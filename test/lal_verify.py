@@ -1,10 +1,14 @@
+import cPickle
 import doctest
 import filecmp
 import os
+import pickle
 import random
+import StringIO
 import sys
 import unittest
 from glue import lal
+from glue import segments
 
 
 #
@@ -17,6 +21,13 @@ def maxLIGOTimeGPS():
 def randomLIGOTimeGPS():
 	return lal.LIGOTimeGPS(random.randint(-100000000, +100000000), random.randint(0, 999999999))
 
+def randomsegment():
+	start = random.randint(0, 200)
+	return segments.segment(start, start + random.randint(0, 30))
+
+def randomCacheEntries(n):
+	return [lal.CacheEntry(random.choice("HLV"), random.choice(("A", "B", "AB")), randomsegment(), "file://localhost/tmp/%d.gwf" % i) for i in range(n)]
+
 
 class test_docstrings(unittest.TestCase):
 	def test(self):
@@ -92,6 +103,41 @@ class test_LIGOTimeGPS(unittest.TestCase):
 	def test__mod__(self):
 		self.assertEqual(lal.LIGOTimeGPS(3), lal.LIGOTimeGPS(13) % 5.0)
 
+	def test__str__(self):
+		self.assertEqual("100.5", str(lal.LIGOTimeGPS(100.5)))
+		self.assertEqual("100", str(lal.LIGOTimeGPS(100)))
+		self.assertEqual("-0.8", str(lal.LIGOTimeGPS("-0.8")))
+		self.assertEqual("-1.2", str(lal.LIGOTimeGPS("-1.2")))
+		self.assertEqual("0.000000001", str(lal.LIGOTimeGPS(0, 1)))
+
+	def test__hash__(self):
+		self.assertEqual(hash(lal.LIGOTimeGPS(100, 5)), hash(100 ^ 5))
+		self.assertEqual(1, len(set([lal.LIGOTimeGPS(100.5), lal.LIGOTimeGPS("100.5"), lal.LIGOTimeGPS(100, 500000000)])))
+
+	def test__cmp__(self):
+		from glue import segments
+		self.assertEqual(True, lal.LIGOTimeGPS(100.5) < lal.LIGOTimeGPS(100, 500000001))
+		self.assertEqual(True, lal.LIGOTimeGPS(100.5) == 100.5)
+		self.assertEqual(True, lal.LIGOTimeGPS(100.5) < "200")
+		self.assertEqual(True, lal.LIGOTimeGPS(100.5) < segments.PosInfinity)
+		self.assertEqual(True, segments.NegInfinity < lal.LIGOTimeGPS(100.5))
+		self.assertEqual(False, lal.LIGOTimeGPS(100.5) == None)
+		seglist = segments.segmentlist([segments.segment(lal.LIGOTimeGPS(10, 1), lal.LIGOTimeGPS(20)), segments.segment(lal.LIGOTimeGPS(0), lal.LIGOTimeGPS(10, 1))])
+		self.assertEqual(segments.segmentlist([segments.segment(lal.LIGOTimeGPS(0), lal.LIGOTimeGPS(20))]), seglist.coalesce())
+
+	def testpickle(self):
+		# pickles of the pure-Python implementation
+		pickles = {
+			0: "ccopy_reg\n_reconstructor\np0\n(cglue.lal\nLIGOTimeGPS\np1\nc__builtin__\nobject\np2\nNtp3\nRp4\n(dp5\nS'_LIGOTimeGPS__nanoseconds'\np6\nI500000000\nsS'_LIGOTimeGPS__seconds'\np7\nI100\nsb.",
+			2: "\x80\x02cglue.lal\nLIGOTimeGPS\nq\x00)\x81q\x01}q\x02(U\x19_LIGOTimeGPS__nanosecondsq\x03J\x00e\xcd\x1dU\x15_LIGOTimeGPS__secondsq\x04Kdub."
+		}
+		for protocol, s in pickles.items():
+			self.assertEqual(s, pickle.dumps(lal.LIGOTimeGPS(100.5), protocol))
+			self.assertEqual(lal.LIGOTimeGPS(100.5), pickle.loads(s))
+		for protocol in (0, 1, 2):
+			x = randomLIGOTimeGPS()
+			self.assertEqual(x, cPickle.loads(cPickle.dumps(x, protocol)))
+
 	def test_swig_comparison(self):
 		try:
 			from lal import LIGOTimeGPS as swigLIGOTimeGPS
@@ -133,6 +179,89 @@ class test_LIGOTimeGPS(unittest.TestCase):
 				raise AssertionError("%s(%s, %s) comparison failed: %s != %s" % (key, str(arg1), "%.17g" % arg2, str(op(arg1, arg2)), str(swigop(toswig(arg1), arg2))))
 
 
+class test_IndexedCache(unittest.TestCase):
+	def testsieve(self):
+		for i in xrange(300):
+			entries = randomCacheEntries(60)
+			cache = lal.Cache(entries)
+			indexed = lal.IndexedCache(entries)
+			for j in xrange(5):
+				if random.randint(0, 1):
+					# index must survive appends
+					entries = randomCacheEntries(3)
+					cache.extend(entries[:2])
+					indexed.extend(entries[:2])
+					cache.append(entries[2])
+					indexed.append(entries[2])
+				kwargs = {}
+				if random.randint(0, 1):
+					kwargs["ifos"] = random.choice("HLV")
+				if random.randint(0, 1):
+					kwargs["description"] = random.choice(("A", "B", "AB"))
+				if random.randint(0, 1):
+					kwargs["segment"] = randomsegment()
+				if random.randint(0, 1):
+					kwargs["segmentlist"] = segments.segmentlist(randomsegment() for k in range(random.randint(0, 5)))
+				for exact_match in (False, True):
+					self.assertEqual(list(cache.sieve(exact_match = exact_match, **kwargs)), list(indexed.sieve(exact_match = exact_match, **kwargs)))
+			# index must be discarded by other modifications
+			del cache[10:20]
+			del indexed[10:20]
+			cache.sort(reverse = True)
+			indexed.sort(reverse = True)
+			kwargs = {"segment": randomsegment()}
+			self.assertEqual(list(cache.sieve(**kwargs)), list(indexed.sieve(**kwargs)))
+
+	def testsetops(self):
+		for i in xrange(100):
+			a = randomCacheEntries(20)
+			b = a[5:15] + randomCacheEntries(10)
+			self.assertEqual(lal.Cache(a) - lal.Cache(b), a[:5] + a[15:])
+			self.assertEqual(lal.Cache(a) & lal.Cache(b), a[5:15])
+			self.assertEqual(lal.Cache(a) | lal.Cache(b), a + b[10:])
+			self.assertEqual(lal.Cache(a + a[::2]).unique(), a)
+			self.assertEqual(type(lal.IndexedCache(a) - lal.Cache(b)), lal.IndexedCache)
+
+
+class test_ColumnarCache(unittest.TestCase):
+	def testfromfile(self):
+		for i in xrange(100):
+			entries = randomCacheEntries(50)
+			for entry in entries:
+				# Cache.to_segmentlistdict() sometimes keeps
+				# zero-length segments
+				if not abs(entry.segment):
+					entry.segment = entry.segment.protract(1)
+			for entry in random.sample(entries, 5):
+				entry.segment = None
+			for entry in random.sample(entries, 5):
+				entry.observatory = None
+			text = "".join("%s\n" % entry for entry in entries)
+			cache = lal.Cache.fromfile(StringIO.StringIO(text))
+			columns = lal.ColumnarCache.fromfile(StringIO.StringIO(text))
+			self.assertEqual(len(columns), len(cache))
+			self.assertEqual(columns.pfnlist(), cache.pfnlist())
+			self.assertEqual(columns.to_segmentlistdict(), cache.to_segmentlistdict())
+			for j in random.sample(xrange(len(cache)), 10):
+				self.assertEqual(columns[j], cache[j])
+			self.assertEqual(list(columns[10:20]), cache[10:20])
+			self.assertEqual(list(columns), cache)
+			# modified entries are written as they are now
+			columns[0].url = "file://localhost/modified.gwf"
+			cache[0].url = "file://localhost/modified.gwf"
+			f = StringIO.StringIO()
+			f.close = lambda: None
+			cache.tofile(f)
+			g = StringIO.StringIO()
+			g.close = lambda: None
+			columns.tofile(g)
+			self.assertEqual(f.getvalue(), g.getvalue())
+
+	def testinvalid(self):
+		for text in ("H1 S5 0 1\n", "H1 S5 0 1 file://localhost/tmp/x.gwf extra\n", "H1 S5 0 1 file://localhost/tmp/x.gwf\n\n"):
+			self.assertRaises(ValueError, lal.ColumnarCache.fromfile, StringIO.StringIO(text))
+
+
 #
 # Construct and run the test suite.
 #
@@ -141,5 +270,7 @@ class test_LIGOTimeGPS(unittest.TestCase):
 suite = unittest.TestSuite()
 suite.addTest(unittest.makeSuite(test_docstrings))
 suite.addTest(unittest.makeSuite(test_LIGOTimeGPS))
+suite.addTest(unittest.makeSuite(test_IndexedCache))
+suite.addTest(unittest.makeSuite(test_ColumnarCache))
 
 sys.exit(not unittest.TextTestRunner(verbosity=2).run(suite).wasSuccessful())
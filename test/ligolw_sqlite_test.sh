@@ -46,7 +46,41 @@ echo "--------------------------------------------------------------------"
 ligolw_sqlite --verbose --preserve-ids --replace --database ${BASE}_input.sqlite ${BASE}_input.xml.gz
 ligolw_sqlite --verbose --replace --database ${BASE}.sqlite --extract ${BASE}_output.xml file://${PWD}/${BASE}_input.sqlite ${BASE}_input.sqlite
 cmp ${BASE}_ref.xml ${BASE}_output.xml || exit
-rm -vf ${BASE}_ref.xml ${BASE}_input.sqlite ${BASE}.sqlite ${BASE}_output.xml
+rm -vf ${BASE}_input.sqlite ${BASE}.sqlite ${BASE}_output.xml
 echo
 echo "ligolw_sqlite test 3:  success"
 echo "ligolw_add and ligolw_sqlite produced identical merged documents"
+
+#
+# are the results the same if the databases store row IDs as integers?
+# this is checked for .xml.gz input, and for .sqlite input with integer
+# IDs inserted into a database with text IDs
+#
+
+echo
+echo "ligolw_sqlite test 4:  merge files using integer IDs and compare to ligolw_add"
+echo "--------------------------------------------------------------------"
+ligolw_sqlite --verbose --integer-ids --replace --database ${BASE}.sqlite --extract ${BASE}_output.xml ${BASE}_input.xml.gz ${BASE}_input.xml.gz
+cmp ${BASE}_ref.xml ${BASE}_output.xml || exit
+rm -vf ${BASE}.sqlite ${BASE}_output.xml
+ligolw_sqlite --verbose --integer-ids --preserve-ids --replace --database ${BASE}_input.sqlite ${BASE}_input.xml.gz
+ligolw_sqlite --verbose --replace --database ${BASE}.sqlite --extract ${BASE}_output.xml ${BASE}_input.sqlite ${BASE}_input.sqlite
+cmp ${BASE}_ref.xml ${BASE}_output.xml || exit
+rm -vf ${BASE}_input.sqlite ${BASE}.sqlite ${BASE}_output.xml
+echo
+echo "ligolw_sqlite test 4:  success"
+echo "ligolw_add and ligolw_sqlite produced identical merged documents"
+
+#
+# are the results the same if the documents are parsed in parallel?
+#
+
+echo
+echo "ligolw_sqlite test 5:  merge .xml.gz files in parallel and compare to ligolw_add"
+echo "--------------------------------------------------------------------"
+ligolw_sqlite --verbose --jobs 2 --replace --database ${BASE}.sqlite --extract ${BASE}_output.xml file://${PWD}/${BASE}_input.xml.gz ${BASE}_input.xml.gz
+cmp ${BASE}_ref.xml ${BASE}_output.xml || exit
+rm -vf ${BASE}_ref.xml ${BASE}.sqlite ${BASE}_output.xml
+echo
+echo "ligolw_sqlite test 5:  success"
+echo "ligolw_add and ligolw_sqlite produced identical merged documents"
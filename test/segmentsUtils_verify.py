@@ -66,6 +66,44 @@ class test_vote(unittest.TestCase):
 			self.assertEqual(correct, segmentsUtils.vote(seglists, n))
 
 
+class test_streaming(unittest.TestCase):
+	def random_sorted_list(self):
+		# sorted but not coalesced
+		return segments.segmentlist(sorted(verifyutils.random_uncoalesced_list(random.randint(1, algebra_listlength))))
+
+	def test_algebra(self):
+		"""
+		Test the streaming segment algebra against segmentlist.
+		"""
+		for i in range(algebra_repeats // 10):
+			seglists = [self.random_sorted_list() for j in range(random.randint(1, 4))]
+			coalesced = [segments.segmentlist(seglist).coalesce() for seglist in seglists]
+			a, b = seglists[0], seglists[-1]
+			# pass generators to check the inputs are iterated
+			# over only once
+			self.assertEqual(list(segmentsUtils.itercoalesce(iter(a))), coalesced[0])
+			self.assertEqual(list(segmentsUtils.iterunion(*map(iter, seglists))), reduce(lambda x, y: x | y, coalesced))
+			self.assertEqual(list(segmentsUtils.iterintersection(*map(iter, seglists))), reduce(lambda x, y: x & y, coalesced))
+			self.assertEqual(list(segmentsUtils.iterdifference(iter(a), iter(b))), coalesced[0] - coalesced[-1])
+			extent = segments.segment(random.random(), 1 + random.random())
+			self.assertEqual(list(segmentsUtils.itercomplement(iter(a), extent)), ~coalesced[0] & segments.segmentlist([extent]))
+
+	def test_order(self):
+		"""
+		Test that segments out of order are detected.
+		"""
+		segs = [segments.segment(10, 20), segments.segment(0, 5)]
+		self.assertRaises(ValueError, list, segmentsUtils.itercoalesce(segs))
+		self.assertEqual(list(segmentsUtils.iterintersection()), [])
+
+	def test_iterfromsegwizard(self):
+		"""
+		Test streaming segwizard parsing.
+		"""
+		data = StringIO.StringIO("1 10 100 90\n2 90 120 30\n3 125 130 5\n")
+		self.assertEqual(list(segmentsUtils.itercoalesce(segmentsUtils.iterfromsegwizard(data))), [segments.segment(10, 120), segments.segment(125, 130)])
+
+
 #
 # Construct and run the test suite.
 #
@@ -74,5 +112,6 @@ class test_vote(unittest.TestCase):
 suite = unittest.TestSuite()
 suite.addTest(unittest.makeSuite(test_segwizard))
 suite.addTest(unittest.makeSuite(test_vote))
+suite.addTest(unittest.makeSuite(test_streaming))
 
 sys.exit(not unittest.TextTestRunner(verbosity=2).run(suite).wasSuccessful())
@@ -1,4 +1,5 @@
 import doctest
+import itertools
 import pickle
 import random
 import sys
@@ -378,6 +379,121 @@ class test_segmentlist(unittest.TestCase):
 		self.assertEqual(eval("%s | %s" % (w, y)), segments.segmentlist([segments.segment(0, 30)]))
 
 
+class test_segmentarray(unittest.TestCase):
+	def random_pair(self):
+		a = verifyutils.random_coalesced_list(random.randint(1, algebra_listlength))
+		b = verifyutils.random_coalesced_list(random.randint(1, algebra_listlength))
+		# exercise each of the storage types.  the boundaries of
+		# the random lists are multiples of 1/128
+		typecode = random.choice(("q", "d", "O"))
+		if typecode == "q":
+			a = segments.segmentlist(segments.segment(int(lo * 128), int(hi * 128)) for lo, hi in a)
+			b = segments.segmentlist(segments.segment(int(lo * 128), int(hi * 128)) for lo, hi in b)
+		return a, b, segments.segmentarray(a, typecode), segments.segmentarray(b, typecode)
+
+	def testalgebra(self):
+		for i in xrange(algebra_repeats // 10):
+			a, b, x, y = self.random_pair()
+			try:
+				self.assertEqual(x | y, a | b)
+				self.assertEqual(x & y, a & b)
+				self.assertEqual(x - y, a - b)
+				# segmentlist.__xor__() does not coalesce its result
+				self.assertEqual(x ^ y, (a ^ b).coalesce())
+				self.assertEqual(~x, ~a)
+				self.assertEqual(x.intersects(y), a.intersects(b))
+				self.assertEqual(x & b, a & b)
+				self.assertTrue(x - y in x)
+				self.assertEqual(x in x | y, True)
+				x |= y
+				self.assertEqual(x, a | b)
+			except AssertionError, e:
+				raise AssertionError, str(e) + "\na = " + str(a) + "\nb = " + str(b)
+
+	def testqueries(self):
+		for i in xrange(algebra_repeats // 10):
+			a, b, x, y = self.random_pair()
+			try:
+				for seg in b:
+					self.assertEqual(x.intersects_segment(seg), a.intersects_segment(seg))
+					self.assertEqual(seg in x, seg in a)
+					self.assertEqual(seg[0] in x, seg[0] in a)
+					self.assertEqual(seg[1] in x, seg[1] in a)
+				for seg in a:
+					self.assertEqual(x[x.find(seg)], seg)
+					self.assertEqual(x[x.find(seg[0])], seg)
+					self.assertRaises(ValueError, x.find, seg[1])
+				self.assertEqual(abs(x), abs(a))
+				self.assertEqual(x.extent(), a.extent())
+			except AssertionError, e:
+				raise AssertionError, str(e) + "\na = " + str(a) + "\nb = " + str(b)
+
+	def testfind_many(self):
+		import numpy
+		def find(segs, t):
+			try:
+				return segs.find(t)
+			except ValueError:
+				return -1
+		for i in xrange(algebra_repeats // 10):
+			a, b, x, y = self.random_pair()
+			# boundaries of both lists, so the edges are tested, in
+			# sorted and random order
+			times = [seg[j] for seg in a + b for j in (0, 1) if abs(seg[j]) != segments.infinity()]
+			for times in (sorted(times), random.sample(times, len(times))):
+				if x.typecode == "q":
+					times = numpy.array(times, dtype = "int64")
+				expected = [find(a, t) for t in times]
+				try:
+					self.assertEqual(list(x.find_many(times)), expected)
+					self.assertEqual(list(a.find_many(times)), expected)
+					self.assertEqual(list(x.contains_many(times)), [j >= 0 for j in expected])
+					self.assertEqual(list(a.contains_many(times)), [j >= 0 for j in expected])
+				except AssertionError, e:
+					raise AssertionError, str(e) + "\na = " + str(a) + "\ntimes = " + str(times)
+		x = segments.segmentarray([segments.segment(0, 10), segments.segment(20, segments.infinity())])
+		self.assertEqual(x.find_many([[5, 15], [25, -5]]).tolist(), [[0, -1], [1, -1]])
+		self.assertEqual(x.find_many([5.5, float("nan"), 1e300]).tolist(), [0, -1, 1])
+		self.assertEqual(x.find_many(numpy.array([5, 15], dtype = object)).tolist(), [0, -1])
+		self.assertEqual(x.find_many([]).tolist(), [])
+
+	def testcoalesce(self):
+		for i in xrange(algebra_repeats // 10):
+			a = verifyutils.random_uncoalesced_list(random.randint(1, algebra_listlength))
+			self.assertEqual(segments.segmentarray(a), segments.segmentlist(a).coalesce())
+
+	def testtypecode(self):
+		self.assertEqual(segments.segmentarray([segments.segment(0, 10)]).typecode, "q")
+		self.assertEqual(segments.segmentarray([segments.segment(0, 10.5)]).typecode, "d")
+		self.assertEqual(segments.segmentarray([segments.segment(0, 2**70)]).typecode, "O")
+		self.assertEqual(segments.segmentarray([segments.segment(0, segments.infinity())]).typecode, "q")
+		self.assertEqual(segments.segmentarray([segments.segment(0, 10)], "O").typecode, "O")
+		self.assertRaises(TypeError, segments.segmentarray, [segments.segment(0, 10.5)], "q")
+		for typecode in ("q", "d", "O"):
+			x = segments.segmentarray([segments.segment(-segments.infinity(), 0), segments.segment(10, segments.infinity())], typecode)
+			self.assertEqual(~x, segments.segmentlist([segments.segment(0, 10)]))
+			self.assertEqual(x[0][0], -segments.infinity())
+			self.assertEqual(x[-1][1], segments.infinity())
+			self.assertEqual(abs(x), segments.infinity())
+
+	def testprotract(self):
+		for typecode in ("q", "d", "O"):
+			x = segments.segmentarray([segments.segment(3, 7), segments.segment(13, 17)], typecode)
+			self.assertEqual(segments.segmentlist([segments.segment(0, 20)]), x.protract(3))
+			x = segments.segmentarray([segments.segment(3, 7), segments.segment(13, 17)], typecode)
+			self.assertEqual(segments.segmentlist([segments.segment(0, 20)]), x.contract(-3))
+			x = segments.segmentarray([segments.segment(3, 7), segments.segment(13, 17)], typecode)
+			self.assertEqual(segments.segmentlist([segments.segment(3.5, 7.5), segments.segment(13.5, 17.5)]), x.shift(0.5))
+
+	def testpickle(self):
+		for typecode in ("q", "d", "O"):
+			a = segments.segmentarray([segments.segment(0, 10), segments.segment(20, 30)], typecode)
+			for protocol in (0, 1, 2):
+				b = pickle.loads(pickle.dumps(a, protocol = protocol))
+				self.assertEqual(a, b)
+				self.assertEqual(a.typecode, b.typecode)
+
+
 class test_segmentlistdict(unittest.TestCase):
 	def testextent_all(self):
 		a = segments.segmentlistdict({"H1": segments.segmentlist(), "L1": segments.segmentlist([segments.segment(25, 35)])})
@@ -403,12 +519,134 @@ class test_segmentlistdict(unittest.TestCase):
 
 		self.assertEqual(a.all_intersects_all(b), False)
 
+	def testfind_many(self):
+		a = segments.segmentlistdict({"H1": segments.segmentlist([segments.segment(0, 10), segments.segment(20, 30)]), "L1": segments.segmentlist([segments.segment(5, 25)])})
+		result = a.find_many([2, 7, 12, 22])
+		self.assertEqual(sorted(result), ["H1", "L1"])
+		self.assertEqual(result["H1"].tolist(), [0, 0, -1, 1])
+		self.assertEqual(result["L1"].tolist(), [-1, 0, 0, 0])
+		self.assertEqual(a.contains_many([2, 7])["L1"].tolist(), [False, True])
+
+	def testcoincidences(self):
+		for i in xrange(algebra_repeats // 10):
+			a = segments.segmentlistdict((key, verifyutils.random_coalesced_list(random.randint(1, algebra_listlength))) for key in ("H1", "H2", "L1", "V1"))
+			exactly, at_least, livetime = a.coincidences(livetimes = True)
+			try:
+				self.assertEqual(sorted(exactly), [1, 2, 3, 4])
+				correct = {5: segments.segmentlist()}
+				for k in xrange(4, 0, -1):
+					correct[k] = segments.segmentlist()
+					for keys in itertools.combinations(a, k):
+						correct[k] |= a.intersection(keys)
+					self.assertEqual(at_least[k], correct[k])
+					self.assertEqual(exactly[k], correct[k] - correct[k + 1])
+				for k in xrange(1, 5):
+					for keys in itertools.combinations(a, k):
+						on = a.intersection(keys) - a.union(set(a) - set(keys))
+						self.assertAlmostEqual(livetime.get(frozenset(keys), 0), abs(on))
+			except AssertionError, e:
+				raise AssertionError, str(e) + "\na = " + str(a)
+		exactly, at_least, livetime = segments.segmentlistdict().coincidences(livetimes = True)
+		self.assertEqual((exactly, at_least, livetime), ({}, {}, {}))
+		a = segments.segmentlistdict({"H1": segments.segmentlist([segments.segment(0, 10)]), "L1": segments.segmentlist([segments.segment(10, 20)])})
+		self.assertEqual(a.coincidences(["H1", "L1"])[0], {1: segments.segmentlist([segments.segment(0, 20)]), 2: segments.segmentlist()})
+
+	def testindex(self):
+		for i in xrange(algebra_repeats // 10):
+			a = segments.segmentlistdict((key, verifyutils.random_coalesced_list(random.randint(1, algebra_listlength))) for key in ("H1", "H2", "L1", "V1"))
+			b = a.copy().build_index()
+			self.assertTrue(b.indexed)
+			try:
+				for seg in verifyutils.random_coalesced_list(algebra_listlength) + a["H1"]:
+					for x in seg:
+						self.assertEqual(sorted(b.keys_at(x)), sorted(a.keys_at(x)))
+					self.assertEqual(sorted(b.keys_intersecting(seg)), sorted(a.keys_intersecting(seg)))
+					self.assertEqual(b.intersects_segment(seg), a.intersects_segment(seg))
+				for seg in a["H1"]:
+					self.assertEqual(sorted(b.keys_at(seg[0])), sorted(a.keys_at(seg[0])))
+					try:
+						correct = a.find(seg)
+					except ValueError:
+						self.assertRaises(ValueError, b.find, seg)
+					else:
+						self.assertEqual(b.find(seg), correct)
+			except AssertionError, e:
+				raise AssertionError, str(e) + "\na = " + str(a)
+
+		# modifications discard the index
+		a = segments.segmentlistdict({"H1": segments.segmentlist([segments.segment(0, 10)]), "L1": segments.segmentlist([segments.segment(5, 15)])})
+		a.build_index()
+		self.assertEqual(sorted(a.keys_at(7)), ["H1", "L1"])
+		a.offsets["H1"] = 10
+		self.assertFalse(a.indexed)
+		self.assertEqual(a.keys_at(7), ["L1"])
+		a.build_index()
+		a["V1"] = segments.segmentlist([segments.segment(0, 20)])
+		self.assertFalse(a.indexed)
+		a.build_index()
+		a.contract(1)
+		self.assertFalse(a.indexed)
+
+	def testlazyoffsets(self):
+		for i in xrange(algebra_repeats // 10):
+			a = segments.segmentlistdict((key, verifyutils.random_coalesced_list(random.randint(1, algebra_listlength))) for key in ("H1", "H2", "L1"))
+			b = a.copy()
+			b.lazy_offsets = True
+			stored = dict(dict.items(b))
+			for j in xrange(5):
+				offsets = dict((key, random.randint(-8, 8) / 4.0) for key in a)
+				a.offsets.update(offsets)
+				b.offsets.update(offsets)
+				try:
+					# the stored lists are not shifted
+					self.assertEqual(dict(dict.items(b)), stored)
+					self.assertEqual(b, a)
+					self.assertEqual(dict(b.items()), dict(a.items()))
+					self.assertEqual(b.intersection(a), a.intersection(a))
+					self.assertEqual(b.union(a), a.union(a))
+					self.assertEqual(b.extent_all(), a.extent_all())
+					for seg in a["H1"]:
+						self.assertEqual(sorted(b.keys_at(seg[0])), sorted(a.keys_at(seg[0])))
+						self.assertEqual(sorted(b.keys_intersecting(seg)), sorted(a.keys_intersecting(seg)))
+						self.assertEqual(b.intersects_segment(seg), a.intersects_segment(seg))
+						try:
+							correct = a.find(seg)
+						except ValueError:
+							self.assertRaises(ValueError, b.find, seg)
+						else:
+							self.assertEqual(b.find(seg), correct)
+					self.assertEqual(b & a, a & a)
+					self.assertEqual(~b, ~a)
+				except AssertionError, e:
+					raise AssertionError, str(e) + "\na = " + str(a) + "\noffsets = " + str(offsets)
+
+		# assignment and in-place operations in lazy mode
+		a = segments.segmentlistdict({"H1": segments.segmentlist([segments.segment(0, 10)])})
+		a.lazy_offsets = True
+		a.offsets["H1"] = 10
+		a["H1"] = segments.segmentlist([segments.segment(10, 30)])
+		self.assertEqual(dict.__getitem__(a, "H1"), segments.segmentlist([segments.segment(0, 20)]))
+		a -= segments.segmentlistdict({"H1": segments.segmentlist([segments.segment(25, 40)])})
+		self.assertEqual(a["H1"], segments.segmentlist([segments.segment(10, 25)]))
+		a.extend(segments.segmentlistdict({"H1": segments.segmentlist([segments.segment(40, 50)])}))
+		self.assertEqual(a["H1"], segments.segmentlist([segments.segment(10, 25), segments.segment(40, 50)]))
+		a.lazy_offsets = False
+		self.assertEqual(dict.__getitem__(a, "H1"), segments.segmentlist([segments.segment(10, 25), segments.segment(40, 50)]))
+		self.assertEqual(a.offsets["H1"], 10)
+
 	def testpickle(self):
 		a = segments.segmentlistdict({"H1": segments.segmentlist([segments.segment(0, 10), segments.segment(20, 30)])})
 		a.offsets["H1"] = 10.0
 		self.assertEqual(a, pickle.loads(pickle.dumps(a, protocol = 0)))
 		self.assertEqual(a, pickle.loads(pickle.dumps(a, protocol = 1)))
 		self.assertEqual(a, pickle.loads(pickle.dumps(a, protocol = 2)))
+		a.lazy_offsets = True
+		a.offsets["H1"] = 20.0
+		for protocol in (0, 1, 2):
+			b = pickle.loads(pickle.dumps(a, protocol = protocol))
+			self.assertTrue(b.lazy_offsets)
+			self.assertEqual(a, b)
+			self.assertEqual(dict.items(a), dict.items(b))
 
 
 #
@@ -426,6 +664,7 @@ if __name__ == "__main__":
 	suite.addTest(unittest.makeSuite(test_infinity))
 	suite.addTest(unittest.makeSuite(test_segment))
 	suite.addTest(unittest.makeSuite(test_segmentlist))
+	suite.addTest(unittest.makeSuite(test_segmentarray))
 	suite.addTest(unittest.makeSuite(test_segmentlistdict))
 
 	if not unittest.TextTestRunner(verbosity=2).run(suite).wasSuccessful():
@@ -441,11 +680,14 @@ if __name__ == "__main__":
 	segments.PosInfinity = __segments.PosInfinity
 	segments.segment = __segments.segment
 	segments.segmentlist = __segments.segmentlist
+	segments.segmentarray = __segments.segmentarray
+	segments.coincidence_sweep = __segments.coincidence_sweep
 
 	suite = unittest.TestSuite()
 	suite.addTest(unittest.makeSuite(test_infinity))
 	suite.addTest(unittest.makeSuite(test_segment))
 	suite.addTest(unittest.makeSuite(test_segmentlist))
+	suite.addTest(unittest.makeSuite(test_segmentarray))
 	suite.addTest(unittest.makeSuite(test_segmentlistdict))
 
 	if not unittest.TextTestRunner(verbosity=2).run(suite).wasSuccessful():
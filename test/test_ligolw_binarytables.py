@@ -0,0 +1,7 @@
+#!/usr/bin/env python
+
+import doctest
+from glue.ligolw import binarytables
+
+if __name__ == '__main__':
+	doctest.testmod(binarytables)
@@ -0,0 +1,7 @@
+#!/usr/bin/env python
+
+import doctest
+from glue.ligolw import columnartables
+
+if __name__ == '__main__':
+	doctest.testmod(columnartables)